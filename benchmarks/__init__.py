@@ -0,0 +1,8 @@
+"""
+Benchmarks for tei-transform on a synthetic corpus of TEI documents.
+
+Run with
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare baseline.json results.json
+"""
@@ -0,0 +1,117 @@
+import argparse
+import os
+import sys
+import tempfile
+from typing import List, Optional
+
+from benchmarks.corpus import write_corpus
+from benchmarks.runner import (
+    DEFAULT_SCHEME,
+    compare,
+    format_comparison,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="""Benchmark tei-transform on a synthetic corpus of TEI
+        documents and compare the results of different runs.""",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser(
+        "run", help="Generate a corpus and time the stages of processing."
+    )
+    run_parser.add_argument(
+        "--output", "-o", help="File to write the results to (JSON)."
+    )
+    run_parser.add_argument("--documents", type=int, default=50)
+    run_parser.add_argument(
+        "--paragraphs",
+        type=int,
+        default=200,
+        help="Average number of paragraphs per document.",
+    )
+    run_parser.add_argument(
+        "--depth", type=int, default=2, help="Nesting depth of <div/> elements."
+    )
+    run_parser.add_argument(
+        "--error-density",
+        type=float,
+        default=0.1,
+        help="Probability of a paragraph to be replaced by an invalid pattern.",
+    )
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument(
+        "--transformation",
+        "-t",
+        nargs="+",
+        default=None,
+        help="Plugins to benchmark. Default is all plugins except tei-ns.",
+    )
+    run_parser.add_argument(
+        "--corpus",
+        default=None,
+        help="""Directory to write the corpus to. By default, a temporary
+        directory is used.""",
+    )
+    run_parser.add_argument("--scheme", default=DEFAULT_SCHEME)
+    run_parser.add_argument(
+        "--no-validation",
+        action="store_true",
+        help="Skip compiling the scheme and validating the documents.",
+    )
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare the results of two runs."
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="""Relative slowdown of a stage that is reported as regression.
+        Default is 0.1.""",
+    )
+    args = parser.parse_args(arguments)
+    if args.command == "compare":
+        baseline = load_results(args.baseline)
+        current = load_results(args.current)
+        print(format_comparison(baseline, current))
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            sys.exit(f"Regression in: {', '.join(regressions)}")
+        return
+    with tempfile.TemporaryDirectory() as tempdir:
+        files = write_corpus(
+            args.corpus or os.path.join(tempdir, "corpus"),
+            documents=args.documents,
+            paragraphs=args.paragraphs,
+            depth=args.depth,
+            error_density=args.error_density,
+            seed=args.seed,
+        )
+        results = run_benchmarks(
+            files,
+            plugins=args.transformation,
+            repeat=args.repeat,
+            tei_scheme=None if args.no_validation else args.scheme,
+        )
+    results["metadata"]["corpus"] = {
+        "paragraphs": args.paragraphs,
+        "depth": args.depth,
+        "error_density": args.error_density,
+        "seed": args.seed,
+    }
+    for stage, result in results["stages"].items():
+        print(f"{stage:<16}{result['min']:>10.3f}s")
+    if args.output is not None:
+        save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Generate synthetic TEI documents that contain the invalid patterns the
+built-in observers are meant to fix. The patterns are named after the
+plugin that fixes them. Patterns that change the structure of the whole
+document (missing-body, empty-body, tei-ns) are not generated.
+"""
+import os
+import random
+from typing import Dict, List, Optional, Sequence, Set
+
+# Patterns in the text part, inserted as children of the innermost <div/>.
+# '{n}' is replaced by a number that is unique within the document.
+TEXT_PATTERNS: Dict[str, str] = {
+    "byline-sibling": "<p>text {n}</p><byline>byline</byline><p>text</p>",
+    "cell-tail": "<table><row><cell>a</cell>tail {n}<cell>b</cell></row></table>",
+    "code-elem": "<p>text {n}<code><hi>code</hi></code></p>",
+    "del-child": "<p>text {n}<del><p>deleted</p></del></p>",
+    "div-parent": "<p>text {n}<div><p>inner</p></div></p>",
+    "div-sibling": "<div><p>text {n}</p></div><p>after div</p>",
+    "div-tail": "<div><p>text {n}</p></div>tail",
+    "div-text": "<div>text {n}<p>paragraph</p></div>",
+    "double-cell": "<table><row><cell><cell>text {n}</cell></cell></row></table>",
+    "double-item": "<list><item><item>text {n}</item></item></list>",
+    "double-plike": "<p>outer {n}<p>inner</p>tail</p>",
+    "empty-attrib": '<p rend="">text {n}</p>',
+    "empty-elem": "<list/><p>text {n}</p>",
+    "fw-child": "<fw><p>text {n}</p></fw>",
+    "h-level": "<h2>text {n}</h2>",
+    "head-child": "<head><p>text {n}</p></head>",
+    "head-parent": "<p>text {n}<head>head</head></p>",
+    "head-type": '<head type="sub">text {n}</head>',
+    "hi-child": "<p><hi><p>text {n}</p></hi></p>",
+    "hi-parent": "<hi>text {n}</hi>",
+    "id-attribute": '<p id="p{n}">text {n}</p>',
+    "invalid-attr": '<p datetime="2022-01-01">text {n}</p>',
+    "invalid-role": '<p role="note">text {n}</p>',
+    "lb-div": "<lb/>text {n}",
+    "lb-text": "<p>text {n}<lb>broken</lb>tail</p>",
+    "list-child": "<list><p>text {n}</p></list>",
+    "list-text": "<list>text {n}<item>item</item></list>",
+    "lonely-cell": "<cell>text {n}</cell>",
+    "lonely-item": "<item>text {n}</item>",
+    "lonely-row": "<row><cell>text {n}</cell></row>",
+    "lonely-s": "<s>text {n}</s>",
+    "misused-byline": "<p>text {n}</p><byline>byline</byline><p>text</p>",
+    "misused-l": "<p><s><l>text {n}</l></s></p>",
+    "misused-opener": "<p>text {n}</p><opener/><p>text</p>",
+    "nested-fw": "<fw><fw>text {n}<list><item>item</item></list></fw></fw>",
+    "num-value": "<p>text {n}<num value='percent'>20</num></p>",
+    "p-head": "<p>text {n}</p><head>head</head>",
+    "p-parent": "<p>text {n}</p><code>code</code>tail",
+    "row-child": "<table><row><p>text {n}</p></row></table>",
+    "table-child": "<table><p>text {n}</p><row><cell>cell</cell></row></table>",
+    "table-text": "<table>text {n}<row><cell>cell</cell></row></table>",
+    "tail-text": "<p>text {n}</p>tail",
+    "u-parent": "<p>text {n}<u>spoken</u>tail</p>",
+    "ul-elem": "<ul><item>text {n}</item></ul>",
+    "unfinished-elem": "<table><head>text {n}</head><fw>fw</fw></table>",
+}
+
+HEADER_PATTERNS = frozenset(
+    {
+        "author-type",
+        "avail-text",
+        "classcode",
+        "empty-kw",
+        "empty-scheme",
+        "empty-stmt",
+        "filename-element",
+        "lang-ident",
+        "misp-notesstmt",
+        "missing-publisher",
+        "mq-attr",
+        "notesstmt",
+        "p-pubstmt",
+        "ptr-target",
+        "rel-item",
+        "resp-note",
+        "schemalocation",
+        "teiheader-type",
+        "textclass",
+    }
+)
+
+PATTERNS = sorted(set(TEXT_PATTERNS) | HEADER_PATTERNS | {"body-text"})
+
+# configuration for the plugins that need one to transform the patterns
+CONFIG = """
+[empty-scheme]
+scheme=#scheme
+action=remove
+
+[p-parent]
+target=code
+
+[lang-ident]
+ident=de
+
+[empty-attrib]
+target=rend
+
+[invalid-attr]
+datetime=
+"""
+
+_VALID_PARAGRAPHS = [
+    '<p>Text {n} with <hi rend="italic">highlighted</hi> words.<lb/>More text.</p>',
+    "<list><item>item {n}</item><item>item</item></list>",
+    "<table><row><cell>cell {n}</cell><cell>cell</cell></row></table>",
+    "<p>Text {n}, a <ref target='#p1'>reference</ref> and a <note>note</note>.</p>",
+]
+
+
+def generate_document(
+    paragraphs: int = 100,
+    depth: int = 2,
+    error_density: float = 0.1,
+    seed: int = 0,
+    patterns: Optional[Sequence[str]] = None,
+    section_size: int = 10,
+) -> str:
+    """
+    Return a TEI document with the given number of paragraphs in the text
+    part, grouped in sections of nested <div/> elements of the given depth.
+    Each paragraph is replaced by an invalid pattern with the probability
+    error_density. The patterns are cycled through, so that all patterns
+    are contained, if there are enough errors. Each pattern of the header
+    is contained with the same probability.
+    """
+    rng = random.Random(seed)
+    if patterns is None:
+        patterns = PATTERNS
+    unknown = set(patterns) - set(PATTERNS)
+    if unknown:
+        raise ValueError(f"Unknown patterns: {', '.join(sorted(unknown))}")
+    text_patterns = [name for name in patterns if name in TEXT_PATTERNS]
+    header_errors = {
+        name
+        for name in patterns
+        if name not in TEXT_PATTERNS and rng.random() < error_density
+    }
+    slots: List[str] = []
+    offset = rng.randrange(len(text_patterns)) if text_patterns else 0
+    for n in range(paragraphs):
+        if text_patterns and rng.random() < error_density:
+            name = text_patterns[(offset + len(slots)) % len(text_patterns)]
+            fragment = TEXT_PATTERNS[name]
+        else:
+            fragment = rng.choice(_VALID_PARAGRAPHS)
+        slots.append(fragment.format(n=n))
+    sections = []
+    for start in range(0, len(slots), section_size):
+        end = start + section_size
+        sections.append(_nested_divs(slots[start:end], depth))
+    body_text = "text in body" if "body-text" in header_errors else ""
+    root_attributes = ""
+    if "schemalocation" in header_errors:
+        root_attributes = (
+            ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+            ' xsi:schemaLocation="http://www.tei-c.org/ns/1.0 tei_all.xsd"'
+        )
+    return (
+        f'<TEI xmlns="http://www.tei-c.org/ns/1.0"{root_attributes}>'
+        f"{_header(header_errors)}"
+        f"<text><body>{body_text}{''.join(sections)}</body></text>"
+        "</TEI>"
+    )
+
+
+def write_corpus(
+    directory: str,
+    documents: int,
+    paragraphs: int = 100,
+    depth: int = 2,
+    error_density: float = 0.1,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Write synthetic documents to directory and return their paths. The
+    number of paragraphs varies between documents by up to 50%.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    files = []
+    for number in range(documents):
+        size = max(1, round(paragraphs * rng.uniform(0.5, 1.5)))
+        path = os.path.join(directory, f"document_{number:05d}.xml")
+        with open(path, "w", encoding="utf-8") as ptr:
+            ptr.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            ptr.write(
+                generate_document(
+                    paragraphs=size,
+                    depth=depth,
+                    error_density=error_density,
+                    seed=seed + number,
+                )
+            )
+        files.append(path)
+    return files
+
+
+def _nested_divs(content: List[str], depth: int) -> str:
+    inner = "".join(content)
+    for level in range(depth, 0, -1):
+        inner = f'<div n="{level}"><head>Section</head>{inner}</div>'
+    return inner
+
+
+def _header(errors: Set[str]) -> str:
+    def choose(name: str, invalid: str, valid: str = "") -> str:
+        return invalid if name in errors else valid
+
+    author = choose(
+        "author-type",
+        '<author type="person">A. Author</author>',
+        "<author>A. Author</author>",
+    )
+    resp_stmt = choose(
+        "resp-note",
+        "<respStmt><note>transcription</note><name>B. Editor</name></respStmt>",
+        "<respStmt><resp>transcription</resp><name>B. Editor</name></respStmt>",
+    )
+    availability = choose(
+        "avail-text",
+        "<availability>free<p>licence</p></availability>",
+        "<availability><p>licence</p></availability>",
+    )
+    publication_stmt = (
+        "<publicationStmt>"
+        + choose("missing-publisher", "", "<publisher>Publisher</publisher>")
+        + "<idno>1</idno>"
+        + choose("p-pubstmt", "<p/>")
+        + choose("ptr-target", '<ptr target=""/>')
+        + availability
+        + "</publicationStmt>"
+    )
+    notes_stmt = (
+        "<notesStmt"
+        + choose("notesstmt", ' type="remark"')
+        + "><note>note</note>"
+        + choose("rel-item", "<relatedItem>related</relatedItem>")
+        + "</notesStmt>"
+    )
+    source_desc = "<sourceDesc><p>born digital</p></sourceDesc>"
+    file_desc = (
+        "<fileDesc>"
+        f"<titleStmt><title>Synthetic document</title>{author}{resp_stmt}</titleStmt>"
+        + publication_stmt
+        + choose("empty-stmt", "<seriesStmt/>")
+        + choose("misp-notesstmt", source_desc + notes_stmt, notes_stmt + source_desc)
+        + choose("filename-element", "<filename>document.xml</filename>")
+        + "</fileDesc>"
+    )
+    language = choose(
+        "lang-ident",
+        "<language>German</language>",
+        '<language ident="de">German</language>',
+    )
+    text_class_tag = choose("textclass", "textclass", "textClass")
+    class_code_tag = choose("classcode", "classcode", "classCode")
+    scheme = choose("empty-scheme", "", "#scheme")
+    keywords = choose(
+        "empty-kw",
+        "<keywords/>",
+        "<keywords><term"
+        + choose("mq-attr", ' measure_quantity="1"')
+        + ">term</term></keywords>",
+    )
+    profile_desc = (
+        "<profileDesc>"
+        f"<langUsage>{language}</langUsage>"
+        f"<{text_class_tag}>"
+        f'<{class_code_tag} scheme="{scheme}">code</{class_code_tag}>'
+        f"{keywords}"
+        f"</{text_class_tag}>"
+        "</profileDesc>"
+    )
+    header_type = choose("teiheader-type", ' type="text"')
+    return f"<teiHeader{header_type}>{file_desc}{profile_desc}</teiHeader>"
@@ -0,0 +1,165 @@
+"""
+Time the stages of the processing of a corpus separately and compare the
+results of different runs.
+"""
+import configparser
+import datetime
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+from benchmarks.corpus import CONFIG
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.result_cache import package_version
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.xml_tree_iterator import UnparsedText, XMLTreeIterator
+from tei_transform.xml_writer import XmlWriterImpl
+
+DEFAULT_SCHEME = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+    "tei_transform",
+    "tei_all.rng",
+)
+
+
+def default_plugins() -> List[str]:
+    """All installed plugins, except tei-ns that only applies to files
+    without namespace."""
+    return sorted(
+        name for name in ObserverConstructor().plugins_by_name if name != "tei-ns"
+    )
+
+
+def run_benchmarks(
+    files: List[str],
+    plugins: Optional[List[str]] = None,
+    repeat: int = 3,
+    tei_scheme: Optional[str] = DEFAULT_SCHEME,
+) -> Dict[str, Any]:
+    """
+    Time iterating, transforming, validating and writing the files. Each
+    stage is run repeat times over all files. Transforming includes parsing
+    the files with the XMLTreeIterator and validating includes parsing with
+    etree.parse. If tei_scheme is None, validation is skipped.
+    """
+    if plugins is None:
+        plugins = default_plugins()
+    config = configparser.ConfigParser()
+    config.read_string(CONFIG)
+    transformer = TeiTransformer(XMLTreeIterator())
+    transformer.set_list_of_observers(
+        ObserverConstructor().construct_observers(plugins, config)
+    )
+    iterator = XMLTreeIterator()
+    writer = XmlWriterImpl()
+    transformed: List[Tuple[etree._Element, Optional[UnparsedText]]] = []
+
+    def iterate() -> None:
+        for file in files:
+            for _ in iterator.iterate_xml(file):
+                pass
+
+    def transform() -> None:
+        transformed.clear()
+        for file in files:
+            root = transformer.perform_transformation(file)
+            transformed.append((root, transformer.unparsed_text()))
+
+    stages: Dict[str, Dict[str, Any]] = {
+        "iterate": _time_stage(iterate, repeat),
+        "transform": _time_stage(transform, repeat),
+    }
+    with tempfile.TemporaryDirectory() as output_dir:
+
+        def write() -> None:
+            for number, (root, unparsed_text) in enumerate(transformed):
+                writer.write_xml(
+                    os.path.join(output_dir, f"{number}.xml"), root, unparsed_text
+                )
+
+        stages["write"] = _time_stage(write, repeat)
+    if tei_scheme is not None:
+        start = time.perf_counter()
+        validator = etree.RelaxNG(etree.parse(tei_scheme))
+        stages["compile_scheme"] = _summarize([time.perf_counter() - start])
+
+        def validate() -> None:
+            for file in files:
+                validator.validate(etree.parse(file))
+
+        stages["validate"] = _time_stage(validate, repeat)
+    return {
+        "metadata": {
+            "tei_transform_version": package_version(),
+            "python": platform.python_version(),
+            "lxml": etree.__version__,
+            "platform": platform.platform(),
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "documents": len(files),
+            "bytes": sum(os.path.getsize(file) for file in files),
+            "plugins": plugins,
+            "repeat": repeat,
+        },
+        "stages": stages,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1
+) -> List[str]:
+    """
+    Compare the fastest run of each stage contained in both results.
+    Return the names of the stages that got slower by more than threshold.
+    """
+    regressions = []
+    for stage, result in current["stages"].items():
+        if stage not in baseline["stages"]:
+            continue
+        if result["min"] > baseline["stages"][stage]["min"] * (1 + threshold):
+            regressions.append(stage)
+    return regressions
+
+
+def format_comparison(baseline: Dict[str, Any], current: Dict[str, Any]) -> str:
+    lines = [f"{'stage':<16}{'baseline':>12}{'current':>12}{'ratio':>8}"]
+    for stage, result in current["stages"].items():
+        if stage not in baseline["stages"]:
+            continue
+        before = baseline["stages"][stage]["min"]
+        ratio = result["min"] / before if before else float("inf")
+        lines.append(f"{stage:<16}{before:>11.3f}s{result['min']:>11.3f}s{ratio:>8.2f}")
+    return "\n".join(lines)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as ptr:
+        return json.load(ptr)
+
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as ptr:
+        json.dump(results, ptr, indent=2)
+
+
+def _time_stage(stage: Callable[[], None], repeat: int) -> Dict[str, Any]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        runs.append(time.perf_counter() - start)
+    return _summarize(runs)
+
+
+def _summarize(runs: List[float]) -> Dict[str, Any]:
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.mean(runs),
+    }
@@ -1,11 +1,46 @@
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, FrozenSet, List, Optional
 
 from lxml import etree
 
+if TYPE_CHECKING:
+    from tei_transform.xslt_backend import XsltRule
+
 
 class AbstractNodeObserver(ABC):
     """Abstract class for implementation of observers applied by TeiTransformer"""
 
+    # Optional metadata used by TeiTransformer to decide on which nodes
+    # observe() is called at all. Leave an attribute as None if it
+    # doesn't restrict the nodes the observer can match.
+    # Localnames of the elements the observer can match.
+    target_tags: Optional[FrozenSet[str]] = None
+    # Localnames of the parents a matching element can have.
+    required_parents: Optional[FrozenSet[str]] = None
+    # Attributes of which a matching element has at least one.
+    required_attributes: Optional[FrozenSet[str]] = None
+    # Part of the document, 'teiHeader' or 'text', that can contain
+    # matching elements.
+    scope: Optional[str] = None
+    # True if the observer doesn't need the siblings of the children of
+    # <body>, <front> and <back> (e.g. to insert elements next to them is
+    # fine) and doesn't change these containers, so it can be applied while
+    # <text> is streamed, see TeiTransformer.stream_transformation().
+    local_context: bool = False
+    # Part of the document that has to be transformed by the other observers
+    # before the observer is applied to a node. 'subtree' if it only depends
+    # on the transformed subtree of the node (e.g. its children), it is then
+    # applied after the subtree was visited, in the same traversal. 'document'
+    # if the observer needs a separate traversal after all other observers
+    # were applied (e.g. to match elements created by other observers).
+    requires_transformed: Optional[str] = None
+    # Localnames of the elements and attributes the observer can add to a
+    # document, that aren't copied from it (e.g. the new tag of a renamed
+    # element). Other observers might match them, so these are needed to
+    # leave out observers that can't match in a file, see tag_scan.py.
+    created_tags: Optional[FrozenSet[str]] = None
+    created_attributes: Optional[FrozenSet[str]] = None
+
     @abstractmethod
     def observe(self, node: etree._Element) -> bool:
         """
@@ -20,3 +55,11 @@ class AbstractNodeObserver(ABC):
         This method should implement the action to perform on nodes that
         the observer activates on."""
         pass
+
+    def xslt_rules(self) -> Optional[List["XsltRule"]]:
+        """
+        Return the transformation of the observer as rules of an XSLT
+        stylesheet, or None if it can't be expressed that way. The rules
+        are used to apply the observer with libxslt, see xslt_backend.py.
+        """
+        return None
@@ -0,0 +1,208 @@
+"""
+Runners of the commands that don't transform the input files to the output
+directory: the corpus survey, the transformation service and the shard plan.
+"""
+import configparser
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from lxml import etree
+
+from tei_transform.abstract_node_observer import AbstractNodeObserver
+from tei_transform.cli.file_processor import Validator
+from tei_transform.cli.request import CliRequest
+from tei_transform.corpus_survey import CorpusSurvey, CorpusSurveyor, sample_files
+from tei_transform.observer_constructor import (
+    InvalidObserver,
+    MissingConfiguration,
+    ObserverConstructor,
+)
+from tei_transform.parse_config import RevisionDescChange, parse_config_file
+from tei_transform.sharding import ShardPlan, relative_path
+from tei_transform.tag_scan import scan_file
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.transformation_service import TransformationService, serve
+from tei_transform.xml_writer import XmlWriter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SurveyRunner:
+    """
+    Count the nodes that the observer of each installed plugin matches in
+    (a sample of) the input files and write the survey to the file
+    requested. No file is transformed or written to the output directory.
+    """
+
+    observer_constructor: ObserverConstructor
+
+    def run(self, request: CliRequest, files: List[str]) -> None:
+        assert request.survey is not None
+        config = None
+        if request.config is not None:
+            config = parse_config_file(request.config)
+        observers_by_plugin = _construct_observers_by_plugin(
+            self.observer_constructor,
+            sorted(self.observer_constructor.plugins_by_name),
+            config,
+            warn=True,
+        )
+        sample = sample_files(files, request.sample)
+        survey = CorpusSurvey(sorted(observers_by_plugin), len(files))
+        if request.jobs > 1:
+            # only imported if needed, the module is slow to import
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(
+                max_workers=request.jobs,
+                initializer=_initialize_survey_worker,
+                initargs=(list(observers_by_plugin), request.config, request.prescan),
+            ) as executor:
+                results = list(
+                    executor.map(_survey_file_in_worker, sample, chunksize=8)
+                )
+        else:
+            surveyor = CorpusSurveyor(observers_by_plugin)
+            results = [_survey_file(surveyor, file, request.prescan) for file in sample]
+        for file, hits, error in results:
+            if hits is None:
+                logger.error("File ignored: %s\n%s" % (file, error))
+                survey.add_ignored_file(file)
+                continue
+            survey.add_file(file, hits)
+        survey.write(request.survey)
+        logger.info(
+            "Surveyed %d of %d files with %d plugins"
+            % (len(survey.files), len(files), len(observers_by_plugin))
+        )
+
+
+@dataclass
+class ServiceRunner:
+    """
+    Transform, validate and survey the documents sent to the transformation
+    service with the observers and the validator that were loaded once,
+    until the process is interrupted.
+    """
+
+    tei_transformer: TeiTransformer
+    xml_writer: XmlWriter
+    observer_constructor: ObserverConstructor
+    validator: Optional[Validator] = None
+    revision_entry: Optional[RevisionDescChange] = None
+
+    def run(self, request: CliRequest) -> None:
+        config = None
+        if request.config is not None:
+            config = parse_config_file(request.config)
+        surveyor = CorpusSurveyor(
+            _construct_observers_by_plugin(
+                self.observer_constructor,
+                sorted(self.observer_constructor.plugins_by_name),
+                config,
+                warn=True,
+            )
+        )
+        service = TransformationService(
+            tei_transformer=self.tei_transformer,
+            xml_writer=self.xml_writer,
+            surveyor=surveyor,
+            plugins=request.observers,
+            validator=self.validator,
+            revision_entry=self.revision_entry,
+        )
+        serve(
+            service,
+            request.serve_socket,
+            request.serve_port,
+            request.output,
+            request.serve_input_root,
+        )
+
+
+@dataclass
+class ShardPlanRunner:
+    """
+    Assign the input files to the number of shards requested, balanced by
+    their cost (e.g. the file size), and write the plan to the file
+    requested. No file is transformed.
+    """
+
+    cost_model: Callable[[str], float]
+
+    def run(self, request: CliRequest, files: Iterable[Tuple[str, str]]) -> None:
+        assert request.plan_shards is not None
+        sizes = {
+            relative_path(file, request.file_or_dir): self.cost_model(file)
+            for file, _ in files
+        }
+        plan = ShardPlan.balance(sizes.items(), request.shards)
+        plan.write(request.plan_shards, sizes)
+        logger.info("Planned %d files in %d shards" % (len(sizes), request.shards))
+
+
+def _construct_observers_by_plugin(
+    observer_constructor: ObserverConstructor,
+    plugins: List[str],
+    config: Optional[configparser.ConfigParser],
+    warn: bool = False,
+) -> Dict[str, AbstractNodeObserver]:
+    """
+    Construct the observer of each plugin. Plugins that require a
+    configuration that isn't given and invalid plugins are left out.
+    """
+    observers_by_plugin = {}
+    for plugin in plugins:
+        try:
+            first_pass, second_pass = observer_constructor.construct_observers(
+                [plugin], config
+            )
+        except MissingConfiguration:
+            if warn:
+                logger.warning(
+                    "Plugin not surveyed, configuration required: %s" % plugin
+                )
+            continue
+        except InvalidObserver as error:
+            if warn:
+                logger.warning("Plugin not surveyed: %s" % error)
+            continue
+        observers_by_plugin[plugin] = (first_pass + second_pass)[0]
+    return observers_by_plugin
+
+
+def _survey_file(
+    surveyor: CorpusSurveyor, file: str, prescan: bool = False
+) -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+    try:
+        scan = scan_file(file) if prescan else None
+        return file, surveyor.survey_file(file, scan), None
+    except (etree.XMLSyntaxError, OSError) as error:
+        return file, None, "%s: %s" % (error.__class__.__name__, error)
+
+
+_surveyor: Optional[CorpusSurveyor] = None
+_prescan: bool = False
+
+
+def _initialize_survey_worker(
+    plugins: List[str], config: Optional[str], prescan: bool
+) -> None:
+    global _surveyor, _prescan
+    _prescan = prescan
+    _surveyor = CorpusSurveyor(
+        _construct_observers_by_plugin(
+            ObserverConstructor(),
+            plugins,
+            parse_config_file(config) if config is not None else None,
+        )
+    )
+
+
+def _survey_file_in_worker(
+    file: str,
+) -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+    assert _surveyor is not None
+    return _survey_file(_surveyor, file, _prescan)
@@ -1,8 +1,16 @@
 import argparse
-from typing import List
+from typing import List, Tuple
 
 from tei_transform.cli.use_case import CliRequest, TeiTransformationUseCase
 
+DEFAULT_TRANSFORMATION = [
+    "schemalocation",
+    "id-attribute",
+    "teiheader-type",
+    "notesstmt",
+    "filename-element",
+]
+
 
 class TeiTransformController:
     """
@@ -13,13 +21,31 @@ class TeiTransformController:
         self.use_case = use_case
 
     def process_arguments(self, arguments: List[str]) -> None:
+        """
+        A first argument 'serve' or 'plan-shards' selects this command. A
+        first argument '--' is removed, so that a file or directory named
+        like a command is processed, e.g. 'tei-transform -- serve'.
+        """
+        if arguments[:1] == ["--"]:
+            arguments = arguments[1:]
+        elif arguments[:1] == ["serve"]:
+            self._process_serve_arguments(arguments[1:])
+            return
+        elif arguments[:1] == ["plan-shards"]:
+            self._process_plan_arguments(arguments[1:])
+            return
         parser = argparse.ArgumentParser(
             description="""Parse xml-files that have some errors (that make them
             invalid according to TEI P5) and apply transformations to the file
             content and save to new file. The old file is not changed.
             There are options to validate files before processing to e.g.
             ignore valid files. Files are validated against the Relax NG scheme
-            of the current version of  the TEI guidelines (tei_all.rng)."""
+            of the current version of  the TEI guidelines (tei_all.rng).""",
+            epilog="""Commands: 'tei-transform serve' starts the transformation
+            service, 'tei-transform plan-shards' balances shards by file size
+            (see their --help). To process a file or directory named 'serve'
+            or 'plan-shards', start the arguments with '--', e.g.
+            'tei-transform -- serve -o output', or pass it as './serve'.""",
         )
         parser.add_argument(
             "file_or_dir",
@@ -33,13 +59,7 @@ class TeiTransformController:
             content. If no plugin is passed, the default setting will be used
             ('schemalocation, id-attribute, teiheader, notesstmt, filename-element')""",
             nargs="+",
-            default=[
-                "schemalocation",
-                "id-attribute",
-                "teiheader-type",
-                "notesstmt",
-                "filename-element",
-            ],
+            default=DEFAULT_TRANSFORMATION,
         )
         parser.add_argument(
             "--config-file",
@@ -79,6 +99,15 @@ class TeiTransformController:
             help="""Validate files before processing and ignore valid file during
             processing. Only transformed files are written to the output directory.""",
         )
+        parser.add_argument(
+            "--validation-service",
+            action="store_true",
+            help="""Validate files with the compiled scheme of a running
+            validation service (tei-transform-validator) instead of compiling the
+            scheme. This saves the time to compile the scheme, but each file is
+            serialized and parsed again by the service, so it only pays off for
+            few files. Requires --copy-valid or --ignore-valid.""",
+        )
         parser.add_argument(
             "--add-revision",
             "-r",
@@ -91,24 +120,443 @@ class TeiTransformController:
             comma. If no date parameter is passed, the current date will be inserted.""",
             action="store_true",
         )
+        parser.add_argument(
+            "--jobs",
+            "-j",
+            help="""Number of worker processes used to process the files of a
+            directory in parallel. Default is 1, i.e. files are processed
+            sequentially.""",
+            type=int,
+            default=1,
+        )
+        parser.add_argument(
+            "--schedule",
+            help="""Order in which the files of a directory are dispatched to the
+            worker processes if --jobs is greater than 1. With 'largest-first'
+            (the default), the largest files are processed first, so that the
+            workers finish at about the same time. With 'walk', the files are
+            processed in the order they are found in the directory.""",
+            choices=["largest-first", "walk"],
+            default="largest-first",
+        )
+        parser.add_argument(
+            "--cache-file",
+            help="""Name of a file to store the results of processed files in. On
+            later runs with the same plugins, configuration and options, files that
+            didn't change since the last run are skipped, as long as their output
+            file is unchanged. The file is created if it doesn't exist.""",
+            default=None,
+        )
+        parser.add_argument(
+            "--observer-stats",
+            help="""Name of a file to write statistics of the observers to, i.e.
+            the number of calls and matches, the time spent in observe() and
+            transform_node() and the number of transformation errors of each
+            observer, per file and in total. If the file extension is '.csv', the
+            statistics are written as CSV, otherwise as JSON.""",
+            default=None,
+        )
+        parser.add_argument(
+            "--unchanged",
+            help="""How files are written to the output directory if no plugin
+            changed them. With 'write' (the default), the parsed document is
+            serialized like all other files. With 'copy', the original file is
+            copied without changes, sharing the data blocks with the original
+            file if the file system supports it. With 'link', the output file
+            is created as hard link to the original file if possible, so
+            changes to one of the files also change the other.""",
+            choices=["write", "copy", "link"],
+            default="write",
+        )
+        parser.add_argument(
+            "--stream",
+            help="""Transform and write the children of <body/>, <front/> and
+            <back/> one by one while the file is parsed, so that large files
+            don't have to be kept in memory completely. This is only possible
+            if all plugins support it (see README) and is ignored otherwise, as
+            well as for files that are validated or get a revision entry.""",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--prefetch",
+            help="""Number of files that are read and parsed ahead in a separate
+            thread, while a file is transformed. The output files are written in
+            another thread, so that reading, transforming and writing overlap,
+            which helps if the files are on slow (e.g. network) storage. Default
+            is 0, i.e. no files are read ahead. Only used if --jobs is 1.""",
+            type=int,
+            default=0,
+        )
+        parser.add_argument(
+            "--until-stable",
+            help="""Apply the plugins again to the parts of a file they changed,
+            until no plugin changes the file anymore, as if the output was
+            transformed again with the same plugins. The optional value is the
+            maximum number of rounds (default: 10). The number of rounds is
+            logged for each file, with a warning if the file is not stable.""",
+            metavar="MAX_ROUNDS",
+            type=int,
+            nargs="?",
+            const=10,
+            default=None,
+        )
+        parser.add_argument(
+            "--survey",
+            help="""Name of a file to write a survey of the input files to,
+            instead of transforming them. For each installed plugin, the number
+            of elements it would change (without the changes caused by other
+            plugins) is counted per file and in total. Plugins that require a
+            configuration are only surveyed if it is passed with --config-file.
+            Nothing is written to the output directory. If the file extension
+            is '.csv', the survey is written as CSV, otherwise as JSON.""",
+            default=None,
+        )
+        parser.add_argument(
+            "--sample",
+            help="""Fraction of the input files that are surveyed with
+            --survey, e.g. 0.01 for 1%% of the files. The files are drawn at
+            random and the number of files each plugin matches in the whole
+            corpus is estimated, with a 95%% confidence interval. Default is 1,
+            i.e. all files are surveyed.""",
+            type=float,
+            default=None,
+        )
+        parser.add_argument(
+            "--prescan",
+            help="""Scan each file for the names of its elements and attributes
+            before it is parsed and only apply the plugins that can match one of
+            them (directly or after the changes of other plugins). Plugins that
+            don't declare which elements they match or create are always applied.
+            With --cache-file, the scans are stored and reused by later runs.
+            With --survey, files no plugin can match are not parsed.""",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--xslt",
+            help="""Compile the plugins into an XSLT stylesheet that is applied
+            by libxslt, instead of applying them in Python. This is only done
+            if all plugins support it (e.g. the default plugins), otherwise the
+            option has no effect. The result is the same either way.""",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--max-memory",
+            help="""Limit the memory (resident set size) of each process to MB
+            megabytes. Files whose tree wouldn't fit into the memory left after
+            the process was set up (e.g. with the compiled scheme), according
+            to an estimate made before parsing them, are ignored and logged. If
+            the process already uses more memory than the limit, the run is
+            stopped. Files are
+            parsed with as little memory as possible: very large text nodes and
+            deeply nested trees are allowed, duplicate xml:ids aren't an error,
+            and files aren't parsed ahead with --prefetch.""",
+            metavar="MB",
+            type=int,
+            default=None,
+        )
+        parser.add_argument(
+            "--remove-comments",
+            help="""Remove comments from the files while parsing them.""",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--time-budget",
+            help="""Maximum time in seconds the transformation of a file may
+            take. Files that take longer are quarantined: the transformation
+            is stopped, no output is written for the file and the run goes on
+            with the next file.""",
+            metavar="SECONDS",
+            type=float,
+            default=None,
+        )
+        parser.add_argument(
+            "--node-budget",
+            help="""Maximum number of nodes the plugins may visit in a file
+            (each traversal and each round with --until-stable visits the nodes
+            again). Files that need more visits are quarantined.""",
+            metavar="NODES",
+            type=int,
+            default=None,
+        )
+        parser.add_argument(
+            "--quarantine",
+            help="""Write the quarantined files to FILENAME, one JSON object
+            per line with the file, the reason, the plugin applied when the
+            budget ran out, the elapsed time and the number of nodes visited.
+            Requires --time-budget or --node-budget.""",
+            metavar="FILENAME",
+            default=None,
+        )
+        parser.add_argument(
+            "--journal",
+            help="""Record each input file in FILENAME as soon as it is
+            processed, one JSON object per line with the file, its status
+            (transformed, unchanged, valid-copied, ignored, syntax-error,
+            quarantined or cached), the duration and the output file.""",
+            metavar="FILENAME",
+            default=None,
+        )
+        parser.add_argument(
+            "--resume",
+            help="""Resume an interrupted run: files recorded in the journal
+            are skipped and further files are appended to it. The run must
+            have the same input, output and settings as the interrupted run.
+            Requires --journal FILENAME.""",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--file-list",
+            help="""Process the files listed in PATH (one per line, or read
+            from stdin if PATH is '-') instead of all files in file_or_dir. The
+            files must be in the directory file_or_dir, the output is written
+            to the same paths as without the list.""",
+            metavar="PATH",
+            default=None,
+        )
+        parser.add_argument(
+            "--shard",
+            help="""Process only the files of shard I of N, e.g. '--shard 2/4',
+            to split the files between several machines. A file is assigned
+            to a shard by its path relative to file_or_dir, the same way on
+            every machine.""",
+            metavar="I/N",
+            type=_shard,
+            default=None,
+        )
+        parser.add_argument(
+            "--shard-plan",
+            help="""Assign the files to the shards according to the plan in
+            FILENAME made by 'tei-transform plan-shards' for the same input.
+            Files that aren't in the plan are assigned by their path. Requires
+            --shard I/N.""",
+            metavar="FILENAME",
+            default=None,
+        )
         args = parser.parse_args(arguments)
         if args.add_revision and args.config_file is None:
             parser.error("--add-revision requires --config-file FILENAME")
+        if args.jobs < 1:
+            parser.error("--jobs requires a positive number")
+        if args.prefetch < 0:
+            parser.error("--prefetch requires a non-negative number")
+        if args.until_stable is not None and args.until_stable < 1:
+            parser.error("--until-stable requires a positive number")
+        if args.sample is not None and args.survey is None:
+            parser.error("--sample requires --survey FILENAME")
+        if args.sample is not None and not 0 < args.sample <= 1:
+            parser.error("--sample requires a number greater than 0 and at most 1")
+        if args.max_memory is not None and args.max_memory < 1:
+            parser.error("--max-memory requires a positive number")
+        if args.time_budget is not None and args.time_budget <= 0:
+            parser.error("--time-budget requires a positive number")
+        if args.node_budget is not None and args.node_budget < 1:
+            parser.error("--node-budget requires a positive number")
+        if args.quarantine is not None and (
+            args.time_budget is None and args.node_budget is None
+        ):
+            parser.error("--quarantine requires --time-budget or --node-budget")
+        if args.resume and args.journal is None:
+            parser.error("--resume requires --journal FILENAME")
+        if args.shard_plan is not None and args.shard is None:
+            parser.error("--shard-plan requires --shard I/N")
         validation = not (args.no_validation) and any(
             [args.copy_valid, args.ignore_valid]
         )
-        transformation = []
-        for plugin in args.transformation:
-            if plugin not in transformation:
-                transformation.append(plugin)
+        if args.validation_service and not validation:
+            parser.error("--validation-service requires --copy-valid or --ignore-valid")
         self.use_case.process(
             CliRequest(
                 file_or_dir=args.file_or_dir,
-                observers=transformation,
+                observers=_unique(args.transformation),
                 config=args.config_file,
                 output=args.output,
                 validation=validation,
+                validation_service=args.validation_service,
                 copy_valid=args.copy_valid,
                 add_revision=args.add_revision,
+                jobs=args.jobs,
+                schedule=args.schedule,
+                cache=args.cache_file,
+                observer_stats=args.observer_stats,
+                unchanged=args.unchanged,
+                stream=args.stream,
+                prefetch=args.prefetch,
+                max_rounds=args.until_stable or 1,
+                survey=args.survey,
+                sample=args.sample or 1.0,
+                prescan=args.prescan,
+                xslt=args.xslt,
+                max_memory=args.max_memory,
+                remove_comments=args.remove_comments,
+                time_budget=args.time_budget,
+                node_budget=args.node_budget,
+                quarantine=args.quarantine,
+                journal=args.journal,
+                resume=args.resume,
+                file_list=args.file_list,
+                shard=args.shard,
+                shard_plan=args.shard_plan,
             )
         )
+
+    def _process_serve_arguments(self, arguments: List[str]) -> None:
+        parser = argparse.ArgumentParser(
+            prog="tei-transform serve",
+            description="""Start a service that loads the plugins, the
+            configuration and the Relax NG scheme once and transforms, validates
+            and surveys documents sent to it over HTTP, on a Unix domain socket
+            or a port of localhost. See README for the requests it accepts.""",
+        )
+        parser.add_argument(
+            "--transformation",
+            "-t",
+            help="""Observer plugins that should be used to transform the
+            documents. The default is the same as for tei-transform.""",
+            nargs="+",
+            default=DEFAULT_TRANSFORMATION,
+        )
+        parser.add_argument(
+            "--config-file",
+            "-c",
+            default=None,
+            help="""Name of configuration file for the plugins and the revision
+            entry, see tei-transform.""",
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="""Name of the output directory of files that are transformed
+            without an explicit output directory. Output directories of
+            requests must be inside of it. Default is 'output'.""",
+            default="output",
+        )
+        parser.add_argument(
+            "--input-root",
+            help="""Accept paths of input files in requests, if the files are
+            in DIR. Without this option, only documents sent in the body of
+            requests are accepted.""",
+            metavar="DIR",
+            default=None,
+        )
+        parser.add_argument(
+            "--add-revision",
+            "-r",
+            help="""Add an entry to <revisionDesc/> of changed documents. This
+            option requires the --config-file argument.""",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--no-validation",
+            help="""Do not load the Relax NG scheme and don't validate documents.
+            By default, transformed documents are validated.""",
+            action="store_true",
+        )
+        address_group = parser.add_mutually_exclusive_group()
+        address_group.add_argument(
+            "--socket",
+            help="""Path of the Unix domain socket the service listens on. The
+            default is 'transformation.sock' in the user's cache directory.""",
+            default=None,
+        )
+        address_group.add_argument(
+            "--port",
+            help="""Port of localhost the service listens on, instead of a Unix
+            domain socket.""",
+            type=int,
+            default=None,
+        )
+        parser.add_argument(
+            "--xslt",
+            help="""Compile the plugins into an XSLT stylesheet that is applied
+            by libxslt, instead of applying them in Python. This is only done
+            if all plugins support it (e.g. the default plugins), otherwise the
+            option has no effect. The result is the same either way.""",
+            action="store_true",
+        )
+        args = parser.parse_args(arguments)
+        if args.add_revision and args.config_file is None:
+            parser.error("--add-revision requires --config-file FILENAME")
+        if args.port is not None and not 0 <= args.port < 65536:
+            parser.error("--port requires a number between 0 and 65535")
+        self.use_case.process(
+            CliRequest(
+                file_or_dir="",
+                observers=_unique(args.transformation),
+                config=args.config_file,
+                output=args.output,
+                validation=not args.no_validation,
+                add_revision=args.add_revision,
+                serve=True,
+                serve_socket=args.socket,
+                serve_port=args.port,
+                serve_input_root=args.input_root,
+                xslt=args.xslt,
+            )
+        )
+
+    def _process_plan_arguments(self, arguments: List[str]) -> None:
+        parser = argparse.ArgumentParser(
+            prog="tei-transform plan-shards",
+            description="""Assign the xml files in file_or_dir to a number of
+            shards, so that the files of each shard have about the same total
+            size, and write the plan to a file for 'tei-transform --shard I/N
+            --shard-plan FILENAME'. No file is transformed.""",
+        )
+        parser.add_argument(
+            "file_or_dir",
+            help="File or directory to process",
+            type=str,
+        )
+        parser.add_argument(
+            "--shards",
+            "-n",
+            help="Number of shards.",
+            type=int,
+            required=True,
+        )
+        parser.add_argument(
+            "--plan",
+            help="Name of the file to write the plan to (JSON).",
+            metavar="FILENAME",
+            required=True,
+        )
+        parser.add_argument(
+            "--file-list",
+            help="""Plan the files listed in PATH (or stdin if PATH is '-')
+            instead of all files in file_or_dir, see tei-transform.""",
+            metavar="PATH",
+            default=None,
+        )
+        args = parser.parse_args(arguments)
+        if args.shards < 1:
+            parser.error("--shards requires a positive number")
+        self.use_case.process(
+            CliRequest(
+                file_or_dir=args.file_or_dir,
+                observers=[],
+                file_list=args.file_list,
+                plan_shards=args.plan,
+                shards=args.shards,
+            )
+        )
+
+
+def _shard(value: str) -> Tuple[int, int]:
+    index, _, count = value.partition("/")
+    try:
+        shard = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected I/N, e.g. 1/4: %s" % value)
+    if not 1 <= shard[0] <= shard[1]:
+        raise argparse.ArgumentTypeError(
+            "I must be between 1 and N (the number of shards): %s" % value
+        )
+    return shard
+
+
+def _unique(plugins: List[str]) -> List[str]:
+    unique_plugins = []
+    for plugin in plugins:
+        if plugin not in unique_plugins:
+            unique_plugins.append(plugin)
+    return unique_plugins
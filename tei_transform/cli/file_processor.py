@@ -0,0 +1,361 @@
+"""
+Processing of a single input file: a FileProcessor validates, transforms
+and writes the file and returns the outcome. The result cache and the
+journal of a run are decorators around a FileProcessor, which look up or
+record the outcome of each file.
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Protocol, Union
+
+from lxml import etree
+
+from tei_transform.cli.request import CliRequest
+from tei_transform.memory_limit import MemoryLimit
+from tei_transform.parse_config import RevisionDescChange
+from tei_transform.pipeline import PrefetchedFile, QueuedXmlWriter
+from tei_transform.quarantine import Quarantine, QuarantinedFile
+from tei_transform.result_cache import CachedResult, ResultCache, file_digest
+from tei_transform.run_journal import (
+    CACHED,
+    IGNORED,
+    QUARANTINED,
+    SYNTAX_ERROR,
+    TRANSFORMED,
+    UNCHANGED,
+    VALID_COPIED,
+    JournalEntry,
+    RunJournal,
+)
+from tei_transform.tag_scan import TagScan, scan_file, scan_tree
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.transformation_budget import BudgetExceeded
+from tei_transform.validation_service import RemoteValidator
+from tei_transform.xml_writer import XmlWriter
+
+logger = logging.getLogger(__name__)
+
+Validator = Union[etree.RelaxNG, RemoteValidator]
+
+
+@dataclass(frozen=True)
+class FileOutcome:
+    """
+    Outcome of processing an input file: its status (see run_journal) and
+    the output file, if one was written. If cacheable is True, the outcome
+    can be stored in the result cache, otherwise the file is processed again
+    by the next run.
+    """
+
+    status: str
+    output_path: Optional[str] = None
+    cacheable: bool = False
+
+
+class FileProcessing(Protocol):
+    def process(
+        self,
+        file: str,
+        output_dir: str,
+        prefetched: Optional[PrefetchedFile] = None,
+        digest: Optional[str] = None,
+    ) -> FileOutcome:
+        ...
+
+
+@dataclass
+class FileProcessor:
+    """
+    Validate, transform and write input files according to the options of
+    the request.
+    """
+
+    xml_writer: XmlWriter
+    tei_transformer: TeiTransformer
+    request: CliRequest
+    # returns the validator, which is instantiated when it is first needed
+    validator: Callable[[], Validator]
+    revision_entry: Optional[RevisionDescChange] = None
+    memory_limit: Optional[MemoryLimit] = None
+    quarantine: Optional[Quarantine] = None
+    # scans of the input files for --prescan are stored in the result cache
+    result_cache: Optional[ResultCache] = None
+
+    def process(
+        self,
+        file: str,
+        output_dir: str,
+        prefetched: Optional[PrefetchedFile] = None,
+        digest: Optional[str] = None,
+    ) -> FileOutcome:
+        """
+        Process file according to the validation options of the request and
+        return the outcome. If the file was read ahead, its parsed tree is
+        used. digest is the digest of the file content, if it is known, to
+        look up the scan of the file in the result cache.
+        """
+        if self.request.prescan:
+            self._select_observers(file, prefetched, digest)
+        self.xml_writer.create_output_directories(output_dir)
+        tree = None
+        if prefetched is not None:
+            if prefetched.error is not None:
+                logger.error("File ignored: %s" % file, exc_info=prefetched.error)
+                return FileOutcome(SYNTAX_ERROR)
+            tree = prefetched.tree
+        if self.request.validation:
+            validator = self.validator()
+            if tree is None:
+                if self._exceeds_memory_limit(file):
+                    return FileOutcome(IGNORED)
+                try:
+                    tree = self.tei_transformer.xml_iterator.parse(file)
+                except etree.XMLSyntaxError:
+                    logger.exception("File ignored: %s" % file)
+                    return FileOutcome(SYNTAX_ERROR)
+            if validator.validate(tree):
+                return self._process_valid_file(file, output_dir)
+            # reuse the parsed tree instead of parsing the file again
+            return self._process_file(file, output_dir, tree)
+        return self._process_file(file, output_dir, tree, stream=self.request.stream)
+
+    def _select_observers(
+        self,
+        file: str,
+        prefetched: Optional[PrefetchedFile] = None,
+        digest: Optional[str] = None,
+    ) -> None:
+        """
+        Let the transformer apply only the observers that can match in file,
+        according to a scan of the names of its elements and attributes. The
+        scan is taken from the tree of the file, if it was read ahead, or
+        from the result cache, if the file with digest was scanned before.
+        """
+        scan: Optional[TagScan]
+        if prefetched is not None and prefetched.tree is not None:
+            scan = scan_tree(prefetched.tree.getroot())
+        elif self.result_cache is not None and digest is not None:
+            scan = self.result_cache.lookup_scan(digest)
+            if scan is None:
+                scan = scan_file(file)
+                if scan is not None:
+                    self.result_cache.store_scan(digest, scan)
+        else:
+            scan = scan_file(file)
+        left_out = self.tei_transformer.select_observers(scan)
+        logger.debug(
+            "Observers left out after pre-scan: %d, file: %s" % (left_out, file)
+        )
+
+    def _process_file(
+        self,
+        file: str,
+        output_dir: str,
+        tree: Optional[etree._ElementTree] = None,
+        stream: bool = False,
+    ) -> FileOutcome:
+        """
+        Transform file and write the result to the output directory. If no
+        observer changed the file and unchanged is 'copy' or 'link', the
+        original file is copied (or linked) instead of serializing the tree.
+        If stream is True, the file is written while it is transformed, if
+        the observers allow it and no revision entry has to be added.
+        """
+        unchanged = self.request.unchanged
+        output_file_path = os.path.join(output_dir, os.path.basename(file))
+        if (
+            stream
+            and tree is None
+            and self.revision_entry is None
+            and self.tei_transformer.can_stream()
+        ):
+            try:
+                written = self.xml_writer.write_stream(
+                    output_file_path, self.tei_transformer.stream_transformation(file)
+                )
+            except etree.XMLSyntaxError:
+                logger.exception("File ignored: %s" % file)
+                return FileOutcome(SYNTAX_ERROR)
+            except BudgetExceeded as error:
+                return self._quarantine_file(file, error)
+            if written:
+                return self._finish_streamed_file(file, output_file_path)
+            # the root isn't <TEI>, which is handled by the usual processing
+        if tree is None and self._exceeds_memory_limit(file):
+            return FileOutcome(IGNORED)
+        try:
+            new_root = self.tei_transformer.perform_transformation(file, tree)
+        except BudgetExceeded as error:
+            return self._quarantine_file(file, error)
+        tree_changed = self.tei_transformer.xml_tree_changed()
+        if new_root is not None and self.tei_transformer.max_rounds > 1:
+            self._report_rounds(file)
+        if new_root is not None and not tree_changed and unchanged != "write":
+            self.xml_writer.copy_unchanged_file(
+                file, output_file_path, link=unchanged == "link"
+            )
+            self._release_tree(file, new_root)
+            return FileOutcome(UNCHANGED, output_file_path, cacheable=True)
+        if tree_changed and self.revision_entry is not None:
+            self.tei_transformer.add_change_to_revision_desc(
+                new_root, self.revision_entry
+            )
+        self.xml_writer.write_xml(
+            output_file_path, new_root, self.tei_transformer.unparsed_text()
+        )
+        self._release_tree(file, new_root)
+        if new_root is None:
+            # nothing was written, the file is processed again on the next run
+            if self.tei_transformer.is_well_formed():
+                return FileOutcome(IGNORED)
+            return FileOutcome(SYNTAX_ERROR)
+        status = TRANSFORMED if tree_changed else UNCHANGED
+        return FileOutcome(status, output_file_path, cacheable=True)
+
+    def _quarantine_file(self, file: str, error: BudgetExceeded) -> FileOutcome:
+        """
+        Leave out file, whose transformation exceeded the budget, and add it
+        to the quarantine list.
+        """
+        logger.error("File quarantined, %s: %s" % (error, file))
+        if self.quarantine is not None:
+            self.quarantine.add(QuarantinedFile.from_error(file, error))
+        self._release_tree(file, None)
+        return FileOutcome(QUARANTINED)
+
+    def _exceeds_memory_limit(self, file: str) -> bool:
+        """
+        Check if parsing and transforming file would exceed the memory limit,
+        according to an estimate of the size of its tree.
+        """
+        if self.memory_limit is None:
+            return False
+        # the stylesheet creates a transformed copy of the tree
+        trees = 2 if self.tei_transformer.uses_stylesheet() else 1
+        estimated = self.memory_limit.estimate_exceeding(file, trees)
+        if estimated is None:
+            return False
+        logger.error(
+            "File ignored, estimated memory use of %d MB exceeds the %d MB left "
+            "below the limit of %d MB: %s"
+            % (
+                estimated >> 20,
+                self.memory_limit.headroom() >> 20,
+                self.memory_limit.max_bytes >> 20,
+                file,
+            )
+        )
+        return True
+
+    def _release_tree(self, file: str, root: Optional[etree._Element]) -> None:
+        """
+        Free the memory of the tree of file after it was written, if the
+        memory is limited.
+        """
+        if self.memory_limit is None:
+            return
+        # a queued writer might not have written the tree yet
+        written = not isinstance(self.xml_writer, QueuedXmlWriter)
+        self.tei_transformer.release_tree(root if written else None)
+        if self.memory_limit.is_exceeded():
+            logger.warning("Memory limit exceeded after file: %s" % file)
+
+    def _report_rounds(self, file: str) -> None:
+        rounds = self.tei_transformer.rounds()
+        if self.tei_transformer.is_stable():
+            logger.info("File stable after %d rounds: %s" % (rounds, file))
+        else:
+            logger.warning("File not stable after %d rounds: %s" % (rounds, file))
+
+    def _finish_streamed_file(self, file: str, output_file_path: str) -> FileOutcome:
+        tree_changed = self.tei_transformer.xml_tree_changed()
+        if not tree_changed and self.request.unchanged != "write":
+            # it is only known after writing that the file wasn't changed
+            self.xml_writer.copy_unchanged_file(
+                file, output_file_path, link=self.request.unchanged == "link"
+            )
+        status = TRANSFORMED if tree_changed else UNCHANGED
+        return FileOutcome(status, output_file_path, cacheable=True)
+
+    def _process_valid_file(self, file: str, output_dir: str) -> FileOutcome:
+        if not self.request.copy_valid:
+            return FileOutcome(IGNORED, cacheable=True)
+        self.xml_writer.copy_valid_files(file, output_dir)
+        output_path = os.path.join(output_dir, os.path.basename(file))
+        return FileOutcome(VALID_COPIED, output_path, cacheable=True)
+
+
+@dataclass
+class CachingFileProcessor:
+    """
+    Skip input files whose output of a previous run is intact according to
+    the result cache, and store the outcome of the other files in the cache.
+    """
+
+    processor: FileProcessing
+    result_cache: ResultCache
+    xml_writer: XmlWriter
+
+    def process(
+        self,
+        file: str,
+        output_dir: str,
+        prefetched: Optional[PrefetchedFile] = None,
+        digest: Optional[str] = None,
+    ) -> FileOutcome:
+        digest = file_digest(file)
+        cache_key = self.result_cache.key(file, output_dir, digest)
+        cached_result = self.result_cache.lookup(cache_key)
+        if cached_result is not None and cached_result.output_is_intact():
+            logger.debug("File unchanged since last run, skipped: %s" % file)
+            return FileOutcome(CACHED, cached_result.output_path)
+        outcome = self.processor.process(file, output_dir, prefetched, digest)
+        if not outcome.cacheable:
+            return outcome
+        if outcome.output_path is not None and isinstance(
+            self.xml_writer, QueuedXmlWriter
+        ):
+            # size and modification time of the output file are recorded
+            self.xml_writer.join()
+        self.result_cache.store(
+            cache_key,
+            CachedResult.for_output(
+                outcome.output_path, tree_changed=outcome.status == TRANSFORMED
+            ),
+        )
+        return outcome
+
+
+@dataclass
+class JournalingFileProcessor:
+    """
+    Record the outcome of each input file in the journal, after the output
+    of the file was written.
+    """
+
+    processor: FileProcessing
+    journal: RunJournal
+    xml_writer: XmlWriter
+
+    def process(
+        self,
+        file: str,
+        output_dir: str,
+        prefetched: Optional[PrefetchedFile] = None,
+        digest: Optional[str] = None,
+    ) -> FileOutcome:
+        start = time.monotonic()
+        outcome = self.processor.process(file, output_dir, prefetched, digest)
+        entry = JournalEntry(
+            file,
+            outcome.status,
+            round(time.monotonic() - start, 3),
+            outcome.output_path,
+        )
+        if isinstance(self.xml_writer, QueuedXmlWriter):
+            self.xml_writer.call_after_writes(self.journal.add, entry)
+        else:
+            self.journal.add(entry)
+        return outcome
@@ -0,0 +1,116 @@
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from tei_transform.run_journal import RunJournal
+from tei_transform.sharding import Shard, relative_path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class InputFiles:
+    """
+    The xml files of file_or_dir (or of the file list) to process, together
+    with the directory the output of each file is written to. Files of other
+    shards and files that were completed according to the journal of a
+    resumed run are left out.
+    """
+
+    file_or_dir: str
+    output: str
+    file_list: Optional[str] = None
+    shard: Optional[Shard] = None
+    journal: Optional[RunJournal] = None
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for file, output_dir in self._find():
+            if self.shard is not None and not self.shard.contains(
+                relative_path(file, self.file_or_dir)
+            ):
+                continue
+            if self._is_completed(file):
+                continue
+            yield file, output_dir
+
+    def scheduled(
+        self, schedule: str, cost_model: Callable[[str], float]
+    ) -> List[Tuple[str, str]]:
+        """
+        Order the input files for processing in a pool of workers. With the
+        'largest-first' schedule, files with the highest cost according to
+        the cost model (e.g. the file size) are dispatched first, so that no
+        large file is left at the end of the run.
+        """
+        tasks = list(self)
+        if schedule == "largest-first":
+            tasks.sort(key=lambda task: cost_model(task[0]), reverse=True)
+        return tasks
+
+    def _find(self) -> Iterator[Tuple[str, str]]:
+        if self.file_list is not None:
+            yield from self._read_file_list()
+        elif os.path.isfile(self.file_or_dir):
+            if os.path.splitext(self.file_or_dir)[1] == ".xml":
+                yield self.file_or_dir, self.output
+        elif os.path.isdir(self.file_or_dir):
+            file_or_dir = self.file_or_dir.rstrip(os.sep)
+            for root, dirs, files in os.walk(file_or_dir):
+                for file in files:
+                    if os.path.splitext(file)[1] != ".xml":
+                        continue
+                    output_dir = os.path.join(
+                        self.output,
+                        os.path.relpath(root, start=os.path.dirname(file_or_dir)),
+                    )
+                    yield os.path.join(root, file), output_dir
+
+    def _read_file_list(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield the xml files of the file list (or of stdin, if it is '-') with
+        their output directories, as if they were found in the input
+        directory. The paths in the list are relative to the working
+        directory or absolute, files outside the input directory are ignored.
+        """
+        assert self.file_list is not None
+        if not os.path.isdir(self.file_or_dir):
+            sys.exit("--file-list requires a directory: %s" % self.file_or_dir)
+        file_or_dir = self.file_or_dir.rstrip(os.sep)
+        for listed in _read_lines(self.file_list):
+            if os.path.splitext(listed)[1] != ".xml":
+                continue
+            path = os.path.relpath(
+                os.path.abspath(listed), os.path.abspath(file_or_dir)
+            )
+            if path.split(os.sep)[0] == os.pardir or not os.path.isfile(listed):
+                logger.warning(
+                    "File not found in %s, ignored: %s" % (self.file_or_dir, listed)
+                )
+                continue
+            # the same path as if the file was found by walking the directory
+            file = os.path.join(file_or_dir, path)
+            output_dir = os.path.join(
+                self.output,
+                os.path.relpath(
+                    os.path.dirname(file), start=os.path.dirname(file_or_dir)
+                ),
+            )
+            yield file, output_dir
+
+    def _is_completed(self, file: str) -> bool:
+        if self.journal is None or not self.journal.is_completed(file):
+            return False
+        logger.debug("File completed by a previous run, skipped: %s" % file)
+        return True
+
+
+def _read_lines(path: str) -> List[str]:
+    """Read the non-empty lines of the file at path, or of stdin if it is '-'."""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as ptr:
+            lines = ptr.read().splitlines()
+    return [line.strip() for line in lines if line.strip()]
@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+@dataclass
+class CliRequest:
+    file_or_dir: str
+    observers: List[str]
+    config: Optional[str] = None
+    output: str = "output"
+    validation: bool = False
+    validation_service: bool = False
+    copy_valid: bool = False
+    add_revision: bool = False
+    jobs: int = 1
+    schedule: str = "largest-first"
+    cache: Optional[str] = None
+    observer_stats: Optional[str] = None
+    unchanged: str = "write"
+    stream: bool = False
+    prefetch: int = 0
+    max_rounds: int = 1
+    survey: Optional[str] = None
+    sample: float = 1.0
+    prescan: bool = False
+    serve: bool = False
+    serve_socket: Optional[str] = None
+    serve_port: Optional[int] = None
+    serve_input_root: Optional[str] = None
+    xslt: bool = False
+    max_memory: Optional[int] = None
+    remove_comments: bool = False
+    time_budget: Optional[float] = None
+    node_budget: Optional[int] = None
+    quarantine: Optional[str] = None
+    journal: Optional[str] = None
+    resume: bool = False
+    file_list: Optional[str] = None
+    # index (from 1) and number of shards
+    shard: Optional[Tuple[int, int]] = None
+    shard_plan: Optional[str] = None
+    plan_shards: Optional[str] = None
+    shards: int = 1
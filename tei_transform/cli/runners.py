@@ -0,0 +1,222 @@
+"""
+Runners that pass the input files of a transformation run to a file
+processor: one after another, in a pipeline that reads and writes files in
+separate threads, or in a pool of worker processes.
+"""
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from lxml import etree
+
+from tei_transform.cli.file_processor import FileProcessing
+from tei_transform.observer_statistics import (
+    ObserverStatistics,
+    TransformationProfile,
+)
+from tei_transform.pipeline import QueuedXmlWriter, prefetch_files
+from tei_transform.quarantine import Quarantine, QuarantinedFile
+from tei_transform.run_journal import JournalEntry, RunJournal
+from tei_transform.xml_writer import XmlWriter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SequentialRunner:
+    """Process the input files one after another."""
+
+    processor: FileProcessing
+
+    def run(self, files: Iterable[Tuple[str, str]]) -> None:
+        for file, output_dir in files:
+            self.processor.process(file, output_dir)
+
+
+@dataclass
+class PipelineRunner:
+    """
+    Process the input files one after another, while the next depth files
+    are read (and parsed with parser, if parse is True) and the output of
+    the previous files is written in separate threads.
+    """
+
+    # constructs the file processor that writes with the given writer
+    create_processor: Callable[[XmlWriter], FileProcessing]
+    xml_writer: XmlWriter
+    depth: int
+    parse: bool
+    # the reader thread uses a parser of its own
+    parser: etree.XMLParser
+
+    def run(self, files: Iterable[Tuple[str, str]]) -> None:
+        queued_writer = QueuedXmlWriter(self.xml_writer, self.depth)
+        processor = self.create_processor(queued_writer)
+        try:
+            for prefetched in prefetch_files(
+                files, self.depth, self.parse, self.parser
+            ):
+                processor.process(
+                    prefetched.file, prefetched.output_dir, prefetched=prefetched
+                )
+        finally:
+            queued_writer.close()
+
+
+class _LogRecordCollector(logging.Handler):
+    """
+    Collect log records in a worker process, so they can be passed
+    to the main process.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # make record picklable
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        self.records.append(record)
+
+
+@dataclass
+class Worker:
+    """
+    File processor of a worker process, with the profile, quarantine and
+    journal it adds the results of the files to.
+    """
+
+    processor: FileProcessing
+    profile: Optional[TransformationProfile] = None
+    quarantine: Optional[Quarantine] = None
+    journal: Optional[RunJournal] = None
+    log_collector: _LogRecordCollector = field(default_factory=_LogRecordCollector)
+
+
+@dataclass
+class _FileResult:
+    file: str
+    log_records: List[logging.LogRecord]
+    worker: int
+    duration: float
+    observer_statistics: Dict[str, ObserverStatistics]
+    quarantined_files: List[QuarantinedFile]
+    journal_entries: List[JournalEntry]
+
+
+@dataclass
+class ParallelRunner:
+    """
+    Distribute the input files to a pool of worker processes, each of which
+    constructs its worker once with create_worker (which must be picklable).
+    Log messages of the workers are emitted in the order the files were
+    dispatched, and the results of the files are added to the profile,
+    quarantine and journal of the main process.
+    """
+
+    jobs: int
+    create_worker: Callable[[], Worker]
+    profile: Optional[TransformationProfile] = None
+    quarantine: Optional[Quarantine] = None
+    journal: Optional[RunJournal] = None
+
+    def run(self, files: Iterable[Tuple[str, str]]) -> None:
+        # only imported if needed, the module is slow to import
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        busy_time_by_worker: Dict[int, float] = {}
+        files_by_worker: Dict[int, int] = {}
+        start = time.monotonic()
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_initialize_worker,
+            initargs=(self.create_worker, logging.getLogger().level),
+        ) as executor:
+            try:
+                for result in executor.map(_process_file_in_worker, files):
+                    self._add_result(result)
+                    busy_time_by_worker[result.worker] = (
+                        busy_time_by_worker.get(result.worker, 0) + result.duration
+                    )
+                    files_by_worker[result.worker] = (
+                        files_by_worker.get(result.worker, 0) + 1
+                    )
+            except BrokenProcessPool:
+                sys.exit("Worker processes terminated unexpectedly, see log file.")
+        makespan = time.monotonic() - start
+        _report_worker_utilisation(makespan, busy_time_by_worker, files_by_worker)
+
+    def _add_result(self, result: _FileResult) -> None:
+        for record in result.log_records:
+            logging.getLogger(record.name).handle(record)
+        if self.profile is not None:
+            self.profile.add_file(result.file, result.observer_statistics)
+        if self.quarantine is not None:
+            for quarantined in result.quarantined_files:
+                self.quarantine.add(quarantined)
+        if self.journal is not None:
+            for entry in result.journal_entries:
+                self.journal.add(entry)
+
+
+def _report_worker_utilisation(
+    makespan: float,
+    busy_time_by_worker: Dict[int, float],
+    files_by_worker: Dict[int, int],
+) -> None:
+    logger.info(
+        "Processed %d files with %d workers, makespan: %.2fs"
+        % (sum(files_by_worker.values()), len(files_by_worker), makespan)
+    )
+    for number, worker in enumerate(busy_time_by_worker, start=1):
+        busy_time = busy_time_by_worker[worker]
+        utilisation = busy_time / makespan if makespan else 0
+        logger.info(
+            "Worker %d: %d files, busy for %.2fs, utilisation: %.1f%%"
+            % (number, files_by_worker[worker], busy_time, utilisation * 100)
+        )
+
+
+_worker: Optional[Worker] = None
+
+
+def _initialize_worker(create_worker: Callable[[], Worker], log_level: int) -> None:
+    """
+    Construct transformer, observers and validator once per worker process.
+    """
+    global _worker
+    _worker = create_worker()
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(_worker.log_collector)
+    root_logger.setLevel(log_level)
+
+
+def _process_file_in_worker(task: Tuple[str, str]) -> _FileResult:
+    assert _worker is not None
+    file, output_dir = task
+    _worker.log_collector.records = []
+    start = time.monotonic()
+    _worker.processor.process(file, output_dir)
+    duration = time.monotonic() - start
+    profile = _worker.profile
+    quarantine = _worker.quarantine
+    journal = _worker.journal
+    return _FileResult(
+        file=file,
+        log_records=_worker.log_collector.records,
+        worker=os.getpid(),
+        duration=duration,
+        observer_statistics=profile.pop_file(file) if profile is not None else {},
+        quarantined_files=quarantine.pop_files() if quarantine is not None else [],
+        journal_entries=journal.pop_entries() if journal is not None else [],
+    )
@@ -1,34 +1,49 @@
+import functools
 import logging
 import os
 import sys
 from dataclasses import dataclass
-from typing import List, Optional, Protocol
+from typing import Callable, Optional, Protocol, Union
 
 from lxml import etree
 
+from tei_transform.cli.commands import ServiceRunner, ShardPlanRunner, SurveyRunner
+from tei_transform.cli.file_processor import (
+    CachingFileProcessor,
+    FileProcessing,
+    FileProcessor,
+    JournalingFileProcessor,
+    Validator,
+)
+from tei_transform.cli.input_files import InputFiles
+from tei_transform.cli.request import CliRequest
+from tei_transform.cli.runners import (
+    ParallelRunner,
+    PipelineRunner,
+    SequentialRunner,
+    Worker,
+)
+from tei_transform.memory_limit import MemoryLimit, MemoryLimitTooLow
 from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.observer_statistics import TransformationProfile
 from tei_transform.parse_config import (
     RevisionDescChange,
     construct_change_from_config,
     parse_config_file,
 )
+from tei_transform.quarantine import Quarantine
+from tei_transform.result_cache import ResultCache, run_fingerprint
+from tei_transform.run_journal import JournalMismatch, RunJournal
+from tei_transform.sharding import InvalidShardPlan, Shard, ShardPlan
 from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.transformation_budget import TransformationBudget
+from tei_transform.validation_service import RemoteValidator, default_socket_path
+from tei_transform.xml_tree_iterator import ParserOptions, XMLTreeIterator
 from tei_transform.xml_writer import XmlWriter
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class CliRequest:
-    file_or_dir: str
-    observers: List[str]
-    config: Optional[str] = None
-    output: str = "output"
-    validation: bool = False
-    copy_valid: bool = False
-    add_revision: bool = False
-
-
 class TeiTransformationUseCase(Protocol):
     def process(self, request: CliRequest) -> None:
         ...
@@ -37,97 +52,271 @@ class TeiTransformationUseCase(Protocol):
 @dataclass
 class TeiTransformationUseCaseImpl:
     """
-    Use case that is called by console script.
+    Use case that is called by console script. It sets up the transformer,
+    the validator and the state of a run according to the request and
+    passes the input files to the runner of the requested mode.
     """
 
     xml_writer: XmlWriter
     tei_transformer: TeiTransformer
     observer_constructor: ObserverConstructor
     tei_scheme: str = ""
-    tei_validator: Optional[etree.RelaxNG] = None
+    tei_validator: Optional[Union[etree.RelaxNG, RemoteValidator]] = None
+    cost_model: Callable[[str], float] = os.path.getsize
+    result_cache: Optional[ResultCache] = None
+    memory_limit: Optional[MemoryLimit] = None
+    quarantine: Optional[Quarantine] = None
+    journal: Optional[RunJournal] = None
+    shard: Optional[Shard] = None
 
     def process(self, request: CliRequest) -> None:
         """
         Processes cli arguments and applies them to the transformation
         of an xml tree.
         """
+        if request.serve:
+            change = self._prepare_processing(request)
+            ServiceRunner(
+                tei_transformer=self.tei_transformer,
+                xml_writer=self.xml_writer,
+                observer_constructor=self.observer_constructor,
+                validator=self.tei_validator,
+                revision_entry=change,
+            ).run(request)
+            return
+        if request.plan_shards is not None:
+            ShardPlanRunner(self.cost_model).run(request, self._input_files(request))
+            return
+        self.shard = self._select_shard(request)
+        if request.survey is not None:
+            files = [file for file, _ in self._input_files(request)]
+            SurveyRunner(self.observer_constructor).run(request, files)
+            return
+        change = self._prepare_processing(
+            request, instantiate_validator=request.jobs == 1 and request.cache is None
+        )
+        if request.quarantine is not None:
+            # only the main process writes the list of quarantined files
+            self.quarantine = Quarantine(request.quarantine)
+        if request.journal is not None:
+            self.journal = self._open_journal(request, change)
+        self._transform_input_files(request, change)
+        if request.observer_stats is not None:
+            assert self.tei_transformer.profile is not None
+            self.tei_transformer.profile.write(request.observer_stats)
+        if self.quarantine is not None and self.quarantine.files:
+            logger.warning("%d files quarantined" % len(self.quarantine.files))
+        if self.journal is not None:
+            self.journal.close()
+
+    def _transform_input_files(
+        self, request: CliRequest, change: Optional[RevisionDescChange]
+    ) -> None:
+        """
+        Transform the input files in a pool of workers (with --jobs), in a
+        pipeline (with --prefetch) or one after another.
+        """
+        files = self._input_files(request)
+        if request.jobs > 1:
+            ParallelRunner(
+                jobs=request.jobs,
+                create_worker=functools.partial(
+                    _create_worker, self.xml_writer, self.tei_scheme, request
+                ),
+                profile=self.tei_transformer.profile,
+                quarantine=self.quarantine,
+                journal=self.journal,
+            ).run(files.scheduled(request.schedule, self.cost_model))
+        elif request.prefetch > 0:
+            # trees aren't parsed ahead if only the header or a stream of the
+            # file is transformed, or if they might exceed the memory limit
+            parse = (
+                not self.tei_transformer.transforms_header_only()
+                and not (request.stream and self.tei_transformer.can_stream())
+                and self.memory_limit is None
+            )
+            PipelineRunner(
+                create_processor=functools.partial(
+                    self._create_file_processor, request, change
+                ),
+                xml_writer=self.xml_writer,
+                depth=request.prefetch,
+                parse=parse,
+                parser=self.tei_transformer.xml_iterator.parser_options.create_parser(),
+            ).run(files)
+        else:
+            SequentialRunner(
+                self._create_file_processor(request, change, self.xml_writer)
+            ).run(files)
+
+    def _create_file_processor(
+        self,
+        request: CliRequest,
+        change: Optional[RevisionDescChange],
+        xml_writer: XmlWriter,
+    ) -> FileProcessing:
+        """
+        Construct the processor of the input files, which writes with
+        xml_writer, looks up the files in the result cache and records them
+        in the journal, if the run has one.
+        """
+        processor: FileProcessing = FileProcessor(
+            xml_writer=xml_writer,
+            tei_transformer=self.tei_transformer,
+            request=request,
+            validator=functools.partial(self._validator, request.validation_service),
+            revision_entry=change,
+            memory_limit=self.memory_limit,
+            quarantine=self.quarantine,
+            result_cache=self.result_cache,
+        )
+        if self.result_cache is not None:
+            processor = CachingFileProcessor(processor, self.result_cache, xml_writer)
+        if self.journal is not None:
+            processor = JournalingFileProcessor(processor, self.journal, xml_writer)
+        return processor
+
+    def _input_files(self, request: CliRequest) -> InputFiles:
+        return InputFiles(
+            file_or_dir=request.file_or_dir,
+            output=request.output,
+            file_list=request.file_list,
+            shard=self.shard,
+            journal=self.journal,
+        )
+
+    def _prepare_processing(
+        self, request: CliRequest, instantiate_validator: bool = True
+    ) -> Optional[RevisionDescChange]:
         config = None
         if request.config is not None:
             config = parse_config_file(request.config)
         observer_lists = self.observer_constructor.construct_observers(
             request.observers, config
         )
+        self.tei_transformer.use_xslt = request.xslt
         self.tei_transformer.set_list_of_observers(observer_lists)
+        if request.xslt and not self.tei_transformer.uses_stylesheet():
+            logger.info("Plugins can't be compiled to a stylesheet, --xslt ignored")
         change = None
         if config is not None and request.add_revision:
             change = construct_change_from_config(config)
-        if request.validation and self.tei_validator is None:
-            self._instantiate_tei_validator()
-        if os.path.isfile(request.file_or_dir):
-            if os.path.splitext(request.file_or_dir)[1] == ".xml":
-                self._determine_file_processing_method(
-                    file=request.file_or_dir,
-                    output_dir=request.output,
-                    request=request,
-                    revision_entry=change,
-                )
-        elif os.path.isdir(request.file_or_dir):
-            file_or_dir = request.file_or_dir.rstrip(os.sep)
-            for root, dirs, files in os.walk(file_or_dir):
-                for file in files:
-                    if os.path.splitext(file)[1] != ".xml":
-                        continue
-                    output_dir = output_dir = os.path.join(
-                        request.output,
-                        os.path.relpath(root, start=os.path.dirname(file_or_dir)),
-                    )
-                    self._determine_file_processing_method(
-                        file=os.path.join(root, file),
-                        output_dir=output_dir,
-                        request=request,
-                        revision_entry=change,
-                    )
-
-    def _determine_file_processing_method(
-        self,
-        file: str,
-        output_dir: str,
-        request: CliRequest,
-        revision_entry: Optional[RevisionDescChange] = None,
-    ) -> None:
-        self.xml_writer.create_output_directories(output_dir)
-        if request.validation:
-            assert self.tei_validator is not None
-            try:
-                file_valid = self.tei_validator.validate(etree.parse(file))
-            except etree.XMLSyntaxError:
-                logger.exception("File ignored: %s" % file)
-                return
-            if file_valid:
-                self._process_valid_file(file, output_dir, request.copy_valid)
-                return
-        self._process_file(file, output_dir, revision_entry)
-
-    def _process_file(
-        self,
-        file: str,
-        output_dir: str,
-        revision_entry: Optional[RevisionDescChange] = None,
-    ) -> None:
-        output_file_path = os.path.join(output_dir, os.path.basename(file))
-        new_root = self.tei_transformer.perform_transformation(file)
-        if self.tei_transformer.xml_tree_changed() and revision_entry is not None:
-            self.tei_transformer.add_change_to_revision_desc(new_root, revision_entry)
-        self.xml_writer.write_xml(output_file_path, new_root)
-
-    def _process_valid_file(
-        self, file: str, output_dir: str, copy_valid: bool = False
-    ) -> None:
-        if copy_valid:
-            self.xml_writer.copy_valid_files(file, output_dir)
+        if request.cache is not None:
+            self.result_cache = ResultCache(
+                request.cache, self._run_fingerprint(request, change)
+            )
+        self.tei_transformer.max_rounds = request.max_rounds
+        if request.max_memory is not None:
+            self.memory_limit = MemoryLimit(request.max_memory * 1024 * 1024)
+            parser_options = ParserOptions.bounded_memory(request.remove_comments)
+        else:
+            parser_options = ParserOptions(remove_comments=request.remove_comments)
+        self.tei_transformer.xml_iterator.set_parser_options(parser_options)
+        if request.time_budget is not None or request.node_budget is not None:
+            self.tei_transformer.budget = TransformationBudget(
+                request.time_budget, request.node_budget
+            )
+            self.quarantine = Quarantine()
+        if request.journal is not None:
+            # the entries are passed to the journal of the main process
+            self.journal = RunJournal()
+        if request.observer_stats is not None:
+            self.tei_transformer.profile = TransformationProfile()
+        if request.validation and self.tei_validator is None and instantiate_validator:
+            self._instantiate_tei_validator(request.validation_service)
+        self._measure_memory_baseline()
+        return change
+
+    def _run_fingerprint(
+        self, request: CliRequest, change: Optional[RevisionDescChange]
+    ) -> str:
+        return run_fingerprint(
+            request.observers,
+            request.config,
+            request.validation,
+            request.copy_valid,
+            change,
+            request.unchanged,
+            request.max_rounds,
+            request.remove_comments,
+        )
+
+    def _open_journal(
+        self, request: CliRequest, change: Optional[RevisionDescChange]
+    ) -> RunJournal:
+        """
+        Open the journal of the request. If the run is resumed, the files
+        recorded in the journal aren't processed again.
+        """
+        assert request.journal is not None
+        run = {
+            "run": self._run_fingerprint(request, change),
+            "input": os.path.abspath(request.file_or_dir),
+            "output": os.path.abspath(request.output),
+        }
+        if self.shard is not None:
+            run["shard"] = str(self.shard)
+        try:
+            return RunJournal.open(request.journal, run, request.resume)
+        except JournalMismatch as error:
+            sys.exit(str(error))
+
+    def _select_shard(self, request: CliRequest) -> Optional[Shard]:
+        if request.shard is None:
+            return None
+        index, count = request.shard
+        if request.shard_plan is None:
+            return Shard(index, count)
+        try:
+            plan = ShardPlan.read(request.shard_plan)
+        except InvalidShardPlan as error:
+            sys.exit(str(error))
+        if plan.count != count:
+            sys.exit(
+                "Shard plan has %d shards, not %d: %s"
+                % (plan.count, count, request.shard_plan)
+            )
+        return Shard(index, count, plan)
 
-    def _instantiate_tei_validator(self) -> None:
+    def _measure_memory_baseline(self) -> None:
+        """
+        Measure the memory the process uses once it is set up, which the
+        trees of the files have to fit on top of.
+        """
+        if self.memory_limit is None:
+            return
         try:
+            self.memory_limit.measure_baseline()
+        except MemoryLimitTooLow as error:
+            # logged for worker processes, whose exit message isn't shown
+            logger.error(str(error))
+            sys.exit(str(error))
+
+    def _validator(self, use_service: bool = False) -> Validator:
+        """
+        Return the validator, which is instantiated if it wasn't before,
+        e.g. because all files of a cached run might have been skipped.
+        """
+        if self.tei_validator is None:
+            self._instantiate_tei_validator(use_service)
+            self._measure_memory_baseline()
+        assert self.tei_validator is not None
+        return self.tei_validator
+
+    def _instantiate_tei_validator(self, use_service: bool = False) -> None:
+        try:
+            if use_service:
+                # use the compiled scheme of the validation service
+                socket_path = default_socket_path(self.tei_scheme)
+                self.tei_validator = RemoteValidator.connect(
+                    socket_path, self.tei_transformer.xml_iterator.parser_options
+                )
+                if self.tei_validator is not None:
+                    return
+                logger.warning(
+                    "Validation service not running on %s, scheme compiled"
+                    % socket_path
+                )
             self.tei_validator = etree.RelaxNG(etree.parse(self.tei_scheme))
         except OSError:
             sys.exit("Validation scheme file not found.")
@@ -135,3 +324,26 @@ class TeiTransformationUseCaseImpl:
             sys.exit("Invalid scheme.")
         except etree.XMLSyntaxError:
             sys.exit("Invalid xml.")
+
+
+def _create_worker(
+    xml_writer: XmlWriter, tei_scheme: str, request: CliRequest
+) -> Worker:
+    """
+    Construct transformer, observers and validator of a worker process.
+    """
+    use_case = TeiTransformationUseCaseImpl(
+        xml_writer=xml_writer,
+        tei_transformer=TeiTransformer(XMLTreeIterator()),
+        observer_constructor=ObserverConstructor(),
+        tei_scheme=tei_scheme,
+    )
+    revision_entry = use_case._prepare_processing(
+        request, instantiate_validator=request.cache is None
+    )
+    return Worker(
+        processor=use_case._create_file_processor(request, revision_entry, xml_writer),
+        profile=use_case.tei_transformer.profile,
+        quarantine=use_case.quarantine,
+        journal=use_case.journal,
+    )
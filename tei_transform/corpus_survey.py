@@ -0,0 +1,238 @@
+"""
+Count the nodes the observers of each plugin match in the files of a
+corpus, without transforming the files, to find out which plugins the
+corpus needs.
+"""
+import csv
+import json
+import math
+import random
+from dataclasses import asdict, dataclass, fields
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from lxml import etree
+
+from tei_transform.abstract_node_observer import AbstractNodeObserver
+from tei_transform.observer_dispatcher import SCOPES, ObserverDispatcher
+from tei_transform.sibling_index import SiblingIndex
+from tei_transform.tag_scan import TagScan, can_match
+
+# z-score of the 95% confidence interval of the estimates
+_Z = 1.96
+
+_T = TypeVar("_T")
+
+
+class CorpusSurveyor:
+    """
+    Apply only observe() of the observers, identified by their plugin
+    name, to the nodes of a file. As in TeiTransformer, the observers are
+    dispatched by tag and scope. No node is transformed, so the hits of
+    plugins that would only match after another plugin changed the file
+    are not counted.
+    """
+
+    def __init__(self, observers_by_plugin: Dict[str, AbstractNodeObserver]) -> None:
+        self._observers = list(observers_by_plugin.values())
+        # observers aren't necessarily hashable
+        self._plugins = {
+            id(observer): plugin for plugin, observer in observers_by_plugin.items()
+        }
+        # dispatchers for the subsets of observers that can match in a file
+        self._dispatchers: Dict[
+            Tuple[bool, ...], Dict[Optional[str], ObserverDispatcher]
+        ] = {}
+        # the tree isn't changed, so the index never has to be invalidated
+        self._sibling_index = SiblingIndex()
+        for observer in self._observers:
+            if hasattr(observer, "sibling_index"):
+                observer.sibling_index = self._sibling_index
+
+    def survey_file(
+        self, filename: Union[str, IO[bytes]], scan: Optional[TagScan] = None
+    ) -> Dict[str, int]:
+        """
+        Return the number of nodes in filename (or a file object) that the
+        observer of each plugin matches. Plugins without matches are left out.
+        If the pre-scan of the file is passed, only the observers that can
+        match a node of the file are applied. If none can, the file isn't
+        parsed at all (and not checked to be well-formed).
+        """
+        selection = tuple(
+            scan is None or can_match(observer, scan) for observer in self._observers
+        )
+        if not any(selection):
+            return {}
+        dispatchers = self._dispatchers_for(selection)
+        root = etree.parse(filename).getroot()
+        hits: Dict[str, int] = {}
+        try:
+            self._observe(iter([root]), dispatchers[None], hits)
+            for child in root:
+                scope = (
+                    child.tag.rpartition("}")[2] if isinstance(child.tag, str) else None
+                )
+                self._observe(
+                    child.iter(), dispatchers.get(scope, dispatchers[None]), hits
+                )
+        finally:
+            self._sibling_index.clear()
+        return hits
+
+    def _dispatchers_for(
+        self, selection: Tuple[bool, ...]
+    ) -> Dict[Optional[str], ObserverDispatcher]:
+        dispatchers = self._dispatchers.get(selection)
+        if dispatchers is None:
+            observers = [
+                observer
+                for observer, selected in zip(self._observers, selection)
+                if selected
+            ]
+            dispatchers = {None: ObserverDispatcher(observers)}
+            for scope in SCOPES:
+                dispatchers[scope] = ObserverDispatcher(observers, scope)
+            self._dispatchers[selection] = dispatchers
+        return dispatchers
+
+    def _observe(
+        self,
+        nodes: Iterator[etree._Element],
+        dispatcher: ObserverDispatcher,
+        hits: Dict[str, int],
+    ) -> None:
+        for node in nodes:
+            for observer in dispatcher.observers_for(node):
+                if observer.observe(node):
+                    plugin = self._plugins[id(observer)]
+                    hits[plugin] = hits.get(plugin, 0) + 1
+
+
+@dataclass
+class PluginTotal:
+    """
+    Hits of a plugin in the surveyed files and the estimated number of
+    files of the corpus it matches, with a 95% confidence interval.
+    """
+
+    files: int = 0
+    hits: int = 0
+    estimated_files: int = 0
+    estimated_files_low: int = 0
+    estimated_files_high: int = 0
+
+
+class CorpusSurvey:
+    """
+    Hits of the plugins per surveyed file. If only a sample of the files
+    of the corpus was surveyed, the totals contain the estimated number
+    of files each plugin matches in the whole corpus.
+    """
+
+    def __init__(self, plugins: List[str], files_total: int) -> None:
+        self.plugins = plugins
+        self.files_total = files_total
+        self.files: Dict[str, Dict[str, int]] = {}
+        self.ignored_files: List[str] = []
+
+    def add_file(self, filename: str, hits: Dict[str, int]) -> None:
+        self.files[filename] = hits
+
+    def add_ignored_file(self, filename: str) -> None:
+        """Add a file that was sampled, but couldn't be surveyed."""
+        self.ignored_files.append(filename)
+
+    def totals(self) -> Dict[str, PluginTotal]:
+        """Sum up the hits of each plugin and estimate the files it matches."""
+        # ignored files are left out of the corpus as well as the sample
+        surveyed = len(self.files)
+        corpus = max(self.files_total - len(self.ignored_files), surveyed)
+        totals = {plugin: PluginTotal() for plugin in self.plugins}
+        for hits in self.files.values():
+            for plugin, count in hits.items():
+                total = totals.setdefault(plugin, PluginTotal())
+                total.files += 1
+                total.hits += count
+        for total in totals.values():
+            (
+                total.estimated_files,
+                total.estimated_files_low,
+                total.estimated_files_high,
+            ) = estimate_files(total.files, surveyed, corpus)
+        return totals
+
+    def write(self, path: str) -> None:
+        """
+        Write the survey to path. If the file extension is '.csv',
+        the survey is written as CSV, otherwise as JSON.
+        """
+        if path.lower().endswith(".csv"):
+            self._write_csv(path)
+        else:
+            self._write_json(path)
+
+    def _write_json(self, path: str) -> None:
+        data = {
+            "files_total": self.files_total,
+            "files_surveyed": len(self.files),
+            "ignored_files": self.ignored_files,
+            "total": {plugin: asdict(total) for plugin, total in self.totals().items()},
+            "files": self.files,
+        }
+        with open(path, "w", encoding="utf-8") as ptr:
+            json.dump(data, ptr, indent=2)
+
+    def _write_csv(self, path: str) -> None:
+        # rows with an empty file column contain the totals of the plugins
+        columns = [field.name for field in fields(PluginTotal)]
+        with open(path, "w", encoding="utf-8", newline="") as ptr:
+            writer = csv.writer(ptr)
+            writer.writerow(["file", "plugin"] + columns)
+            for plugin, total in self.totals().items():
+                values = asdict(total)
+                writer.writerow(["", plugin] + [values[column] for column in columns])
+            for filename, hits in self.files.items():
+                for plugin, count in hits.items():
+                    writer.writerow([filename, plugin, 1, count, "", "", ""])
+
+
+def estimate_files(matching: int, surveyed: int, total: int) -> Tuple[int, int, int]:
+    """
+    Estimate how many of total files a plugin matches, if it matches
+    matching of surveyed files drawn without replacement. Return the
+    estimate and the bounds of the 95% Wilson score interval, with the
+    sample size corrected for the size of the corpus.
+    """
+    if surveyed == 0:
+        return 0, 0, total
+    if surveyed >= total:
+        return matching, matching, matching
+    share = matching / surveyed
+    sample_size = surveyed * (total - 1) / (total - surveyed)
+    denominator = 1 + _Z**2 / sample_size
+    centre = (share + _Z**2 / (2 * sample_size)) / denominator
+    margin = (
+        _Z
+        * math.sqrt(
+            share * (1 - share) / sample_size + _Z**2 / (4 * sample_size**2)
+        )
+        / denominator
+    )
+    # the surveyed files are known for sure
+    low = max(matching, math.floor((centre - margin) * total))
+    high = min(total - (surveyed - matching), math.ceil((centre + margin) * total))
+    return round(share * total), low, high
+
+
+def sample_files(
+    files: Sequence[_T], fraction: float, rng: Optional[random.Random] = None
+) -> List[_T]:
+    """
+    Draw a random sample of fraction of the files, but at least one file,
+    keeping the order of the files.
+    """
+    if fraction >= 1 or not files:
+        return list(files)
+    size = max(1, math.ceil(len(files) * fraction))
+    positions = (rng or random.Random()).sample(range(len(files)), size)
+    return [files[position] for position in sorted(positions)]
@@ -0,0 +1,80 @@
+"""
+Remember the parts of a tree that were changed by observers, so that the
+observers can be applied to these parts again until the tree is stable.
+"""
+from typing import Iterator, List, Optional, Set, Tuple
+
+from lxml import etree
+
+
+class DirtyRegions:
+    """
+    Collect the nodes that were transformed. A transformation changes the
+    children of the old and the new parent of the node. An observer that
+    didn't match before can now match these parents, their descendants or
+    their siblings (e.g. because a parent got a new tag), so the region to
+    observe again is the subtree of the parent of each changed parent. If
+    the root was transformed, only the root is observed again.
+    """
+
+    def __init__(self) -> None:
+        self._changes: List[Tuple[etree._Element, Optional[etree._Element]]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._changes)
+
+    def add(self, node: etree._Element, old_parent: Optional[etree._Element]) -> None:
+        """
+        Record that node was transformed, while its parent was old_parent.
+        """
+        self._changes.append((node, old_parent))
+
+    def changed_elements(self) -> Iterator[etree._Element]:
+        """
+        Yield the elements whose children were changed, i.e. the old and
+        new parents of the transformed nodes, or the transformed root.
+        """
+        for node, old_parent in self._changes:
+            parent = node.getparent()
+            if parent is None and old_parent is None:
+                yield node
+                continue
+            for changed in (old_parent, parent):
+                if changed is not None:
+                    yield changed
+
+    def regions(self, root: etree._Element) -> List[Tuple[etree._Element, bool]]:
+        """
+        Return the regions of the tree of root to observe again, in the order
+        they were changed, as pairs of an element and whether its subtree is
+        part of the region. Regions contained in other regions and regions
+        that were removed from the tree are left out.
+        """
+        subtrees: List[etree._Element] = []
+        seen: Set[etree._Element] = set()
+        root_changed = False
+        for node, old_parent in self._changes:
+            parent = node.getparent()
+            if parent is None and old_parent is None:
+                root_changed = root_changed or node is root
+                continue
+            for changed in (old_parent, parent):
+                if changed is None:
+                    continue
+                region = changed.getparent()
+                if region is None:
+                    region = changed
+                if region not in seen:
+                    seen.add(region)
+                    subtrees.append(region)
+        result = []
+        for region in subtrees:
+            ancestors = list(region.iterancestors())
+            if (ancestors[-1] if ancestors else region) is not root:
+                continue
+            if any(ancestor in seen for ancestor in ancestors):
+                continue
+            result.append((region, True))
+        if root_changed and root not in seen:
+            result.append((root, False))
+        return result
@@ -0,0 +1,137 @@
+"""
+Cache the entry points of the node_observer group, so that the entry points
+of all installed distributions don't have to be read on every start.
+
+The index is stored together with a fingerprint of the installed
+distributions, i.e. the names of the metadata directories on sys.path and
+the modification times of their entry point files. If a distribution is
+installed, updated or removed, the fingerprint changes and the entry points
+are read again. As long as the index is up to date, importlib.metadata
+isn't imported at all.
+"""
+import hashlib
+import importlib
+import json
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from tei_transform.user_cache import cache_directory
+
+GROUP = "node_observer"
+
+
+@dataclass(frozen=True)
+class IndexedEntryPoint:
+    """
+    Entry point read from the index, that can be loaded like an
+    importlib.metadata.EntryPoint.
+    """
+
+    name: str
+    value: str
+    group: str = GROUP
+
+    def load(self) -> Any:
+        module_name, _, attributes = self.value.partition(":")
+        # remove extras, e.g. 'module:Observer [extra]'
+        attributes = attributes.split("[")[0].strip()
+        loaded = importlib.import_module(module_name.strip())
+        for attribute in attributes.split(".") if attributes else []:
+            loaded = getattr(loaded, attribute)
+        return loaded
+
+
+def node_observer_entry_points(
+    index_file: Optional[str] = None,
+) -> Tuple[IndexedEntryPoint, ...]:
+    """
+    Return the entry points of the node_observer group, from the index
+    file if it is up to date.
+    """
+    if index_file is None:
+        index_file = default_index_file()
+    fingerprint = distributions_fingerprint()
+    entry_points = _read_index(index_file, fingerprint)
+    if entry_points is None:
+        entry_points = _scan_entry_points()
+        _write_index(index_file, fingerprint, entry_points)
+    return entry_points
+
+
+def default_index_file() -> str:
+    return os.path.join(cache_directory(), "entry-points.json")
+
+
+def distributions_fingerprint() -> str:
+    """
+    Return a hash of the metadata directories of the distributions found
+    on sys.path and the modification times of their entry point files.
+    """
+    sha256 = hashlib.sha256()
+    for path in sys.path:
+        directory = os.path.abspath(path or os.curdir)
+        sha256.update(directory.encode("utf-8"))
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.name.endswith((".dist-info", ".egg-info")):
+                continue
+            try:
+                mtime = os.stat(
+                    os.path.join(entry.path, "entry_points.txt")
+                ).st_mtime_ns
+            except OSError:
+                mtime = 0
+            sha256.update(f"{entry.name}:{mtime}".encode("utf-8"))
+    return sha256.hexdigest()
+
+
+def _scan_entry_points() -> Tuple[IndexedEntryPoint, ...]:
+    from importlib import metadata
+
+    if sys.version_info < (3, 10):
+        entry_points = metadata.entry_points().get(GROUP, ())
+    else:
+        entry_points = metadata.entry_points().select(group=GROUP)
+    return tuple(IndexedEntryPoint(entry.name, entry.value) for entry in entry_points)
+
+
+def _read_index(
+    index_file: str, fingerprint: str
+) -> Optional[Tuple[IndexedEntryPoint, ...]]:
+    try:
+        with open(index_file, "r", encoding="utf-8") as ptr:
+            index = json.load(ptr)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("fingerprint") != fingerprint:
+        return None
+    return tuple(
+        IndexedEntryPoint(name, value) for name, value in index["entry_points"]
+    )
+
+
+def _write_index(
+    index_file: str, fingerprint: str, entry_points: Tuple[IndexedEntryPoint, ...]
+) -> None:
+    index = {
+        "fingerprint": fingerprint,
+        "entry_points": [[entry.name, entry.value] for entry in entry_points],
+    }
+    directory = os.path.dirname(index_file)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # write to a temporary file first, so that concurrent processes
+        # never read an incomplete index
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as ptr:
+            json.dump(index, ptr)
+        os.replace(temp_path, index_file)
+    except OSError:
+        # the index is only an optimisation
+        pass
@@ -0,0 +1,100 @@
+"""
+Copy the content of files as cheaply as the file system allows, e.g. to
+write input files that weren't changed to the output directory.
+"""
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+# ioctl request to share the data blocks of two files on Linux (btrfs, xfs)
+_FICLONE = 0x40049409
+
+
+def copy_file(source: str, destination: str) -> None:
+    """
+    Copy the content of source to destination. If the file system supports
+    it, the data blocks are shared (reflink) instead of copied, otherwise the
+    data is copied in the kernel (copy_file_range) if possible.
+    """
+    if _is_same_file(source, destination):
+        return
+    _remove_if_exists(destination)
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        if _reflink(src.fileno(), dst.fileno()):
+            return
+        if _copy_file_range(src.fileno(), dst.fileno()):
+            return
+        shutil.copyfileobj(src, dst)
+
+
+def link_file(source: str, destination: str) -> None:
+    """
+    Create destination as hard link to source. If that isn't possible,
+    e.g. because the files are on different file systems, source is copied.
+    """
+    if _is_same_file(source, destination):
+        return
+    _remove_if_exists(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        copy_file(source, destination)
+
+
+def unlink_if_shared(path: str) -> None:
+    """
+    Remove path if it has more than one hard link, so that writing to
+    path doesn't change the other files.
+    """
+    try:
+        if os.stat(path).st_nlink > 1:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _is_same_file(source: str, destination: str) -> bool:
+    try:
+        return os.path.samefile(source, destination)
+    except OSError:
+        return False
+
+
+def _remove_if_exists(path: str) -> None:
+    # the existing file might be a hard link to another file, that
+    # mustn't be overwritten
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _reflink(src: int, dst: int) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst, _FICLONE, src)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src: int, dst: int) -> bool:
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is None:
+        return False
+    remaining = os.fstat(src).st_size
+    try:
+        while remaining > 0:
+            copied = copy_file_range(src, dst, remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except OSError:
+        # the rest is copied from the current offsets of the files
+        return False
+    return True
@@ -0,0 +1,101 @@
+"""
+Keep the memory used by a process below a ceiling, by rejecting input files
+whose parsed tree wouldn't fit into the memory that is left, before they
+are parsed. Otherwise, a few very large files could get a worker killed by
+the operating system, which stops the whole run.
+"""
+import os
+import sys
+from typing import Optional
+
+_CHUNK_SIZE = 1 << 20
+# approximate memory of a libxml2 tree per byte of the file, per node (counted
+# by the number of '<') and per attribute (counted by the number of '=')
+_BYTES_PER_BYTE = 2
+_BYTES_PER_NODE = 160
+_BYTES_PER_ATTRIBUTE = 256
+
+
+def resident_set_size() -> Optional[int]:
+    """
+    Return the resident set size of the process in bytes. If the current
+    size isn't available, the peak size is returned, or None on platforms
+    without the resource module.
+    """
+    try:
+        with open("/proc/self/statm", "r") as ptr:
+            return int(ptr.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def estimate_tree_size(file: str) -> int:
+    """
+    Estimate the memory the parsed tree of file takes in bytes, from the
+    size of the file and the number of its nodes and attributes. The file
+    is read, but not parsed.
+    """
+    size = nodes = attributes = 0
+    with open(file, "rb") as ptr:
+        while data := ptr.read(_CHUNK_SIZE):
+            size += len(data)
+            nodes += data.count(b"<")
+            attributes += data.count(b"=")
+    return (
+        size * _BYTES_PER_BYTE
+        + nodes * _BYTES_PER_NODE
+        + attributes * _BYTES_PER_ATTRIBUTE
+    )
+
+
+class MemoryLimitTooLow(Exception):
+    pass
+
+
+class MemoryLimit:
+    """
+    Ceiling for the resident set size of a process. The trees of the files
+    it parses have to fit into the headroom between the ceiling and the
+    baseline, i.e. the memory the process uses once it is set up (for the
+    interpreter, the observers and the validator), see measure_baseline().
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.baseline = 0
+
+    def measure_baseline(self) -> None:
+        """
+        Measure the memory the process uses before it processes files.
+        Raise MemoryLimitTooLow if it already exceeds the limit.
+        """
+        self.baseline = resident_set_size() or 0
+        if self.baseline >= self.max_bytes:
+            raise MemoryLimitTooLow(
+                "Memory limit of %d MB too low, the process uses %d MB "
+                "before processing any file"
+                % (self.max_bytes >> 20, self.baseline >> 20)
+            )
+
+    def headroom(self) -> int:
+        return self.max_bytes - self.baseline
+
+    def estimate_exceeding(self, file: str, trees: int = 1) -> Optional[int]:
+        """
+        Return the estimated memory in bytes of the tree of file (times
+        trees copies of it), if it doesn't fit into the headroom, otherwise
+        None.
+        """
+        estimated = trees * estimate_tree_size(file)
+        return estimated if estimated > self.headroom() else None
+
+    def is_exceeded(self) -> bool:
+        """Check if the process already uses more memory than the limit."""
+        return (resident_set_size() or 0) > self.max_bytes
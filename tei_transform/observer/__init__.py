@@ -1,80 +1,187 @@
-from tei_transform.observer.author_type_observer import AuthorTypeObserver
-from tei_transform.observer.availability_text_observer import AvailabilityTextObserver
-from tei_transform.observer.body_with_text_observer import BodyWithTextObserver
-from tei_transform.observer.byline_sibling_observer import BylineSiblingObserver
-from tei_transform.observer.cell_tail_observer import CellTailObserver
-from tei_transform.observer.childless_body_observer import ChildlessBodyObserver
-from tei_transform.observer.classcode_observer import ClasscodeObserver
-from tei_transform.observer.code_element_observer import CodeElementObserver
-from tei_transform.observer.del_child_observer import DelChildObserver
-from tei_transform.observer.div_parent_observer import DivParentObserver
-from tei_transform.observer.div_sibling_observer import DivSiblingObserver
-from tei_transform.observer.div_tail_observer import DivTailObserver
-from tei_transform.observer.div_text_observer import DivTextObserver
-from tei_transform.observer.double_cell_observer import DoubleCellObserver
-from tei_transform.observer.double_item_observer import DoubleItemObserver
-from tei_transform.observer.double_plike_observer import DoublePlikeObserver
-from tei_transform.observer.empty_attribute_observer import EmptyAttributeObserver
-from tei_transform.observer.empty_element_observer import EmptyElementObserver
-from tei_transform.observer.empty_keywords_observer import EmptyKeywordsObserver
-from tei_transform.observer.empty_p_publicationstmt_observer import (
-    EmptyPPublicationstmtObserver,
-)
-from tei_transform.observer.empty_stmt_observer import EmptyStmtObserver
-from tei_transform.observer.filename_element_observer import FilenameElementObserver
-from tei_transform.observer.fw_child_observer import FwChildObserver
-from tei_transform.observer.h_level_observer import HLevelObserver
-from tei_transform.observer.head_after_p_element_observer import (
-    HeadAfterPElementObserver,
-)
-from tei_transform.observer.head_child_observer import HeadChildObserver
-from tei_transform.observer.head_parent_observer import HeadParentObserver
-from tei_transform.observer.head_with_type_attr_observer import HeadWithTypeAttrObserver
-from tei_transform.observer.hi_child_observer import HiChildObserver
-from tei_transform.observer.hi_with_wrong_parent_observer import (
-    HiWithWrongParentObserver,
-)
-from tei_transform.observer.id_attribute_observer import IdAttributeObserver
-from tei_transform.observer.invalid_attribute_observer import InvalidAttributeObserver
-from tei_transform.observer.invalid_role_observer import InvalidRoleObserver
-from tei_transform.observer.lang_ident_observer import LangIdentObserver
-from tei_transform.observer.linebreak_div_observer import LinebreakDivObserver
-from tei_transform.observer.linebreak_text_observer import LinebreakTextObserver
-from tei_transform.observer.list_text_observer import ListTextObserver
-from tei_transform.observer.lonely_cell_observer import LonelyCellObserver
-from tei_transform.observer.lonely_item_observer import LonelyItemObserver
-from tei_transform.observer.lonely_row_observer import LonelyRowObserver
-from tei_transform.observer.lonely_s_observer import LonelySObserver
-from tei_transform.observer.measure_quantity_attribute_observer import (
-    MeasureQuantityAttributeObserver,
-)
-from tei_transform.observer.misplaced_notesstmt_observer import (
-    MisplacedNotesstmtObserver,
-)
-from tei_transform.observer.missing_body_observer import MissingBodyObserver
-from tei_transform.observer.missing_publisher_observer import MissingPublisherObserver
-from tei_transform.observer.misused_byline_observer import MisusedBylineObserver
-from tei_transform.observer.misused_l_observer import MisusedLObserver
-from tei_transform.observer.misused_opener_observer import MisusedOpenerObserver
-from tei_transform.observer.nested_fw_with_invalid_descendant_observer import (
-    NestedFwWithInvalidDescendantObserver,
-)
-from tei_transform.observer.notesstmt_observer import NotesStmtObserver
-from tei_transform.observer.num_value_observer import NumValueObserver
-from tei_transform.observer.p_parent_observer import PParentObserver
-from tei_transform.observer.ptr_target_observer import PtrTargetObserver
-from tei_transform.observer.related_item_observer import RelatedItemObserver
-from tei_transform.observer.respstmt_note_observer import RespStmtNoteObserver
-from tei_transform.observer.row_child_observer import RowChildObserver
-from tei_transform.observer.schemalocation_observer import SchemaLocationObserver
-from tei_transform.observer.scheme_attribute_observer import SchemeAttributeObserver
-from tei_transform.observer.table_child_observer import TableChildObserver
-from tei_transform.observer.table_text_observer import TableTextObserver
-from tei_transform.observer.tail_text_observer import TailTextObserver
-from tei_transform.observer.tei_namespace_observer import TeiNamespaceObserver
-from tei_transform.observer.teiheader_type_observer import TeiHeaderTypeObserver
-from tei_transform.observer.textclass_observer import TextclassObserver
-from tei_transform.observer.u_parent_observer import UParentObserver
-from tei_transform.observer.ul_element_observer import UlElementObserver
-from tei_transform.observer.unfinished_element_observer import UnfinishedElementObserver
-from tei_transform.observer.wrong_list_child_observer import WrongListChildObserver
+"""
+Observers of the built-in plugins.
+
+The observer modules are only imported when an observer is accessed, so that
+importing the package (or a single observer module) doesn't import all of them.
+"""
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from tei_transform.observer.author_type_observer import AuthorTypeObserver
+    from tei_transform.observer.availability_text_observer import (
+        AvailabilityTextObserver,
+    )
+    from tei_transform.observer.body_with_text_observer import BodyWithTextObserver
+    from tei_transform.observer.byline_sibling_observer import BylineSiblingObserver
+    from tei_transform.observer.cell_tail_observer import CellTailObserver
+    from tei_transform.observer.childless_body_observer import ChildlessBodyObserver
+    from tei_transform.observer.classcode_observer import ClasscodeObserver
+    from tei_transform.observer.code_element_observer import CodeElementObserver
+    from tei_transform.observer.del_child_observer import DelChildObserver
+    from tei_transform.observer.div_parent_observer import DivParentObserver
+    from tei_transform.observer.div_sibling_observer import DivSiblingObserver
+    from tei_transform.observer.div_tail_observer import DivTailObserver
+    from tei_transform.observer.div_text_observer import DivTextObserver
+    from tei_transform.observer.double_cell_observer import DoubleCellObserver
+    from tei_transform.observer.double_item_observer import DoubleItemObserver
+    from tei_transform.observer.double_plike_observer import DoublePlikeObserver
+    from tei_transform.observer.empty_attribute_observer import EmptyAttributeObserver
+    from tei_transform.observer.empty_element_observer import EmptyElementObserver
+    from tei_transform.observer.empty_keywords_observer import EmptyKeywordsObserver
+    from tei_transform.observer.empty_p_publicationstmt_observer import (
+        EmptyPPublicationstmtObserver,
+    )
+    from tei_transform.observer.empty_stmt_observer import EmptyStmtObserver
+    from tei_transform.observer.filename_element_observer import FilenameElementObserver
+    from tei_transform.observer.fw_child_observer import FwChildObserver
+    from tei_transform.observer.h_level_observer import HLevelObserver
+    from tei_transform.observer.head_after_p_element_observer import (
+        HeadAfterPElementObserver,
+    )
+    from tei_transform.observer.head_child_observer import HeadChildObserver
+    from tei_transform.observer.head_parent_observer import HeadParentObserver
+    from tei_transform.observer.head_with_type_attr_observer import (
+        HeadWithTypeAttrObserver,
+    )
+    from tei_transform.observer.hi_child_observer import HiChildObserver
+    from tei_transform.observer.hi_with_wrong_parent_observer import (
+        HiWithWrongParentObserver,
+    )
+    from tei_transform.observer.id_attribute_observer import IdAttributeObserver
+    from tei_transform.observer.invalid_attribute_observer import (
+        InvalidAttributeObserver,
+    )
+    from tei_transform.observer.invalid_role_observer import InvalidRoleObserver
+    from tei_transform.observer.lang_ident_observer import LangIdentObserver
+    from tei_transform.observer.linebreak_div_observer import LinebreakDivObserver
+    from tei_transform.observer.linebreak_text_observer import LinebreakTextObserver
+    from tei_transform.observer.list_text_observer import ListTextObserver
+    from tei_transform.observer.lonely_cell_observer import LonelyCellObserver
+    from tei_transform.observer.lonely_item_observer import LonelyItemObserver
+    from tei_transform.observer.lonely_row_observer import LonelyRowObserver
+    from tei_transform.observer.lonely_s_observer import LonelySObserver
+    from tei_transform.observer.measure_quantity_attribute_observer import (
+        MeasureQuantityAttributeObserver,
+    )
+    from tei_transform.observer.misplaced_notesstmt_observer import (
+        MisplacedNotesstmtObserver,
+    )
+    from tei_transform.observer.missing_body_observer import MissingBodyObserver
+    from tei_transform.observer.missing_publisher_observer import (
+        MissingPublisherObserver,
+    )
+    from tei_transform.observer.misused_byline_observer import MisusedBylineObserver
+    from tei_transform.observer.misused_l_observer import MisusedLObserver
+    from tei_transform.observer.misused_opener_observer import MisusedOpenerObserver
+    from tei_transform.observer.nested_fw_with_invalid_descendant_observer import (
+        NestedFwWithInvalidDescendantObserver,
+    )
+    from tei_transform.observer.notesstmt_observer import NotesStmtObserver
+    from tei_transform.observer.num_value_observer import NumValueObserver
+    from tei_transform.observer.p_parent_observer import PParentObserver
+    from tei_transform.observer.ptr_target_observer import PtrTargetObserver
+    from tei_transform.observer.related_item_observer import RelatedItemObserver
+    from tei_transform.observer.respstmt_note_observer import RespStmtNoteObserver
+    from tei_transform.observer.row_child_observer import RowChildObserver
+    from tei_transform.observer.schemalocation_observer import SchemaLocationObserver
+    from tei_transform.observer.scheme_attribute_observer import SchemeAttributeObserver
+    from tei_transform.observer.table_child_observer import TableChildObserver
+    from tei_transform.observer.table_text_observer import TableTextObserver
+    from tei_transform.observer.tail_text_observer import TailTextObserver
+    from tei_transform.observer.tei_namespace_observer import TeiNamespaceObserver
+    from tei_transform.observer.teiheader_type_observer import TeiHeaderTypeObserver
+    from tei_transform.observer.textclass_observer import TextclassObserver
+    from tei_transform.observer.u_parent_observer import UParentObserver
+    from tei_transform.observer.ul_element_observer import UlElementObserver
+    from tei_transform.observer.unfinished_element_observer import (
+        UnfinishedElementObserver,
+    )
+    from tei_transform.observer.wrong_list_child_observer import WrongListChildObserver
+
+_MODULE_BY_OBSERVER = {
+    "AuthorTypeObserver": "author_type_observer",
+    "AvailabilityTextObserver": "availability_text_observer",
+    "BodyWithTextObserver": "body_with_text_observer",
+    "BylineSiblingObserver": "byline_sibling_observer",
+    "CellTailObserver": "cell_tail_observer",
+    "ChildlessBodyObserver": "childless_body_observer",
+    "ClasscodeObserver": "classcode_observer",
+    "CodeElementObserver": "code_element_observer",
+    "DelChildObserver": "del_child_observer",
+    "DivParentObserver": "div_parent_observer",
+    "DivSiblingObserver": "div_sibling_observer",
+    "DivTailObserver": "div_tail_observer",
+    "DivTextObserver": "div_text_observer",
+    "DoubleCellObserver": "double_cell_observer",
+    "DoubleItemObserver": "double_item_observer",
+    "DoublePlikeObserver": "double_plike_observer",
+    "EmptyAttributeObserver": "empty_attribute_observer",
+    "EmptyElementObserver": "empty_element_observer",
+    "EmptyKeywordsObserver": "empty_keywords_observer",
+    "EmptyPPublicationstmtObserver": "empty_p_publicationstmt_observer",
+    "EmptyStmtObserver": "empty_stmt_observer",
+    "FilenameElementObserver": "filename_element_observer",
+    "FwChildObserver": "fw_child_observer",
+    "HLevelObserver": "h_level_observer",
+    "HeadAfterPElementObserver": "head_after_p_element_observer",
+    "HeadChildObserver": "head_child_observer",
+    "HeadParentObserver": "head_parent_observer",
+    "HeadWithTypeAttrObserver": "head_with_type_attr_observer",
+    "HiChildObserver": "hi_child_observer",
+    "HiWithWrongParentObserver": "hi_with_wrong_parent_observer",
+    "IdAttributeObserver": "id_attribute_observer",
+    "InvalidAttributeObserver": "invalid_attribute_observer",
+    "InvalidRoleObserver": "invalid_role_observer",
+    "LangIdentObserver": "lang_ident_observer",
+    "LinebreakDivObserver": "linebreak_div_observer",
+    "LinebreakTextObserver": "linebreak_text_observer",
+    "ListTextObserver": "list_text_observer",
+    "LonelyCellObserver": "lonely_cell_observer",
+    "LonelyItemObserver": "lonely_item_observer",
+    "LonelyRowObserver": "lonely_row_observer",
+    "LonelySObserver": "lonely_s_observer",
+    "MeasureQuantityAttributeObserver": "measure_quantity_attribute_observer",
+    "MisplacedNotesstmtObserver": "misplaced_notesstmt_observer",
+    "MissingBodyObserver": "missing_body_observer",
+    "MissingPublisherObserver": "missing_publisher_observer",
+    "MisusedBylineObserver": "misused_byline_observer",
+    "MisusedLObserver": "misused_l_observer",
+    "MisusedOpenerObserver": "misused_opener_observer",
+    "NestedFwWithInvalidDescendantObserver": "nested_fw_with_invalid_descendant_observer",
+    "NotesStmtObserver": "notesstmt_observer",
+    "NumValueObserver": "num_value_observer",
+    "PParentObserver": "p_parent_observer",
+    "PtrTargetObserver": "ptr_target_observer",
+    "RelatedItemObserver": "related_item_observer",
+    "RespStmtNoteObserver": "respstmt_note_observer",
+    "RowChildObserver": "row_child_observer",
+    "SchemaLocationObserver": "schemalocation_observer",
+    "SchemeAttributeObserver": "scheme_attribute_observer",
+    "TableChildObserver": "table_child_observer",
+    "TableTextObserver": "table_text_observer",
+    "TailTextObserver": "tail_text_observer",
+    "TeiNamespaceObserver": "tei_namespace_observer",
+    "TeiHeaderTypeObserver": "teiheader_type_observer",
+    "TextclassObserver": "textclass_observer",
+    "UParentObserver": "u_parent_observer",
+    "UlElementObserver": "ul_element_observer",
+    "UnfinishedElementObserver": "unfinished_element_observer",
+    "WrongListChildObserver": "wrong_list_child_observer",
+}
+
+__all__ = list(_MODULE_BY_OBSERVER)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _MODULE_BY_OBSERVER.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f"{__name__}.{module_name}")
+    observer = getattr(module, name)
+    globals()[name] = observer
+    return observer
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
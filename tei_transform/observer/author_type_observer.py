@@ -1,10 +1,11 @@
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import remove_attribute_from_node
+from tei_transform.xslt_backend import XsltRule
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,12 @@ class AuthorTypeObserver(AbstractNodeObserver):
     the replace @type by @role.
     """
 
+    target_tags = frozenset({"author"})
+    required_attributes = frozenset({"type"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset({"role"})
+
     def __init__(self, action: Optional[str] = None) -> None:
         self.action = action
 
@@ -34,6 +41,26 @@ class AuthorTypeObserver(AbstractNodeObserver):
         else:
             remove_attribute_from_node(node, "type")
 
+    def xslt_rules(self) -> List[XsltRule]:
+        if self.action == "replace":
+            return [
+                XsltRule.create(
+                    {"author"},
+                    condition="@type",
+                    attributes={"type", "role"},
+                    removed_attributes=["@type"],
+                    added_attributes=[("role", "@type")],
+                )
+            ]
+        return [
+            XsltRule.create(
+                {"author"},
+                condition="@type",
+                attributes={"type"},
+                removed_attributes=["@type"],
+            )
+        ]
+
     def configure(self, config_dict: Dict[str, str]) -> None:
         action = config_dict.get("action", None)
         if action is not None:
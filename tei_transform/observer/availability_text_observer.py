@@ -12,6 +12,10 @@ class AvailabilityTextObserver(AbstractNodeObserver):
     and add as text content of new <p/> elements.
     """
 
+    target_tags = frozenset({"availability"})
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "availability":
             if node.text is not None and node.text.strip():
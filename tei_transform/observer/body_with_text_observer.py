@@ -14,6 +14,11 @@ class BodyWithTextObserver(AbstractNodeObserver):
     <body/>.
     """
 
+    target_tags = frozenset({"body"})
+    scope = "text"
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if (
             etree.QName(node).localname == "body"
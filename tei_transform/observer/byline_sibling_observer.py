@@ -1,7 +1,10 @@
+from typing import Optional
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import create_new_element
+from tei_transform.sibling_index import SiblingIndex
 
 
 class BylineSiblingObserver(AbstractNodeObserver):
@@ -20,6 +23,9 @@ class BylineSiblingObserver(AbstractNodeObserver):
     To avoid this invalid structure, use togehter with DivSiblingObserver.
     """
 
+    created_tags = frozenset({"div"})
+    created_attributes = frozenset()
+
     #  cf. https://tei-c.org/release/doc/tei-p5-doc/en/html/ref-model.divWrapper.html
     div_wrapper = [
         "argument",
@@ -37,8 +43,13 @@ class BylineSiblingObserver(AbstractNodeObserver):
         "head",
         "opener",
     ]
+    _head_like_or_div_wrapper = frozenset(div_wrapper + head_like)
+    # set by the TeiTransformer
+    sibling_index: Optional[SiblingIndex] = None
 
     def observe(self, node: etree._Element) -> bool:
+        if self.sibling_index is not None:
+            return self._observe_with_index(node, self.sibling_index)
         byline_siblings = list(node.itersiblings("{*}byline", preceding=True))
         if byline_siblings != []:
             if etree.QName(node).localname not in self.div_wrapper + self.head_like:
@@ -60,6 +71,31 @@ class BylineSiblingObserver(AbstractNodeObserver):
                                 return True
         return False
 
+    def _observe_with_index(self, node: etree._Element, index: SiblingIndex) -> bool:
+        # Any element after <byline/> that isn't part of model.divWrapper is
+        # invalid, so it suffices to know if there is a <byline/> before node
+        # that is preceded by an element that is neither head-like nor a
+        # divWrapper.
+        if not isinstance(node.tag, str):
+            return False
+        if etree.QName(node).localname in self._head_like_or_div_wrapper:
+            return False
+        return (
+            index.state_before(node, self.__class__, initial=0, step=self._next_state)
+            == 2
+        )
+
+    def _next_state(self, state: int, localname: Optional[str]) -> int:
+        # 0: no invalid element yet, 1: invalid element found,
+        # 2: <byline/> found after an invalid element
+        if state == 2 or localname is None:
+            return state
+        if localname == "byline":
+            return 2 if state == 1 else state
+        if localname not in self._head_like_or_div_wrapper:
+            return 1
+        return state
+
     def transform_node(self, node: etree._Element) -> None:
         parent = node.getparent()
         older_siblings = []
@@ -12,6 +12,11 @@ class CellTailObserver(AbstractNodeObserver):
     or add to tail of last child, if present.
     """
 
+    target_tags = frozenset({"cell"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "cell" and (
             node.tail is not None and node.tail.strip()
@@ -14,6 +14,11 @@ class ChildlessBodyObserver(AbstractNodeObserver):
     To remove text content from <body/>, use BodyWithTextObserver.
     """
 
+    target_tags = frozenset({"body"})
+    scope = "text"
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         required_children = {"p", "ab", "quote", "list", "table", "div"}
         if (
@@ -1,7 +1,10 @@
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import change_element_tag
+from tei_transform.xslt_backend import XsltRule
 
 
 class ClasscodeObserver(AbstractNodeObserver):
@@ -10,6 +13,10 @@ class ClasscodeObserver(AbstractNodeObserver):
     Find <classcode/> element and replace tag with 'classCode'
     """
 
+    target_tags = frozenset({"classcode"})
+    created_tags = frozenset({"classCode"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "classcode":
             return True
@@ -17,3 +24,6 @@ class ClasscodeObserver(AbstractNodeObserver):
 
     def transform_node(self, node: etree._Element) -> None:
         change_element_tag(node, "classCode")
+
+    def xslt_rules(self) -> List[XsltRule]:
+        return [XsltRule.create({"classcode"}, new_tag="classCode")]
@@ -27,6 +27,11 @@ class CodeElementObserver(AbstractNodeObserver):
     element contains <p/> or <ab/> as children.
     """
 
+    target_tags = frozenset({"code"})
+    local_context = True
+    created_tags = frozenset({"ab"})
+    created_attributes = frozenset({"type"})
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "code" and len(node) != 0:
             return True
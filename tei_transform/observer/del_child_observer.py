@@ -13,6 +13,12 @@ class DelChildObserver(AbstractNodeObserver):
     will not be removed.
     """
 
+    target_tags = frozenset({"p", "ab", "head"})
+    required_parents = frozenset({"del"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname in {"p", "ab", "head"}:
             parent = node.getparent()
@@ -29,6 +29,10 @@ class DivParentObserver(AbstractNodeObserver):
     other observer classes that handle invalid siblings of <div/>.
     """
 
+    target_tags = frozenset({"div"})
+    created_tags = frozenset({"div", "p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         valid_div_parents = {"div", "body", "lem", "rdg", "back", "front"}
         if etree.QName(node).localname == "div":
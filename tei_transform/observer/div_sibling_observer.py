@@ -4,6 +4,7 @@ from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import create_new_element
+from tei_transform.sibling_index import SiblingIndex
 
 
 class DivSiblingObserver(AbstractNodeObserver):
@@ -18,11 +19,21 @@ class DivSiblingObserver(AbstractNodeObserver):
     If the target element is empty, it will be removed.
     """
 
+    target_tags = frozenset({"quote", "table", "list", "p", "head", "ab"})
+    _div = frozenset({"div"})
+    requires_transformed = "document"
+    created_tags = frozenset({"div"})
+    created_attributes = frozenset()
+    # set by the TeiTransformer
+    sibling_index: Optional[SiblingIndex] = None
+
     def __init__(self) -> None:
         self._new_div: Optional[etree._Element] = None
 
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname in {"quote", "table", "list", "p", "head", "ab"}:
+            if self.sibling_index is not None:
+                return self.sibling_index.has_preceding_sibling(node, self._div)
             if list(node.itersiblings("{*}div", preceding=True)) != []:
                 return True
         return False
@@ -16,6 +16,11 @@ class DivTailObserver(AbstractNodeObserver):
     contains other <div/> elements.
     """
 
+    target_tags = frozenset({"div"})
+    local_context = True
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "div" and (
             node.tail is not None and node.tail.strip()
@@ -16,6 +16,11 @@ class DivTextObserver(AbstractNodeObserver):
     is added to the first <p/> child element.
     """
 
+    target_tags = frozenset({"div"})
+    local_context = True
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "div" and node.text is not None:
             if node.text.strip("\n \t"):
@@ -13,6 +13,12 @@ class DoubleCellObserver(AbstractNodeObserver):
     children, it is added as a sibling before the outer cell.
     """
 
+    target_tags = frozenset({"cell"})
+    required_parents = frozenset({"cell"})
+    local_context = True
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "cell":
             parent = node.getparent()
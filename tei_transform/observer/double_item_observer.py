@@ -14,6 +14,12 @@ class DoubleItemObserver(AbstractNodeObserver):
     the tag of the inner <item/> will be changed to <ab/>.
     """
 
+    target_tags = frozenset({"item"})
+    required_parents = frozenset({"item"})
+    local_context = True
+    created_tags = frozenset({"ab", "list"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "item":
             parent = node.getparent()
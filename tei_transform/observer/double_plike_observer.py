@@ -20,6 +20,12 @@ class DoublePlikeObserver(AbstractNodeObserver):
     separate text parts of target and parent resp. older sibling.
     """
 
+    target_tags = frozenset({"p", "ab"})
+    required_parents = frozenset({"p", "ab"})
+    local_context = True
+    created_tags = frozenset({"lb"})
+    created_attributes = frozenset()
+
     def __init__(self, add_lb: bool = False) -> None:
         self._add_lb = add_lb
 
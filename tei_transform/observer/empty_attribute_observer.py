@@ -1,13 +1,17 @@
 import logging
-from typing import Dict, Optional, Set
+import re
+from typing import Dict, FrozenSet, List, Optional, Set
 
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import remove_attribute_from_node
+from tei_transform.xslt_backend import XsltRule
 
 logger = logging.getLogger(__name__)
 
+_NCNAME = re.compile(r"[^\W\d][\w.-]*")
+
 
 class EmptyAttributeObserver(AbstractNodeObserver):
     """
@@ -18,9 +22,17 @@ class EmptyAttributeObserver(AbstractNodeObserver):
     This requires configuration by setting the target attributes.
     """
 
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def __init__(self, target_attributes: Optional[Set[str]] = None) -> None:
         self.target_attributes = target_attributes or set()
 
+    @property
+    def required_attributes(self) -> FrozenSet[str]:  # type: ignore [override]
+        return frozenset(self.target_attributes)
+
     def observe(self, node: etree._Element) -> bool:
         if self.target_attributes:
             matching_attributes = self.target_attributes.intersection(node.attrib)
@@ -34,6 +46,22 @@ class EmptyAttributeObserver(AbstractNodeObserver):
             if node.attrib.get(target_attr, None) == "":
                 remove_attribute_from_node(node, target_attr)
 
+    def xslt_rules(self) -> Optional[List[XsltRule]]:
+        # names with a prefix or namespace would be read differently in XPath
+        if not all(_NCNAME.fullmatch(attr) for attr in self.target_attributes):
+            return None
+        if not self.target_attributes:
+            return []
+        target_attributes = sorted(self.target_attributes)
+        return [
+            XsltRule.create(
+                None,
+                condition=" or ".join(f"@{attr}=''" for attr in target_attributes),
+                attributes=target_attributes,
+                removed_attributes=[f"@{attr}[.='']" for attr in target_attributes],
+            )
+        ]
+
     def configure(self, config_dict: Dict[str, str]) -> None:
         target_attributes = config_dict.get("target")
         if not target_attributes:
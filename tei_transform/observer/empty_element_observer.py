@@ -26,6 +26,11 @@ class EmptyElementObserver(AbstractNodeObserver):
     should be applied.
     """
 
+    target_tags = frozenset({"list", "row", "table"})
+    local_context = True
+    created_tags = frozenset({"cell", "p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname in {"list", "row", "table"}:
             if len(node) == 0 and (node.text is None or not node.text.strip()):
@@ -12,6 +12,10 @@ class EmptyKeywordsObserver(AbstractNodeObserver):
     as child.
     """
 
+    target_tags = frozenset({"keywords"})
+    created_tags = frozenset({"term"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "keywords" and len(node) == 0:
             return True
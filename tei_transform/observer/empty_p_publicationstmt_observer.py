@@ -15,6 +15,11 @@ class EmptyPPublicationstmtObserver(AbstractNodeObserver):
     and required manual inspection and curation.
     """
 
+    target_tags = frozenset({"p", "ab"})
+    required_parents = frozenset({"publicationStmt"})
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         target_tags = {"p", "ab"}
         if etree.QName(node).localname in target_tags:
@@ -11,6 +11,10 @@ class EmptyStmtObserver(AbstractNodeObserver):
     have any children and delete them.
     """
 
+    target_tags = frozenset({"notesStmt", "seriesStmt"})
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if (
             etree.QName(node).localname in {"notesStmt", "seriesStmt"}
@@ -1,6 +1,9 @@
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
+from tei_transform.xslt_backend import XsltRule
 
 
 class FilenameElementObserver(AbstractNodeObserver):
@@ -10,6 +13,10 @@ class FilenameElementObserver(AbstractNodeObserver):
     Find <filename/> elements and remove them.
     """
 
+    target_tags = frozenset({"filename"})
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node.tag).localname == "filename":
             return True
@@ -18,3 +25,6 @@ class FilenameElementObserver(AbstractNodeObserver):
     def transform_node(self, node: etree._Element) -> None:
         parent = node.getparent()
         parent.remove(node)
+
+    def xslt_rules(self) -> List[XsltRule]:
+        return [XsltRule.create({"filename"}, remove_element=True)]
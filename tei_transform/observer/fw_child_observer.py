@@ -24,6 +24,12 @@ class FwChildObserver(AbstractNodeObserver):
     nesting of <fw/> and <ab/>.
     """
 
+    target_tags = frozenset({"p", "list", "table"})
+    required_parents = frozenset({"fw"})
+    local_context = True
+    created_tags = frozenset({"ab"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         target_tags = {"p", "list", "table"}
         if etree.QName(node).localname in target_tags:
@@ -1,3 +1,7 @@
+import functools
+import sys
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
@@ -5,6 +9,7 @@ from tei_transform.element_transformation import (
     change_element_tag,
     remove_attribute_from_node,
 )
+from tei_transform.xslt_backend import XsltRule
 
 
 class HLevelObserver(AbstractNodeObserver):
@@ -16,6 +21,9 @@ class HLevelObserver(AbstractNodeObserver):
     Invalid attributes, such as @class and @title, are removed.
     """
 
+    created_tags = frozenset({"ab"})
+    created_attributes = frozenset({"type", "rend"})
+
     def observe(self, node: etree._Element) -> bool:
         if len(tag := etree.QName(node).localname) == 2:
             if tag.startswith("h") and tag[1].isnumeric():
@@ -30,3 +38,28 @@ class HLevelObserver(AbstractNodeObserver):
         unwanted_attributes = ["class", "title"]
         for attr in unwanted_attributes:
             remove_attribute_from_node(node, attr)
+
+    def xslt_rules(self) -> List[XsltRule]:
+        numeric = _numeric_characters()
+        return [
+            XsltRule.create(
+                None,
+                condition=(
+                    "string-length(local-name())=2 and starts-with(local-name(), 'h')"
+                    f" and contains('{numeric}', substring(local-name(), 2, 1))"
+                ),
+                condition_tags={"h" + character for character in numeric},
+                attributes={"type", "rend", "class", "title"},
+                removed_attributes=["@class", "@title"],
+                added_attributes=[("type", "'head'"), ("rend", "local-name()")],
+                new_tag="ab",
+            )
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def _numeric_characters() -> str:
+    # characters for which str.isnumeric() is true, as checked by observe()
+    return "".join(
+        chr(code) for code in range(sys.maxunicode + 1) if chr(code).isnumeric()
+    )
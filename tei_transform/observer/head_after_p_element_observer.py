@@ -1,7 +1,10 @@
+from typing import Optional
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import change_element_tag
+from tei_transform.sibling_index import SiblingIndex
 
 
 class HeadAfterPElementObserver(AbstractNodeObserver):
@@ -13,8 +16,13 @@ class HeadAfterPElementObserver(AbstractNodeObserver):
     [@type='head'].
     """
 
-    def observe(self, node: etree._Element) -> bool:
-        allowed_before = [  # mainly elements from model.divWrapper
+    target_tags = frozenset({"head"})
+    created_tags = frozenset({"ab"})
+    created_attributes = frozenset({"type"})
+    # set by the TeiTransformer
+    sibling_index: Optional[SiblingIndex] = None
+    allowed_before = frozenset(
+        {  # mainly elements from model.divWrapper
             "fw",
             "opener",
             "argument",
@@ -27,12 +35,19 @@ class HeadAfterPElementObserver(AbstractNodeObserver):
             "meeting",
             "salute",
             "head",
-        ]
+        }
+    )
+
+    def observe(self, node: etree._Element) -> bool:
         if etree.QName(node.tag).localname == "head":
+            if self.sibling_index is not None:
+                return self.sibling_index.has_preceding_sibling(
+                    node, self.allowed_before, exclude=True
+                )
             if [
                 sibling
                 for sibling in node.itersiblings(preceding=True)
-                if etree.QName(sibling).localname not in allowed_before
+                if etree.QName(sibling).localname not in self.allowed_before
             ] != []:
                 return True
         return False
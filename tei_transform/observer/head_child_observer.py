@@ -15,6 +15,12 @@ class HeadChildObserver(AbstractNodeObserver):
     boundary between the text parts.
     """
 
+    target_tags = frozenset({"p", "ab"})
+    required_parents = frozenset({"head"})
+    local_context = True
+    created_tags = frozenset({"lb"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname in {"p", "ab"}:
             parent = node.getparent()
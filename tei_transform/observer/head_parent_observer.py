@@ -12,6 +12,12 @@ class HeadParentObserver(AbstractNodeObserver):
     <item/>, or <quote/> as parent and change their tag to <hi/>.
     """
 
+    target_tags = frozenset({"head"})
+    required_parents = frozenset({"p", "ab", "head", "hi", "item", "quote"})
+    local_context = True
+    created_tags = frozenset({"hi"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "head":
             parent = node.getparent()
@@ -11,6 +11,12 @@ class HeadWithTypeAttrObserver(AbstractNodeObserver):
     Find <head/> elements and remove 'type' attribute.
     """
 
+    target_tags = frozenset({"head"})
+    required_attributes = frozenset({"type"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         qname = etree.QName(node.tag)
         if qname.localname == "head" and "type" in node.attrib:
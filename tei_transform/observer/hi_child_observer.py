@@ -16,6 +16,12 @@ class HiChildObserver(AbstractNodeObserver):
     the text parts.
     """
 
+    target_tags = frozenset({"p"})
+    required_parents = frozenset({"hi"})
+    local_context = True
+    created_tags = frozenset({"lb"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         parent = node.getparent()
         if (
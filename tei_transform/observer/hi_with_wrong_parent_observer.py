@@ -18,6 +18,13 @@ class HiWithWrongParentObserver(AbstractNodeObserver):
     is embedded in a <div#/> with the according number and a <p/>.
     """
 
+    target_tags = frozenset({"hi"})
+    required_parents = frozenset(
+        {"body", "div", "div1", "div2", "div3", "div4", "div5", "div6", "div7"}
+    )
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "hi":
             if etree.QName(node.getparent()).localname in {
@@ -1,3 +1,5 @@
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
@@ -5,6 +7,7 @@ from tei_transform.element_transformation import (
     add_namespace_prefix_to_attribute,
     remove_attribute_from_node,
 )
+from tei_transform.xslt_backend import XsltRule
 
 
 class IdAttributeObserver(AbstractNodeObserver):
@@ -16,6 +19,11 @@ class IdAttributeObserver(AbstractNodeObserver):
     attribute will be removed.
     """
 
+    required_attributes = frozenset({"id"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if "id" in node.attrib:
             return True
@@ -29,3 +37,17 @@ class IdAttributeObserver(AbstractNodeObserver):
             add_namespace_prefix_to_attribute(
                 node, "id", "http://www.w3.org/XML/1998/namespace"
             )
+
+    def xslt_rules(self) -> List[XsltRule]:
+        return [
+            XsltRule.create(
+                {"TEI"}, condition="@id", attributes={"id"}, removed_attributes=["@id"]
+            ),
+            XsltRule.create(
+                None,
+                condition="@id and local-name()!='TEI'",
+                attributes={"id"},
+                removed_attributes=["@id"],
+                added_attributes=[("xml:id", "@id")],
+            ),
+        ]
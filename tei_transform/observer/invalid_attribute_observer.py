@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, Optional, Set
+from typing import Dict, FrozenSet, Optional, Set
 
 from lxml import etree
 
@@ -20,6 +20,10 @@ class InvalidAttributeObserver(AbstractNodeObserver):
     be removed.
     """
 
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def __init__(self, target_attributes: Optional[Dict[str, Set[str]]] = None) -> None:
         """
         To instantiate, pass a dictionary where the keys are the target
@@ -30,6 +34,10 @@ class InvalidAttributeObserver(AbstractNodeObserver):
         """
         self.target_attributes = target_attributes or {}
 
+    @property
+    def required_attributes(self) -> FrozenSet[str]:  # type: ignore [override]
+        return frozenset(self.target_attributes)
+
     def observe(self, node: etree._Element) -> bool:
         if self.target_attributes:
             matching_attributes = set(self.target_attributes).intersection(node.attrib)
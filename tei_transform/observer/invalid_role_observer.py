@@ -12,6 +12,12 @@ class InvalidRoleObserver(AbstractNodeObserver):
     remove the attribute.
     """
 
+    target_tags = frozenset({"div", "p"})
+    required_attributes = frozenset({"role"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if (
             etree.QName(node).localname in {"div", "p"}
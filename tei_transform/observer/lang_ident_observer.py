@@ -19,6 +19,10 @@ class LangIdentObserver(AbstractNodeObserver):
     file, the language codes are matched via index.
     """
 
+    target_tags = frozenset({"language"})
+    created_tags = frozenset()
+    created_attributes = frozenset({"ident"})
+
     def __init__(self, ident: Optional[Dict[int, str]] = None) -> None:
         self.ident = ident or {}
 
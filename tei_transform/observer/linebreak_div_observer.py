@@ -17,6 +17,11 @@ class LinebreakDivObserver(AbstractNodeObserver):
     element.
     """
 
+    target_tags = frozenset({"lb"})
+    required_parents = frozenset({"div", "body"})
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def __init__(self) -> None:
         self._new_p: Optional[etree._Element] = None
 
@@ -11,6 +11,11 @@ class LinebreakTextObserver(AbstractNodeObserver):
     Remove text content of <lb/> and merge with tail.
     """
 
+    target_tags = frozenset({"lb"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if (
             etree.QName(node).localname == "lb"
@@ -21,6 +21,10 @@ class ListTextObserver(AbstractNodeObserver):
     if it has no previous siblings.
     """
 
+    target_tags = frozenset({"list"})
+    created_tags = frozenset({"item"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "list":
             if node.text is not None and node.text.strip():
@@ -14,6 +14,10 @@ class LonelyCellObserver(AbstractNodeObserver):
     wrap them with <row/> (and <table/>, if necessary).
     """
 
+    target_tags = frozenset({"cell"})
+    created_tags = frozenset({"row", "table"})
+    created_attributes = frozenset()
+
     def __init__(self) -> None:
         self._new_row: Optional[etree._Element] = None
         self._new_table: Optional[etree._Element] = None
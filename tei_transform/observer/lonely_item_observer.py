@@ -11,6 +11,10 @@ class LonelyItemObserver(AbstractNodeObserver):
     Observer for <item/> elements outside <list/> elements.
     """
 
+    target_tags = frozenset({"item"})
+    created_tags = frozenset({"list"})
+    created_attributes = frozenset()
+
     def __init__(self) -> None:
         self._new_list: Optional[etree._Element] = None
 
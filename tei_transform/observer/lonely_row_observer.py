@@ -19,6 +19,10 @@ class LonelyRowObserver(AbstractNodeObserver):
     a new <cell/> is added).
     """
 
+    target_tags = frozenset({"row"})
+    created_tags = frozenset({"table", "cell"})
+    created_attributes = frozenset()
+
     def __init__(self) -> None:
         self._new_table: Optional[etree._Element] = None
 
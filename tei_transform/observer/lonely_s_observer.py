@@ -16,6 +16,11 @@ class LonelySObserver(AbstractNodeObserver):
     Multiple adjacent <s/> elements are added to the same <p/>.
     """
 
+    target_tags = frozenset({"s"})
+    required_parents = frozenset({"div", "body"})
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def __init__(self) -> None:
         self._new_p: Optional[etree._Element] = None
 
@@ -12,6 +12,12 @@ class MeasureQuantityAttributeObserver(AbstractNodeObserver):
     attribute.
     """
 
+    target_tags = frozenset({"term"})
+    required_attributes = frozenset({"measure_quantity"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "term" and "measure_quantity" in node.attrib:
             return True
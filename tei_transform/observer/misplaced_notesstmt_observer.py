@@ -14,6 +14,10 @@ class MisplacedNotesstmtObserver(AbstractNodeObserver):
     removed.
     """
 
+    target_tags = frozenset({"notesStmt"})
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "notesStmt":
             prev_sibling = node.getprevious()
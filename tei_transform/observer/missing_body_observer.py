@@ -18,6 +18,11 @@ class MissingBodyObserver(AbstractNodeObserver):
     element.
     """
 
+    target_tags = frozenset({"text"})
+    scope = "text"
+    created_tags = frozenset({"body", "p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if (
             etree.QName(node).localname == "text"
@@ -18,6 +18,9 @@ class MissingPublisherObserver(AbstractNodeObserver):
     if they also appear as first child of <publicationStmt/>.
     """
 
+    created_tags = frozenset({"publisher"})
+    created_attributes = frozenset()
+
     # cf. https://tei-c.org/release/doc/tei-p5-doc/en/html/ref-model.publicationStmtPart.agency.html
     pub_stmt_agency_tags = {"publisher", "authority", "distributor"}
 
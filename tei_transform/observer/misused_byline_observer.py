@@ -13,6 +13,10 @@ class MisusedBylineObserver(AbstractNodeObserver):
     <head/> and change their tag to <ab/>.
     """
 
+    target_tags = frozenset({"byline"})
+    created_tags = frozenset({"ab"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "byline":
             if (
@@ -12,6 +12,12 @@ class MisusedLObserver(AbstractNodeObserver):
     change their tag to <w/>.
     """
 
+    target_tags = frozenset({"l"})
+    required_parents = frozenset({"s"})
+    local_context = True
+    created_tags = frozenset({"w"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "l":
             parent = node.getparent()
@@ -12,6 +12,10 @@ class MisusedOpenerObserver(AbstractNodeObserver):
     children (other than <lb/>) and change their tag to <ab/>.
     """
 
+    target_tags = frozenset({"opener"})
+    created_tags = frozenset({"ab"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         tags_allowed_before = {
             "argument",
@@ -27,6 +27,11 @@ class NestedFwWithInvalidDescendantObserver(AbstractNodeObserver):
     of <fw/> and <ab/> elements.
     """
 
+    target_tags = frozenset({"fw"})
+    required_parents = frozenset({"fw"})
+    created_tags = frozenset({"fw"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "fw":
             parent = node.getparent()
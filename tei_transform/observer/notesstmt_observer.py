@@ -1,7 +1,10 @@
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import remove_attribute_from_node
+from tei_transform.xslt_backend import XsltRule
 
 
 class NotesStmtObserver(AbstractNodeObserver):
@@ -11,6 +14,11 @@ class NotesStmtObserver(AbstractNodeObserver):
     and remove this attribute from the matching elements.
     """
 
+    target_tags = frozenset({"notesStmt"})
+    required_attributes = frozenset({"type"})
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node.tag).localname == "notesStmt" and "type" in node.attrib:
             return True
@@ -18,3 +26,13 @@ class NotesStmtObserver(AbstractNodeObserver):
 
     def transform_node(self, node: etree._Element) -> None:
         remove_attribute_from_node(node, "type")
+
+    def xslt_rules(self) -> List[XsltRule]:
+        return [
+            XsltRule.create(
+                {"notesStmt"},
+                condition="@type",
+                attributes={"type"},
+                removed_attributes=["@type"],
+            )
+        ]
@@ -1,6 +1,9 @@
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
+from tei_transform.xslt_backend import XsltRule
 
 
 class NumValueObserver(AbstractNodeObserver):
@@ -10,6 +13,12 @@ class NumValueObserver(AbstractNodeObserver):
     Change name of @value attribute to @type if value is 'percent'.
     """
 
+    target_tags = frozenset({"num"})
+    required_attributes = frozenset({"value"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset({"type"})
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "num":
             value_attrib = node.attrib.get("value", None)
@@ -20,3 +29,14 @@ class NumValueObserver(AbstractNodeObserver):
     def transform_node(self, node: etree._Element) -> None:
         value_attrib = node.attrib.pop("value")
         node.set("type", value_attrib)
+
+    def xslt_rules(self) -> List[XsltRule]:
+        return [
+            XsltRule.create(
+                {"num"},
+                condition="@value='percent'",
+                attributes={"value", "type"},
+                removed_attributes=["@value"],
+                added_attributes=[("type", "@value")],
+            )
+        ]
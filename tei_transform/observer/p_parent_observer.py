@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, Optional, Set
+from typing import Dict, FrozenSet, Optional, Set
 
 from lxml import etree
 
@@ -20,10 +20,18 @@ class PParentObserver(AbstractNodeObserver):
     should be handled.
     """
 
+    required_parents = frozenset({"div", "body"})
+    created_tags = frozenset({"p"})
+    created_attributes = frozenset()
+
     def __init__(self, target_elems: Optional[Set[str]] = None) -> None:
         self.config_required: bool = True
         self.target_elems = target_elems
 
+    @property
+    def target_tags(self) -> FrozenSet[str]:  # type: ignore [override]
+        return frozenset(self.target_elems or ())
+
     def observe(self, node: etree._Element) -> bool:
         if (
             self.target_elems is not None
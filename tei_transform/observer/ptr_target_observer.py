@@ -1,7 +1,10 @@
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import remove_attribute_from_node
+from tei_transform.xslt_backend import XsltRule
 
 
 class PtrTargetObserver(AbstractNodeObserver):
@@ -12,6 +15,12 @@ class PtrTargetObserver(AbstractNodeObserver):
     value and remove the attribute.
     """
 
+    target_tags = frozenset({"ptr"})
+    required_attributes = frozenset({"target"})
+    local_context = True
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if (
             etree.QName(node).localname == "ptr"
@@ -22,3 +31,13 @@ class PtrTargetObserver(AbstractNodeObserver):
 
     def transform_node(self, node: etree._Element) -> None:
         remove_attribute_from_node(node, "target")
+
+    def xslt_rules(self) -> List[XsltRule]:
+        return [
+            XsltRule.create(
+                {"ptr"},
+                condition="@target=''",
+                attributes={"target"},
+                removed_attributes=["@target"],
+            )
+        ]
@@ -14,6 +14,10 @@ class RelatedItemObserver(AbstractNodeObserver):
     it will also be removed.
     """
 
+    target_tags = frozenset({"relatedItem"})
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "relatedItem" and len(node) == 0:
             if "target" not in node.attrib:
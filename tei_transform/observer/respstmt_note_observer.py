@@ -13,6 +13,11 @@ class RespStmtNoteObserver(AbstractNodeObserver):
     a new <resp/> element.
     """
 
+    target_tags = frozenset({"note"})
+    required_parents = frozenset({"respStmt"})
+    created_tags = frozenset({"resp"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "note":
             parent = node.getparent()
@@ -15,6 +15,12 @@ class RowChildObserver(AbstractNodeObserver):
     be empty after the removal, an empty <cell/> is inserted.
     """
 
+    target_tags = frozenset({"p"})
+    required_parents = frozenset({"row"})
+    local_context = True
+    created_tags = frozenset({"cell"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "p":
             parent = node.getparent()
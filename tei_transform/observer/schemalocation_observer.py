@@ -1,7 +1,10 @@
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import remove_attribute_from_node
+from tei_transform.xslt_backend import XsltRule
 
 
 class SchemaLocationObserver(AbstractNodeObserver):
@@ -11,6 +14,10 @@ class SchemaLocationObserver(AbstractNodeObserver):
     Find 'schemaLocation' attribute in <TEI/> nodes and removed it.
     """
 
+    target_tags = frozenset({"TEI"})
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         ns_mapping = node.nsmap
         if (
@@ -26,3 +33,19 @@ class SchemaLocationObserver(AbstractNodeObserver):
         if node.nsmap:
             attrib_ns = "xsi"
         remove_attribute_from_node(node, "schemaLocation", attrib_ns)
+
+    def xslt_rules(self) -> List[XsltRule]:
+        # attribute in the namespace of the 'xsi' prefix, or without namespace
+        # if the prefix isn't declared, as long as no namespace is declared
+        attribute = (
+            "@*[local-name()='schemaLocation'"
+            " and namespace-uri()=string(../namespace::xsi)]"
+        )
+        return [
+            XsltRule.create(
+                {"TEI"},
+                condition=f"{attribute} and (namespace::xsi or count(namespace::*)=1)",
+                attributes={"schemaLocation"},
+                removed_attributes=[attribute],
+            )
+        ]
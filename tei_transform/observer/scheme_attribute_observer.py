@@ -18,6 +18,10 @@ class SchemeAttributeObserver(AbstractNodeObserver):
     to remove the <classCode/> element from the tree.
     """
 
+    required_attributes = frozenset({"scheme"})
+    created_tags = frozenset()
+    created_attributes = frozenset({"scheme"})
+
     def __init__(self, scheme: Optional[str] = None) -> None:
         self.scheme = scheme
         self.config_required: bool = True
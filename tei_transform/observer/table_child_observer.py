@@ -16,6 +16,12 @@ class TableChildObserver(AbstractNodeObserver):
     TableTextObserver.
     """
 
+    target_tags = frozenset({"p", "ab"})
+    required_parents = frozenset({"table"})
+    local_context = True
+    created_tags = frozenset({"fw"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname in {"p", "ab"}:
             parent = node.getparent()
@@ -18,6 +18,11 @@ class TableTextObserver(AbstractNodeObserver):
     the child is <row/>.
     """
 
+    target_tags = frozenset({"table"})
+    local_context = True
+    created_tags = frozenset({"cell", "head"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "table":
             if node.text is not None and node.text.strip():
@@ -19,6 +19,12 @@ class TailTextObserver(AbstractNodeObserver):
     tag <fw> will be used instead of <p>.
     """
 
+    target_tags = frozenset({"p", "ab", "fw", "list", "table", "quote", "head"})
+    required_parents = frozenset({"div", "body", "floatingText"})
+    local_context = True
+    created_tags = frozenset({"fw", "p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         node_local_tag = etree.QName(node).localname
         if node_local_tag in {"p", "ab", "fw", "list", "table", "quote", "head"}:
@@ -1,6 +1,9 @@
+from typing import FrozenSet, List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
+from tei_transform.xslt_backend import XsltRule
 
 
 class TeiNamespaceObserver(AbstractNodeObserver):
@@ -10,8 +13,15 @@ class TeiNamespaceObserver(AbstractNodeObserver):
     Use this as plugin anyway, if you want to add xml namespace for TEI
     (http://www.tei-c.org/ns/1.0) to a file."""
 
+    target_tags: FrozenSet[str] = frozenset()
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         return False
 
     def transform_node(self, node: etree._Element) -> None:
         pass
+
+    def xslt_rules(self) -> List[XsltRule]:
+        return []
@@ -1,7 +1,10 @@
+from typing import List
+
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
 from tei_transform.element_transformation import remove_attribute_from_node
+from tei_transform.xslt_backend import XsltRule
 
 
 class TeiHeaderTypeObserver(AbstractNodeObserver):
@@ -11,6 +14,12 @@ class TeiHeaderTypeObserver(AbstractNodeObserver):
     Find 'type' attribute in <teiHeader> element and remove it.
     """
 
+    target_tags = frozenset({"teiHeader"})
+    required_attributes = frozenset({"type"})
+    scope = "teiHeader"
+    created_tags = frozenset()
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node.tag).localname == "teiHeader" and "type" in node.attrib:
             return True
@@ -18,3 +27,14 @@ class TeiHeaderTypeObserver(AbstractNodeObserver):
 
     def transform_node(self, node: etree._Element) -> None:
         remove_attribute_from_node(node, "type")
+
+    def xslt_rules(self) -> List[XsltRule]:
+        return [
+            XsltRule.create(
+                {"teiHeader"},
+                condition="@type",
+                scope="teiHeader",
+                attributes={"type"},
+                removed_attributes=["@type"],
+            )
+        ]
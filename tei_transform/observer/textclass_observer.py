@@ -9,6 +9,10 @@ class TextclassObserver(AbstractNodeObserver):
     Find <textclass> element and replace tag with 'textClass'
     """
 
+    target_tags = frozenset({"textclass"})
+    created_tags = frozenset({"textClass"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node.tag).localname == "textclass":
             return True
@@ -20,6 +20,12 @@ class UParentObserver(AbstractNodeObserver):
     If the <u/> element is empty, it is removed instead.
     """
 
+    target_tags = frozenset({"u"})
+    required_parents = frozenset({"p"})
+    local_context = True
+    created_tags = frozenset({"div", "p"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "u":
             parent = node.getparent()
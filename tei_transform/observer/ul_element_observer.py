@@ -11,6 +11,11 @@ class UlElementObserver(AbstractNodeObserver):
     Find <ul/> elements and change tag to <list/>.
     """
 
+    target_tags = frozenset({"ul"})
+    local_context = True
+    created_tags = frozenset({"list"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         if etree.QName(node).localname == "ul":
             return True
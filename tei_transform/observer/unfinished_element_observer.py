@@ -21,6 +21,12 @@ class UnfinishedElementObserver(AbstractNodeObserver):
 
     """
 
+    target_tags = frozenset({"list", "table"})
+    local_context = True
+    requires_transformed = "subtree"
+    created_tags = frozenset({"item", "row", "cell"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         element_tag = etree.QName(node).localname
         if element_tag == "list" and len(node) != 0:
@@ -15,6 +15,12 @@ class WrongListChildObserver(AbstractNodeObserver):
     instead.
     """
 
+    target_tags = frozenset({"p", "hi", "ab", "list", "del", "quote", "table"})
+    required_parents = frozenset({"list"})
+    local_context = True
+    created_tags = frozenset({"item"})
+    created_attributes = frozenset()
+
     def observe(self, node: etree._Element) -> bool:
         target_tags = {"p", "hi", "ab", "list", "del", "quote", "table"}
         if etree.QName(node).localname in target_tags:
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import configparser
-import sys
-from importlib import metadata
-from typing import List, Optional, Tuple, Union
+from typing import List, Optional, Tuple
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
+from tei_transform.entry_point_index import (
+    IndexedEntryPoint,
+    node_observer_entry_points,
+)
+from tei_transform.observer_dispatcher import SCOPES
+from tei_transform.traversal import DEPENDENCIES
 
 
 class ObserverConstructor:
@@ -21,12 +25,8 @@ class ObserverConstructor:
     @classmethod
     def _get_node_observer_entry_points(
         cls,
-    ) -> Union[Tuple[metadata.EntryPoint], metadata.EntryPoints]:  # type: ignore [name-defined]
-        if sys.version_info < (3, 10):
-            entry_points = metadata.entry_points()["node_observer"]
-        else:
-            entry_points = metadata.entry_points().select(group="node_observer")
-        return entry_points
+    ) -> Tuple[IndexedEntryPoint, ...]:
+        return node_observer_entry_points()
 
     def construct_observers(
         self,
@@ -47,9 +47,19 @@ class ObserverConstructor:
                 raise InvalidObserver(
                     f"{observer_name} is not an instance of AbstractNodeObserver."
                 )
+            if not self._has_valid_scope(observer):
+                raise InvalidObserver(
+                    f"{observer_name} has invalid scope, use one of {sorted(SCOPES)}."
+                )
+            if not self._has_valid_dependency(observer):
+                raise InvalidObserver(
+                    f"{observer_name} has invalid 'requires_transformed', "
+                    f"use one of {sorted(DEPENDENCIES)}."
+                )
             if config is not None:
                 self._configure_observer(observer, config, observer_name)
-            if observer_name in {"div-sibling", "unfinished-elem"}:
+            # observers that depend on the transformation of other nodes
+            if getattr(observer, "requires_transformed", None) is not None:
                 second_pass_observers.append(observer)
                 continue
             first_pass_observers.append(observer)
@@ -63,6 +73,14 @@ class ObserverConstructor:
     def _is_valid_observer(self, observer: AbstractNodeObserver) -> bool:
         return isinstance(observer, AbstractNodeObserver)
 
+    def _has_valid_scope(self, observer: AbstractNodeObserver) -> bool:
+        scope = getattr(observer, "scope", None)
+        return scope is None or scope in SCOPES
+
+    def _has_valid_dependency(self, observer: AbstractNodeObserver) -> bool:
+        dependency = getattr(observer, "requires_transformed", None)
+        return dependency is None or dependency in DEPENDENCIES
+
     def _sort_plugins(self, observer_strings: List[str]) -> List[str]:
         observer_strings = self._move_lb_text_to_front(observer_strings)
         observer_strings = self._move_div_parent_to_front(observer_strings)
@@ -0,0 +1,127 @@
+"""
+Look up the observers that can match a node by the node's tag.
+"""
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from tei_transform.abstract_node_observer import AbstractNodeObserver
+
+SCOPES = {"teiHeader", "text"}
+
+_Candidate = Tuple[
+    int, AbstractNodeObserver, Optional[FrozenSet[str]], Optional[FrozenSet[str]]
+]
+
+
+class ObserverDispatcher:
+    """
+    Index a list of observers by the localnames declared in their
+    'target_tags' attribute. Observers that don't declare any target
+    tags are dispatched for every node. Nodes without one of the
+    'required_parents' or 'required_attributes' of an observer are
+    not dispatched to it. The order of the observers in the original
+    list is preserved for each node.
+    If a scope is passed, only observers declared for that scope (or
+    for any scope) are dispatched.
+    """
+
+    def __init__(
+        self, observers: List[AbstractNodeObserver], scope: Optional[str] = None
+    ) -> None:
+        self.observers = [
+            observer
+            for observer in observers
+            if scope is None or getattr(observer, "scope", None) in {None, scope}
+        ]
+        self._wildcard_observers: List[_Candidate] = []
+        self._observers_by_localname: Dict[str, List[_Candidate]] = defaultdict(list)
+        for position, observer in enumerate(self.observers):
+            candidate = (
+                position,
+                observer,
+                _frozenset_or_none(getattr(observer, "required_parents", None)),
+                _frozenset_or_none(getattr(observer, "required_attributes", None)),
+            )
+            target_tags = getattr(observer, "target_tags", None)
+            if target_tags is None:
+                self._wildcard_observers.append(candidate)
+                continue
+            for localname in set(target_tags):
+                self._observers_by_localname[localname].append(candidate)
+        self._candidates_by_tag: Dict[Any, List[_Candidate]] = {}
+
+    def dispatch(self, node: etree._Element) -> Iterator[AbstractNodeObserver]:
+        """
+        Yield the observers that should be applied to node, in order.
+        If an observer changes the tag of the node, the remaining
+        observers are looked up for the new tag.
+        """
+        tag = node.tag
+        candidates = self._candidates_for_tag(tag)
+        index = 0
+        while index < len(candidates):
+            position, observer, parents, attributes = candidates[index]
+            index += 1
+            if parents is not None and not self._has_parent_in(node, parents):
+                continue
+            if attributes is not None and attributes.isdisjoint(node.attrib):
+                continue
+            yield observer
+            if node.tag != tag:
+                tag = node.tag
+                candidates = [
+                    candidate
+                    for candidate in self._candidates_for_tag(tag)
+                    if candidate[0] > position
+                ]
+                index = 0
+
+    def observers_for(self, node: etree._Element) -> List[AbstractNodeObserver]:
+        """
+        Return the observers that dispatch() yields for node, if none of
+        them changes the tag of node, e.g. if they are only observed.
+        """
+        return [
+            observer
+            for _, observer, parents, attributes in self._candidates_for_tag(node.tag)
+            if (parents is None or self._has_parent_in(node, parents))
+            and (attributes is None or not attributes.isdisjoint(node.attrib))
+        ]
+
+    def has_candidates(self, node: etree._Element) -> bool:
+        """
+        Check if any observer is declared for the tag of node. It might
+        still not be dispatched, depending on the parent and attributes.
+        """
+        candidates = self._candidates_by_tag.get(node.tag)
+        if candidates is None:
+            candidates = self._candidates_for_tag(node.tag)
+        return bool(candidates)
+
+    def _candidates_for_tag(self, tag: Any) -> List[_Candidate]:
+        candidates = self._candidates_by_tag.get(tag)
+        if candidates is None:
+            # comments and processing instructions don't have a str tag
+            if isinstance(tag, str):
+                localname = tag.rpartition("}")[2]
+                candidates = sorted(
+                    self._observers_by_localname.get(localname, [])
+                    + self._wildcard_observers,
+                    key=lambda candidate: candidate[0],
+                )
+            else:
+                candidates = self._wildcard_observers
+            self._candidates_by_tag[tag] = candidates
+        return candidates
+
+    def _has_parent_in(self, node: etree._Element, parents: FrozenSet[str]) -> bool:
+        parent = node.getparent()
+        return parent is not None and parent.tag.rpartition("}")[2] in parents
+
+
+def _frozenset_or_none(values: Optional[Any]) -> Optional[FrozenSet[str]]:
+    if values is None:
+        return None
+    return frozenset(values)
@@ -0,0 +1,116 @@
+"""
+Collect how often the observers are called and how much time they take,
+to find out which plugins dominate the runtime of a transformation.
+"""
+import csv
+import json
+from dataclasses import asdict, dataclass, fields
+from typing import Dict
+
+from tei_transform.abstract_node_observer import AbstractNodeObserver
+
+
+@dataclass
+class ObserverStatistics:
+    observe_calls: int = 0
+    matches: int = 0
+    observe_time: float = 0.0
+    transform_time: float = 0.0
+    transformation_errors: int = 0
+
+    def add(self, other: "ObserverStatistics") -> None:
+        for field in fields(self):
+            setattr(
+                self, field.name, getattr(self, field.name) + getattr(other, field.name)
+            )
+
+
+class TransformationProfile:
+    """
+    Statistics of the observers per file and aggregated over all files.
+    Observers are identified by their class name.
+    """
+
+    def __init__(self) -> None:
+        self.files: Dict[str, Dict[str, ObserverStatistics]] = {}
+
+    def statistics(
+        self, filename: str, observer: AbstractNodeObserver
+    ) -> ObserverStatistics:
+        """
+        Return the statistics of observer for filename, that are
+        updated while the file is transformed.
+        """
+        statistics_of_file = self.files.setdefault(filename, {})
+        name = observer.__class__.__name__
+        statistics = statistics_of_file.get(name)
+        if statistics is None:
+            statistics = statistics_of_file[name] = ObserverStatistics()
+        return statistics
+
+    def pop_file(self, filename: str) -> Dict[str, ObserverStatistics]:
+        """
+        Remove the statistics of filename, e.g. to pass them from a
+        worker process to the main process.
+        """
+        return self.files.pop(filename, {})
+
+    def add_file(
+        self, filename: str, statistics_of_file: Dict[str, ObserverStatistics]
+    ) -> None:
+        """Add the statistics of a file, that was transformed elsewhere."""
+        for name, statistics in statistics_of_file.items():
+            self.files.setdefault(filename, {}).setdefault(
+                name, ObserverStatistics()
+            ).add(statistics)
+
+    def aggregate(self) -> Dict[str, ObserverStatistics]:
+        """Sum up the statistics of each observer over all files."""
+        total: Dict[str, ObserverStatistics] = {}
+        for statistics_of_file in self.files.values():
+            for name, statistics in statistics_of_file.items():
+                total.setdefault(name, ObserverStatistics()).add(statistics)
+        return total
+
+    def write(self, path: str) -> None:
+        """
+        Write the statistics to path. If the file extension is '.csv',
+        the statistics are written as CSV, otherwise as JSON.
+        """
+        if path.lower().endswith(".csv"):
+            self._write_csv(path)
+        else:
+            self._write_json(path)
+
+    def _write_json(self, path: str) -> None:
+        data = {
+            "total": _as_dict(self.aggregate()),
+            "files": {
+                filename: _as_dict(statistics_of_file)
+                for filename, statistics_of_file in self.files.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as ptr:
+            json.dump(data, ptr, indent=2)
+
+    def _write_csv(self, path: str) -> None:
+        # rows with an empty file column contain the aggregated statistics
+        columns = [field.name for field in fields(ObserverStatistics)]
+        with open(path, "w", encoding="utf-8", newline="") as ptr:
+            writer = csv.writer(ptr)
+            writer.writerow(["file", "observer"] + columns)
+            rows = [("", self.aggregate())] + list(self.files.items())
+            for filename, statistics_of_file in rows:
+                for name, statistics in statistics_of_file.items():
+                    values = asdict(statistics)
+                    writer.writerow(
+                        [filename, name] + [values[column] for column in columns]
+                    )
+
+
+def _as_dict(
+    statistics_by_observer: Dict[str, ObserverStatistics]
+) -> Dict[str, Dict[str, float]]:
+    return {
+        name: asdict(statistics) for name, statistics in statistics_by_observer.items()
+    }
@@ -0,0 +1,182 @@
+"""
+Stages to overlap reading and parsing of the input files and writing of the
+output files with the transformation, if the files are processed in a single
+process. lxml releases the GIL while parsing and serializing, so the stages
+run in threads.
+"""
+import queue
+import threading
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from lxml import etree
+
+from tei_transform.xml_tree_iterator import UnparsedText
+from tei_transform.xml_writer import XmlWriter
+
+_CHUNK_SIZE = 1 << 20
+# marks the end of a queue
+_DONE = object()
+
+
+@dataclass
+class PrefetchedFile:
+    """
+    Input file that was read ahead. tree is the parsed document, if the file
+    was parsed, and error the exception raised while parsing it.
+    """
+
+    file: str
+    output_dir: str
+    tree: Optional[etree._ElementTree] = None
+    error: Optional[etree.XMLSyntaxError] = None
+
+
+def prefetch_files(
+    files: Iterable[Tuple[str, str]],
+    depth: int,
+    parse: bool = True,
+    parser: Optional[etree.XMLParser] = None,
+) -> Iterator[PrefetchedFile]:
+    """
+    Yield the input files together with their output directory, while up to
+    depth of the next files are read (and parsed with parser, if parse is
+    True) in a separate thread. If the files aren't parsed, they are only
+    read, so that their content is in the cache of the operating system
+    when it is needed.
+    """
+    prefetched: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def read_ahead() -> None:
+        try:
+            for file, output_dir in files:
+                if stopped.is_set():
+                    return
+                prefetched.put(_prefetch_file(file, output_dir, parse, parser))
+        except BaseException as error:
+            prefetched.put(error)
+        prefetched.put(_DONE)
+
+    reader = threading.Thread(target=read_ahead, name="reader", daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = prefetched.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        # unblock the reader, if the queue is full
+        while reader.is_alive():
+            try:
+                prefetched.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def _prefetch_file(
+    file: str, output_dir: str, parse: bool, parser: Optional[etree.XMLParser]
+) -> PrefetchedFile:
+    if not parse:
+        with open(file, "rb") as ptr:
+            while ptr.read(_CHUNK_SIZE):
+                pass
+        return PrefetchedFile(file, output_dir)
+    try:
+        tree = etree.parse(file, parser)
+    except etree.XMLSyntaxError as error:
+        return PrefetchedFile(file, output_dir, error=error)
+    return PrefetchedFile(file, output_dir, tree=tree)
+
+
+class QueuedXmlWriter:
+    """
+    XmlWriter that passes all calls to another writer in a separate thread,
+    in the order they were made. At most depth calls are pending, further
+    calls wait until a call was finished. If a call raised an exception, it
+    is raised again by the next call or by join().
+    """
+
+    def __init__(self, xml_writer: XmlWriter, depth: int) -> None:
+        self.xml_writer = xml_writer
+        self._calls: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+        self._errors: List[BaseException] = []
+        self._thread = threading.Thread(target=self._run, name="writer", daemon=True)
+        self._thread.start()
+
+    def write_xml(
+        self,
+        path: str,
+        xml: etree._Element,
+        unparsed_text: Optional[UnparsedText] = None,
+    ) -> None:
+        self._submit(self.xml_writer.write_xml, path, xml, unparsed_text)
+
+    def write_stream(self, path: str, chunks: Iterable[bytes]) -> bool:
+        # the chunks are produced while they are written, so the transformation
+        # can't continue in the meantime
+        self.join()
+        return self.xml_writer.write_stream(path, chunks)
+
+    def create_output_directories(self, output_dir: str) -> None:
+        self._submit(self.xml_writer.create_output_directories, output_dir)
+
+    def copy_valid_files(self, file: str, output_dir: str) -> None:
+        self._submit(self.xml_writer.copy_valid_files, file, output_dir)
+
+    def copy_unchanged_file(self, file: str, path: str, link: bool = False) -> None:
+        self._submit(self.xml_writer.copy_unchanged_file, file, path, link)
+
+    def call_after_writes(self, function: Callable[..., Any], *args: Any) -> None:
+        """
+        Call function in the writer thread after the calls made before were
+        finished, e.g. to record that an output file was written. function
+        isn't called if one of these calls failed.
+        """
+        self._submit(function, *args)
+
+    def join(self) -> None:
+        """Wait until all calls were finished."""
+        self._calls.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Finish all calls and stop the thread."""
+        self._calls.put(_DONE)
+        self._thread.join()
+        self._raise_error()
+
+    def _submit(self, method: Callable[..., Any], *args: Any) -> None:
+        self._raise_error()
+        self._calls.put((method, args))
+
+    def _run(self) -> None:
+        while True:
+            call = self._calls.get()
+            if call is _DONE:
+                self._calls.task_done()
+                return
+            method, args = call
+            try:
+                if not self._errors:
+                    method(*args)
+            except BaseException as error:
+                self._errors.append(error)
+            finally:
+                self._calls.task_done()
+
+    def _raise_error(self) -> None:
+        if self._errors:
+            raise self._errors.pop(0)
@@ -0,0 +1,59 @@
+"""
+Record the files whose transformation exceeded the budget, so they can
+be examined and processed separately after the run.
+"""
+import json
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from tei_transform.transformation_budget import BudgetExceeded
+
+
+@dataclass
+class QuarantinedFile:
+    file: str
+    reason: str
+    # class name of the observer applied when the budget ran out, if known
+    observer: Optional[str]
+    elapsed: float
+    nodes: int
+
+    @classmethod
+    def from_error(cls, file: str, error: BudgetExceeded) -> "QuarantinedFile":
+        return cls(
+            file=file,
+            reason=error.reason,
+            observer=error.observer,
+            elapsed=round(error.elapsed, 3),
+            nodes=error.nodes,
+        )
+
+
+class Quarantine:
+    """
+    List of quarantined files. If a path is given, each file is appended
+    to it as a line of JSON as soon as it is added, so the list is complete
+    even if the run is interrupted.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.files: List[QuarantinedFile] = []
+        if path is not None:
+            # the list of a previous run is replaced
+            open(path, "w", encoding="utf-8").close()
+
+    def add(self, quarantined: QuarantinedFile) -> None:
+        self.files.append(quarantined)
+        if self.path is None:
+            return
+        with open(self.path, "a", encoding="utf-8") as ptr:
+            ptr.write(json.dumps(asdict(quarantined)) + "\n")
+
+    def pop_files(self) -> List[QuarantinedFile]:
+        """
+        Remove the files added so far, e.g. to pass them from a worker
+        process to the main process.
+        """
+        files, self.files = self.files, []
+        return files
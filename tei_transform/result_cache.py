@@ -0,0 +1,225 @@
+"""
+Remember the results of previous runs, so that input files that didn't
+change since the last run don't have to be processed again.
+
+The results are stored in an SQLite database. An entry is found by a key
+that is derived from the content of the input file, the path of the output
+file and a fingerprint of the run, i.e. the ordered list of plugins, the content
+of the config file, the options for processing valid files and the version
+of tei-transform. If any of these change, the files are processed again.
+The pre-scans of the input files (see tag_scan.py) are stored by the content
+of the files only, so they are reused by runs with other settings.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from tei_transform.parse_config import RevisionDescChange
+from tei_transform.tag_scan import TagScan
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    """
+    Result of processing an input file. output_path is None if no output
+    file was written, e.g. because a valid file was ignored.
+    """
+
+    output_path: Optional[str]
+    tree_changed: bool
+    output_size: Optional[int] = None
+    output_mtime: Optional[int] = None
+
+    @classmethod
+    def for_output(
+        cls, output_path: Optional[str], tree_changed: bool
+    ) -> "CachedResult":
+        """
+        Construct the result for output_path, recording size and modification
+        time of the output file to detect later changes.
+        """
+        if output_path is None:
+            return cls(output_path=None, tree_changed=tree_changed)
+        stat = os.stat(output_path)
+        return cls(
+            output_path=output_path,
+            tree_changed=tree_changed,
+            output_size=stat.st_size,
+            output_mtime=stat.st_mtime_ns,
+        )
+
+    def output_is_intact(self) -> bool:
+        """
+        Check that the output file still exists and wasn't modified since
+        it was written.
+        """
+        if self.output_path is None:
+            return True
+        try:
+            stat = os.stat(self.output_path)
+        except OSError:
+            return False
+        return (
+            stat.st_size == self.output_size and stat.st_mtime_ns == self.output_mtime
+        )
+
+
+class ResultCache:
+    """
+    On-disk cache of the results of processing input files.
+
+    The database connection is opened lazily, so that instances can be
+    passed to worker processes.
+    """
+
+    def __init__(self, path: str, run_fingerprint: str) -> None:
+        self.path = path
+        self.run_fingerprint = run_fingerprint
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def key(self, file: str, output_dir: str, digest: Optional[str] = None) -> str:
+        """
+        Return the key of the result for file. If the digest of the content
+        of file is already known, it can be passed.
+        """
+        sha256 = hashlib.sha256()
+        sha256.update(self.run_fingerprint.encode("utf-8"))
+        sha256.update((digest or file_digest(file)).encode("utf-8"))
+        output_path = os.path.join(os.path.abspath(output_dir), os.path.basename(file))
+        sha256.update(output_path.encode("utf-8"))
+        return sha256.hexdigest()
+
+    def lookup(self, key: str) -> Optional[CachedResult]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT output_path, tree_changed, output_size, output_mtime "
+                "FROM results WHERE key = ?",
+                (key,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        output_path, tree_changed, output_size, output_mtime = row
+        return CachedResult(output_path, bool(tree_changed), output_size, output_mtime)
+
+    def store(self, key: str, result: CachedResult) -> None:
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    result.output_path,
+                    int(result.tree_changed),
+                    result.output_size,
+                    result.output_mtime,
+                ),
+            )
+
+    def lookup_scan(self, digest: str) -> Optional[TagScan]:
+        """Return the pre-scan of the file with content digest, if stored."""
+        row = (
+            self._connect()
+            .execute("SELECT scan FROM scans WHERE digest = ?", (digest,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return TagScan.from_json(row[0])
+
+    def store_scan(self, digest: str, scan: TagScan) -> None:
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO scans VALUES (?, ?)", (digest, scan.to_json())
+            )
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # several worker processes may write to the database concurrently
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, "
+                    "output_path TEXT, tree_changed INTEGER, output_size INTEGER, "
+                    "output_mtime INTEGER)"
+                )
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS scans (digest TEXT PRIMARY KEY, "
+                    "scan TEXT)"
+                )
+        return self._connection
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+
+def file_digest(file: str) -> str:
+    """Return the sha256 hash of the content of file."""
+    sha256 = hashlib.sha256()
+    with open(file, "rb") as ptr:
+        for chunk in iter(lambda: ptr.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def run_fingerprint(
+    observers: List[str],
+    config_file: Optional[str],
+    validation: bool,
+    copy_valid: bool,
+    revision_entry: Optional[RevisionDescChange],
+    unchanged: str = "write",
+    max_rounds: int = 1,
+    remove_comments: bool = False,
+) -> str:
+    """
+    Return a string that identifies all settings of a run that influence
+    the output for an input file.
+    """
+    config = ""
+    if config_file is not None:
+        with open(config_file, "r", encoding="utf-8") as ptr:
+            config = ptr.read()
+    return json.dumps(
+        {
+            "version": package_version(),
+            "observers": observers,
+            "config": config,
+            "validation": validation,
+            "copy_valid": copy_valid,
+            "unchanged": unchanged,
+            "max_rounds": max_rounds,
+            "remove_comments": remove_comments,
+            # the date of the revision entry can depend on the day of the run
+            "revision": asdict(revision_entry) if revision_entry else None,
+        },
+        sort_keys=True,
+    )
+
+
+def package_version() -> str:
+    """Return the installed version of tei-transform."""
+    # imported here, importlib.metadata is slow to import
+    from importlib import metadata
+
+    try:
+        return metadata.version("tei-transform")
+    except metadata.PackageNotFoundError:
+        return "unknown"
@@ -0,0 +1,140 @@
+"""
+Record the outcome of each input file of a run in an append-only journal,
+so that an interrupted run can be resumed without processing the files
+again that were finished before.
+
+The journal is a file with one JSON object per line. The first line
+identifies the run (the fingerprint of its settings, see
+result_cache.run_fingerprint(), and the input and output paths), each
+further line is a JournalEntry. An entry is only written after the output
+of the file was written.
+
+Each line is flushed when it is written, so that it survives a crash of the
+process. To survive a crash of the machine (e.g. a preempted cloud instance)
+the journal is also synced to disk, at most once per SYNC_INTERVAL seconds
+to keep the cost low for many small files, and when it is closed. Entries
+lost on such a crash only cause their files to be processed again.
+"""
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import IO, Any, Dict, List, Optional, Set
+
+TRANSFORMED = "transformed"
+UNCHANGED = "unchanged"
+VALID_COPIED = "valid-copied"
+IGNORED = "ignored"
+SYNTAX_ERROR = "syntax-error"
+QUARANTINED = "quarantined"
+# the result of a previous run was found in the result cache
+CACHED = "cached"
+
+# seconds between two syncs of the journal file to disk
+SYNC_INTERVAL = 1.0
+
+
+class JournalMismatch(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    file: str
+    status: str
+    # time in seconds the file took to process, without writing the output
+    duration: float
+    # path of the output file, None if no output was written
+    output: Optional[str] = None
+
+
+class RunJournal:
+    """
+    Journal of the files processed by a run. Use RunJournal.open() for a
+    journal that is written to a file, otherwise the entries are only kept
+    in memory, e.g. to pass them from a worker process to the main process.
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[JournalEntry] = []
+        self._completed: Set[str] = set()
+        self._ptr: Optional[IO[str]] = None
+        self._last_sync: Optional[float] = None
+
+    @classmethod
+    def open(cls, path: str, run: Dict[str, str], resume: bool) -> "RunJournal":
+        """
+        Open the journal at path for the run identified by run. If resume is
+        True and the journal exists, the files recorded in it are completed
+        and further entries are appended, otherwise a new journal is started.
+        Raise JournalMismatch if the existing journal was written by a run
+        with other settings.
+        """
+        journal = cls()
+        if resume and os.path.exists(path):
+            journal._read(path, run)
+            journal._ptr = open(path, "a", encoding="utf-8")
+            return journal
+        journal._ptr = open(path, "w", encoding="utf-8")
+        journal._write_line(run)
+        return journal
+
+    def add(self, entry: JournalEntry) -> None:
+        self.entries.append(entry)
+        self._completed.add(entry.file)
+        if self._ptr is not None:
+            self._write_line(asdict(entry))
+
+    def is_completed(self, file: str) -> bool:
+        """Check if the journal has an entry for file."""
+        return file in self._completed
+
+    def pop_entries(self) -> List[JournalEntry]:
+        """Remove the entries added so far and return them."""
+        entries, self.entries = self.entries, []
+        return entries
+
+    def close(self) -> None:
+        if self._ptr is not None:
+            self._sync()
+            self._ptr.close()
+            self._ptr = None
+
+    def _read(self, path: str, run: Dict[str, str]) -> None:
+        with open(path, "r", encoding="utf-8") as ptr:
+            lines = ptr.read().split("\n")
+        try:
+            journal_run = json.loads(lines[0])
+        except json.JSONDecodeError:
+            raise JournalMismatch("Journal can't be read: %s" % path)
+        if journal_run != run:
+            raise JournalMismatch(
+                "Journal was written by a run with other settings: %s" % path
+            )
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # an incomplete line of a run that was interrupted while
+                # writing it, or the empty string after the last line
+                continue
+            if isinstance(entry, dict) and isinstance(entry.get("file"), str):
+                self._completed.add(entry["file"])
+        if lines[-1]:
+            with open(path, "a", encoding="utf-8") as ptr:
+                ptr.write("\n")
+
+    def _write_line(self, data: Dict[str, Any]) -> None:
+        assert self._ptr is not None
+        self._ptr.write(json.dumps(data) + "\n")
+        # entries of files that were finished survive a crash of the process
+        self._ptr.flush()
+        now = time.monotonic()
+        if self._last_sync is None or now - self._last_sync >= SYNC_INTERVAL:
+            self._sync()
+
+    def _sync(self) -> None:
+        assert self._ptr is not None
+        self._ptr.flush()
+        os.fsync(self._ptr.fileno())
+        self._last_sync = time.monotonic()
@@ -0,0 +1,111 @@
+"""
+Split the input files of a corpus between several machines, without a
+process that coordinates them: each machine runs tei-transform with the
+same input and output and its own shard, e.g. --shard 2/4, and processes
+only the files of this shard.
+
+A file is assigned to a shard by the hash of its path relative to the
+input directory, so the assignment is the same on every machine and in
+every run, and new files don't move other files to another shard. A
+ShardPlan assigns the files by their size instead, so that each shard has
+about the same amount of work.
+"""
+import hashlib
+import heapq
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class InvalidShardPlan(Exception):
+    pass
+
+
+def relative_path(file: str, file_or_dir: str) -> str:
+    """
+    Path of file relative to the input file_or_dir, with '/' as separator.
+    If the input is a single file, this is its name.
+    """
+    if os.path.isfile(file_or_dir):
+        return os.path.basename(file)
+    path = os.path.relpath(os.path.abspath(file), os.path.abspath(file_or_dir))
+    return path.replace(os.sep, "/")
+
+
+def hashed_shard(path: str, count: int) -> int:
+    """Shard (from 1 to count) of the relative path of a file."""
+    digest = hashlib.sha256(path.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+@dataclass
+class ShardPlan:
+    """
+    Assignment of files, by their relative path, to count shards. Files that
+    aren't in the plan (e.g. added after it was made) are assigned by hash.
+    """
+
+    count: int
+    shards: Dict[str, int]
+
+    @classmethod
+    def balance(cls, sizes: Iterable[Tuple[str, float]], count: int) -> "ShardPlan":
+        """
+        Assign the files with their sizes to count shards, each file (the
+        largest first) to the shard with the smallest total size so far.
+        """
+        totals = [(0.0, shard) for shard in range(1, count + 1)]
+        shards = {}
+        for path, size in sorted(sizes, key=lambda item: (-item[1], item[0])):
+            total, shard = heapq.heappop(totals)
+            shards[path] = shard
+            heapq.heappush(totals, (total + size, shard))
+        return cls(count, shards)
+
+    @classmethod
+    def read(cls, path: str) -> "ShardPlan":
+        try:
+            with open(path, "r", encoding="utf-8") as ptr:
+                data = json.load(ptr)
+            return cls(int(data["shards"]), dict(data["files"]))
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            raise InvalidShardPlan("Shard plan can't be read: %s\n%s" % (path, error))
+
+    def write(self, path: str, sizes: Optional[Dict[str, float]] = None) -> None:
+        """
+        Write the plan to path as JSON. If the sizes of the files are given,
+        the total size of each shard is added for information.
+        """
+        data: Dict[str, object] = {"shards": self.count}
+        if sizes is not None:
+            totals: List[float] = [0] * self.count
+            for file, shard in self.shards.items():
+                totals[shard - 1] += sizes[file]
+            data["sizes"] = totals
+        data["files"] = self.shards
+        with open(path, "w", encoding="utf-8") as ptr:
+            json.dump(data, ptr, indent=2)
+
+    def shard_of(self, path: str) -> int:
+        if path in self.shards:
+            return self.shards[path]
+        return hashed_shard(path, self.count)
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Shard index (from 1 to count) of the files processed by a run."""
+
+    index: int
+    count: int
+    plan: Optional[ShardPlan] = None
+
+    def contains(self, path: str) -> bool:
+        """Check if the file with relative path belongs to the shard."""
+        if self.plan is not None:
+            return self.plan.shard_of(path) == self.index
+        return hashed_shard(path, self.count) == self.index
+
+    def __str__(self) -> str:
+        return "%d/%d" % (self.index, self.count)
@@ -0,0 +1,103 @@
+"""
+Facts about the older siblings of a node, that are shared between the
+siblings of a parent, so that observers that depend on the siblings of
+a node don't have to scan all siblings for every node.
+"""
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from lxml import etree
+
+_State = Tuple[etree._Element, int, Any]
+
+
+class SiblingIndex:
+    """
+    Remember for each element the state of a fact about the element and
+    its older siblings (e.g. 'a <div/> was found'), so that the state for
+    the next sibling is computed from the state of its predecessor. If the
+    nodes of a parent are queried in document order, each query takes
+    constant time.
+
+    The states of the children of a parent are valid until the parent is
+    invalidated, i.e. if its children change. The TeiTransformer invalidates
+    the parents affected by a transformation. Comments and processing
+    instructions are ignored.
+    """
+
+    def __init__(self) -> None:
+        self._epochs: Dict[etree._Element, int] = {}
+        self._states: Dict[Hashable, Dict[etree._Element, _State]] = {}
+
+    def has_preceding_sibling(
+        self, node: etree._Element, tags: FrozenSet[str], exclude: bool = False
+    ) -> bool:
+        """
+        Check if node has an older sibling with one of the localnames in tags
+        or, if exclude is True, with a localname that is not in tags.
+        """
+
+        def matches(localname: Optional[str]) -> bool:
+            return localname is not None and (localname in tags) != exclude
+
+        return self.state_before(
+            node,
+            ("has_preceding_sibling", tags, exclude),
+            initial=False,
+            step=lambda state, localname: state or matches(localname),
+            absorbing=True,
+        )
+
+    def state_before(
+        self,
+        node: etree._Element,
+        key: Hashable,
+        initial: Any,
+        step: Callable[[Any, Optional[str]], Any],
+        absorbing: Optional[Any] = None,
+    ) -> Any:
+        """
+        Return the state of the fact identified by key after the older
+        siblings of node. The state is computed by applying step to the
+        state and the localname of each sibling, starting with initial for
+        the first child. If absorbing is given, no sibling can change this
+        state once it is reached, so older siblings don't have to be read.
+        """
+        parent = node.getparent()
+        if parent is None:
+            return initial
+        epoch = self._epochs.get(parent, 0)
+        states = self._states.setdefault(key, {})
+        pending: List[etree._Element] = []
+        state = initial
+        sibling = node.getprevious()
+        while sibling is not None:
+            cached = states.get(sibling)
+            if cached is not None and cached[0] is parent and cached[1] == epoch:
+                state = cached[2]
+                break
+            pending.append(sibling)
+            if (
+                absorbing is not None
+                and step(initial, _localname(sibling)) == absorbing
+            ):
+                state = initial
+                break
+            sibling = sibling.getprevious()
+        for sibling in reversed(pending):
+            state = step(state, _localname(sibling))
+            states[sibling] = (parent, epoch, state)
+        return state
+
+    def invalidate(self, parent: etree._Element) -> None:
+        """Discard the states of the children of parent."""
+        self._epochs[parent] = self._epochs.get(parent, 0) + 1
+
+    def clear(self) -> None:
+        self._epochs.clear()
+        self._states.clear()
+
+
+def _localname(node: etree._Element) -> Optional[str]:
+    if isinstance(node.tag, str):
+        return node.tag.rpartition("}")[2]
+    return None
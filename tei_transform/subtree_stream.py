@@ -0,0 +1,266 @@
+"""
+Transform and write a TEI document while it is parsed, so that only a part
+of <text> is kept in memory at a time.
+The children of the elements that divide <text> (<text>, <front>, <body>,
+<back> and <group>) are transformed and written one by one, as soon as they
+were parsed completely, and are removed from the tree afterwards.
+"""
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Set,
+    Tuple,
+)
+
+from lxml import etree
+
+from tei_transform.xml_tree_iterator import ParserOptions
+
+_XML_DECLARATION = b"<?xml version='1.0' encoding='UTF-8'?>\n"
+# localnames of the elements, whose children are written one by one, by the
+# localname of their parent
+_CONTAINERS: Dict[Optional[str], FrozenSet[str]] = {
+    "TEI": frozenset({"text"}),
+    "text": frozenset({"front", "body", "back", "group"}),
+    "group": frozenset({"text", "group"}),
+}
+# children of <TEI> that are part of the output
+_ROOT_CHILDREN = frozenset({"teiHeader", "text"})
+
+
+class SubtreeTransformation(Protocol):
+    def transform_root(self, root: etree._Element) -> etree._Element:
+        """
+        Return the transformed copy of the <TEI> element, that is written
+        instead of root. root has no children yet.
+        """
+        ...
+
+    def transform_subtree(self, node: etree._Element) -> None:
+        """Transform a complete child of <TEI>."""
+        ...
+
+    def transform_container(self, container: etree._Element) -> None:
+        """
+        Transform a container element, before its start tag is written. Its
+        children might not be parsed or were written already.
+        """
+        ...
+
+    def transform_nodes(self, nodes: Callable[[], Iterable[etree._Element]]) -> None:
+        """
+        Transform the nodes of some complete children of a container. nodes()
+        returns the nodes to visit in document order and can be called
+        once per pass.
+        """
+        ...
+
+
+@dataclass
+class _Container:
+    element: etree._Element
+    parent: Optional["_Container"]
+    end_tag: Optional[bytes] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.end_tag is not None
+
+
+class SubtreeStreamer:
+    """
+    Parse a TEI document incrementally, apply a transformation to its
+    parts and yield the serialized output in chunks.
+    """
+
+    def __init__(
+        self,
+        transformation: SubtreeTransformation,
+        parser_options: Optional[ParserOptions] = None,
+    ) -> None:
+        self.transformation = transformation
+        self.parser_options = parser_options or ParserOptions()
+        self._stack: List[_Container] = []
+        # containers that were written except for their tail
+        self._written: Set[etree._Element] = set()
+        self._root: Optional[etree._Element] = None
+        self._declarations: List[bytes] = []
+
+    def stream(self, file: str) -> Iterator[bytes]:
+        """
+        Yield the transformed document in chunks. Nothing is yielded if
+        the root of the document isn't <TEI>.
+        """
+        self._stack = []
+        self._written = set()
+        self._root = None
+        for event, element in etree.iterparse(
+            file, events=("start", "end"), **self.parser_options.iterparse_arguments()
+        ):
+            if event == "start":
+                if self._root is None and _localname(element) != "TEI":
+                    return
+                yield from self._start(element)
+            else:
+                yield from self._end(element)
+                if element is self._root:
+                    self._root = None
+                    return
+
+    def _start(self, element: etree._Element) -> Iterator[bytes]:
+        parent = element.getparent()
+        if parent is None:
+            self._root = element
+            new_root = self.transformation.transform_root(element)
+            # namespaces declared on the root don't have to be declared again
+            self._declarations = [
+                _namespace_declaration(prefix, uri)
+                for prefix, uri in new_root.nsmap.items()
+            ]
+            start_tag, end_tag = _split_element(new_root)
+            self._stack.append(_Container(element, None, end_tag))
+            yield _XML_DECLARATION + start_tag
+            return
+        container = self._stack[-1]
+        if parent is not container.element:
+            return
+        # all children of the container before element are complete now
+        yield from self._write_children(container, stop=element)
+        if _localname(element) in _CONTAINERS.get(_localname(parent), ()):
+            self._stack.append(_Container(element, container))
+
+    def _end(self, element: etree._Element) -> Iterator[bytes]:
+        container = self._stack[-1]
+        if element is not container.element:
+            return
+        self._stack.pop()
+        if not container.is_open and container.parent is not None:
+            # the whole container is written as child of its parent
+            return
+        yield from self._write_children(container, stop=None)
+        assert container.end_tag is not None
+        yield container.end_tag
+        if container.parent is not None:
+            # the tail is written with the other children of the parent
+            self._written.add(element)
+
+    def _write_children(
+        self, container: _Container, stop: Optional[etree._Element]
+    ) -> Iterator[bytes]:
+        children = _children_before(container.element, stop)
+        if not children:
+            return
+        if container.parent is None:
+            yield from self._write_children_of_root(container.element, children)
+            return
+        yield from self._open(container)
+        if any(child not in self._written for child in children):
+            self.transformation.transform_nodes(
+                lambda: self._nodes_before(container.element, stop)
+            )
+            # the transformation might have inserted or removed children
+            children = _children_before(container.element, stop)
+        for child in children:
+            yield self._serialize(child)
+            container.element.remove(child)
+
+    def _write_children_of_root(
+        self, root: etree._Element, children: List[etree._Element]
+    ) -> Iterator[bytes]:
+        for child in children:
+            if child in self._written:
+                yield self._serialize(child)
+            elif _localname(child) in _ROOT_CHILDREN:
+                self.transformation.transform_subtree(child)
+                yield self._serialize(child)
+            root.remove(child)
+
+    def _open(self, container: _Container) -> Iterator[bytes]:
+        if container.is_open:
+            return
+        assert container.parent is not None
+        yield from self._open(container.parent)
+        self.transformation.transform_container(container.element)
+        start_tag, container.end_tag = _split_element(container.element)
+        yield self._strip_declarations(start_tag)
+
+    def _nodes_before(
+        self, container: etree._Element, stop: Optional[etree._Element]
+    ) -> Iterator[etree._Element]:
+        for node in container.iter():
+            if node is stop:
+                return
+            if node is container or node in self._written:
+                continue
+            yield node
+
+    def _serialize(self, element: etree._Element) -> bytes:
+        if element in self._written:
+            self._written.discard(element)
+            return _serialize_text(element.tail)
+        data = etree.tostring(element, encoding="UTF-8", with_tail=True)
+        if not isinstance(element.tag, str):
+            return data
+        return self._strip_declarations(data)
+
+    def _strip_declarations(self, data: bytes) -> bytes:
+        # the first '>' ends the start tag, because it is escaped in
+        # attribute values
+        end = data.index(b">")
+        start_tag = data[:end]
+        for declaration in self._declarations:
+            start_tag = start_tag.replace(declaration, b"", 1)
+        return start_tag + data[end:]
+
+
+def _children_before(
+    element: etree._Element, stop: Optional[etree._Element]
+) -> List[etree._Element]:
+    children = []
+    for child in element:
+        if child is stop:
+            break
+        children.append(child)
+    return children
+
+
+def _split_element(element: etree._Element) -> Tuple[bytes, bytes]:
+    """
+    Return the start tag of element followed by its text, and its end tag.
+    """
+    copy = etree.Element(element.tag, element.attrib, nsmap=element.nsmap)
+    copy.text = ""
+    data = etree.tostring(copy, encoding="UTF-8")
+    end = data.rindex(b"</")
+    return data[:end] + _serialize_text(element.text), data[end:]
+
+
+def _serialize_text(text: Optional[str]) -> bytes:
+    if not text:
+        return b""
+    element = etree.Element("t")
+    element.text = text
+    serialized = etree.tostring(element, encoding="UTF-8")
+    # strip the start and end tag of the element
+    start, end = len(b"<t>"), len(serialized) - len(b"</t>")
+    return serialized[start:end]
+
+
+def _namespace_declaration(prefix: Optional[str], uri: str) -> bytes:
+    value = _serialize_text(uri).replace(b'"', b"&quot;")
+    if prefix is None:
+        return b' xmlns="%s"' % value
+    return b' xmlns:%s="%s"' % (prefix.encode("UTF-8"), value)
+
+
+def _localname(element: etree._Element) -> Optional[str]:
+    if not isinstance(element.tag, str):
+        return None
+    return element.tag.rpartition("}")[2]
@@ -0,0 +1,185 @@
+"""
+Find out which elements and attributes occur in a file without building
+its tree, to leave out the observers that can't match any node of the file.
+"""
+import codecs
+import json
+import re
+from dataclasses import dataclass
+from typing import AbstractSet, FrozenSet, Iterable, List, Optional, Sequence, Set
+
+from lxml import etree
+
+from tei_transform.abstract_node_observer import AbstractNodeObserver
+
+# localname of a start tag, comments, processing instructions, doctype
+# declarations and end tags are left out
+_TAG = re.compile(rb"<(?:[^\s/>!?:=\"']+:)?([^\s/>!?:=\"']+)")
+# localname of an attribute, or text that looks like one
+_ATTRIBUTE = re.compile(rb"\s(?:[^\s/>=\"'<:]+:)?([^\s/>=\"'<:]+)\s*=\s*[\"']")
+_ENCODING = re.compile(rb"<\?xml[^>]*?encoding\s*=\s*[\"']([A-Za-z0-9._-]+)")
+# declarations of an internal DTD subset that can add elements or attributes
+_DECLARATIONS = (b"<!ENTITY", b"<!ATTLIST")
+_CHUNK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class TagScan:
+    """Localnames of the elements and attributes that occur in a file."""
+
+    tags: FrozenSet[str]
+    attributes: FrozenSet[str]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"tags": sorted(self.tags), "attributes": sorted(self.attributes)}
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "TagScan":
+        values = json.loads(data)
+        return cls(frozenset(values["tags"]), frozenset(values["attributes"]))
+
+
+def scan_file(file: str) -> Optional[TagScan]:
+    """
+    Collect the localnames of the elements and attributes in file from its
+    raw bytes, reading the file in chunks. Names in comments, CDATA sections
+    or text that looks like markup are collected as well, so the scan can
+    contain names that aren't part of the tree of the file, but every name
+    of the tree is part of the scan. Return None if this isn't guaranteed,
+    i.e. if the encoding of the file isn't compatible with ASCII or the
+    file declares entities or default attributes in its DTD. The file isn't
+    checked to be well-formed.
+    """
+    tags: Set[bytes] = set()
+    attributes: Set[bytes] = set()
+    encoding: Optional[str] = None
+    rest = b""
+    with open(file, "rb") as ptr:
+        while True:
+            chunk = ptr.read(_CHUNK_SIZE)
+            data = rest + chunk
+            if encoding is None:
+                encoding = _detect_encoding(data)
+                if encoding is None:
+                    return None
+            if chunk:
+                # the last tag might continue in the next chunk
+                end = data.rfind(b"<")
+                if end == -1:
+                    end = len(data)
+                data, rest = data[:end], data[end:]
+            if any(declaration in data for declaration in _DECLARATIONS):
+                return None
+            tags.update(_TAG.findall(data))
+            attributes.update(_ATTRIBUTE.findall(data))
+            if not chunk:
+                break
+    return TagScan(
+        frozenset(_decode(tags, encoding)), frozenset(_decode(attributes, encoding))
+    )
+
+
+def scan_tree(root: etree._Element) -> TagScan:
+    """
+    Collect the localnames of the elements and attributes in the tree
+    of root, e.g. if the file was already parsed.
+    """
+    tags: Set[str] = set()
+    attributes: Set[str] = set()
+    for node in root.iter(tag=etree.Element):
+        tags.add(node.tag.rpartition("}")[2])
+        if node.attrib:
+            attributes.update(name.rpartition("}")[2] for name in node.attrib)
+    return TagScan(frozenset(tags), frozenset(attributes))
+
+
+def can_match(observer: AbstractNodeObserver, scan: TagScan) -> bool:
+    """
+    Check if the declared target tags, required parents and required
+    attributes of observer occur in the file of scan, so that observer
+    can match a node of the file, if the file isn't transformed.
+    """
+    return _can_match(observer, scan.tags, scan.attributes)
+
+
+def select_observers(
+    observers: Sequence[AbstractNodeObserver], scan: TagScan
+) -> List[AbstractNodeObserver]:
+    """
+    Return the observers that can match a node of the file of scan, while
+    the file is transformed by them, in their original order. Elements and
+    attributes that the selected observers create (see 'created_tags' and
+    'created_attributes' of AbstractNodeObserver) can be matched by other
+    observers, so these are added to the names of the scan until no further
+    observer can match. If a selected observer doesn't declare what it
+    creates, all observers are returned.
+    """
+    tags = set(scan.tags)
+    attributes = set(scan.attributes)
+    selected = [False] * len(observers)
+    changed = True
+    while changed:
+        changed = False
+        for position, observer in enumerate(observers):
+            if selected[position] or not _can_match(observer, tags, attributes):
+                continue
+            created_tags = getattr(observer, "created_tags", None)
+            created_attributes = getattr(observer, "created_attributes", None)
+            if created_tags is None or created_attributes is None:
+                return list(observers)
+            selected[position] = True
+            tags.update(created_tags)
+            attributes.update(created_attributes)
+            changed = True
+    return [
+        observer for observer, is_selected in zip(observers, selected) if is_selected
+    ]
+
+
+def _can_match(
+    observer: AbstractNodeObserver, tags: AbstractSet[str], attributes: AbstractSet[str]
+) -> bool:
+    target_tags = getattr(observer, "target_tags", None)
+    if target_tags is not None and tags.isdisjoint(target_tags):
+        return False
+    required_parents = getattr(observer, "required_parents", None)
+    if required_parents is not None and tags.isdisjoint(required_parents):
+        return False
+    required_attributes = getattr(observer, "required_attributes", None)
+    if required_attributes is not None and attributes.isdisjoint(
+        name.rpartition("}")[2] for name in required_attributes
+    ):
+        return False
+    return True
+
+
+def _detect_encoding(data: bytes) -> Optional[str]:
+    """
+    Return the encoding declared at the start of data, or UTF-8 if none
+    is declared, if it is compatible with ASCII. Otherwise return None.
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        bom_size = len(codecs.BOM_UTF8)
+        data = data[bom_size:]
+    elif b"\x00" in data[:4]:
+        # UTF-16 or UTF-32, with or without byte order mark
+        return None
+    if not data.startswith(b"<?xml"):
+        return "utf-8"
+    match = _ENCODING.match(data)
+    if match is None:
+        return "utf-8"
+    encoding = match.group(1).decode("ascii")
+    sample = "<?xml/>='\" abcdefghijklmnopqrstuvwxyz"
+    try:
+        if sample.encode(encoding) != sample.encode("ascii"):
+            return None
+    except (LookupError, UnicodeError):
+        return None
+    return encoding
+
+
+def _decode(names: Iterable[bytes], encoding: str) -> Iterable[str]:
+    return (name.decode(encoding, errors="replace") for name in names)
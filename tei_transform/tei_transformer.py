@@ -1,17 +1,31 @@
+import itertools
 import logging
-from typing import List, Optional, Tuple
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from lxml import etree
 
 from tei_transform.abstract_node_observer import AbstractNodeObserver
+from tei_transform.dirty_regions import DirtyRegions
 from tei_transform.element_transformation import construct_new_tei_root
-from tei_transform.observer import TeiNamespaceObserver
+from tei_transform.observer.tei_namespace_observer import TeiNamespaceObserver
 from tei_transform.observer.observer_errors import TransformationError
+from tei_transform.observer_dispatcher import SCOPES, ObserverDispatcher
+from tei_transform.observer_statistics import TransformationProfile
 from tei_transform.parse_config import RevisionDescChange
-from tei_transform.xml_tree_iterator import XMLTreeIterator
+from tei_transform.sibling_index import SiblingIndex
+from tei_transform.subtree_stream import SubtreeStreamer
+from tei_transform.tag_scan import TagScan, select_observers
+from tei_transform.transformation_budget import BudgetTracker, TransformationBudget
+from tei_transform.traversal import is_ancestor, schedule_traversals
+from tei_transform.xml_tree_iterator import UnparsedText, XMLTreeIterator
+from tei_transform.xslt_backend import CompiledObservers, compile_observers
 
 logger = logging.getLogger(__name__)
 
+_Dispatchers = Dict[Optional[str], ObserverDispatcher]
+
 
 class TeiTransformer:
     """Apply transformation specified by node observers to xml tree"""
@@ -23,7 +37,32 @@ class TeiTransformer:
         self.xml_iterator = xml_iterator
         self._first_pass_observers: List[AbstractNodeObserver]
         self._second_pass_observers: List[AbstractNodeObserver]
+        # dispatchers for the pre-order and post-order observers of each
+        # traversal of a document
+        self._traversals: List[Tuple[_Dispatchers, _Dispatchers]]
         self._xml_changed: bool = False
+        self._well_formed: bool = True
+        # if set, calls and runtime of the observers are recorded
+        self.profile: Optional[TransformationProfile] = None
+        self._sibling_index: Optional[SiblingIndex] = None
+        self._header_only: bool = False
+        self._unparsed_text: Optional[UnparsedText] = None
+        self._streamable: bool = False
+        # if greater than 1, the observers are applied again to the changed
+        # parts of the tree, see perform_transformation()
+        self.max_rounds: int = 1
+        # setups for the subsets of observers chosen by select_observers()
+        self._setups: Dict[Tuple[bool, ...], _Setup] = {}
+        self._dirty: Optional[DirtyRegions] = None
+        self._rounds: int = 0
+        # if set before set_list_of_observers(), observers that declare
+        # xslt_rules() are applied with a stylesheet, see uses_stylesheet()
+        self.use_xslt: bool = False
+        self._compiled: Optional[CompiledObservers] = None
+        # if set, the transformation of a file is stopped with BudgetExceeded
+        # as soon as it takes longer or visits more nodes than allowed
+        self.budget: Optional[TransformationBudget] = None
+        self._budget_tracker: Optional[BudgetTracker] = None
 
     def set_list_of_observers(
         self,
@@ -32,30 +71,112 @@ class TeiTransformer:
         ],
     ) -> None:
         self._first_pass_observers, self._second_pass_observers = lists_of_observers
+        # observers with a 'sibling_index' attribute share one index,
+        # that is kept up to date by the transformer
+        self._sibling_index = None
+        for observer in self._first_pass_observers + self._second_pass_observers:
+            if hasattr(observer, "sibling_index"):
+                if self._sibling_index is None:
+                    self._sibling_index = SiblingIndex()
+                observer.sibling_index = self._sibling_index
+        self._setups = {}
+        self.select_observers(None)
 
-    def perform_transformation(self, filename: str) -> etree._Element:
+    def select_observers(self, scan: Optional[TagScan]) -> int:
+        """
+        Apply only the observers that can match a node of a file with the
+        elements and attributes of scan to the next files, see
+        tag_scan.select_observers(). If scan is None, all observers are
+        applied again. Return the number of observers left out.
+        """
+        observers = self._first_pass_observers + self._second_pass_observers
+        selected = observers if scan is None else select_observers(observers, scan)
+        # the namespace is added after the traversals, see perform_transformation()
+        kept = {id(observer) for observer in selected} | {
+            id(observer)
+            for observer in observers
+            if isinstance(observer, TeiNamespaceObserver)
+        }
+        key = tuple(id(observer) in kept for observer in observers)
+        setup = self._setups.get(key)
+        if setup is None:
+            first_pass, second_pass = (
+                [observer for observer in pass_observers if id(observer) in kept]
+                for pass_observers in (
+                    self._first_pass_observers,
+                    self._second_pass_observers,
+                )
+            )
+            setup = self._construct_setup(first_pass, second_pass)
+            self._setups[key] = setup
+        self._use_setup(setup)
+        return len(observers) - len(kept)
+
+    def perform_transformation(
+        self, filename: str, tree: Optional[etree._ElementTree] = None
+    ) -> etree._Element:
         """
         Iterate over file and apply transformations defined by
         observers to the xml tree.
+        If the tree of the file was already parsed, it can be passed
+        and is transformed in place instead of parsing the file again.
+        If all observers only apply to <teiHeader>, only the header is
+        parsed if possible, see unparsed_text().
+        If max_rounds is greater than 1, the observers are applied again to
+        the regions of the tree that were changed in the previous round,
+        until no observer changes the tree anymore or max_rounds rounds
+        were made, see rounds() and is_stable().
+        If budget is set, BudgetExceeded is raised when the file exceeds it.
         """
         self._xml_changed = False
+        self._well_formed = True
+        self._unparsed_text = None
+        self._start_budget()
+        self._dirty = DirtyRegions() if self.max_rounds > 1 else None
+        self._rounds = 1
         transformed_nodes = []
+        if tree is None and self._header_only:
+            split_document = self.xml_iterator.split_header(filename)
+            if split_document is not None:
+                tree, self._unparsed_text = split_document
+        nodes: Iterable[etree._Element]
+        if tree is None:
+            nodes = self.xml_iterator.iterate_xml(filename)
+        else:
+            nodes = self.xml_iterator.iterate_tree(tree)
+        compiled = self._compiled
+        if self._dirty is not None or self.profile is not None:
+            compiled = None
         try:
-            for node in self.xml_iterator.iterate_xml(filename):
-                self._transform_subtree_of_node(
-                    node, self._first_pass_observers, filename
-                )
-                self._transform_subtree_of_node(
-                    node, self._second_pass_observers, filename
-                )
+            if compiled is not None:
+                yielded_nodes = list(nodes)
+                if not compiled.supports(yielded_nodes[1:]):
+                    compiled = None
+                nodes = yielded_nodes
+            for node in nodes:
+                if self._budget_tracker is not None:
+                    # parsing the file counts towards the time budget
+                    self._budget_tracker.check()
+                if compiled is None:
+                    for dispatchers in self._traversals:
+                        self._transform_subtree_of_node(node, dispatchers, filename)
                 transformed_nodes.append(node)
         except etree.XMLSyntaxError:
             logger.exception("File ignored: %s" % filename)
+            self._well_formed = False
             return None
+        if compiled is not None:
+            root = self._construct_element_tree(transformed_nodes)
+            if root is not None:
+                root, changed = compiled.transform(root)
+                self._xml_changed = self._xml_changed or changed
+                transformed_nodes = [root] + list(root)
         if any(
             isinstance(observer, TeiNamespaceObserver)
             for observer in self._first_pass_observers
         ):
+            if transformed_nodes[0].nsmap.get(None) != "http://www.tei-c.org/ns/1.0":
+                self._xml_changed = True
             new_root = construct_new_tei_root(
                 transformed_nodes[0], ns_to_add={None: "http://www.tei-c.org/ns/1.0"}
             )
@@ -63,12 +184,99 @@ class TeiTransformer:
         root = self._construct_element_tree(transformed_nodes)
         if root is None:
             logger.warning("No 'TEI' element found, file ignored: %s" % filename)
+        elif self._dirty is not None:
+            self._transform_until_stable(root, filename)
         return root
 
+    def transforms_header_only(self) -> bool:
+        """
+        Check if all observers only apply to <teiHeader>, so that only the
+        header of a file is parsed, if possible.
+        """
+        return self._header_only
+
+    def uses_stylesheet(self) -> bool:
+        """
+        Check if the observers are applied with a stylesheet compiled from
+        their xslt_rules(), instead of traversing the tree in Python. This
+        requires use_xslt and that all observers declare rules that don't
+        conflict, see xslt_backend.compile_observers(). Files are still
+        transformed in Python, if they are streamed, if max_rounds is
+        greater than 1, if the observers are profiled or if the stylesheet
+        doesn't support a file.
+        """
+        return self._compiled is not None
+
+    def can_stream(self) -> bool:
+        """
+        Check if files can be transformed with stream_transformation(), i.e.
+        all observers only need local context or only apply to the header.
+        """
+        return self._streamable and not self._header_only and self.max_rounds == 1
+
+    def stream_transformation(self, filename: str) -> Iterator[bytes]:
+        """
+        Transform file while it is parsed and yield the serialized result
+        in chunks. The children of <body>, <front> and <back> are transformed
+        and written as soon as they are parsed and then removed from memory.
+        This requires that can_stream() is True. Nothing is yielded if the
+        root of the file isn't <TEI>. If the file isn't well-formed,
+        etree.XMLSyntaxError is raised after a part of the file was yielded,
+        and BudgetExceeded, if the file exceeds the budget.
+        """
+        self._xml_changed = False
+        self._unparsed_text = None
+        self._start_budget()
+        yield from SubtreeStreamer(
+            _StreamedFile(self, filename), self.xml_iterator.parser_options
+        ).stream(filename)
+
+    def rounds(self) -> int:
+        """
+        Return the number of rounds in which the observers were applied
+        to the last file.
+        """
+        return self._rounds
+
+    def is_stable(self) -> bool:
+        """
+        Check if no observer changed the last file in the last round, so
+        that another round wouldn't change it either. This is only known
+        if max_rounds is greater than 1.
+        """
+        return not self._dirty
+
+    def release_tree(self, root: Optional[etree._Element] = None) -> None:
+        """
+        Drop the references to the nodes of the last transformed tree that
+        are kept for the observers, and clear root, if it was written
+        already, so that the memory of the tree is freed at once.
+        """
+        if self._sibling_index is not None:
+            self._sibling_index.clear()
+        self._dirty = None
+        if root is not None:
+            root.clear()
+
     def xml_tree_changed(self) -> bool:
         """Check if any transformation was applied by an observer."""
         return self._xml_changed
 
+    def is_well_formed(self) -> bool:
+        """
+        Check if the last file passed to perform_transformation() was
+        parsed without a syntax error.
+        """
+        return self._well_formed
+
+    def unparsed_text(self) -> Optional[UnparsedText]:
+        """
+        Return the part of the last file after <teiHeader>, that wasn't
+        parsed and has to be appended to the header when the transformed
+        tree is written, or None if the whole file was parsed.
+        """
+        return self._unparsed_text
+
     def add_change_to_revision_desc(
         self, tree: etree._Element, change: RevisionDescChange
     ) -> None:
@@ -107,21 +315,236 @@ class TeiTransformer:
         if teiheader is not None:
             teiheader.append(revision_node)
 
+    def _start_budget(self) -> None:
+        self._budget_tracker = self.budget.start() if self.budget is not None else None
+
+    def _transform_until_stable(self, root: etree._Element, filename: str) -> None:
+        assert self._dirty is not None
+        while self._dirty and self._rounds < self.max_rounds:
+            regions = self._dirty.regions(root)
+            self._dirty = DirtyRegions()
+            if not regions:
+                break
+            self._rounds += 1
+            before = [_snapshot(element, subtree) for element, subtree in regions]
+            self._transform_regions(root, regions, filename)
+            if self._dirty and self._changes_undone(regions, before):
+                # e.g. observers that undo the changes of each other
+                self._dirty = DirtyRegions()
+
+    def _changes_undone(
+        self, regions: List[Tuple[etree._Element, bool]], before: List[Any]
+    ) -> bool:
+        """
+        Check if the last round didn't change the tree, because all changes
+        were made inside the regions and these look like before the round.
+        """
+        assert self._dirty is not None
+        elements = {element for element, _ in regions}
+        for changed in self._dirty.changed_elements():
+            if changed not in elements and elements.isdisjoint(changed.iterancestors()):
+                return False
+        return all(
+            _snapshot(element, subtree) == snapshot
+            for (element, subtree), snapshot in zip(regions, before)
+        )
+
+    def _transform_regions(
+        self,
+        root: etree._Element,
+        regions: List[Tuple[etree._Element, bool]],
+        filename: str,
+    ) -> None:
+        for element, subtree in regions:
+            # the region might have been removed in this round
+            if element is not root and root not in element.iterancestors():
+                continue
+            scope = _scope_of(element)
+            for dispatchers in self._traversals:
+                pre_order, post_order = (
+                    dispatcher.get(scope, dispatcher[None])
+                    for dispatcher in dispatchers
+                )
+                nodes = element.iter() if subtree else iter([element])
+                self._transform_nodes(nodes, pre_order, post_order, filename)
+
     def _transform_subtree_of_node(
         self,
         node: etree._Element,
-        list_of_observers: List[AbstractNodeObserver],
+        dispatchers: Tuple[_Dispatchers, _Dispatchers],
+        filename: str,
+    ) -> None:
+        scope = node.tag.rpartition("}")[2] if isinstance(node.tag, str) else None
+        pre_order, post_order = (
+            dispatcher.get(scope, dispatcher[None]) for dispatcher in dispatchers
+        )
+        self._transform_nodes(node.iter(), pre_order, post_order, filename)
+
+    def _transform_nodes(
+        self,
+        nodes: Iterable[etree._Element],
+        pre_order: ObserverDispatcher,
+        post_order: ObserverDispatcher,
+        filename: str,
+    ) -> None:
+        """
+        Apply the observers of pre_order to the nodes when they are visited
+        and the observers of post_order after their subtree was visited.
+        """
+        if not pre_order.observers and not post_order.observers:
+            return
+        if self._sibling_index is not None:
+            self._sibling_index.clear()
+        hooks = None
+        if self.profile is not None or self._budget_tracker is not None:
+            hooks = _ObserverHooks(filename, self.profile, self._budget_tracker)
+        if self._budget_tracker is not None:
+            nodes = self._budget_tracker.count(nodes)
+        transform = self._transform_node
+        if not post_order.observers:
+            for subnode in nodes:
+                transform(subnode, pre_order, filename, hooks)
+            return
+        root: Optional[etree._Element] = None
+        # visited nodes with post-order observers, whose subtree might
+        # contain the next node
+        open_nodes: List[etree._Element] = []
+
+        def transform_after_subtree(node: etree._Element) -> None:
+            # nodes that were removed from the tree are not visited again
+            if node is root or node.getparent() is not None:
+                transform(node, post_order, filename, hooks)
+
+        for subnode in nodes:
+            if root is None:
+                root = subnode
+            while open_nodes and not is_ancestor(open_nodes[-1], subnode):
+                transform_after_subtree(open_nodes.pop())
+            transform(subnode, pre_order, filename, hooks)
+            if post_order.has_candidates(subnode):
+                open_nodes.append(subnode)
+        while open_nodes:
+            transform_after_subtree(open_nodes.pop())
+
+    def _transform_node(
+        self,
+        node: etree._Element,
+        dispatcher: ObserverDispatcher,
         filename: str,
+        hooks: Optional["_ObserverHooks"] = None,
     ) -> None:
-        for subnode in node.iter():
-            for observer in list_of_observers:
-                if observer.observe(subnode):
-                    try:
-                        observer.transform_node(subnode)
-                    except TransformationError:
-                        logger.exception("Manual curation needed: file %s" % filename)
+        for observer in dispatcher.dispatch(node):
+            if hooks is None:
+                match = observer.observe(node)
+            else:
+                match = hooks.observe(observer, node)
+            if match:
+                position = self._position_for_sibling_index(node)
+                parent = node.getparent()
+                try:
+                    if hooks is None:
+                        observer.transform_node(node)
                     else:
-                        self._xml_changed = True
+                        hooks.transform(observer, node)
+                except TransformationError:
+                    logger.exception("Manual curation needed: file %s" % filename)
+                else:
+                    self._xml_changed = True
+                    if self._dirty is not None:
+                        self._dirty.add(node, parent)
+                finally:
+                    self._invalidate_sibling_index(node, position)
+            if hooks is not None:
+                hooks.after_observer(observer)
+
+    def _position_for_sibling_index(
+        self, node: etree._Element
+    ) -> Optional[Tuple[Optional[etree._Element], Optional[etree._Element]]]:
+        if self._sibling_index is None:
+            return None
+        return node.getparent(), node.getprevious()
+
+    def _invalidate_sibling_index(
+        self,
+        node: etree._Element,
+        position: Optional[Tuple[Optional[etree._Element], Optional[etree._Element]]],
+    ) -> None:
+        """
+        Invalidate the sibling index for the elements whose children might
+        have been changed by the transformation of node. If node wasn't moved,
+        its older siblings are assumed to be unchanged and only the children
+        of node are invalidated. Otherwise, the children of all ancestors of
+        node before and after the transformation are invalidated.
+        """
+        if self._sibling_index is None or position is None:
+            return
+        self._sibling_index.invalidate(node)
+        parent, previous = position
+        if node.getparent() is parent and node.getprevious() is previous:
+            return
+        for element in node.iterancestors():
+            self._sibling_index.invalidate(element)
+        if parent is not None:
+            self._sibling_index.invalidate(parent)
+            for element in parent.iterancestors():
+                self._sibling_index.invalidate(element)
+
+    def _construct_setup(
+        self,
+        first_pass: List[AbstractNodeObserver],
+        second_pass: List[AbstractNodeObserver],
+    ) -> "_Setup":
+        traversals = schedule_traversals(first_pass, second_pass)
+        compiled = None
+        if self.use_xslt:
+            compiled = compile_observers(
+                [
+                    observer
+                    for traversal in traversals
+                    for observer in traversal.pre_order + traversal.post_order
+                ]
+            )
+        return _Setup(
+            traversals=[
+                (
+                    self._construct_dispatchers(traversal.pre_order),
+                    self._construct_dispatchers(traversal.post_order),
+                )
+                for traversal in traversals
+            ],
+            # if no observer can change <text>, it doesn't have to be parsed
+            header_only=all(
+                _applies_to_header_only(observer)
+                for observer in first_pass + second_pass
+            ),
+            streamable=all(
+                _applies_to_header_only(observer)
+                or getattr(observer, "local_context", False)
+                for observer in first_pass + second_pass
+            ),
+            compiled=compiled,
+        )
+
+    def _use_setup(self, setup: "_Setup") -> None:
+        self._traversals = setup.traversals
+        self._header_only = setup.header_only
+        self._streamable = setup.streamable
+        self._compiled = setup.compiled
+
+    def _construct_dispatchers(
+        self, list_of_observers: List[AbstractNodeObserver]
+    ) -> Dict[Optional[str], ObserverDispatcher]:
+        """
+        Construct a dispatcher for the subtrees of <teiHeader> and <text>
+        each, that only contain the observers declared for that part of
+        the document, and one for all other nodes.
+        """
+        dispatchers: Dict[Optional[str], ObserverDispatcher] = {
+            None: ObserverDispatcher(list_of_observers)
+        }
+        for scope in SCOPES:
+            dispatchers[scope] = ObserverDispatcher(list_of_observers, scope)
+        return dispatchers
 
     def _construct_element_tree(
         self, list_of_nodes: List[etree._Element]
@@ -133,3 +556,115 @@ class TeiTransformer:
                 root.extend(list_of_nodes[1:])
                 return root
         return None
+
+
+@dataclass
+class _Setup:
+    """
+    Traversals of a list of observers and the ways files can be transformed
+    by them, see TeiTransformer.transforms_header_only() and can_stream().
+    """
+
+    traversals: List[Tuple[_Dispatchers, _Dispatchers]]
+    header_only: bool
+    streamable: bool
+    compiled: Optional[CompiledObservers] = None
+
+
+@dataclass
+class _ObserverHooks:
+    """
+    Calls of the observers by TeiTransformer._transform_node, that measure
+    them for the profile and check the budget of the file after each of them.
+    """
+
+    filename: str
+    profile: Optional[TransformationProfile]
+    budget_tracker: Optional[BudgetTracker]
+
+    def observe(self, observer: AbstractNodeObserver, node: etree._Element) -> bool:
+        if self.profile is None:
+            return observer.observe(node)
+        statistics = self.profile.statistics(self.filename, observer)
+        statistics.observe_calls += 1
+        start = time.perf_counter()
+        match = observer.observe(node)
+        statistics.observe_time += time.perf_counter() - start
+        if match:
+            statistics.matches += 1
+        return match
+
+    def transform(self, observer: AbstractNodeObserver, node: etree._Element) -> None:
+        if self.profile is None:
+            observer.transform_node(node)
+            return
+        statistics = self.profile.statistics(self.filename, observer)
+        start = time.perf_counter()
+        try:
+            observer.transform_node(node)
+        except TransformationError:
+            statistics.transformation_errors += 1
+            raise
+        finally:
+            statistics.transform_time += time.perf_counter() - start
+
+    def after_observer(self, observer: AbstractNodeObserver) -> None:
+        if self.budget_tracker is not None:
+            self.budget_tracker.check(observer)
+
+
+@dataclass
+class _StreamedFile:
+    """
+    Apply the observers of a transformer to the parts of a file, while
+    it is streamed by SubtreeStreamer.
+    """
+
+    transformer: TeiTransformer
+    filename: str
+
+    def transform_root(self, root: etree._Element) -> etree._Element:
+        new_root = construct_new_tei_root(root)
+        self.transform_subtree(new_root)
+        return new_root
+
+    def transform_subtree(self, node: etree._Element) -> None:
+        for dispatchers in self.transformer._traversals:
+            self.transformer._transform_subtree_of_node(
+                node, dispatchers, self.filename
+            )
+
+    def transform_container(self, container: etree._Element) -> None:
+        self.transform_nodes(lambda: [container])
+
+    def transform_nodes(self, nodes: Callable[[], Iterable[etree._Element]]) -> None:
+        # containers are part of <text>
+        for pre_order, post_order in self.transformer._traversals:
+            self.transformer._transform_nodes(
+                nodes(), pre_order["text"], post_order["text"], self.filename
+            )
+
+
+def _snapshot(element: etree._Element, subtree: bool) -> Any:
+    if subtree:
+        return etree.tostring(element)
+    return element.tag, dict(element.attrib), element.text
+
+
+def _scope_of(element: etree._Element) -> Optional[str]:
+    # the scope of the closest ancestor that is the root of a scope
+    for node in itertools.chain([element], element.iterancestors()):
+        if isinstance(node.tag, str) and node.tag.rpartition("}")[2] in SCOPES:
+            return node.tag.rpartition("}")[2]
+    return None
+
+
+def _applies_to_header_only(observer: AbstractNodeObserver) -> bool:
+    # the namespace is added to all nodes after the transformation
+    if isinstance(observer, TeiNamespaceObserver):
+        return False
+    if getattr(observer, "scope", None) == "teiHeader":
+        return True
+    # observers for the <TEI> element, e.g. to remove attributes
+    target_tags = getattr(observer, "target_tags", None)
+    return target_tags is not None and set(target_tags) <= {"TEI"}
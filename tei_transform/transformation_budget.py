@@ -0,0 +1,92 @@
+"""
+Limit the time and the number of node visits the observers may spend on
+a single file, so that a document that triggers the worst case of an
+observer (e.g. a very large flat <div>) doesn't stall the whole run.
+"""
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from lxml import etree
+
+from tei_transform.abstract_node_observer import AbstractNodeObserver
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by TeiTransformer, if the transformation of a file exceeds the
+    budget of the transformer.
+    """
+
+    def __init__(
+        self, reason: str, observer: Optional[str], elapsed: float, nodes: int
+    ) -> None:
+        self.reason = reason
+        # class name of the observer that was applied when the budget ran out
+        self.observer = observer
+        self.elapsed = elapsed
+        self.nodes = nodes
+        message = "%s after %.2fs and %d nodes" % (reason, elapsed, nodes)
+        if observer is not None:
+            message += ", observer: %s" % observer
+        super().__init__(message)
+
+
+@dataclass(frozen=True)
+class TransformationBudget:
+    """
+    Maximum wall-clock time in seconds (including the time for parsing)
+    and maximum number of node visits of the observers per file. Each
+    traversal and each round of a file visits its nodes again. None means
+    no limit.
+    """
+
+    max_seconds: Optional[float] = None
+    max_nodes: Optional[int] = None
+
+    def start(self) -> "BudgetTracker":
+        """Start to track the budget of the next file."""
+        return BudgetTracker(self)
+
+
+class BudgetTracker:
+    """Budget used up by the transformation of a file."""
+
+    def __init__(self, budget: TransformationBudget) -> None:
+        self.budget = budget
+        self.nodes = 0
+        self._start = time.monotonic()
+
+    def count(self, nodes: Iterable[etree._Element]) -> Iterator[etree._Element]:
+        """
+        Yield nodes and count them as visited. Raise BudgetExceeded as soon
+        as there are more visits than allowed.
+        """
+        max_nodes = self.budget.max_nodes
+        for node in nodes:
+            self.nodes += 1
+            if max_nodes is not None and self.nodes > max_nodes:
+                raise BudgetExceeded(
+                    "Node budget of %d exceeded" % max_nodes,
+                    None,
+                    self.elapsed(),
+                    self.nodes,
+                )
+            yield node
+
+    def check(self, observer: Optional[AbstractNodeObserver] = None) -> None:
+        """
+        Raise BudgetExceeded if the time is up, naming observer as the
+        observer that was applied last.
+        """
+        max_seconds = self.budget.max_seconds
+        if max_seconds is not None and self.elapsed() > max_seconds:
+            raise BudgetExceeded(
+                "Time budget of %gs exceeded" % max_seconds,
+                observer.__class__.__name__ if observer is not None else None,
+                self.elapsed(),
+                self.nodes,
+            )
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
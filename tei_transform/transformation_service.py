@@ -0,0 +1,402 @@
+"""
+Keep the observers, their configuration and the compiled Relax NG validator
+in a long-running process, so that single documents can be transformed,
+validated or surveyed without starting tei-transform for each of them.
+
+The service speaks HTTP on a Unix domain socket or on a port of localhost.
+For every request, a child process that inherits the observers and the
+validator is forked, so that several clients can be served in parallel.
+
+Requests are POSTed to /transform, /validate or /survey. The body is either
+the xml document itself or, with the content type 'application/json', an
+object with the path of an input 'file' (and for /transform the 'output'
+directory to write the result to). GET /status returns the plugins of the
+service. Errors are returned as JSON object with an 'error' message.
+
+The service doesn't authenticate clients, so paths are only accepted if the
+service was started with an input directory: input files must be in this
+directory and output directories in the output directory of the service.
+The Unix domain socket is only accessible by the user of the service.
+"""
+import http.server
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+from dataclasses import dataclass
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+
+from lxml import etree
+
+from tei_transform.corpus_survey import CorpusSurveyor
+from tei_transform.parse_config import RevisionDescChange
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.user_cache import cache_directory
+from tei_transform.validation_service import RemoteValidator
+from tei_transform.xml_writer import XmlWriter
+
+logger = logging.getLogger(__name__)
+
+_Source = Union[str, IO[bytes]]
+
+
+def service_socket_path() -> str:
+    """
+    Return the default path of the socket of the transformation service,
+    located in the user's cache directory.
+    """
+    return os.path.join(cache_directory(), "transformation.sock")
+
+
+@dataclass
+class TransformationResult:
+    """
+    Result of the transformation of a document. valid is None if the
+    service doesn't validate documents. Either the path the document was
+    written to or the serialized document is part of the result.
+    """
+
+    changed: bool
+    valid: Optional[bool] = None
+    output_path: Optional[str] = None
+    data: Optional[bytes] = None
+
+
+class TransformationService:
+    """
+    Transform, validate and survey documents with observers and a validator
+    that were set up once. The transformed documents are validated after
+    the transformation.
+    """
+
+    def __init__(
+        self,
+        tei_transformer: TeiTransformer,
+        xml_writer: XmlWriter,
+        surveyor: CorpusSurveyor,
+        plugins: List[str],
+        validator: Optional[Union[etree.RelaxNG, RemoteValidator]] = None,
+        revision_entry: Optional[RevisionDescChange] = None,
+    ) -> None:
+        self.tei_transformer = tei_transformer
+        self.xml_writer = xml_writer
+        self.surveyor = surveyor
+        self.plugins = plugins
+        self.validator = validator
+        self.revision_entry = revision_entry
+
+    def transform_document(self, source: _Source) -> Optional[TransformationResult]:
+        """
+        Transform the document read from source, a file name or a file
+        object, and return the serialized result. Return None if the root
+        of the document isn't <TEI>. etree.XMLSyntaxError is raised if the
+        document isn't well-formed.
+        """
+        transformed = self._transform(source)
+        if transformed is None:
+            return None
+        root, changed = transformed
+        return TransformationResult(
+            changed=changed,
+            valid=self.validate_tree(root.getroottree()),
+            data=etree.tostring(
+                root.getroottree(), xml_declaration=True, encoding="UTF-8"
+            ),
+        )
+
+    def transform_file(
+        self, file: str, output_dir: str
+    ) -> Optional[TransformationResult]:
+        """
+        Transform file and write the result to output_dir, like the command
+        line tool does. Return None if the root of the document isn't <TEI>.
+        """
+        transformed = self._transform(file)
+        if transformed is None:
+            return None
+        root, changed = transformed
+        output_path = os.path.join(output_dir, os.path.basename(file))
+        self.xml_writer.create_output_directories(output_dir)
+        self.xml_writer.write_xml(output_path, root)
+        return TransformationResult(
+            changed=changed,
+            valid=self.validate_tree(root.getroottree()),
+            output_path=output_path,
+        )
+
+    def validate(self, source: _Source) -> Optional[bool]:
+        """
+        Validate the document read from source. Return None if the service
+        doesn't validate documents.
+        """
+        return self.validate_tree(etree.parse(source))
+
+    def validate_tree(self, tree: etree._ElementTree) -> Optional[bool]:
+        if self.validator is None:
+            return None
+        return bool(self.validator.validate(tree))
+
+    def survey(self, source: _Source) -> Dict[str, int]:
+        """
+        Return the number of nodes of the document read from source that
+        the observer of each installed plugin matches, see CorpusSurveyor.
+        """
+        return self.surveyor.survey_file(source)
+
+    def status(self) -> Dict[str, Any]:
+        return {"plugins": self.plugins, "validation": self.validator is not None}
+
+    def _transform(self, source: _Source) -> Optional[Tuple[etree._Element, bool]]:
+        # parsed here, so that malformed documents raise an error
+        tree = etree.parse(source)
+        name = source if isinstance(source, str) else "<request>"
+        root = self.tei_transformer.perform_transformation(name, tree)
+        if root is None:
+            return None
+        changed = self.tei_transformer.xml_tree_changed()
+        if changed and self.revision_entry is not None:
+            self.tei_transformer.add_change_to_revision_desc(root, self.revision_entry)
+        return root, changed
+
+
+class ServiceError(Exception):
+    """Error of a request, that is returned to the client with status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class _ServiceRequestHandler(http.server.BaseHTTPRequestHandler):
+    server: Union["UnixTransformationServer", "TcpTransformationServer"]
+
+    def do_GET(self) -> None:
+        if self.path != "/status":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        self._send_json(200, self.server.service.status())
+
+    def do_POST(self) -> None:
+        jobs = {
+            "/transform": self._transform,
+            "/validate": self._validate,
+            "/survey": self._survey,
+        }
+        job = jobs.get(self.path)
+        if job is None:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            job()
+        except ServiceError as error:
+            self._send_json(error.status, {"error": str(error)})
+        except etree.XMLSyntaxError as error:
+            self._send_json(422, {"error": f"Document not well-formed: {error}"})
+        except OSError as error:
+            self._send_json(400, {"error": f"{error.__class__.__name__}: {error}"})
+
+    def _transform(self) -> None:
+        service = self.server.service
+        request = self._json_request()
+        if request is None:
+            result = service.transform_document(io.BytesIO(self._read_body()))
+            if result is None:
+                raise ServiceError(422, "No 'TEI' element found")
+            assert result.data is not None
+            headers = {"X-TEI-Changed": _header_value(result.changed)}
+            if result.valid is not None:
+                headers["X-TEI-Valid"] = _header_value(result.valid)
+            self._send(200, result.data, "application/xml", headers)
+            return
+        result = service.transform_file(
+            self._file_of(request), self._output_of(request)
+        )
+        if result is None:
+            raise ServiceError(422, "No 'TEI' element found")
+        self._send_json(
+            200,
+            {
+                "output_path": result.output_path,
+                "changed": result.changed,
+                "valid": result.valid,
+            },
+        )
+
+    def _validate(self) -> None:
+        if self.server.service.validator is None:
+            raise ServiceError(501, "Service started without validation")
+        self._send_json(200, {"valid": self.server.service.validate(self._source())})
+
+    def _survey(self) -> None:
+        self._send_json(200, {"hits": self.server.service.survey(self._source())})
+
+    def _source(self) -> _Source:
+        request = self._json_request()
+        if request is None:
+            return io.BytesIO(self._read_body())
+        return self._file_of(request)
+
+    def _json_request(self) -> Optional[Dict[str, Any]]:
+        """Return the JSON object of the request, if it isn't a document."""
+        if self.headers.get_content_type() != "application/json":
+            return None
+        try:
+            request = json.loads(self._read_body())
+        except ValueError as error:
+            raise ServiceError(400, f"Invalid JSON: {error}")
+        if not isinstance(request, dict):
+            raise ServiceError(400, "Invalid JSON: object expected")
+        return request
+
+    def _file_of(self, request: Dict[str, Any]) -> str:
+        file = request.get("file")
+        if not isinstance(file, str):
+            raise ServiceError(400, "Path of input 'file' missing")
+        if self.server.input_root is None:
+            raise ServiceError(
+                403, "Service started without input directory, paths not accepted"
+            )
+        return _confine(file, self.server.input_root, "input")
+
+    def _output_of(self, request: Dict[str, Any]) -> str:
+        output = request.get("output", self.server.output)
+        if not isinstance(output, str):
+            raise ServiceError(400, "Path of 'output' directory must be a string")
+        return _confine(output, self.server.output, "output")
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send_json(self, status: int, content: Dict[str, Any]) -> None:
+        self._send(status, json.dumps(content).encode("utf-8"), "application/json")
+
+    def _send(
+        self,
+        status: int,
+        data: bytes,
+        content_type: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # the client address of a Unix domain socket is empty
+        logger.debug(format % args)
+
+
+class UnixTransformationServer(
+    socketserver.ForkingMixIn, socketserver.UnixStreamServer
+):
+    """Serve requests to the transformation service on a Unix domain socket."""
+
+    def __init__(
+        self,
+        socket_path: str,
+        service: TransformationService,
+        output: str = "output",
+        input_root: Optional[str] = None,
+    ) -> None:
+        self.service = service
+        # output directory of files without explicit output directory, the
+        # output directories of requests must be inside of it
+        self.output = output
+        # directory of the input files of requests, None if no paths are accepted
+        self.input_root = input_root
+        self.socket_path = socket_path
+        super().__init__(socket_path, _ServiceRequestHandler)
+
+    def server_bind(self) -> None:
+        super().server_bind()
+        # clients aren't authenticated, so only the user may connect
+        os.chmod(self.socket_path, 0o600)
+
+
+class TcpTransformationServer(socketserver.ForkingMixIn, http.server.HTTPServer):
+    """Serve requests to the transformation service on a port of localhost."""
+
+    def __init__(
+        self,
+        port: int,
+        service: TransformationService,
+        output: str = "output",
+        input_root: Optional[str] = None,
+    ) -> None:
+        self.service = service
+        self.output = output
+        self.input_root = input_root
+        super().__init__(("127.0.0.1", port), _ServiceRequestHandler)
+
+
+def serve(
+    service: TransformationService,
+    socket_path: Optional[str] = None,
+    port: Optional[int] = None,
+    output: str = "output",
+    input_root: Optional[str] = None,
+) -> None:
+    """
+    Serve requests on port of localhost, if it is passed, otherwise on the
+    Unix domain socket socket_path (by default service_socket_path()),
+    until the process is interrupted. Paths of input files are only
+    accepted if input_root is passed, see module docstring.
+    """
+    server: Union[UnixTransformationServer, TcpTransformationServer]
+    if port is not None:
+        server = TcpTransformationServer(port, service, output, input_root)
+        address = "http://127.0.0.1:%d" % server.server_port
+    else:
+        if socket_path is None:
+            socket_path = service_socket_path()
+        _remove_stale_socket(socket_path)
+        server = UnixTransformationServer(socket_path, service, output, input_root)
+        address = socket_path
+    with server:
+        logger.info("Transformation service listening on %s" % address)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if socket_path is not None and port is None:
+                os.remove(socket_path)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            # left over by a service that was terminated
+            os.remove(socket_path)
+            return
+    sys.exit(f"Transformation service already running on {socket_path}.")
+
+
+def _confine(path: str, root: str, name: str) -> str:
+    """
+    Resolve path (following symbolic links) and return it, if it is root
+    or inside of root. Otherwise raise ServiceError.
+    """
+    resolved = os.path.realpath(path)
+    resolved_root = os.path.realpath(root)
+    if os.path.commonpath([resolved, resolved_root]) != resolved_root:
+        raise ServiceError(403, f"Path not in {name} directory of the service: {path}")
+    return resolved
+
+
+def _header_value(value: bool) -> str:
+    return "true" if value else "false"
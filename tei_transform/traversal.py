@@ -0,0 +1,59 @@
+"""
+Apply the observers in as few traversals of a document as their declared
+dependencies allow, see AbstractNodeObserver.requires_transformed.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from lxml import etree
+
+from tei_transform.abstract_node_observer import AbstractNodeObserver
+
+DEPENDENCIES = {"subtree", "document"}
+
+
+@dataclass
+class Traversal:
+    """
+    Observers applied in one traversal of a document. The pre_order
+    observers are applied to a node when it is reached, the post_order
+    observers after the whole subtree of the node was visited.
+    """
+
+    pre_order: List[AbstractNodeObserver] = field(default_factory=list)
+    post_order: List[AbstractNodeObserver] = field(default_factory=list)
+
+
+def schedule_traversals(
+    first_pass: List[AbstractNodeObserver], second_pass: List[AbstractNodeObserver]
+) -> List[Traversal]:
+    """
+    Distribute the observers over the traversals of a document. The
+    observers in second_pass, and those in first_pass with a declared
+    dependency, are applied in a second traversal after the other observers.
+    If they all only depend on the transformed subtree of a node, they are
+    applied in post-order in the first traversal instead.
+    """
+    first = [observer for observer in first_pass if _dependency(observer) is None]
+    second = [
+        observer for observer in first_pass if _dependency(observer) is not None
+    ] + second_pass
+    if first and all(_dependency(observer) == "subtree" for observer in second):
+        return [Traversal(first, second)]
+    return [Traversal(observers) for observers in (first, second) if observers]
+
+
+def _dependency(observer: AbstractNodeObserver) -> Optional[str]:
+    return getattr(observer, "requires_transformed", None)
+
+
+def is_ancestor(element: etree._Element, node: etree._Element) -> bool:
+    """Check if element is an ancestor of node."""
+    if not len(element):
+        return False
+    ancestor = node.getparent()
+    while ancestor is not None:
+        if ancestor is element:
+            return True
+        ancestor = ancestor.getparent()
+    return False
@@ -0,0 +1,12 @@
+import os
+
+
+def cache_directory() -> str:
+    """
+    Return the directory for files cached by tei-transform, located in
+    the user's cache directory.
+    """
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_dir, "tei-transform")
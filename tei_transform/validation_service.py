@@ -0,0 +1,207 @@
+"""
+Keep a compiled Relax NG validator in a long-running process, so that the
+validation scheme doesn't have to be compiled on every start of the
+command line tool.
+
+The service listens on a Unix domain socket whose path is derived from
+the hash of the scheme file. For every request, a child process that
+inherits the compiled validator is forked, so that several clients can
+validate in parallel.
+
+A request is the length of the message, followed by a byte with the parser
+options of the client and the serialized document, which the service parses
+again with the same options. This costs about as much as parsing the file,
+so the service only pays off if compiling the scheme takes longer than
+that, i.e. for runs with few files. tei-transform only uses the service
+with --validation-service.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import socket
+import socketserver
+import struct
+import sys
+from typing import List, Optional
+
+from lxml import etree
+
+from tei_transform.user_cache import cache_directory
+from tei_transform.xml_tree_iterator import ParserOptions
+
+logger = logging.getLogger(__name__)
+
+_LENGTH_PREFIX = struct.Struct(">Q")
+# part of the name of the socket, so that clients don't use a service that
+# speaks another version of the protocol
+_PROTOCOL_VERSION = 2
+
+
+def schema_digest(tei_scheme: str) -> str:
+    """Return the sha256 hash of the content of the scheme file."""
+    sha256 = hashlib.sha256()
+    with open(tei_scheme, "rb") as ptr:
+        for chunk in iter(lambda: ptr.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def default_socket_path(tei_scheme: str) -> str:
+    """
+    Return the path of the socket of the validation service for the
+    scheme file. The path is located in the user's cache directory.
+    """
+    digest = schema_digest(tei_scheme)[:16]
+    socket_name = f"validator-{_PROTOCOL_VERSION}-{digest}.sock"
+    return os.path.join(cache_directory(), socket_name)
+
+
+class RemoteValidator:
+    """
+    Client for the validation service, that can be used in place of
+    an etree.RelaxNG validator. The service parses the documents with
+    parser_options, which should be those the documents were parsed with.
+    """
+
+    def __init__(
+        self, socket_path: str, parser_options: Optional[ParserOptions] = None
+    ) -> None:
+        self.socket_path = socket_path
+        self.parser_options = parser_options or ParserOptions()
+
+    @classmethod
+    def connect(
+        cls, socket_path: str, parser_options: Optional[ParserOptions] = None
+    ) -> Optional["RemoteValidator"]:
+        """
+        Return a validator for the service listening on socket_path or
+        None, if no service is running.
+        """
+        if not os.path.exists(socket_path):
+            return None
+        validator = cls(socket_path, parser_options)
+        try:
+            validator._request(b"")
+        except OSError:
+            return None
+        return validator
+
+    def validate(self, tree: etree._ElementTree) -> bool:
+        data = _encode_options(self.parser_options) + etree.tostring(tree)
+        return self._request(data) == b"1"
+
+    def _request(self, data: bytes) -> bytes:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall(_LENGTH_PREFIX.pack(len(data)) + data)
+            return _receive_exactly(sock, 1)
+
+
+class _ValidationRequestHandler(socketserver.BaseRequestHandler):
+    server: "ValidationServer"
+
+    def handle(self) -> None:
+        (length,) = _LENGTH_PREFIX.unpack(
+            _receive_exactly(self.request, _LENGTH_PREFIX.size)
+        )
+        # an empty request is used to check if the service is available
+        if length == 0:
+            self.request.sendall(b"1")
+            return
+        data = _receive_exactly(self.request, length)
+        parser = _decode_options(data[0]).create_parser()
+        try:
+            tree = etree.fromstring(data[1:], parser).getroottree()
+            valid = self.server.validator.validate(tree)
+        except etree.XMLSyntaxError:
+            valid = False
+        self.request.sendall(b"1" if valid else b"0")
+
+
+class ValidationServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """
+    Validate xml documents sent over a Unix domain socket with a compiled
+    Relax NG validator.
+    """
+
+    def __init__(self, socket_path: str, validator: etree.RelaxNG) -> None:
+        self.validator = validator
+        super().__init__(socket_path, _ValidationRequestHandler)
+
+
+def serve(tei_scheme: str, socket_path: Optional[str] = None) -> None:
+    """
+    Compile the validation scheme and serve validation requests until
+    the process is interrupted.
+    """
+    if socket_path is None:
+        socket_path = default_socket_path(tei_scheme)
+    validator = etree.RelaxNG(etree.parse(tei_scheme))
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        if RemoteValidator.connect(socket_path) is not None:
+            sys.exit(f"Validation service already running on {socket_path}.")
+        # remove socket left over by a service that was terminated
+        os.remove(socket_path)
+    with ValidationServer(socket_path, validator) as server:
+        logger.info("Validation service listening on %s" % socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """
+    Function that serves as entry point for the console script of the
+    validation service.
+    """
+    parser = argparse.ArgumentParser(
+        description="""Compile the Relax NG scheme of the TEI guidelines once and
+        keep it in memory to validate files for tei-transform. While the service
+        is running, tei-transform --validation-service uses it instead of
+        compiling the scheme on every start."""
+    )
+    parser.add_argument(
+        "--scheme",
+        help="Relax NG scheme used for validation. Default is tei_all.rng.",
+        default=os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "tei_all.rng"
+        ),
+    )
+    parser.add_argument(
+        "--socket",
+        help="""Path of the Unix domain socket to listen on. By default, the path
+        is derived from the hash of the scheme file.""",
+        default=None,
+    )
+    args = parser.parse_args(arguments)
+    logging.basicConfig(level=logging.INFO)
+    serve(args.scheme, args.socket)
+
+
+def _encode_options(options: ParserOptions) -> bytes:
+    flags = options.huge_tree | options.collect_ids << 1 | options.remove_comments << 2
+    return bytes([flags])
+
+
+def _decode_options(flags: int) -> ParserOptions:
+    return ParserOptions(
+        huge_tree=bool(flags & 1),
+        collect_ids=bool(flags & 2),
+        remove_comments=bool(flags & 4),
+    )
+
+
+def _receive_exactly(sock: socket.socket, length: int) -> bytes:
+    chunks = []
+    while length > 0:
+        chunk = sock.recv(min(length, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by validation service.")
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b"".join(chunks)
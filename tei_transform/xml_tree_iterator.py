@@ -1,22 +1,227 @@
 """
 Iterate over xml-file and yield nodes relevant for TEI valid xml.
 """
-from typing import Generator
+import re
+import shutil
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Generator, Iterable, Iterator, Optional, Tuple
 
 from lxml import etree
 
 from tei_transform.element_transformation import construct_new_tei_root
 
+_CHUNK_SIZE = 1 << 16
+_HEADER_END = re.compile(rb"</teiHeader\s*>|<teiHeader(\s[^>]*)?/>")
+_TEXT_TAG = re.compile(rb"<text[\s/>]")
+_TEXT_START = re.compile(rb"\s*<text[\s/>]")
+_DOCUMENT_END = re.compile(rb"(</text\s*>|<text(\s[^>]*)?/>)\s*</TEI\s*>\s*$")
+_ENCODING = re.compile(rb"^\s*<\?xml[^>]*encoding\s*=\s*[\"']([^\"']*)[\"']")
+_BYTE_COMPATIBLE_ENCODINGS = {b"utf-8", b"utf8", b"us-ascii", b"ascii"}
+_RELEVANT_TAGS = ["{*}TEI", "{*}teiHeader", "{*}text"]
+
+
+@dataclass(frozen=True)
+class ParserOptions:
+    """
+    Options of the parsers of XMLTreeIterator. The default options are
+    those of lxml. bounded_memory() returns the options for files that are
+    parsed with as little memory as possible.
+    """
+
+    # allow text nodes larger than 10 MB and trees deeper than 256 levels
+    huge_tree: bool = False
+    # index the xml:ids of a document, which also rejects duplicate ids
+    collect_ids: bool = True
+    remove_comments: bool = False
+
+    @classmethod
+    def bounded_memory(cls, remove_comments: bool = False) -> "ParserOptions":
+        return cls(huge_tree=True, collect_ids=False, remove_comments=remove_comments)
+
+    def create_parser(self) -> etree.XMLParser:
+        return etree.XMLParser(**self._arguments())
+
+    def create_pull_parser(self) -> etree.XMLPullParser:
+        return etree.XMLPullParser(
+            events=["start", "end"], tag=_RELEVANT_TAGS, **self._arguments()
+        )
+
+    def iterparse_arguments(self) -> Dict[str, Any]:
+        """
+        Return the options as arguments of etree.iterparse(), which doesn't
+        support collect_ids.
+        """
+        return {"huge_tree": self.huge_tree, "remove_comments": self.remove_comments}
+
+    def _arguments(self) -> Dict[str, Any]:
+        return dict(self.iterparse_arguments(), collect_ids=self.collect_ids)
+
+
+@dataclass(frozen=True)
+class UnparsedText:
+    """
+    Part of a file after the end tag of <teiHeader/>, i.e. <text/> and
+    the end tag of <TEI/>, that is copied to the output without parsing.
+    """
+
+    file: str
+    offset: int
+
+    def copy_to(self, ptr: BinaryIO) -> None:
+        with open(self.file, "rb") as source:
+            source.seek(self.offset)
+            shutil.copyfileobj(source, ptr)
+
 
 class XMLTreeIterator:
+    def __init__(self, parser_options: Optional[ParserOptions] = None) -> None:
+        self.set_parser_options(parser_options or ParserOptions())
+
+    def set_parser_options(self, parser_options: ParserOptions) -> None:
+        """
+        Parse the next files with parser_options. If they aren't the default
+        options, the parsers are created once and reused for all files.
+        """
+        self.parser_options = parser_options
+        self._parser: Optional[etree.XMLParser] = None
+        self._pull_parser: Optional[etree.XMLPullParser] = None
+        if parser_options != ParserOptions():
+            self._parser = parser_options.create_parser()
+            self._pull_parser = parser_options.create_pull_parser()
+
+    def parse(self, file: str) -> etree._ElementTree:
+        """Parse file with the parser options of the iterator."""
+        return etree.parse(file, self._parser)
+
     def iterate_xml(self, file: str) -> Generator[etree._Element, None, None]:
         """
         Iterate over xml file and yield the nodes <TEI>, <teiHeader>
         and <text>.
+        If the file is parsed with other than the default parser options,
+        the children of <TEI> that aren't yielded (and so aren't part of the
+        transformed document) are removed as soon as they were parsed.
+        """
+        if self._pull_parser is None:
+            yield from self._select_relevant_nodes(
+                etree.iterparse(file, events=["start", "end"], tag=_RELEVANT_TAGS)
+            )
+            return
+        for node in self._select_relevant_nodes(self._parse_incrementally(file)):
+            if etree.QName(node).localname != "TEI":
+                _remove_preceding_siblings(node)
+            yield node
+
+    def iterate_tree(
+        self, tree: etree._ElementTree
+    ) -> Generator[etree._Element, None, None]:
+        """
+        Iterate over an already parsed xml tree and yield the same nodes
+        as iterate_xml() would for the file. The nodes are not copied.
+        """
+        yield from self._select_relevant_nodes(
+            etree.iterwalk(tree, events=["start", "end"], tag=_RELEVANT_TAGS)
+        )
+
+    def split_header(
+        self, file: str
+    ) -> Optional[Tuple[etree._ElementTree, UnparsedText]]:
+        """
+        Parse only the part of file up to the end of <teiHeader> and return
+        a tree with <TEI> and <teiHeader>, together with the unparsed rest
+        of the file.
+        The file is only split if the rest can be copied to a UTF-8 encoded
+        output as is, i.e. it is UTF-8 (or ASCII) encoded, has no document
+        type declaration and <teiHeader> is followed only by <text>. <TEI>
+        must not have a namespace prefix. Otherwise, None is returned.
+        """
+        if not isinstance(file, str):
+            return None
+        with open(file, "rb") as ptr:
+            header = self._read_header(ptr)
+            if header is None:
+                return None
+            text_start = ptr.read(_CHUNK_SIZE)
+            ptr.seek(0, 2)
+            file_size = ptr.tell()
+            ptr.seek(max(len(header), file_size - _CHUNK_SIZE))
+            document_end = ptr.read()
+        if not _TEXT_START.match(text_start) or not _DOCUMENT_END.search(document_end):
+            return None
+        try:
+            root = etree.fromstring(header + b"</TEI>", self._parser)
+        except etree.XMLSyntaxError:
+            return None
+        if root.tag.rpartition("}")[2] != "TEI":
+            return None
+        return root.getroottree(), UnparsedText(file, len(header))
+
+    def _parse_incrementally(self, file: str) -> Iterator[Tuple[str, etree._Element]]:
+        """
+        Feed file to the pull parser of the iterator and yield its events.
         """
-        for event, node in etree.iterparse(
-            file, events=["start", "end"], tag=["{*}TEI", "{*}teiHeader", "{*}text"]
+        assert self._pull_parser is not None
+        parser = self._pull_parser
+        closed = False
+        try:
+            with open(file, "rb") as ptr:
+                while data := ptr.read(_CHUNK_SIZE):
+                    parser.feed(data)
+                    yield from parser.read_events()
+            closed = True
+            parser.close()
+            yield from parser.read_events()
+        finally:
+            # reset the parser for the next file, if the file wasn't well-formed
+            # or the events weren't read completely
+            if not closed:
+                try:
+                    parser.close()
+                except etree.XMLSyntaxError:
+                    pass
+            for _ in parser.read_events():
+                pass
+
+    def _read_header(self, ptr: BinaryIO) -> Optional[bytes]:
+        """
+        Read the file up to and including the end tag of <teiHeader>. None is
+        returned if there is no such tag before <text> or the rest of the file
+        couldn't be copied to the output as is.
+        """
+        data = bytearray()
+        searched = 0
+        while True:
+            chunk = ptr.read(_CHUNK_SIZE)
+            if not chunk:
+                return None
+            data += chunk
+            if searched == 0 and not self._can_be_copied(data):
+                return None
+            # a tag might be split between two chunks
+            start = max(0, searched - 16)
+            match = _HEADER_END.search(data, start)
+            end = match.start() if match is not None else len(data)
+            if _TEXT_TAG.search(data, start, end) is not None:
+                return None
+            if match is not None:
+                ptr.seek(match.end())
+                return bytes(data[: match.end()])
+            searched = len(data)
+
+    def _can_be_copied(self, data: bytearray) -> bool:
+        if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+            return False
+        match = _ENCODING.match(data)
+        if match is not None and match.group(1).lower() not in (
+            _BYTE_COMPATIBLE_ENCODINGS
         ):
+            return False
+        # entities declared in the DTD couldn't be resolved in the output
+        return b"<!DOCTYPE" not in data[: data.find(b"<TEI")]
+
+    def _select_relevant_nodes(
+        self, events: Iterable[Tuple[str, etree._Element]]
+    ) -> Generator[etree._Element, None, None]:
+        for event, node in events:
             qname = etree.QName(node.tag)
             if event == "start":
                 if qname.localname == "TEI":
@@ -27,3 +232,27 @@ class XMLTreeIterator:
                 if qname.localname == "TEI":
                     continue
                 yield node
+
+
+def _remove_preceding_siblings(node: etree._Element) -> None:
+    """
+    Remove the older siblings of a child of the root, except <teiHeader>
+    and <text>, which are not part of the transformed document.
+    """
+    parent = node.getparent()
+    if parent is None or parent.getparent() is not None:
+        return
+    index = parent.index(node) - 1
+    while index >= 0:
+        # the siblings are removed by index, without keeping a reference,
+        # so that they are freed at once
+        if not _is_relevant(parent[index]):
+            del parent[index]
+        index -= 1
+
+
+def _is_relevant(node: etree._Element) -> bool:
+    return isinstance(node.tag, str) and etree.QName(node).localname in (
+        "teiHeader",
+        "text",
+    )
@@ -1,12 +1,23 @@
 import os
 import shutil
-from typing import Protocol
+from typing import Iterable, Optional, Protocol
 
 from lxml import etree
 
+from tei_transform.file_copy import copy_file, link_file, unlink_if_shared
+from tei_transform.xml_tree_iterator import UnparsedText
+
 
 class XmlWriter(Protocol):
-    def write_xml(self, path: str, xml: etree._Element) -> None:
+    def write_xml(
+        self,
+        path: str,
+        xml: etree._Element,
+        unparsed_text: Optional[UnparsedText] = None,
+    ) -> None:
+        ...
+
+    def write_stream(self, path: str, chunks: Iterable[bytes]) -> bool:
         ...
 
     def create_output_directories(self, output_dir: str) -> None:
@@ -15,18 +26,72 @@ class XmlWriter(Protocol):
     def copy_valid_files(self, file: str, output_dir: str) -> None:
         ...
 
+    def copy_unchanged_file(self, file: str, path: str, link: bool = False) -> None:
+        ...
+
 
 class XmlWriterImpl:
-    def write_xml(self, path: str, xml: etree._Element) -> None:
-        if xml is not None:
+    def write_xml(
+        self,
+        path: str,
+        xml: etree._Element,
+        unparsed_text: Optional[UnparsedText] = None,
+    ) -> None:
+        if xml is None:
+            return
+        # the output file might be a hard link to the input file
+        unlink_if_shared(path)
+        if unparsed_text is None:
             xml.getroottree().write(
                 path,
                 xml_declaration=True,
                 encoding="utf-8",
             )
+            return
+        data = etree.tostring(xml.getroottree(), xml_declaration=True, encoding="UTF-8")
+        with open(path, "wb") as ptr:
+            # the end tag of the root is part of the unparsed text
+            ptr.write(data[: data.rindex(b"</")])
+            unparsed_text.copy_to(ptr)
+
+    def write_stream(self, path: str, chunks: Iterable[bytes]) -> bool:
+        """
+        Write the chunks of a serialized document to path while they are
+        produced. path is only replaced after all chunks were written, so
+        no incomplete file is left if producing the chunks fails. Return
+        False if there were no chunks and nothing was written.
+        """
+        chunks = iter(chunks)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            return False
+        temporary_path = path + ".part"
+        try:
+            with open(temporary_path, "wb") as ptr:
+                ptr.write(first_chunk)
+                for chunk in chunks:
+                    ptr.write(chunk)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        # replacing the file doesn't change other hard links to it
+        os.replace(temporary_path, path)
+        return True
 
     def create_output_directories(self, output_dir: str) -> None:
         os.makedirs(output_dir, exist_ok=True)
 
     def copy_valid_files(self, file: str, output_dir: str) -> None:
+        unlink_if_shared(os.path.join(output_dir, os.path.basename(file)))
         shutil.copy2(file, output_dir)
+
+    def copy_unchanged_file(self, file: str, path: str, link: bool = False) -> None:
+        """
+        Write the original content of file to path, because the transformation
+        didn't change the xml tree. If link is True, path is created as hard
+        link to file, if possible.
+        """
+        if link:
+            link_file(file, path)
+        else:
+            copy_file(file, path)
@@ -0,0 +1,248 @@
+"""
+Apply observers with simple transformations (e.g. renaming elements or
+removing attributes) with an XSLT stylesheet, so that libxslt applies all
+of them in one pass over the document instead of calling them in Python.
+
+An observer declares its transformation with xslt_rules(), see
+AbstractNodeObserver. The observers of a run are only compiled if all of
+them declare rules and the rules of different observers don't change the
+same attributes of the same elements, so that the order in which they are
+applied doesn't matter. Otherwise, TeiTransformer applies them in Python.
+"""
+import itertools
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from lxml import etree
+
+from tei_transform.abstract_node_observer import AbstractNodeObserver
+
+_XSL = "http://www.w3.org/1999/XSL/Transform"
+
+
+@dataclass(frozen=True)
+class XsltRule:
+    """
+    Transformation of the elements an observer matches, expressed as parts
+    of an XSLT 1.0 stylesheet. Use XsltRule.create() to construct a rule.
+    """
+
+    # XPath predicate, that is true for the elements the observer matches
+    condition: str
+    # localnames of the elements matched by condition and of the elements
+    # they are renamed to, None if condition can match any element
+    tags: Optional[FrozenSet[str]]
+    # localnames of the attributes the rule reads or changes
+    attributes: FrozenSet[str] = frozenset()
+    # XSLT patterns of attributes of the element that are removed
+    removed_attributes: Tuple[str, ...] = ()
+    # names of attributes that are set, with XPath expressions of their
+    # values, evaluated for the element
+    added_attributes: Tuple[Tuple[str, str], ...] = ()
+    # new localname of the element, in the default namespace of the element
+    new_tag: Optional[str] = None
+    # the element is removed together with its tail
+    remove_element: bool = False
+    # part of the document the condition is restricted to
+    scope: Optional[str] = None
+
+    @classmethod
+    def create(
+        cls,
+        tags: Optional[Iterable[str]],
+        condition: Optional[str] = None,
+        scope: Optional[str] = None,
+        attributes: Iterable[str] = (),
+        removed_attributes: Iterable[str] = (),
+        added_attributes: Iterable[Tuple[str, str]] = (),
+        new_tag: Optional[str] = None,
+        remove_element: bool = False,
+        condition_tags: Optional[Iterable[str]] = None,
+    ) -> "XsltRule":
+        """
+        Construct a rule for the elements with one of the localnames in tags
+        (or any element, if tags is None) inside scope, for which condition
+        is true. If tags is None, but condition can only match elements with
+        certain localnames, these can be passed as condition_tags.
+        """
+        conditions = []
+        if tags is not None:
+            conditions.append(
+                " or ".join(f"local-name()='{tag}'" for tag in sorted(set(tags)))
+            )
+        else:
+            tags = condition_tags
+        if tags is not None:
+            tags = frozenset(tags)
+            if new_tag is not None:
+                tags |= {new_tag}
+        if scope is not None:
+            conditions.append(f"ancestor-or-self::*[local-name()='{scope}']")
+        if condition is not None:
+            conditions.append(condition)
+        return cls(
+            condition=" and ".join(f"({part})" for part in conditions) or "true()",
+            tags=tags,
+            attributes=frozenset(attributes),
+            removed_attributes=tuple(removed_attributes),
+            added_attributes=tuple(added_attributes),
+            new_tag=new_tag,
+            remove_element=remove_element,
+            scope=scope,
+        )
+
+    def changes_tag(self) -> bool:
+        return self.new_tag is not None or self.remove_element
+
+
+class CompiledObservers:
+    """Stylesheet that applies the rules of a list of observers."""
+
+    def __init__(self, rules: List[XsltRule]) -> None:
+        self._stylesheet = etree.XSLT(_construct_stylesheet(rules))
+        self._matches = etree.XPath(
+            "boolean(descendant-or-self::*[%s])" % _any_condition(rules)
+        )
+        removing_rules = [rule for rule in rules if rule.remove_element]
+        self._unsupported: Optional[etree.XPath] = None
+        if removing_rules:
+            # removed elements with children end the traversal of the
+            # subtree in Python, which the stylesheet can't reproduce
+            self._unsupported = etree.XPath(
+                "boolean(descendant-or-self::*[%s][node()[not(self::text())]])"
+                % _any_condition(removing_rules)
+            )
+
+    def supports(self, nodes: Sequence[etree._Element]) -> bool:
+        """
+        Check if the stylesheet transforms the subtrees of nodes like the
+        observers would, if they were applied in Python.
+        """
+        if self._unsupported is None:
+            return True
+        return not any(self._unsupported(node) for node in nodes)
+
+    def transform(self, root: etree._Element) -> Tuple[etree._Element, bool]:
+        """
+        Transform the tree of root and return the new root, or root itself
+        if no rule matches, and whether the tree was changed.
+        """
+        if not self._matches(root):
+            return root, False
+        return self._stylesheet(root).getroot(), True
+
+
+def compile_observers(
+    observers: Sequence[AbstractNodeObserver],
+) -> Optional[CompiledObservers]:
+    """
+    Compile the rules of observers into a stylesheet. Return None if an
+    observer doesn't declare its rules, if the rules of two observers
+    might conflict or if there is nothing to transform.
+    """
+    rules_of_observers = []
+    for observer in observers:
+        xslt_rules = getattr(observer, "xslt_rules", None)
+        rules = xslt_rules() if xslt_rules is not None else None
+        if rules is None:
+            return None
+        rules_of_observers.append(rules)
+    for rules, other_rules in itertools.combinations(rules_of_observers, 2):
+        if any(
+            _conflict(rule, other_rule) for rule in rules for other_rule in other_rules
+        ):
+            return None
+    rules = [rule for rules in rules_of_observers for rule in rules]
+    if not rules:
+        return None
+    return CompiledObservers(rules)
+
+
+def _conflict(rule: XsltRule, other_rule: XsltRule) -> bool:
+    """
+    Check if the result of the rules might depend on the order in which
+    they are applied, i.e. if they might match the same elements and read
+    or change the same attributes, or if one of them changes a tag the
+    other one depends on.
+    """
+    for renaming, dependent in [(rule, other_rule), (other_rule, rule)]:
+        if (
+            renaming.changes_tag()
+            and dependent.scope is not None
+            and (renaming.tags is None or dependent.scope in renaming.tags)
+        ):
+            return True
+    if (
+        rule.tags is not None
+        and other_rule.tags is not None
+        and rule.tags.isdisjoint(other_rule.tags)
+    ):
+        return False
+    if not rule.attributes.isdisjoint(other_rule.attributes):
+        return True
+    return (rule.changes_tag() and other_rule.tags is not None) or (
+        other_rule.changes_tag() and rule.tags is not None
+    )
+
+
+def _any_condition(rules: Iterable[XsltRule]) -> str:
+    return " or ".join(f"({rule.condition})" for rule in rules)
+
+
+def _construct_stylesheet(rules: List[XsltRule]) -> etree._Element:
+    stylesheet = etree.Element(_xsl("stylesheet"), version="1.0", nsmap={"xsl": _XSL})
+    copy = _add(
+        stylesheet, "template", match="@*|text()|comment()|processing-instruction()"
+    )
+    _add(copy, "copy")
+    element = _add(stylesheet, "template", match="*")
+    if any(rule.changes_tag() for rule in rules):
+        choose = _add(element, "choose")
+        for rule in rules:
+            if rule.remove_element:
+                _add(choose, "when", test=rule.condition)
+            elif rule.new_tag is not None:
+                renamed = _add(
+                    _add(choose, "when", test=rule.condition),
+                    "element",
+                    name=rule.new_tag,
+                    namespace="{string(namespace::*[name()=''])}",
+                )
+                _add(renamed, "copy-of", select="namespace::*")
+                _add(renamed, "call-template", name="content")
+        element = _add(choose, "otherwise")
+    _add(_add(element, "copy"), "call-template", name="content")
+    content = _add(stylesheet, "template", name="content")
+    _add(content, "apply-templates", select="@*")
+    for rule in rules:
+        # attributes that don't exist yet are added after the others
+        for name, value in rule.added_attributes:
+            added = _add(content, "if", test=f"({rule.condition}) and not(@{name})")
+            _add(_add(added, "attribute", name=name), "value-of", select=value)
+    _add(content, "apply-templates", select="node()")
+    for rule in rules:
+        for pattern in rule.removed_attributes:
+            _add(stylesheet, "template", match=f"*[{rule.condition}]/{pattern}")
+        # existing attributes are replaced in place
+        for name, value in rule.added_attributes:
+            replaced = _add(
+                _add(stylesheet, "template", match=f"*[{rule.condition}]/@{name}"),
+                "for-each",
+                select="..",
+            )
+            _add(_add(replaced, "attribute", name=name), "value-of", select=value)
+        if rule.remove_element:
+            _add(
+                stylesheet,
+                "template",
+                match=f"text()[preceding-sibling::node()[1][self::*[{rule.condition}]]]",
+            )
+    return stylesheet
+
+
+def _add(parent: etree._Element, tag: str, **attributes: str) -> etree._Element:
+    return etree.SubElement(parent, _xsl(tag), attributes)
+
+
+def _xsl(name: str) -> str:
+    return f"{{{_XSL}}}{name}"
@@ -36,6 +36,36 @@ class MockObserverConfigRequired(AbstractNodeObserver):
         pass
 
 
+class MockObserverInvalidScope(AbstractNodeObserver):
+    scope = "body"
+
+    def observe(self, node):
+        return False
+
+    def transform_node(self, node):
+        pass
+
+
+class MockObserverInvalidDependency(AbstractNodeObserver):
+    requires_transformed = "siblings"
+
+    def observe(self, node):
+        return False
+
+    def transform_node(self, node):
+        pass
+
+
+class MockObserverNeverStable(AbstractNodeObserver):
+    target_tags = frozenset({"p"})
+
+    def observe(self, node):
+        return etree.QName(node).localname == "p"
+
+    def transform_node(self, node):
+        etree.SubElement(node, "milestone")
+
+
 def add_mock_plugin_entry_point(observer_constructor, plugin_name, plugin_path):
     mock_entry_point = metadata.EntryPoint(
         name=plugin_name,
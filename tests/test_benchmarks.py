@@ -0,0 +1,104 @@
+import configparser
+import io
+import os
+import tempfile
+import unittest
+
+from lxml import etree
+
+from benchmarks.corpus import CONFIG, PATTERNS, generate_document, write_corpus
+from benchmarks.runner import compare, run_benchmarks
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.observer_statistics import TransformationProfile
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.xml_tree_iterator import XMLTreeIterator
+
+
+class CorpusTester(unittest.TestCase):
+    def setUp(self):
+        self.constructor = ObserverConstructor()
+        self.config = configparser.ConfigParser()
+        self.config.read_string(CONFIG)
+
+    def test_patterns_named_after_plugins(self):
+        self.assertLessEqual(set(PATTERNS), set(self.constructor.plugins_by_name))
+
+    def test_generated_document_is_well_formed(self):
+        document = generate_document(paragraphs=200, error_density=0.5)
+        root = etree.fromstring(document)
+        self.assertEqual(etree.QName(root).localname, "TEI")
+
+    def test_same_document_generated_with_same_seed(self):
+        self.assertEqual(generate_document(seed=3), generate_document(seed=3))
+        self.assertNotEqual(generate_document(seed=3), generate_document(seed=4))
+
+    def test_size_of_document_depends_on_number_of_paragraphs(self):
+        self.assertLess(
+            len(generate_document(paragraphs=10)),
+            len(generate_document(paragraphs=100)),
+        )
+
+    def test_divs_nested_to_depth(self):
+        root = etree.fromstring(generate_document(paragraphs=5, depth=3))
+        self.assertIsNotNone(root.find(".//{*}body/{*}div/{*}div/{*}div"))
+        self.assertIsNone(root.find(".//{*}body/{*}div/{*}div/{*}div/{*}div"))
+
+    def test_unknown_pattern_rejected(self):
+        with self.assertRaises(ValueError):
+            generate_document(patterns=["unknown"])
+
+    def test_pattern_matched_by_plugin(self):
+        for name in PATTERNS:
+            with self.subTest(pattern=name):
+                document = generate_document(
+                    paragraphs=5, error_density=1.0, patterns=[name]
+                )
+                self.assertGreater(self._count_matches(name, document), 0)
+
+    def test_document_without_errors_not_matched(self):
+        for name in PATTERNS:
+            with self.subTest(pattern=name):
+                document = generate_document(
+                    paragraphs=20, error_density=0.0, patterns=[name]
+                )
+                self.assertEqual(self._count_matches(name, document), 0)
+
+    def test_corpus_written(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            files = write_corpus(tempdir, documents=3, paragraphs=5)
+            self.assertEqual(
+                sorted(os.listdir(tempdir)), sorted(map(os.path.basename, files))
+            )
+
+    def _count_matches(self, plugin, document):
+        transformer = TeiTransformer(XMLTreeIterator())
+        transformer.profile = TransformationProfile()
+        transformer.set_list_of_observers(
+            self.constructor.construct_observers([plugin], self.config)
+        )
+        transformer.perform_transformation(io.BytesIO(document.encode("utf-8")))
+        return sum(
+            statistics.matches
+            for statistics_of_file in transformer.profile.files.values()
+            for statistics in statistics_of_file.values()
+        )
+
+
+class RunnerTester(unittest.TestCase):
+    def test_stages_timed_separately(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            files = write_corpus(tempdir, documents=2, paragraphs=5)
+            results = run_benchmarks(files, repeat=2, tei_scheme=None)
+        self.assertEqual(set(results["stages"]), {"iterate", "transform", "write"})
+        self.assertEqual(len(results["stages"]["transform"]["runs"]), 2)
+        self.assertEqual(results["metadata"]["documents"], 2)
+
+    def test_regression_detected(self):
+        baseline = {"stages": {"transform": {"min": 1.0}, "write": {"min": 1.0}}}
+        current = {"stages": {"transform": {"min": 1.5}, "write": {"min": 1.05}}}
+        self.assertEqual(compare(baseline, current, threshold=0.1), ["transform"])
+
+    def test_stages_missing_in_baseline_ignored(self):
+        baseline = {"stages": {"transform": {"min": 1.0}}}
+        current = {"stages": {"transform": {"min": 1.0}, "validate": {"min": 5.0}}}
+        self.assertEqual(compare(baseline, current), [])
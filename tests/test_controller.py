@@ -90,6 +90,20 @@ class TeiTransformControllerTester(unittest.TestCase):
         self.assertEqual(self.mock_use_case.request.copy_valid, False)
         self.assertEqual(self.mock_use_case.request.validation, True)
 
+    def test_validation_service_not_used_by_default(self):
+        self.controller.process_arguments(["file", "--copy-valid"])
+        self.assertFalse(self.mock_use_case.request.validation_service)
+
+    def test_controller_extracts_validation_service(self):
+        self.controller.process_arguments(
+            ["file", "--ignore-valid", "--validation-service"]
+        )
+        self.assertTrue(self.mock_use_case.request.validation_service)
+
+    def test_validation_service_without_validation_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["file", "--validation-service"])
+
     def test_controller_throws_error_if_input_is_missing(self):
         with self.assertRaises(SystemExit):
             self.controller.process_arguments(["-t", "classcode", "--copy-valid"])
@@ -121,3 +135,317 @@ class TeiTransformControllerTester(unittest.TestCase):
     def test_controller_extracts_revision(self):
         self.controller.process_arguments(["file", "-r", "-c", "conf_file"])
         self.assertEqual(self.mock_use_case.request.add_revision, True)
+
+    def test_controller_extracts_jobs_default_one(self):
+        self.controller.process_arguments(["file"])
+        self.assertEqual(self.mock_use_case.request.jobs, 1)
+
+    def test_controller_extracts_jobs(self):
+        self.controller.process_arguments(["dir", "--jobs", "4"])
+        self.assertEqual(self.mock_use_case.request.jobs, 4)
+
+    def test_controller_extracts_jobs_with_flag(self):
+        self.controller.process_arguments(["dir", "-j", "2"])
+        self.assertEqual(self.mock_use_case.request.jobs, 2)
+
+    def test_jobs_argument_requires_positive_number(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "-j", "0"])
+
+    def test_controller_extracts_schedule_default_largest_first(self):
+        self.controller.process_arguments(["dir", "-j", "2"])
+        self.assertEqual(self.mock_use_case.request.schedule, "largest-first")
+
+    def test_controller_extracts_schedule(self):
+        self.controller.process_arguments(["dir", "-j", "2", "--schedule", "walk"])
+        self.assertEqual(self.mock_use_case.request.schedule, "walk")
+
+    def test_invalid_schedule_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "--schedule", "random"])
+
+    def test_controller_extracts_cache_file_default_none(self):
+        self.controller.process_arguments(["dir"])
+        self.assertIsNone(self.mock_use_case.request.cache)
+
+    def test_controller_extracts_cache_file(self):
+        self.controller.process_arguments(["dir", "--cache-file", "cache.db"])
+        self.assertEqual(self.mock_use_case.request.cache, "cache.db")
+
+    def test_controller_extracts_observer_stats_default_none(self):
+        self.controller.process_arguments(["dir"])
+        self.assertIsNone(self.mock_use_case.request.observer_stats)
+
+    def test_controller_extracts_observer_stats(self):
+        self.controller.process_arguments(["dir", "--observer-stats", "stats.csv"])
+        self.assertEqual(self.mock_use_case.request.observer_stats, "stats.csv")
+
+    def test_controller_extracts_unchanged_default_write(self):
+        self.controller.process_arguments(["dir"])
+        self.assertEqual(self.mock_use_case.request.unchanged, "write")
+
+    def test_controller_extracts_unchanged(self):
+        self.controller.process_arguments(["dir", "--unchanged", "link"])
+        self.assertEqual(self.mock_use_case.request.unchanged, "link")
+
+    def test_invalid_unchanged_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "--unchanged", "move"])
+
+    def test_controller_extracts_stream_default_false(self):
+        self.controller.process_arguments(["dir"])
+        self.assertFalse(self.mock_use_case.request.stream)
+
+    def test_controller_extracts_stream(self):
+        self.controller.process_arguments(["dir", "--stream"])
+        self.assertTrue(self.mock_use_case.request.stream)
+
+    def test_controller_extracts_prefetch_default_zero(self):
+        self.controller.process_arguments(["dir"])
+        self.assertEqual(self.mock_use_case.request.prefetch, 0)
+
+    def test_controller_extracts_prefetch(self):
+        self.controller.process_arguments(["dir", "--prefetch", "4"])
+        self.assertEqual(self.mock_use_case.request.prefetch, 4)
+
+    def test_negative_prefetch_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "--prefetch", "-1"])
+
+    def test_controller_extracts_max_rounds_default_one(self):
+        self.controller.process_arguments(["dir"])
+        self.assertEqual(self.mock_use_case.request.max_rounds, 1)
+
+    def test_controller_extracts_until_stable_without_value(self):
+        self.controller.process_arguments(["dir", "--until-stable"])
+        self.assertEqual(self.mock_use_case.request.max_rounds, 10)
+
+    def test_controller_extracts_until_stable(self):
+        self.controller.process_arguments(["dir", "--until-stable", "3"])
+        self.assertEqual(self.mock_use_case.request.max_rounds, 3)
+
+    def test_until_stable_without_rounds_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "--until-stable", "0"])
+
+    def test_controller_extracts_survey_default_none(self):
+        self.controller.process_arguments(["dir"])
+        self.assertIsNone(self.mock_use_case.request.survey)
+        self.assertEqual(self.mock_use_case.request.sample, 1.0)
+
+    def test_controller_extracts_survey(self):
+        self.controller.process_arguments(
+            ["dir", "--survey", "survey.json", "--sample", "0.01"]
+        )
+        self.assertEqual(self.mock_use_case.request.survey, "survey.json")
+        self.assertEqual(self.mock_use_case.request.sample, 0.01)
+
+    def test_sample_without_survey_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "--sample", "0.5"])
+
+    def test_invalid_sample_rejected(self):
+        for sample in ["0", "1.5", "-0.1"]:
+            with self.subTest(sample=sample):
+                with self.assertRaises(SystemExit):
+                    self.controller.process_arguments(
+                        ["dir", "--survey", "survey.json", "--sample", sample]
+                    )
+
+    def test_controller_extracts_prescan_default_false(self):
+        self.controller.process_arguments(["dir"])
+        self.assertFalse(self.mock_use_case.request.prescan)
+
+    def test_controller_extracts_prescan(self):
+        self.controller.process_arguments(["dir", "--prescan"])
+        self.assertTrue(self.mock_use_case.request.prescan)
+
+    def test_controller_extracts_serve_default_false(self):
+        self.controller.process_arguments(["dir"])
+        self.assertFalse(self.mock_use_case.request.serve)
+
+    def test_controller_extracts_serve_arguments(self):
+        self.controller.process_arguments(
+            ["serve", "-t", "obs1", "obs2", "obs1", "--socket", "service.sock"]
+        )
+        request = self.mock_use_case.request
+        self.assertTrue(request.serve)
+        self.assertEqual(request.observers, ["obs1", "obs2"])
+        self.assertEqual(request.serve_socket, "service.sock")
+        self.assertIsNone(request.serve_port)
+        self.assertIsNone(request.serve_input_root)
+        self.assertTrue(request.validation)
+
+    def test_controller_extracts_serve_input_root(self):
+        self.controller.process_arguments(["serve", "--input-root", "corpus"])
+        self.assertEqual(self.mock_use_case.request.serve_input_root, "corpus")
+
+    def test_controller_extracts_serve_port_and_no_validation(self):
+        self.controller.process_arguments(
+            ["serve", "--port", "8080", "--no-validation"]
+        )
+        request = self.mock_use_case.request
+        self.assertEqual(request.serve_port, 8080)
+        self.assertFalse(request.validation)
+
+    def test_serve_with_socket_and_port_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(
+                ["serve", "--socket", "service.sock", "--port", "8080"]
+            )
+
+    def test_serve_with_revision_requires_config(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["serve", "-r"])
+
+    def test_controller_extracts_xslt_default_false(self):
+        self.controller.process_arguments(["dir"])
+        self.assertFalse(self.mock_use_case.request.xslt)
+
+    def test_controller_extracts_xslt(self):
+        self.controller.process_arguments(["dir", "--xslt"])
+        self.assertTrue(self.mock_use_case.request.xslt)
+
+    def test_controller_extracts_xslt_for_serve(self):
+        self.controller.process_arguments(["serve", "--xslt"])
+        self.assertTrue(self.mock_use_case.request.xslt)
+
+    def test_controller_extracts_max_memory_default_none(self):
+        self.controller.process_arguments(["dir"])
+        self.assertIsNone(self.mock_use_case.request.max_memory)
+
+    def test_controller_extracts_max_memory(self):
+        self.controller.process_arguments(["dir", "--max-memory", "512"])
+        self.assertEqual(self.mock_use_case.request.max_memory, 512)
+
+    def test_invalid_max_memory_rejected(self):
+        for max_memory in ["0", "-1", "1.5"]:
+            with self.subTest(max_memory=max_memory):
+                with self.assertRaises(SystemExit):
+                    self.controller.process_arguments(
+                        ["dir", "--max-memory", max_memory]
+                    )
+
+    def test_controller_extracts_remove_comments_default_false(self):
+        self.controller.process_arguments(["dir"])
+        self.assertFalse(self.mock_use_case.request.remove_comments)
+
+    def test_controller_extracts_remove_comments(self):
+        self.controller.process_arguments(["dir", "--remove-comments"])
+        self.assertTrue(self.mock_use_case.request.remove_comments)
+
+    def test_controller_extracts_budget_default_none(self):
+        self.controller.process_arguments(["dir"])
+        self.assertIsNone(self.mock_use_case.request.time_budget)
+        self.assertIsNone(self.mock_use_case.request.node_budget)
+        self.assertIsNone(self.mock_use_case.request.quarantine)
+
+    def test_controller_extracts_budget_and_quarantine(self):
+        self.controller.process_arguments(
+            [
+                "dir",
+                "--time-budget",
+                "2.5",
+                "--node-budget",
+                "1000",
+                "--quarantine",
+                "quarantine.jsonl",
+            ]
+        )
+        self.assertEqual(self.mock_use_case.request.time_budget, 2.5)
+        self.assertEqual(self.mock_use_case.request.node_budget, 1000)
+        self.assertEqual(self.mock_use_case.request.quarantine, "quarantine.jsonl")
+
+    def test_invalid_budget_rejected(self):
+        for arguments in [
+            ["--time-budget", "0"],
+            ["--time-budget", "-1"],
+            ["--node-budget", "0"],
+            ["--node-budget", "1.5"],
+        ]:
+            with self.subTest(arguments=arguments):
+                with self.assertRaises(SystemExit):
+                    self.controller.process_arguments(["dir"] + arguments)
+
+    def test_quarantine_without_budget_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "--quarantine", "q.jsonl"])
+
+    def test_controller_extracts_journal_default_none(self):
+        self.controller.process_arguments(["dir"])
+        self.assertIsNone(self.mock_use_case.request.journal)
+        self.assertFalse(self.mock_use_case.request.resume)
+
+    def test_controller_extracts_journal_and_resume(self):
+        self.controller.process_arguments(
+            ["dir", "--journal", "journal.jsonl", "--resume"]
+        )
+        self.assertEqual(self.mock_use_case.request.journal, "journal.jsonl")
+        self.assertTrue(self.mock_use_case.request.resume)
+
+    def test_resume_without_journal_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "--resume"])
+
+    def test_controller_extracts_sharding_default_none(self):
+        self.controller.process_arguments(["dir"])
+        self.assertIsNone(self.mock_use_case.request.file_list)
+        self.assertIsNone(self.mock_use_case.request.shard)
+        self.assertIsNone(self.mock_use_case.request.shard_plan)
+
+    def test_controller_extracts_shard_and_file_list(self):
+        self.controller.process_arguments(
+            ["dir", "--shard", "2/4", "--shard-plan", "plan.json", "--file-list", "-"]
+        )
+        self.assertEqual(self.mock_use_case.request.shard, (2, 4))
+        self.assertEqual(self.mock_use_case.request.shard_plan, "plan.json")
+        self.assertEqual(self.mock_use_case.request.file_list, "-")
+
+    def test_invalid_shard_rejected(self):
+        for shard in ["0/4", "5/4", "1", "a/4", "1/0"]:
+            with self.subTest(shard=shard):
+                with self.assertRaises(SystemExit):
+                    self.controller.process_arguments(["dir", "--shard", shard])
+
+    def test_shard_plan_without_shard_rejected(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["dir", "--shard-plan", "plan.json"])
+
+    def test_controller_extracts_plan_arguments(self):
+        self.controller.process_arguments(
+            ["plan-shards", "dir", "--shards", "4", "--plan", "plan.json"]
+        )
+        request = self.mock_use_case.request
+        self.assertEqual(request.file_or_dir, "dir")
+        self.assertEqual(request.plan_shards, "plan.json")
+        self.assertEqual(request.shards, 4)
+        self.assertIsNone(request.file_list)
+
+    def test_plan_requires_positive_number_of_shards(self):
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(
+                ["plan-shards", "dir", "--shards", "0", "--plan", "plan.json"]
+            )
+
+    def test_input_named_like_command_processed_after_double_dash(self):
+        for command in ["serve", "plan-shards"]:
+            with self.subTest(command=command):
+                self.mock_use_case.request = None
+                self.controller.process_arguments(["--", command, "-o", "out"])
+                request = self.mock_use_case.request
+                self.assertEqual(request.file_or_dir, command)
+                self.assertEqual(request.output, "out")
+                self.assertFalse(request.serve)
+                self.assertIsNone(request.plan_shards)
+
+    def test_input_named_like_command_processed_as_relative_path(self):
+        self.controller.process_arguments(["./serve"])
+        request = self.mock_use_case.request
+        self.assertEqual(request.file_or_dir, "./serve")
+        self.assertFalse(request.serve)
+
+    def test_command_not_selected_by_later_argument(self):
+        self.controller.process_arguments(["-o", "out", "serve"])
+        request = self.mock_use_case.request
+        self.assertEqual(request.file_or_dir, "serve")
+        self.assertFalse(request.serve)
@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from lxml import etree
+
+from tei_transform.corpus_survey import (
+    CorpusSurvey,
+    CorpusSurveyor,
+    PluginTotal,
+    estimate_files,
+    sample_files,
+)
+from tei_transform.observer import (
+    DivSiblingObserver,
+    TailTextObserver,
+    TeiHeaderTypeObserver,
+)
+
+
+class CorpusSurveyorTester(unittest.TestCase):
+    def setUp(self):
+        self.data = os.path.join("tests", "testdata")
+        self.surveyor = CorpusSurveyor(
+            {
+                "tail-text": TailTextObserver(),
+                "div-sibling": DivSiblingObserver(),
+                "teiheader-type": TeiHeaderTypeObserver(),
+            }
+        )
+
+    def test_matches_counted_per_plugin(self):
+        file = os.path.join(self.data, "file_with_div_siblings.xml")
+        self.assertEqual(self.surveyor.survey_file(file), {"div-sibling": 3})
+
+    def test_plugins_without_matches_left_out(self):
+        file = os.path.join(self.data, "file_with_tail_text.xml")
+        self.assertEqual(self.surveyor.survey_file(file), {"tail-text": 1})
+
+    def test_nodes_not_transformed(self):
+        surveyor = CorpusSurveyor({"mock": ObservingOnlyObserver({"p"})})
+        file = os.path.join(self.data, "file_with_div_siblings.xml")
+        result = surveyor.survey_file(file)
+        self.assertEqual(result, {"mock": len(etree.parse(file).findall(".//{*}p"))})
+
+    def test_observers_only_applied_to_their_scope(self):
+        surveyor = CorpusSurveyor(
+            {
+                "header": ObservingOnlyObserver({"title", "p"}, scope="teiHeader"),
+                "text": ObservingOnlyObserver({"title", "p"}, scope="text"),
+            }
+        )
+        xml = (
+            b"<TEI><teiHeader><title/><p/></teiHeader>"
+            b"<text><body><p/><p/><p/></body></text></TEI>"
+        )
+        with tempfile.TemporaryDirectory() as tempdir:
+            file = os.path.join(tempdir, "file.xml")
+            with open(file, "wb") as ptr:
+                ptr.write(xml)
+            self.assertEqual(surveyor.survey_file(file), {"header": 2, "text": 3})
+
+    def test_malformed_file_raises_error(self):
+        file = os.path.join(self.data, "malformed_file.xml")
+        with self.assertRaises(etree.XMLSyntaxError):
+            self.surveyor.survey_file(file)
+
+
+class CorpusSurveyTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.survey = CorpusSurvey(["a", "b", "c"], files_total=2)
+        self.survey.add_file("file1.xml", {"a": 2, "b": 1})
+        self.survey.add_file("file2.xml", {"a": 3})
+
+    def test_totals_of_all_files_exact(self):
+        self.assertEqual(
+            self.survey.totals(),
+            {
+                "a": PluginTotal(2, 5, 2, 2, 2),
+                "b": PluginTotal(1, 1, 1, 1, 1),
+                "c": PluginTotal(),
+            },
+        )
+
+    def test_totals_of_sample_estimated_for_corpus(self):
+        survey = CorpusSurvey(["a"], files_total=100)
+        for number in range(10):
+            survey.add_file(f"file{number}.xml", {"a": 1} if number < 5 else {})
+        total = survey.totals()["a"]
+        self.assertEqual(total.estimated_files, 50)
+        self.assertLess(total.estimated_files_low, 50)
+        self.assertGreater(total.estimated_files_high, 50)
+
+    def test_ignored_files_not_part_of_corpus(self):
+        survey = CorpusSurvey(["a"], files_total=2)
+        survey.add_file("file1.xml", {"a": 1})
+        survey.add_ignored_file("file2.xml")
+        self.assertEqual(survey.totals()["a"], PluginTotal(1, 1, 1, 1, 1))
+
+    def test_survey_written_as_json(self):
+        path = os.path.join(self.tempdir.name, "survey.json")
+        self.survey.write(path)
+        with open(path, encoding="utf-8") as ptr:
+            data = json.load(ptr)
+        self.assertEqual(data["files_total"], 2)
+        self.assertEqual(data["files_surveyed"], 2)
+        self.assertEqual(data["total"]["a"]["hits"], 5)
+        self.assertEqual(data["files"]["file1.xml"], {"a": 2, "b": 1})
+
+    def test_survey_written_as_csv(self):
+        path = os.path.join(self.tempdir.name, "survey.csv")
+        self.survey.write(path)
+        with open(path, encoding="utf-8", newline="") as ptr:
+            rows = list(csv.reader(ptr))
+        self.assertEqual(
+            rows[0],
+            [
+                "file",
+                "plugin",
+                "files",
+                "hits",
+                "estimated_files",
+                "estimated_files_low",
+                "estimated_files_high",
+            ],
+        )
+        self.assertIn(["", "a", "2", "5", "2", "2", "2"], rows)
+        self.assertIn(["", "c", "0", "0", "0", "0", "0"], rows)
+        self.assertIn(["file1.xml", "b", "1", "1", "", "", ""], rows)
+
+
+class EstimateFilesTester(unittest.TestCase):
+    def test_estimate_exact_if_all_files_surveyed(self):
+        self.assertEqual(estimate_files(3, 10, 10), (3, 3, 3))
+
+    def test_interval_contains_surveyed_files(self):
+        estimate, low, high = estimate_files(0, 10, 1000)
+        self.assertEqual((estimate, low), (0, 0))
+        self.assertGreater(high, 0)
+        estimate, low, high = estimate_files(10, 10, 1000)
+        self.assertEqual((estimate, high), (1000, 1000))
+        self.assertLess(low, 1000)
+
+    def test_interval_narrower_for_larger_sample(self):
+        _, small_low, small_high = estimate_files(2, 10, 1000)
+        _, large_low, large_high = estimate_files(20, 100, 1000)
+        self.assertLess(large_high - large_low, small_high - small_low)
+
+    def test_nothing_known_without_sample(self):
+        self.assertEqual(estimate_files(0, 0, 10), (0, 0, 10))
+
+
+class SampleFilesTester(unittest.TestCase):
+    def test_all_files_returned_without_sampling(self):
+        self.assertEqual(sample_files(["a", "b"], 1.0), ["a", "b"])
+
+    def test_sample_keeps_order_of_files(self):
+        files = [f"file{number:03}.xml" for number in range(200)]
+        sample = sample_files(files, 0.1, random.Random(1))
+        self.assertEqual(len(sample), 20)
+        self.assertEqual(sample, sorted(sample))
+        self.assertTrue(set(sample) <= set(files))
+
+    def test_at_least_one_file_sampled(self):
+        self.assertEqual(len(sample_files(["a", "b", "c"], 0.01)), 1)
+
+    def test_empty_list_of_files_sampled(self):
+        self.assertEqual(sample_files([], 0.5), [])
+
+
+class ObservingOnlyObserver:
+    def __init__(self, tags, scope=None):
+        self.target_tags = frozenset(tags)
+        self.scope = scope
+
+    def observe(self, node):
+        return True
+
+    def transform_node(self, node):
+        raise AssertionError("node transformed")
@@ -0,0 +1,61 @@
+import unittest
+
+from lxml import etree
+
+from tei_transform.dirty_regions import DirtyRegions
+
+
+class DirtyRegionsTester(unittest.TestCase):
+    def setUp(self):
+        self.root = etree.fromstring("<a><b><c><d/></c><e/></b><f><g/></f></a>")
+        self.dirty = DirtyRegions()
+
+    def test_empty_without_changes(self):
+        self.assertFalse(self.dirty)
+        self.assertEqual(self.dirty.regions(self.root), [])
+
+    def test_region_is_subtree_of_grandparent(self):
+        node = self.root.find(".//d")
+        self.dirty.add(node, node.getparent())
+        self.assertTrue(self.dirty)
+        self.assertEqual(self.dirty.regions(self.root), [(self.root[0], True)])
+
+    def test_old_and_new_parent_of_moved_node_in_regions(self):
+        node = self.root.find(".//d")
+        old_parent = node.getparent()
+        self.root.find(".//g").append(node)
+        self.dirty.add(node, old_parent)
+        self.assertEqual(
+            self.dirty.regions(self.root), [(self.root[0], True), (self.root[1], True)]
+        )
+
+    def test_regions_inside_other_regions_left_out(self):
+        for node in (self.root.find(".//d"), self.root.find(".//g")):
+            self.dirty.add(node, node.getparent())
+        self.assertEqual(self.dirty.regions(self.root), [(self.root, True)])
+
+    def test_removed_regions_left_out(self):
+        node = self.root.find(".//d")
+        self.dirty.add(node, node.getparent())
+        self.root.remove(self.root[0])
+        self.assertEqual(self.dirty.regions(self.root), [])
+
+    def test_transformed_root_observed_without_subtree(self):
+        self.dirty.add(self.root, None)
+        self.assertEqual(self.dirty.regions(self.root), [(self.root, False)])
+
+    def test_transformed_root_inside_subtree_region_left_out(self):
+        self.dirty.add(self.root, None)
+        self.dirty.add(self.root[0], self.root)
+        self.assertEqual(self.dirty.regions(self.root), [(self.root, True)])
+
+    def test_changed_elements_are_parents_of_transformed_nodes(self):
+        node = self.root.find(".//d")
+        old_parent = node.getparent()
+        self.root.find(".//g").append(node)
+        self.dirty.add(node, old_parent)
+        self.dirty.add(self.root, None)
+        self.assertEqual(
+            list(self.dirty.changed_elements()),
+            [old_parent, self.root.find(".//g"), self.root],
+        )
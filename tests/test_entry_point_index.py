@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from tei_transform.entry_point_index import (
+    IndexedEntryPoint,
+    distributions_fingerprint,
+    node_observer_entry_points,
+)
+from tei_transform.observer.id_attribute_observer import IdAttributeObserver
+
+
+class EntryPointIndexTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.index_file = os.path.join(self.tempdir.name, "cache", "index.json")
+
+    def test_entry_points_of_installed_plugins_found(self):
+        entry_points = node_observer_entry_points(self.index_file)
+        self.assertIn("id-attribute", {entry.name for entry in entry_points})
+
+    def test_index_file_written(self):
+        entry_points = node_observer_entry_points(self.index_file)
+        with open(self.index_file, encoding="utf-8") as ptr:
+            index = json.load(ptr)
+        self.assertEqual(index["fingerprint"], distributions_fingerprint())
+        self.assertEqual(len(index["entry_points"]), len(entry_points))
+
+    def test_entry_points_read_from_index(self):
+        self._write_index(distributions_fingerprint(), [["plugin", "module:Class"]])
+        self.assertEqual(
+            node_observer_entry_points(self.index_file),
+            (IndexedEntryPoint("plugin", "module:Class"),),
+        )
+
+    def test_outdated_index_ignored(self):
+        self._write_index("outdated", [["plugin", "module:Class"]])
+        entry_points = node_observer_entry_points(self.index_file)
+        self.assertNotIn("plugin", {entry.name for entry in entry_points})
+        self.assertIn("id-attribute", {entry.name for entry in entry_points})
+
+    def test_invalid_index_ignored(self):
+        os.makedirs(os.path.dirname(self.index_file))
+        with open(self.index_file, "w", encoding="utf-8") as ptr:
+            ptr.write("{invalid")
+        entry_points = node_observer_entry_points(self.index_file)
+        self.assertIn("id-attribute", {entry.name for entry in entry_points})
+
+    def test_unwritable_index_ignored(self):
+        index_file = os.path.join(self.tempdir.name, "file", "index.json")
+        with open(os.path.join(self.tempdir.name, "file"), "w") as ptr:
+            ptr.write("")
+        entry_points = node_observer_entry_points(index_file)
+        self.assertIn("id-attribute", {entry.name for entry in entry_points})
+
+    def test_fingerprint_changes_if_distribution_installed(self):
+        with mock.patch.object(sys, "path", sys.path + [self.tempdir.name]):
+            fingerprint = distributions_fingerprint()
+            os.makedirs(os.path.join(self.tempdir.name, "plugin-1.0.dist-info"))
+            self.assertNotEqual(distributions_fingerprint(), fingerprint)
+
+    def test_fingerprint_changes_if_entry_points_updated(self):
+        dist_info = os.path.join(self.tempdir.name, "plugin-1.0.dist-info")
+        os.makedirs(dist_info)
+        entry_points_file = os.path.join(dist_info, "entry_points.txt")
+        with open(entry_points_file, "w") as ptr:
+            ptr.write("")
+        with mock.patch.object(sys, "path", sys.path + [self.tempdir.name]):
+            fingerprint = distributions_fingerprint()
+            os.utime(entry_points_file, ns=(0, 1))
+            self.assertNotEqual(distributions_fingerprint(), fingerprint)
+
+    def test_fingerprint_unchanged_by_other_files(self):
+        with mock.patch.object(sys, "path", sys.path + [self.tempdir.name]):
+            fingerprint = distributions_fingerprint()
+            with open(os.path.join(self.tempdir.name, "module.py"), "w") as ptr:
+                ptr.write("")
+            self.assertEqual(distributions_fingerprint(), fingerprint)
+
+    def test_indexed_entry_point_loaded(self):
+        entry_point = IndexedEntryPoint(
+            "id-attribute",
+            "tei_transform.observer.id_attribute_observer:IdAttributeObserver",
+        )
+        self.assertIs(entry_point.load(), IdAttributeObserver)
+
+    def test_indexed_entry_point_with_extras_loaded(self):
+        entry_point = IndexedEntryPoint(
+            "id-attribute",
+            "tei_transform.observer.id_attribute_observer:IdAttributeObserver [extra]",
+        )
+        self.assertIs(entry_point.load(), IdAttributeObserver)
+
+    def _write_index(self, fingerprint, entry_points):
+        os.makedirs(os.path.dirname(self.index_file))
+        with open(self.index_file, "w", encoding="utf-8") as ptr:
+            json.dump({"fingerprint": fingerprint, "entry_points": entry_points}, ptr)
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tei_transform.file_copy import copy_file, link_file, unlink_if_shared
+
+
+class FileCopyTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.source = os.path.join(self.tempdir.name, "source.xml")
+        self.destination = os.path.join(self.tempdir.name, "destination.xml")
+        self.content = b"<TEI><teiHeader/><text/></TEI>\n" * 1000
+        with open(self.source, "wb") as ptr:
+            ptr.write(self.content)
+
+    def test_content_copied(self):
+        copy_file(self.source, self.destination)
+        self.assertEqual(self._read(self.destination), self.content)
+        self.assertFalse(os.path.samefile(self.source, self.destination))
+
+    def test_existing_file_replaced(self):
+        with open(self.destination, "wb") as ptr:
+            ptr.write(b"old content, longer than the new content" * 1000)
+        copy_file(self.source, self.destination)
+        self.assertEqual(self._read(self.destination), self.content)
+
+    def test_content_copied_without_kernel_support(self):
+        with mock.patch(
+            "tei_transform.file_copy._reflink", return_value=False
+        ), mock.patch("tei_transform.file_copy._copy_file_range", return_value=False):
+            copy_file(self.source, self.destination)
+        self.assertEqual(self._read(self.destination), self.content)
+
+    def test_copy_to_hard_link_doesnt_change_source(self):
+        os.link(self.source, self.destination)
+        other = os.path.join(self.tempdir.name, "other.xml")
+        with open(other, "wb") as ptr:
+            ptr.write(b"<TEI/>")
+        copy_file(other, self.destination)
+        self.assertEqual(self._read(self.source), self.content)
+        self.assertEqual(self._read(self.destination), b"<TEI/>")
+
+    def test_copy_to_same_file_keeps_content(self):
+        copy_file(self.source, self.source)
+        self.assertEqual(self._read(self.source), self.content)
+
+    def test_hard_link_created(self):
+        link_file(self.source, self.destination)
+        self.assertTrue(os.path.samefile(self.source, self.destination))
+
+    def test_file_copied_if_link_not_possible(self):
+        with mock.patch("os.link", side_effect=OSError):
+            link_file(self.source, self.destination)
+        self.assertEqual(self._read(self.destination), self.content)
+        self.assertFalse(os.path.samefile(self.source, self.destination))
+
+    def test_shared_file_unlinked(self):
+        os.link(self.source, self.destination)
+        unlink_if_shared(self.destination)
+        self.assertFalse(os.path.exists(self.destination))
+        self.assertEqual(self._read(self.source), self.content)
+
+    def test_file_with_single_link_kept(self):
+        unlink_if_shared(self.source)
+        self.assertTrue(os.path.exists(self.source))
+
+    def test_missing_file_ignored(self):
+        unlink_if_shared(self.destination)
+        self.assertFalse(os.path.exists(self.destination))
+
+    def _read(self, path):
+        with open(path, "rb") as ptr:
+            return ptr.read()
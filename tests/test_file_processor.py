@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+
+from tei_transform.cli.file_processor import (
+    CachingFileProcessor,
+    FileOutcome,
+    FileProcessor,
+    JournalingFileProcessor,
+)
+from tei_transform.cli.request import CliRequest
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.result_cache import ResultCache
+from tei_transform.run_journal import (
+    CACHED,
+    IGNORED,
+    SYNTAX_ERROR,
+    TRANSFORMED,
+    UNCHANGED,
+    VALID_COPIED,
+    JournalEntry,
+    RunJournal,
+)
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.xml_tree_iterator import XMLTreeIterator
+from tei_transform.xml_writer import XmlWriterImpl
+
+
+class FakeValidator:
+    def __init__(self, valid):
+        self.valid = valid
+
+    def validate(self, tree):
+        return self.valid
+
+
+class FakeFileProcessor:
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.processed_files = []
+
+    def process(self, file, output_dir, prefetched=None, digest=None):
+        self.processed_files.append(file)
+        return self.outcome
+
+
+class FileProcessorTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.output = self.tempdir.name
+        self.data = os.path.join("tests", "testdata")
+
+    def test_outcome_of_transformed_file(self):
+        file = os.path.join(self.data, "file_with_type_in_teiheader.xml")
+        outcome = self._create_processor().process(file, self.output)
+        self.assertEqual(
+            outcome,
+            FileOutcome(
+                TRANSFORMED,
+                os.path.join(self.output, "file_with_type_in_teiheader.xml"),
+                cacheable=True,
+            ),
+        )
+
+    def test_outcome_of_unchanged_file(self):
+        file = os.path.join(self.data, "file_with_author_type_attr.xml")
+        outcome = self._create_processor().process(file, self.output)
+        self.assertEqual(outcome.status, UNCHANGED)
+        self.assertTrue(os.path.isfile(outcome.output_path))
+
+    def test_outcome_of_empty_file(self):
+        file = os.path.join(self.data, "empty_file.xml")
+        with self.assertLogs(level="ERROR"):
+            outcome = self._create_processor().process(file, self.output)
+        self.assertEqual(outcome, FileOutcome(SYNTAX_ERROR))
+
+    def test_outcome_of_ignored_valid_file(self):
+        file = os.path.join(self.data, "file_with_type_in_teiheader.xml")
+        processor = self._create_processor(validation=True, valid=True)
+        outcome = processor.process(file, self.output)
+        self.assertEqual(outcome, FileOutcome(IGNORED, cacheable=True))
+        self.assertEqual(os.listdir(self.output), [])
+
+    def test_outcome_of_copied_valid_file(self):
+        file = os.path.join(self.data, "file_with_type_in_teiheader.xml")
+        processor = self._create_processor(validation=True, valid=True, copy_valid=True)
+        outcome = processor.process(file, self.output)
+        self.assertEqual(outcome.status, VALID_COPIED)
+        self.assertTrue(os.path.isfile(outcome.output_path))
+
+    def _create_processor(self, valid=False, **options):
+        tei_transformer = TeiTransformer(XMLTreeIterator())
+        tei_transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["teiheader-type"])
+        )
+        return FileProcessor(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=tei_transformer,
+            request=CliRequest("", ["teiheader-type"], **options),
+            validator=lambda: FakeValidator(valid),
+        )
+
+
+class FileProcessorDecoratorTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.file = os.path.join("tests", "testdata", "file_with_id_attribute.xml")
+        self.output_path = os.path.join(self.tempdir.name, "file.xml")
+        with open(self.output_path, "w", encoding="utf-8") as ptr:
+            ptr.write("<TEI/>")
+        self.result_cache = ResultCache(
+            os.path.join(self.tempdir.name, "cache.sqlite"), "run"
+        )
+        self.addCleanup(self.result_cache.close)
+
+    def test_cached_outcome_returned_without_processing(self):
+        outcome = FileOutcome(TRANSFORMED, self.output_path, cacheable=True)
+        self._process_with_cache(FakeFileProcessor(outcome))
+        processor = FakeFileProcessor(outcome)
+        self.assertEqual(
+            self._process_with_cache(processor), FileOutcome(CACHED, self.output_path)
+        )
+        self.assertEqual(processor.processed_files, [])
+
+    def test_outcome_not_cacheable_not_stored(self):
+        self._process_with_cache(FakeFileProcessor(FileOutcome(SYNTAX_ERROR)))
+        processor = FakeFileProcessor(FileOutcome(SYNTAX_ERROR))
+        self._process_with_cache(processor)
+        self.assertEqual(processor.processed_files, [self.file])
+
+    def test_outcome_recorded_in_journal(self):
+        journal = RunJournal()
+        outcome = FileOutcome(TRANSFORMED, self.output_path, cacheable=True)
+        processor = JournalingFileProcessor(
+            FakeFileProcessor(outcome), journal, XmlWriterImpl()
+        )
+        self.assertEqual(processor.process(self.file, self.tempdir.name), outcome)
+        [entry] = journal.entries
+        self.assertEqual(
+            entry,
+            JournalEntry(self.file, TRANSFORMED, entry.duration, self.output_path),
+        )
+
+    def _process_with_cache(self, processor):
+        caching_processor = CachingFileProcessor(
+            processor, self.result_cache, XmlWriterImpl()
+        )
+        return caching_processor.process(self.file, self.tempdir.name)
@@ -0,0 +1,48 @@
+import os
+import unittest
+
+from tei_transform.cli.input_files import InputFiles
+from tei_transform.run_journal import TRANSFORMED, JournalEntry, RunJournal
+from tei_transform.sharding import Shard
+
+
+class InputFilesTester(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = os.path.join("tests", "testdata", "dir_with_files")
+        self.files = [
+            os.path.join(self.input_dir, "file%d.xml" % number)
+            for number in range(1, 4)
+        ]
+
+    def test_files_of_directory_with_output_directories(self):
+        input_files = InputFiles(self.input_dir, "output")
+        self.assertEqual(
+            sorted(input_files),
+            [(file, os.path.join("output", "dir_with_files")) for file in self.files],
+        )
+
+    def test_single_file_written_to_output(self):
+        input_files = InputFiles(self.files[0], "output")
+        self.assertEqual(list(input_files), [(self.files[0], "output")])
+
+    def test_files_of_other_shards_left_out(self):
+        shards = [
+            sorted(
+                file for file, _ in InputFiles(self.input_dir, "output", shard=shard)
+            )
+            for shard in [Shard(1, 2), Shard(2, 2)]
+        ]
+        self.assertEqual(sorted(shards[0] + shards[1]), self.files)
+
+    def test_files_completed_in_journal_left_out(self):
+        journal = RunJournal()
+        journal.add(JournalEntry(self.files[1], TRANSFORMED, 0.1))
+        input_files = InputFiles(self.input_dir, "output", journal=journal)
+        self.assertEqual(
+            sorted(file for file, _ in input_files), [self.files[0], self.files[2]]
+        )
+
+    def test_files_scheduled_by_cost(self):
+        input_files = InputFiles(self.input_dir, "output")
+        tasks = input_files.scheduled("largest-first", lambda file: int(file[-5]))
+        self.assertEqual([file for file, _ in tasks], self.files[::-1])
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from tei_transform.memory_limit import (
+    MemoryLimit,
+    MemoryLimitTooLow,
+    estimate_tree_size,
+    resident_set_size,
+)
+
+
+class MemoryLimitTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.prose = self._write_file("prose.xml", b"<p>" + b"text " * 1000 + b"</p>")
+        self.markup = self._write_file("markup.xml", b"<p n='1'/>" * 500)
+
+    def test_resident_set_size_determined(self):
+        self.assertGreater(resident_set_size(), 0)
+
+    def test_estimate_larger_than_file(self):
+        self.assertGreater(estimate_tree_size(self.prose), os.path.getsize(self.prose))
+
+    def test_estimate_larger_for_markup_than_for_text(self):
+        self.assertGreater(os.path.getsize(self.prose), os.path.getsize(self.markup))
+        self.assertGreater(
+            estimate_tree_size(self.markup), estimate_tree_size(self.prose)
+        )
+
+    def test_file_within_limit_accepted(self):
+        limit = MemoryLimit(resident_set_size() + (1 << 30))
+        limit.measure_baseline()
+        self.assertIsNone(limit.estimate_exceeding(self.markup))
+        self.assertFalse(limit.is_exceeded())
+
+    def test_file_exceeding_headroom_rejected(self):
+        size = estimate_tree_size(self.markup)
+        limit = MemoryLimit(resident_set_size() + (1 << 30))
+        limit.measure_baseline()
+        limit.baseline = limit.max_bytes - size + 1
+        self.assertEqual(limit.estimate_exceeding(self.markup), size)
+
+    def test_only_cost_of_file_compared_with_headroom(self):
+        # the memory the process already uses doesn't count twice
+        size = estimate_tree_size(self.markup)
+        limit = MemoryLimit(1 << 40)
+        limit.baseline = limit.max_bytes - size
+        self.assertIsNone(limit.estimate_exceeding(self.markup))
+
+    def test_baseline_exceeding_limit_rejected(self):
+        limit = MemoryLimit(1)
+        with self.assertRaises(MemoryLimitTooLow):
+            limit.measure_baseline()
+        self.assertTrue(limit.is_exceeded())
+
+    def test_estimate_counts_each_tree(self):
+        size = estimate_tree_size(self.markup)
+        limit = MemoryLimit(1 << 40)
+        limit.baseline = limit.max_bytes - size - size // 2
+        self.assertIsNone(limit.estimate_exceeding(self.markup))
+        self.assertEqual(limit.estimate_exceeding(self.markup, trees=2), 2 * size)
+
+    def _write_file(self, name, data):
+        path = os.path.join(self.tempdir.name, name)
+        with open(path, "wb") as ptr:
+            ptr.write(data)
+        return path
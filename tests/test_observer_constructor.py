@@ -47,6 +47,28 @@ class ObserverConstructorTester(unittest.TestCase):
             InvalidObserver, self.constructor.construct_observers, ["fake-observer"]
         )
 
+    def test_exception_raised_if_observer_has_invalid_scope(self):
+        add_mock_plugin_entry_point(
+            self.constructor,
+            "invalid-scope",
+            "tests.mock_observer:MockObserverInvalidScope",
+        )
+        self.assertRaises(
+            InvalidObserver, self.constructor.construct_observers, ["invalid-scope"]
+        )
+
+    def test_exception_raised_if_observer_has_invalid_dependency(self):
+        add_mock_plugin_entry_point(
+            self.constructor,
+            "invalid-dependency",
+            "tests.mock_observer:MockObserverInvalidDependency",
+        )
+        self.assertRaises(
+            InvalidObserver,
+            self.constructor.construct_observers,
+            ["invalid-dependency"],
+        )
+
     def test_double_p_like_observer_added_last(self):
         plugins = list(self.constructor.plugins_by_name.keys())
         for _ in range(10):
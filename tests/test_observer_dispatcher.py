@@ -0,0 +1,203 @@
+import glob
+import os
+import unittest
+
+from lxml import etree
+
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.observer_dispatcher import ObserverDispatcher
+from tei_transform.parse_config import parse_config_file
+
+
+class ObserverDispatcherTester(unittest.TestCase):
+    def test_only_observers_with_matching_target_tag_dispatched(self):
+        first, second = TaggedObserver({"p"}), TaggedObserver({"div"})
+        dispatcher = ObserverDispatcher([first, second])
+        node = etree.Element("p")
+        self.assertEqual(list(dispatcher.dispatch(node)), [first])
+
+    def test_namespace_ignored_for_lookup(self):
+        observer = TaggedObserver({"p"})
+        dispatcher = ObserverDispatcher([observer])
+        node = etree.Element("{http://www.tei-c.org/ns/1.0}p")
+        self.assertEqual(list(dispatcher.dispatch(node)), [observer])
+
+    def test_observers_without_target_tags_dispatched_for_every_node(self):
+        observer = WildcardObserver()
+        dispatcher = ObserverDispatcher([observer])
+        for tag in ["p", "div", "{http://www.tei-c.org/ns/1.0}text"]:
+            with self.subTest():
+                node = etree.Element(tag)
+                self.assertEqual(list(dispatcher.dispatch(node)), [observer])
+
+    def test_observer_with_empty_target_tags_never_dispatched(self):
+        dispatcher = ObserverDispatcher([TaggedObserver(set())])
+        node = etree.Element("p")
+        self.assertEqual(list(dispatcher.dispatch(node)), [])
+
+    def test_order_of_observers_preserved(self):
+        observers = [
+            TaggedObserver({"p"}),
+            WildcardObserver(),
+            TaggedObserver({"p", "ab"}),
+            WildcardObserver(),
+        ]
+        dispatcher = ObserverDispatcher(observers)
+        node = etree.Element("p")
+        self.assertEqual(list(dispatcher.dispatch(node)), observers)
+
+    def test_comment_only_dispatched_to_wildcard_observers(self):
+        wildcard = WildcardObserver()
+        dispatcher = ObserverDispatcher([TaggedObserver({"p"}), wildcard])
+        node = etree.Comment("comment")
+        self.assertEqual(list(dispatcher.dispatch(node)), [wildcard])
+
+    def test_remaining_observers_looked_up_again_after_tag_change(self):
+        renamed = TaggedObserver({"p"})
+        before = TaggedObserver({"ab"})
+        after = TaggedObserver({"ab"})
+        dispatcher = ObserverDispatcher([before, renamed, after])
+        node = etree.Element("p")
+        result = []
+        for observer in dispatcher.dispatch(node):
+            result.append(observer)
+            if observer is renamed:
+                node.tag = "ab"
+        self.assertEqual(result, [renamed, after])
+
+    def test_node_without_required_parent_not_dispatched(self):
+        observer = TaggedObserver({"p"}, required_parents={"div"})
+        dispatcher = ObserverDispatcher([observer])
+        root = etree.Element("body")
+        node = etree.SubElement(root, "p")
+        self.assertEqual(list(dispatcher.dispatch(node)), [])
+
+    def test_node_with_required_parent_dispatched(self):
+        observer = TaggedObserver({"p"}, required_parents={"div"})
+        dispatcher = ObserverDispatcher([observer])
+        root = etree.Element("{http://www.tei-c.org/ns/1.0}div")
+        node = etree.SubElement(root, "{http://www.tei-c.org/ns/1.0}p")
+        self.assertEqual(list(dispatcher.dispatch(node)), [observer])
+
+    def test_node_without_parent_not_dispatched_if_parent_required(self):
+        observer = TaggedObserver({"p"}, required_parents={"div"})
+        dispatcher = ObserverDispatcher([observer])
+        node = etree.Element("p")
+        self.assertEqual(list(dispatcher.dispatch(node)), [])
+
+    def test_node_dispatched_if_one_of_required_attributes_present(self):
+        observer = TaggedObserver({"p"}, required_attributes={"id", "type"})
+        dispatcher = ObserverDispatcher([observer])
+        nodes = [
+            etree.Element("p", {"id": "a"}),
+            etree.Element("p", {"type": "a"}),
+            etree.Element("p", {"rend": "a"}),
+        ]
+        result = [list(dispatcher.dispatch(node)) for node in nodes]
+        self.assertEqual(result, [[observer], [observer], []])
+
+    def test_observers_for_node_same_as_dispatched(self):
+        observers = [
+            TaggedObserver({"p"}, required_parents={"div"}),
+            WildcardObserver(),
+            TaggedObserver({"p"}, required_attributes={"id"}),
+            TaggedObserver({"ab"}),
+        ]
+        dispatcher = ObserverDispatcher(observers)
+        root = etree.Element("div")
+        nodes = [
+            etree.SubElement(root, "p"),
+            etree.Element("p", {"id": "a"}),
+            etree.Comment("comment"),
+        ]
+        for node in nodes:
+            with self.subTest(node=node):
+                self.assertEqual(
+                    dispatcher.observers_for(node), list(dispatcher.dispatch(node))
+                )
+
+    def test_only_observers_for_scope_contained_in_dispatcher(self):
+        header = TaggedObserver({"p"}, scope="teiHeader")
+        text = TaggedObserver({"p"}, scope="text")
+        any_scope = TaggedObserver({"p"})
+        observers = [header, text, any_scope]
+        result = [
+            ObserverDispatcher(observers, scope).observers
+            for scope in [None, "teiHeader", "text"]
+        ]
+        self.assertEqual(result, [observers, [header, any_scope], [text, any_scope]])
+
+    def test_declared_metadata_of_plugins_covers_all_matches(self):
+        constructor = ObserverConstructor()
+        config = parse_config_file(
+            os.path.join("tests", "testdata", "conf_files", "default.cfg")
+        )
+        first, second = constructor.construct_observers(
+            list(constructor.plugins_by_name), config
+        )
+        files = glob.glob(
+            os.path.join("tests", "testdata", "**", "*.xml"), recursive=True
+        )
+        unexpected_matches = []
+        for file in files:
+            try:
+                tree = etree.parse(file)
+            except etree.XMLSyntaxError:
+                continue
+            for node in tree.iter(tag=etree.Element):
+                for observer in first + second:
+                    if not self._passes_prefilter(node, observer):
+                        if observer.observe(node):
+                            unexpected_matches.append(
+                                (type(observer).__name__, file, node.tag)
+                            )
+        self.assertEqual(unexpected_matches, [])
+
+    def _passes_prefilter(self, node, observer):
+        localname = etree.QName(node).localname
+        if observer.target_tags is not None and localname not in observer.target_tags:
+            return False
+        parent = node.getparent()
+        if observer.required_parents is not None and (
+            parent is None
+            or etree.QName(parent).localname not in observer.required_parents
+        ):
+            return False
+        if (
+            observer.required_attributes is not None
+            and observer.required_attributes.isdisjoint(node.attrib)
+        ):
+            return False
+        if observer.scope is not None:
+            scope_nodes = [
+                ancestor for ancestor in node.iterancestors("{*}teiHeader", "{*}text")
+            ]
+            if localname in {"teiHeader", "text"}:
+                scope_nodes.insert(0, node)
+            if scope_nodes and etree.QName(scope_nodes[-1]).localname != observer.scope:
+                return False
+        return True
+
+
+class TaggedObserver:
+    def __init__(
+        self, target_tags, required_parents=None, required_attributes=None, scope=None
+    ):
+        self.target_tags = frozenset(target_tags)
+        self.required_parents = required_parents
+        self.required_attributes = required_attributes
+        self.scope = scope
+
+    def observe(self, node):
+        return True
+
+    def transform_node(self, node):
+        pass
+
+
+class WildcardObserver:
+    def observe(self, node):
+        return True
+
+    def transform_node(self, node):
+        pass
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+import unittest
+
+import tei_transform.observer
+from tei_transform.observer.id_attribute_observer import IdAttributeObserver
+
+
+class ObserverPackageTester(unittest.TestCase):
+    def test_observer_modules_not_imported_with_package(self):
+        code = (
+            "import sys, tei_transform.observer;"
+            "print(sum(name.startswith('tei_transform.observer.')"
+            " for name in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "0")
+
+    def test_observer_imported_on_access(self):
+        from tei_transform.observer import IdAttributeObserver as observer
+
+        self.assertIs(observer, IdAttributeObserver)
+
+    def test_all_observers_accessible(self):
+        for name in tei_transform.observer.__all__:
+            with self.subTest(observer=name):
+                self.assertEqual(getattr(tei_transform.observer, name).__name__, name)
+
+    def test_unknown_attribute_raises_error(self):
+        with self.assertRaises(AttributeError):
+            tei_transform.observer.UnknownObserver
+
+    def test_observers_listed_by_dir(self):
+        self.assertIn("IdAttributeObserver", dir(tei_transform.observer))
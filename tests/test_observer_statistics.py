@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from tei_transform.observer import TeiHeaderTypeObserver
+from tei_transform.observer_statistics import (
+    ObserverStatistics,
+    TransformationProfile,
+)
+
+
+class ObserverStatisticsTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.profile = TransformationProfile()
+
+    def test_statistics_added(self):
+        statistics = ObserverStatistics(2, 1, 0.5, 0.25, 0)
+        statistics.add(ObserverStatistics(3, 1, 0.5, 0.25, 1))
+        self.assertEqual(statistics, ObserverStatistics(5, 2, 1.0, 0.5, 1))
+
+    def test_statistics_of_observer_identified_by_class_name(self):
+        statistics = self.profile.statistics("file.xml", TeiHeaderTypeObserver())
+        statistics.observe_calls += 1
+        self.assertEqual(
+            self.profile.files,
+            {"file.xml": {"TeiHeaderTypeObserver": ObserverStatistics(1)}},
+        )
+
+    def test_same_statistics_returned_for_file_and_observer(self):
+        first = self.profile.statistics("file.xml", TeiHeaderTypeObserver())
+        second = self.profile.statistics("file.xml", TeiHeaderTypeObserver())
+        self.assertIs(first, second)
+
+    def test_statistics_aggregated_over_files(self):
+        self._add_statistics()
+        self.assertEqual(
+            self.profile.aggregate(),
+            {
+                "ObserverA": ObserverStatistics(3, 2, 0.75, 0.5, 0),
+                "ObserverB": ObserverStatistics(4, 0, 1.0, 0.0, 1),
+            },
+        )
+
+    def test_statistics_of_file_moved_to_other_profile(self):
+        self._add_statistics()
+        other_profile = TransformationProfile()
+        other_profile.add_file("file1.xml", self.profile.pop_file("file1.xml"))
+        self.assertEqual(list(self.profile.files), ["file2.xml"])
+        self.assertEqual(
+            other_profile.files["file1.xml"]["ObserverA"],
+            ObserverStatistics(1, 1, 0.25, 0.25, 0),
+        )
+
+    def test_pop_unknown_file_returns_empty_statistics(self):
+        self.assertEqual(self.profile.pop_file("file.xml"), {})
+
+    def test_statistics_written_as_json(self):
+        self._add_statistics()
+        path = os.path.join(self.tempdir.name, "stats.json")
+        self.profile.write(path)
+        with open(path, encoding="utf-8") as ptr:
+            result = json.load(ptr)
+        self.assertEqual(result["total"]["ObserverB"]["observe_calls"], 4)
+        self.assertEqual(result["files"]["file2.xml"]["ObserverA"]["matches"], 1)
+
+    def test_statistics_written_as_csv(self):
+        self._add_statistics()
+        path = os.path.join(self.tempdir.name, "stats.csv")
+        self.profile.write(path)
+        with open(path, encoding="utf-8", newline="") as ptr:
+            rows = list(csv.DictReader(ptr))
+        self.assertEqual(len(rows), 5)
+        totals = [row for row in rows if row["file"] == ""]
+        self.assertEqual(
+            [(row["observer"], row["observe_calls"]) for row in totals],
+            [("ObserverA", "3"), ("ObserverB", "4")],
+        )
+        self.assertEqual(
+            rows[-1],
+            {
+                "file": "file2.xml",
+                "observer": "ObserverB",
+                "observe_calls": "4",
+                "matches": "0",
+                "observe_time": "1.0",
+                "transform_time": "0.0",
+                "transformation_errors": "1",
+            },
+        )
+
+    def _add_statistics(self):
+        self.profile.add_file(
+            "file1.xml", {"ObserverA": ObserverStatistics(1, 1, 0.25, 0.25, 0)}
+        )
+        self.profile.add_file(
+            "file2.xml",
+            {
+                "ObserverA": ObserverStatistics(2, 1, 0.5, 0.25, 0),
+                "ObserverB": ObserverStatistics(4, 0, 1.0, 0.0, 1),
+            },
+        )
@@ -0,0 +1,172 @@
+import os
+import threading
+import unittest
+
+from lxml import etree
+
+from tei_transform.pipeline import QueuedXmlWriter, prefetch_files
+
+
+class PrefetchFilesTester(unittest.TestCase):
+    def setUp(self):
+        self.data = os.path.join("tests", "testdata")
+        self.files = [
+            (os.path.join(self.data, "file_with_double_item.xml"), "out1"),
+            (os.path.join(self.data, "malformed_file.xml"), "out2"),
+            (os.path.join(self.data, "file_with_tail_text.xml"), "out3"),
+        ]
+
+    def test_files_yielded_in_order(self):
+        result = [
+            (prefetched.file, prefetched.output_dir)
+            for prefetched in prefetch_files(self.files, depth=1)
+        ]
+        self.assertEqual(result, self.files)
+
+    def test_files_parsed(self):
+        first, _, _ = prefetch_files(self.files, depth=2)
+        self.assertEqual(etree.QName(first.tree.getroot()).localname, "TEI")
+        self.assertIsNone(first.error)
+
+    def test_parse_error_returned(self):
+        _, malformed, _ = prefetch_files(self.files, depth=2)
+        self.assertIsNone(malformed.tree)
+        self.assertIsInstance(malformed.error, etree.XMLSyntaxError)
+
+    def test_files_only_read_if_not_parsed(self):
+        for prefetched in prefetch_files(self.files, depth=2, parse=False):
+            self.assertIsNone(prefetched.tree)
+            self.assertIsNone(prefetched.error)
+
+    def test_error_of_input_raised(self):
+        def files():
+            yield self.files[0]
+            raise OSError("directory not readable")
+
+        prefetched = prefetch_files(files(), depth=1)
+        next(prefetched)
+        with self.assertRaises(OSError):
+            next(prefetched)
+
+    def test_missing_file_raises_error(self):
+        with self.assertRaises(OSError):
+            list(prefetch_files([("missing.xml", "out")], depth=1, parse=False))
+
+    def test_reader_stopped_if_iteration_ends_early(self):
+        threads = threading.active_count()
+        prefetched = prefetch_files(self.files * 10, depth=1)
+        next(prefetched)
+        prefetched.close()
+        self.assertEqual(threading.active_count(), threads)
+
+
+class QueuedXmlWriterTester(unittest.TestCase):
+    def setUp(self):
+        self.recording_writer = RecordingXmlWriter()
+        self.xml_writer = QueuedXmlWriter(self.recording_writer, depth=2)
+
+    def test_calls_passed_in_order(self):
+        root = etree.Element("TEI")
+        self.xml_writer.create_output_directories("output")
+        self.xml_writer.write_xml("output/a.xml", root)
+        self.xml_writer.copy_unchanged_file("b.xml", "output/b.xml", link=True)
+        self.xml_writer.copy_valid_files("c.xml", "output")
+        self.xml_writer.close()
+        self.assertEqual(
+            self.recording_writer.calls,
+            [
+                ("create_output_directories", ("output",)),
+                ("write_xml", ("output/a.xml", root, None)),
+                ("copy_unchanged_file", ("b.xml", "output/b.xml", True)),
+                ("copy_valid_files", ("c.xml", "output")),
+            ],
+        )
+
+    def test_calls_finished_after_join(self):
+        self.xml_writer.create_output_directories("output")
+        self.xml_writer.join()
+        self.assertEqual(len(self.recording_writer.calls), 1)
+        self.xml_writer.close()
+
+    def test_calls_made_in_other_thread(self):
+        self.xml_writer.create_output_directories("output")
+        self.xml_writer.close()
+        self.assertNotEqual(self.recording_writer.threads, {threading.get_ident()})
+
+    def test_stream_written_after_pending_calls(self):
+        self.xml_writer.create_output_directories("output")
+        written = self.xml_writer.write_stream("output/a.xml", [b"<TEI/>"])
+        self.assertTrue(written)
+        self.assertEqual(
+            [name for name, _ in self.recording_writer.calls],
+            ["create_output_directories", "write_stream"],
+        )
+        self.xml_writer.close()
+
+    def test_error_raised_by_join(self):
+        self.recording_writer.error = OSError("disk full")
+        self.xml_writer.create_output_directories("output")
+        with self.assertRaises(OSError):
+            self.xml_writer.join()
+        self.xml_writer.close()
+
+    def test_error_raised_on_close(self):
+        self.recording_writer.error = OSError("disk full")
+        self.xml_writer.create_output_directories("output")
+        with self.assertRaises(OSError):
+            self.xml_writer.close()
+
+    def test_calls_after_error_not_made(self):
+        self.recording_writer.error = OSError("disk full")
+        self.xml_writer.create_output_directories("output")
+        self.xml_writer.copy_valid_files("c.xml", "output")
+        with self.assertRaises(OSError):
+            self.xml_writer.close()
+        self.assertEqual(len(self.recording_writer.calls), 1)
+
+    def test_function_called_after_writes(self):
+        calls = []
+        self.xml_writer.write_xml("output/a.xml", etree.Element("TEI"))
+        self.xml_writer.call_after_writes(
+            lambda name: calls.append((name, len(self.recording_writer.calls))), "a"
+        )
+        self.xml_writer.close()
+        self.assertEqual(calls, [("a", 1)])
+
+    def test_function_not_called_after_error(self):
+        calls = []
+        self.recording_writer.error = OSError("disk full")
+        self.xml_writer.write_xml("output/a.xml", etree.Element("TEI"))
+        self.xml_writer.call_after_writes(calls.append, "a")
+        with self.assertRaises(OSError):
+            self.xml_writer.close()
+        self.assertEqual(calls, [])
+
+
+class RecordingXmlWriter:
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+        self.error = None
+
+    def _record(self, name, *args):
+        self.calls.append((name, args))
+        self.threads.add(threading.get_ident())
+        if self.error is not None:
+            raise self.error
+
+    def write_xml(self, path, xml, unparsed_text=None):
+        self._record("write_xml", path, xml, unparsed_text)
+
+    def write_stream(self, path, chunks):
+        self._record("write_stream", path, b"".join(chunks))
+        return True
+
+    def create_output_directories(self, output_dir):
+        self._record("create_output_directories", output_dir)
+
+    def copy_valid_files(self, file, output_dir):
+        self._record("copy_valid_files", file, output_dir)
+
+    def copy_unchanged_file(self, file, path, link=False):
+        self._record("copy_unchanged_file", file, path, link)
@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tei_transform.quarantine import Quarantine, QuarantinedFile
+from tei_transform.transformation_budget import BudgetExceeded
+
+
+class QuarantineTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = os.path.join(self.tempdir.name, "quarantine.jsonl")
+        self.quarantined = QuarantinedFile.from_error(
+            "file.xml",
+            BudgetExceeded(
+                "Time budget of 1s exceeded", "DivSiblingObserver", 1.23456, 10
+            ),
+        )
+
+    def test_quarantined_file_written_as_json_line(self):
+        quarantine = Quarantine(self.path)
+        quarantine.add(self.quarantined)
+        quarantine.add(self.quarantined)
+        with open(self.path, encoding="utf-8") as ptr:
+            lines = ptr.readlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            json.loads(lines[0]),
+            {
+                "file": "file.xml",
+                "reason": "Time budget of 1s exceeded",
+                "observer": "DivSiblingObserver",
+                "elapsed": 1.235,
+                "nodes": 10,
+            },
+        )
+
+    def test_list_of_previous_run_replaced(self):
+        Quarantine(self.path).add(self.quarantined)
+        Quarantine(self.path)
+        self.assertEqual(os.path.getsize(self.path), 0)
+
+    def test_quarantined_files_kept_in_memory_without_path(self):
+        quarantine = Quarantine()
+        quarantine.add(self.quarantined)
+        self.assertEqual(quarantine.pop_files(), [self.quarantined])
+        self.assertEqual(quarantine.files, [])
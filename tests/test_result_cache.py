@@ -0,0 +1,159 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from tei_transform.parse_config import RevisionDescChange
+from tei_transform.result_cache import (
+    CachedResult,
+    ResultCache,
+    file_digest,
+    run_fingerprint,
+)
+from tei_transform.tag_scan import TagScan
+
+
+class ResultCacheTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.input_file = self._write_file("input.xml", "<TEI/>")
+        self.output_file = self._write_file("output.xml", "<TEI/>")
+        self.cache = ResultCache(os.path.join(self.tempdir.name, "cache.db"), "run")
+        self.addCleanup(self.cache.close)
+
+    def test_lookup_of_unknown_key_returns_none(self):
+        self.assertIsNone(self.cache.lookup("unknown"))
+
+    def test_stored_result_found(self):
+        key = self.cache.key(self.input_file, "output")
+        result = CachedResult.for_output(self.output_file, tree_changed=True)
+        self.cache.store(key, result)
+        self.assertEqual(self.cache.lookup(key), result)
+
+    def test_results_persist_between_instances(self):
+        key = self.cache.key(self.input_file, "output")
+        self.cache.store(key, CachedResult(output_path=None, tree_changed=False))
+        self.cache.close()
+        cache = ResultCache(self.cache.path, "run")
+        self.addCleanup(cache.close)
+        self.assertEqual(
+            cache.lookup(key), CachedResult(output_path=None, tree_changed=False)
+        )
+
+    def test_key_changes_with_file_content(self):
+        key = self.cache.key(self.input_file, "output")
+        self._write_file("input.xml", "<TEI><teiHeader/></TEI>")
+        self.assertNotEqual(self.cache.key(self.input_file, "output"), key)
+
+    def test_key_changes_with_output_dir(self):
+        self.assertNotEqual(
+            self.cache.key(self.input_file, "output"),
+            self.cache.key(self.input_file, "other"),
+        )
+
+    def test_key_changes_with_run_fingerprint(self):
+        other_cache = ResultCache(self.cache.path, "other run")
+        self.assertNotEqual(
+            self.cache.key(self.input_file, "output"),
+            other_cache.key(self.input_file, "output"),
+        )
+
+    def test_key_changes_with_file_name(self):
+        copy = self._write_file("copy.xml", "<TEI/>")
+        self.assertNotEqual(
+            self.cache.key(self.input_file, "output"),
+            self.cache.key(copy, "output"),
+        )
+
+    def test_output_intact_if_unchanged(self):
+        result = CachedResult.for_output(self.output_file, tree_changed=False)
+        self.assertTrue(result.output_is_intact())
+
+    def test_output_not_intact_if_removed(self):
+        result = CachedResult.for_output(self.output_file, tree_changed=False)
+        os.remove(self.output_file)
+        self.assertFalse(result.output_is_intact())
+
+    def test_output_not_intact_if_modified(self):
+        result = CachedResult.for_output(self.output_file, tree_changed=False)
+        self._write_file("output.xml", "<TEI><text/></TEI>")
+        self.assertFalse(result.output_is_intact())
+
+    def test_result_without_output_always_intact(self):
+        result = CachedResult(output_path=None, tree_changed=False)
+        self.assertTrue(result.output_is_intact())
+
+    def test_cache_picklable_after_use(self):
+        key = self.cache.key(self.input_file, "output")
+        self.cache.store(key, CachedResult(output_path=None, tree_changed=True))
+        cache = pickle.loads(pickle.dumps(self.cache))
+        self.addCleanup(cache.close)
+        self.assertTrue(cache.lookup(key).tree_changed)
+
+    def test_lookup_of_unknown_scan_returns_none(self):
+        self.assertIsNone(self.cache.lookup_scan(file_digest(self.input_file)))
+
+    def test_stored_scan_found_by_digest_of_file(self):
+        scan = TagScan(frozenset({"TEI"}), frozenset())
+        self.cache.store_scan(file_digest(self.input_file), scan)
+        other_cache = ResultCache(self.cache.path, "other run")
+        self.addCleanup(other_cache.close)
+        self.assertEqual(other_cache.lookup_scan(file_digest(self.output_file)), scan)
+
+    def test_file_digest_of_identical_content_equal(self):
+        self.assertEqual(file_digest(self.input_file), file_digest(self.output_file))
+
+    def test_run_fingerprint_depends_on_order_of_observers(self):
+        self.assertNotEqual(
+            run_fingerprint(["a", "b"], None, False, False, None),
+            run_fingerprint(["b", "a"], None, False, False, None),
+        )
+
+    def test_run_fingerprint_depends_on_config_content(self):
+        config = self._write_file("config.txt", "[revision]\nperson = A\n")
+        fingerprint = run_fingerprint(["a"], config, False, False, None)
+        self._write_file("config.txt", "[revision]\nperson = B\n")
+        self.assertNotEqual(
+            run_fingerprint(["a"], config, False, False, None), fingerprint
+        )
+
+    def test_run_fingerprint_depends_on_validation_options(self):
+        self.assertNotEqual(
+            run_fingerprint(["a"], None, True, False, None),
+            run_fingerprint(["a"], None, True, True, None),
+        )
+
+    def test_run_fingerprint_depends_on_revision_date(self):
+        self.assertNotEqual(
+            run_fingerprint(
+                ["a"], None, False, False, RevisionDescChange(["A"], "2022-01-01", "")
+            ),
+            run_fingerprint(
+                ["a"], None, False, False, RevisionDescChange(["A"], "2022-01-02", "")
+            ),
+        )
+
+    def test_run_fingerprint_depends_on_output_of_unchanged_files(self):
+        self.assertNotEqual(
+            run_fingerprint(["a"], None, False, False, None, "write"),
+            run_fingerprint(["a"], None, False, False, None, "copy"),
+        )
+
+    def test_run_fingerprint_depends_on_max_rounds(self):
+        self.assertNotEqual(
+            run_fingerprint(["a"], None, False, False, None),
+            run_fingerprint(["a"], None, False, False, None, max_rounds=10),
+        )
+
+    def test_run_fingerprint_depends_on_remove_comments(self):
+        self.assertNotEqual(
+            run_fingerprint(["a"], None, False, False, None),
+            run_fingerprint(["a"], None, False, False, None, remove_comments=True),
+        )
+
+    def _write_file(self, name, content):
+        path = os.path.join(self.tempdir.name, name)
+        with open(path, "w", encoding="utf-8") as ptr:
+            ptr.write(content)
+        return path
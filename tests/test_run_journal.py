@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tei_transform.run_journal import (
+    TRANSFORMED,
+    JournalEntry,
+    JournalMismatch,
+    RunJournal,
+)
+
+
+class RunJournalTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = os.path.join(self.tempdir.name, "journal.jsonl")
+        self.run = {"run": "fingerprint", "input": "/input", "output": "/output"}
+        self.entry = JournalEntry("input/a.xml", TRANSFORMED, 0.5, "output/a.xml")
+
+    def test_run_and_entries_written_as_json_lines(self):
+        journal = RunJournal.open(self.path, self.run, resume=False)
+        journal.add(self.entry)
+        journal.close()
+        self.assertEqual(
+            self._read_lines(),
+            [
+                self.run,
+                {
+                    "file": "input/a.xml",
+                    "status": "transformed",
+                    "duration": 0.5,
+                    "output": "output/a.xml",
+                },
+            ],
+        )
+
+    def test_entries_written_immediately(self):
+        journal = RunJournal.open(self.path, self.run, resume=False)
+        self.addCleanup(journal.close)
+        journal.add(self.entry)
+        self.assertEqual(len(self._read_lines()), 2)
+
+    def test_completed_files_read_when_resumed(self):
+        journal = RunJournal.open(self.path, self.run, resume=False)
+        journal.add(self.entry)
+        journal.close()
+        journal = RunJournal.open(self.path, self.run, resume=True)
+        self.assertTrue(journal.is_completed("input/a.xml"))
+        self.assertFalse(journal.is_completed("input/b.xml"))
+        journal.add(JournalEntry("input/b.xml", TRANSFORMED, 0.1))
+        journal.close()
+        self.assertEqual(len(self._read_lines()), 3)
+
+    def test_journal_replaced_if_not_resumed(self):
+        journal = RunJournal.open(self.path, self.run, resume=False)
+        journal.add(self.entry)
+        journal.close()
+        journal = RunJournal.open(self.path, self.run, resume=False)
+        journal.close()
+        self.assertFalse(journal.is_completed("input/a.xml"))
+        self.assertEqual(self._read_lines(), [self.run])
+
+    def test_new_journal_started_if_resumed_without_journal(self):
+        journal = RunJournal.open(self.path, self.run, resume=True)
+        journal.close()
+        self.assertEqual(self._read_lines(), [self.run])
+
+    def test_journal_of_other_run_not_resumed(self):
+        RunJournal.open(self.path, self.run, resume=False).close()
+        other_run = dict(self.run, output="/other")
+        with self.assertRaises(JournalMismatch):
+            RunJournal.open(self.path, other_run, resume=True)
+
+    def test_incomplete_last_line_ignored(self):
+        journal = RunJournal.open(self.path, self.run, resume=False)
+        journal.add(self.entry)
+        journal.close()
+        with open(self.path, "a", encoding="utf-8") as ptr:
+            ptr.write('{"file": "input/b.xml", "sta')
+        journal = RunJournal.open(self.path, self.run, resume=True)
+        self.assertFalse(journal.is_completed("input/b.xml"))
+        journal.add(JournalEntry("input/c.xml", TRANSFORMED, 0.1))
+        journal.close()
+        journal = RunJournal.open(self.path, self.run, resume=True)
+        journal.close()
+        self.assertTrue(journal.is_completed("input/a.xml"))
+        self.assertTrue(journal.is_completed("input/c.xml"))
+
+    def test_lines_without_file_ignored(self):
+        journal = RunJournal.open(self.path, self.run, resume=False)
+        journal.add(self.entry)
+        journal.close()
+        with open(self.path, "a", encoding="utf-8") as ptr:
+            ptr.write(
+                '[]\n"input/b.xml"\nnull\n{"status": "transformed"}\n{"file": 1}\n'
+            )
+        journal = RunJournal.open(self.path, self.run, resume=True)
+        journal.close()
+        self.assertEqual(journal._completed, {"input/a.xml"})
+
+    def test_journal_synced_when_opened_and_closed(self):
+        with mock.patch("tei_transform.run_journal.os.fsync") as fsync:
+            journal = RunJournal.open(self.path, self.run, resume=False)
+            self.assertEqual(fsync.call_count, 1)
+            journal.close()
+            self.assertEqual(fsync.call_count, 2)
+
+    def test_journal_synced_periodically(self):
+        with mock.patch("tei_transform.run_journal.os.fsync") as fsync:
+            with mock.patch("tei_transform.run_journal.time.monotonic") as monotonic:
+                monotonic.return_value = 100.0
+                journal = RunJournal.open(self.path, self.run, resume=False)
+                self.addCleanup(journal.close)
+                journal.add(self.entry)
+                self.assertEqual(fsync.call_count, 1)
+                monotonic.return_value = 101.0
+                journal.add(JournalEntry("input/b.xml", TRANSFORMED, 0.1))
+                self.assertEqual(fsync.call_count, 2)
+
+    def test_entries_kept_in_memory_without_file(self):
+        journal = RunJournal()
+        journal.add(self.entry)
+        self.assertTrue(journal.is_completed("input/a.xml"))
+        self.assertEqual(journal.pop_entries(), [self.entry])
+        self.assertEqual(journal.entries, [])
+
+    def _read_lines(self):
+        with open(self.path, encoding="utf-8") as ptr:
+            return [json.loads(line) for line in ptr]
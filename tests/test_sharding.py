@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tei_transform.sharding import (
+    InvalidShardPlan,
+    Shard,
+    ShardPlan,
+    hashed_shard,
+    relative_path,
+)
+
+
+class ShardingTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.paths = ["file%d.xml" % number for number in range(100)] + [
+            "sub/file%d.xml" % number for number in range(100)
+        ]
+
+    def test_relative_path_of_file_in_directory(self):
+        directory = os.path.join(self.tempdir.name, "corpus")
+        file = os.path.join(directory, "sub", "file.xml")
+        self.assertEqual(relative_path(file, directory), "sub/file.xml")
+        self.assertEqual(relative_path(file, directory + os.sep), "sub/file.xml")
+
+    def test_relative_path_of_single_file(self):
+        file = os.path.join("tests", "testdata", "empty_file.xml")
+        self.assertEqual(relative_path(file, file), "empty_file.xml")
+
+    def test_hashed_shard_in_range(self):
+        for path in self.paths:
+            self.assertIn(hashed_shard(path, 4), range(1, 5))
+
+    def test_hashed_shard_stable(self):
+        # unlike hash(), the shard is the same in every process
+        self.assertEqual(hashed_shard("sub/file.xml", 4), 4)
+
+    def test_files_spread_over_shards(self):
+        counts = [0] * 4
+        for path in self.paths:
+            counts[hashed_shard(path, 4) - 1] += 1
+        for count in counts:
+            self.assertGreater(count, 25)
+
+    def test_each_file_in_one_shard(self):
+        shards = [Shard(index, 3) for index in range(1, 4)]
+        for path in self.paths:
+            self.assertEqual(sum(shard.contains(path) for shard in shards), 1)
+
+    def test_plan_balanced_by_size(self):
+        sizes = [("a", 7), ("b", 5), ("c", 4), ("d", 3), ("e", 1)]
+        plan = ShardPlan.balance(sizes, 2)
+        totals = [0, 0]
+        for path, size in sizes:
+            totals[plan.shard_of(path) - 1] += size
+        self.assertEqual(totals, [10, 10])
+
+    def test_plan_with_more_shards_than_files(self):
+        plan = ShardPlan.balance([("a", 1), ("b", 2)], 4)
+        self.assertEqual(plan.shards, {"b": 1, "a": 2})
+
+    def test_file_not_in_plan_assigned_by_hash(self):
+        plan = ShardPlan.balance([("a", 1)], 4)
+        self.assertEqual(plan.shard_of("new.xml"), hashed_shard("new.xml", 4))
+
+    def test_shard_with_plan_contains_planned_files(self):
+        plan = ShardPlan(2, {"a": 2, "b": 1})
+        self.assertTrue(Shard(2, 2, plan).contains("a"))
+        self.assertFalse(Shard(1, 2, plan).contains("a"))
+
+    def test_plan_written_and_read(self):
+        path = os.path.join(self.tempdir.name, "plan.json")
+        sizes = {"a": 5, "b": 4, "c": 2}
+        plan = ShardPlan.balance(sizes.items(), 2)
+        plan.write(path, sizes)
+        self.assertEqual(ShardPlan.read(path), plan)
+        with open(path, encoding="utf-8") as ptr:
+            self.assertEqual(json.load(ptr)["sizes"], [5, 6])
+
+    def test_invalid_plan_rejected(self):
+        path = os.path.join(self.tempdir.name, "plan.json")
+        for content in ["", "[]", '{"shards": 2}', '{"shards": "x", "files": {}}']:
+            with self.subTest(content=content):
+                with open(path, "w", encoding="utf-8") as ptr:
+                    ptr.write(content)
+                with self.assertRaises(InvalidShardPlan):
+                    ShardPlan.read(path)
+
+    def test_missing_plan_rejected(self):
+        with self.assertRaises(InvalidShardPlan):
+            ShardPlan.read(os.path.join(self.tempdir.name, "plan.json"))
+
+    def test_shard_formatted(self):
+        self.assertEqual(str(Shard(2, 4)), "2/4")
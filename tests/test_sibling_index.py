@@ -0,0 +1,103 @@
+import unittest
+
+from lxml import etree
+
+from tei_transform.sibling_index import SiblingIndex
+
+
+class SiblingIndexTester(unittest.TestCase):
+    def setUp(self):
+        self.index = SiblingIndex()
+        self.root = etree.XML(
+            b"""<body xmlns="http://www.tei-c.org/ns/1.0">
+            <head/><p/><!-- comment --><div/><p/><ab/>
+            </body>"""
+        )
+
+    def test_no_preceding_sibling_for_first_child(self):
+        self.assertFalse(
+            self.index.has_preceding_sibling(self.root[0], frozenset({"head"}))
+        )
+
+    def test_preceding_sibling_found(self):
+        result = [
+            self.index.has_preceding_sibling(child, frozenset({"div"}))
+            for child in self.root
+        ]
+        self.assertEqual(result, [False, False, False, False, True, True])
+
+    def test_preceding_sibling_with_other_tag_found(self):
+        result = [
+            self.index.has_preceding_sibling(child, frozenset({"head"}), exclude=True)
+            for child in self.root
+        ]
+        self.assertEqual(result, [False, False, True, True, True, True])
+
+    def test_result_independent_of_order_of_queries(self):
+        tags = frozenset({"div"})
+        result = [
+            self.index.has_preceding_sibling(child, tags)
+            for child in reversed(self.root)
+        ]
+        self.assertEqual(result, [True, True, False, False, False, False])
+
+    def test_no_preceding_sibling_for_root(self):
+        self.assertFalse(
+            self.index.has_preceding_sibling(self.root, frozenset({"body"}))
+        )
+
+    def test_state_computed_from_older_siblings(self):
+        states = [
+            self.index.state_before(
+                child, "count", initial=0, step=lambda state, name: state + 1
+            )
+            for child in self.root
+        ]
+        self.assertEqual(states, [0, 1, 2, 3, 4, 5])
+
+    def test_comments_passed_as_none(self):
+        names = self.index.state_before(
+            self.root[-1],
+            "names",
+            initial=(),
+            step=lambda state, name: state + (name,),
+        )
+        self.assertEqual(names, ("head", "p", None, "div", "p"))
+
+    def test_states_of_older_siblings_reused(self):
+        calls = []
+
+        def step(state, name):
+            calls.append(name)
+            return state
+
+        for child in self.root:
+            self.index.state_before(child, "calls", initial=None, step=step)
+        self.assertEqual(len(calls), len(self.root) - 1)
+
+    def test_stale_state_used_without_invalidation(self):
+        tags = frozenset({"div"})
+        self.index.has_preceding_sibling(self.root[-1], tags)
+        self.root[3].tag = "p"
+        self.assertTrue(self.index.has_preceding_sibling(self.root[-1], tags))
+
+    def test_state_recomputed_after_parent_invalidated(self):
+        tags = frozenset({"div"})
+        self.index.has_preceding_sibling(self.root[-1], tags)
+        self.root[3].tag = "p"
+        self.index.invalidate(self.root)
+        self.assertFalse(self.index.has_preceding_sibling(self.root[-1], tags))
+
+    def test_state_of_moved_sibling_recomputed(self):
+        tags = frozenset({"div"})
+        self.index.has_preceding_sibling(self.root[-1], tags)
+        new_parent = etree.SubElement(self.root, "div")
+        new_parent.append(self.root[4])
+        self.assertFalse(self.index.has_preceding_sibling(new_parent[0], tags))
+
+    def test_states_discarded_after_clear(self):
+        tags = frozenset({"div"})
+        self.index.has_preceding_sibling(self.root[-1], tags)
+        self.root[3].tag = "p"
+        self.index.clear()
+        self.assertFalse(self.index.has_preceding_sibling(self.root[-1], tags))
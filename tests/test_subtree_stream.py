@@ -0,0 +1,111 @@
+import io
+import unittest
+
+from lxml import etree
+
+from tei_transform.element_transformation import construct_new_tei_root
+from tei_transform.subtree_stream import SubtreeStreamer
+
+
+class SubtreeStreamerTester(unittest.TestCase):
+    def setUp(self):
+        self.transformation = RecordingTransformation()
+        self.streamer = SubtreeStreamer(self.transformation)
+
+    def stream(self, xml):
+        return b"".join(self.streamer.stream(io.BytesIO(xml)))
+
+    def test_document_written_unchanged(self):
+        xml = b"""<TEI xmlns="http://www.tei-c.org/ns/1.0" a="1"><teiHeader>
+        <fileDesc/></teiHeader>
+        <text><front><div>f</div></front><body>
+        <div><p>a &amp; b</p></div>tail
+        <!-- comment --><div xmlns:x="y"><p x:a="1">c</p></div>
+        </body><back><div/><div/></back></text>
+        </TEI>"""
+        result = self.stream(xml)
+        self.assertEqual(result, b"<?xml version='1.0' encoding='UTF-8'?>\n" + xml)
+
+    def test_namespaces_of_root_not_declared_again(self):
+        xml = b"""<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader/><text><body>
+        <div/><div/></body></text></TEI>"""
+        result = self.stream(xml)
+        self.assertEqual(result.count(b"xmlns="), 1)
+
+    def test_children_of_containers_transformed_as_nodes(self):
+        xml = b"""<TEI><teiHeader><title/></teiHeader><text><body>
+        <div><p/></div><div><p/></div>
+        </body></text></TEI>"""
+        self.stream(xml)
+        self.assertEqual(self.transformation.subtrees, ["teiHeader"])
+        self.assertEqual(self.transformation.containers, ["text", "body"])
+        self.assertEqual(self.transformation.nodes, [["div", "p"], ["div", "p"]])
+
+    def test_small_container_transformed_as_part_of_parent(self):
+        xml = b"""<TEI><teiHeader/><text><front><div/></front><body>
+        <div/><div/></body></text></TEI>"""
+        self.stream(xml)
+        self.assertEqual(self.transformation.nodes[0], ["front", "div"])
+
+    def test_text_with_single_child_transformed_as_subtree(self):
+        xml = b"<TEI><teiHeader/><text><body><div/></body></text></TEI>"
+        result = self.stream(xml)
+        self.assertEqual(self.transformation.subtrees, ["teiHeader", "text"])
+        self.assertEqual(self.transformation.nodes, [])
+        self.assertTrue(result.endswith(xml[5:]))
+
+    def test_groups_of_texts_streamed(self):
+        xml = b"""<TEI><teiHeader/><text><group><text><body><p>a</p><p>b</p>
+        </body></text><text><body><p>c</p></body></text></group></text></TEI>"""
+        result = self.stream(xml)
+        self.assertEqual(
+            etree.tostring(etree.fromstring(result), method="c14n"),
+            etree.tostring(etree.fromstring(xml), method="c14n"),
+        )
+        self.assertIn("group", self.transformation.containers)
+
+    def test_other_children_of_root_not_written(self):
+        xml = b"""<TEI><teiHeader/><facsimile/><text><body><p/></body></text></TEI>"""
+        result = self.stream(xml)
+        self.assertNotIn(b"facsimile", result)
+
+    def test_nothing_written_if_root_is_not_tei(self):
+        xml = b"<teiCorpus><TEI><teiHeader/></TEI></teiCorpus>"
+        self.assertEqual(self.stream(xml), b"")
+
+    def test_transformed_root_written(self):
+        self.transformation.root_attributes = {"b": "2"}
+        result = self.stream(b"<TEI a='1'><teiHeader/></TEI>")
+        self.assertIn(b'<TEI a="1" b="2">', result)
+
+    def test_syntax_error_raised(self):
+        with self.assertRaises(etree.XMLSyntaxError):
+            self.stream(b"<TEI><teiHeader><text></TEI>")
+
+
+class RecordingTransformation:
+    def __init__(self):
+        self.root_attributes = {}
+        self.subtrees = []
+        self.containers = []
+        self.nodes = []
+
+    def transform_root(self, root):
+        new_root = construct_new_tei_root(root)
+        new_root.attrib.update(self.root_attributes)
+        return new_root
+
+    def transform_subtree(self, node):
+        self.subtrees.append(etree.QName(node).localname)
+
+    def transform_container(self, container):
+        self.containers.append(etree.QName(container).localname)
+
+    def transform_nodes(self, nodes):
+        self.nodes.append(
+            [
+                etree.QName(node).localname
+                for node in nodes()
+                if isinstance(node.tag, str)
+            ]
+        )
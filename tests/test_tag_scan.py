@@ -0,0 +1,198 @@
+import glob
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from lxml import etree
+
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.parse_config import parse_config_file
+from tei_transform.tag_scan import (
+    TagScan,
+    can_match,
+    scan_file,
+    scan_tree,
+    select_observers,
+)
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.xml_tree_iterator import XMLTreeIterator
+
+
+class ScanFileTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def test_localnames_of_elements_and_attributes_collected(self):
+        file = self._write_file(
+            b"<?xml version='1.0'?>\n<!-- <comment/> -->"
+            b"<TEI xmlns='http://www.tei-c.org/ns/1.0' xmlns:tei='x'>"
+            b"<tei:p xml:id='a' rend = \"b\">text</tei:p><lb/></TEI>"
+        )
+        scan = scan_file(file)
+        # names in comments and declarations aren't told apart without parsing
+        self.assertEqual(scan.tags, {"TEI", "p", "lb", "comment"})
+        self.assertEqual(scan.attributes, {"version", "xmlns", "tei", "id", "rend"})
+
+    def test_scan_contains_names_of_tree(self):
+        files = glob.glob(
+            os.path.join("tests", "testdata", "**", "*.xml"), recursive=True
+        )
+        for file in files:
+            try:
+                tree = etree.parse(file)
+            except etree.XMLSyntaxError:
+                continue
+            scan, expected = scan_file(file), scan_tree(tree.getroot())
+            with self.subTest(file=file):
+                self.assertTrue(expected.tags <= scan.tags)
+                self.assertTrue(expected.attributes <= scan.attributes)
+
+    def test_tags_split_between_chunks_collected(self):
+        file = self._write_file(b"<TEI><teiHeader type='a'/><text/></TEI>")
+        with mock.patch("tei_transform.tag_scan._CHUNK_SIZE", 3):
+            scan = scan_file(file)
+        self.assertEqual(scan, TagScan({"TEI", "teiHeader", "text"}, {"type"}))
+
+    def test_names_decoded_with_declared_encoding(self):
+        file = self._write_file(
+            "<?xml version='1.0' encoding='ISO-8859-1'?><TEI><bär/></TEI>".encode(
+                "latin-1"
+            )
+        )
+        self.assertEqual(scan_file(file).tags, {"TEI", "bär"})
+
+    def test_no_scan_for_encoding_incompatible_with_ascii(self):
+        for encoding in ["utf-16", "utf-16-be", "utf-32"]:
+            with self.subTest(encoding=encoding):
+                file = self._write_file("<TEI><p/></TEI>".encode(encoding))
+                self.assertIsNone(scan_file(file))
+
+    def test_no_scan_if_dtd_declares_entities(self):
+        file = self._write_file(
+            b"<!DOCTYPE TEI [<!ENTITY para '<p/>'>]><TEI>&para;</TEI>"
+        )
+        self.assertIsNone(scan_file(file))
+
+    def test_scan_serialized_as_json(self):
+        scan = TagScan(frozenset({"TEI", "p"}), frozenset({"id"}))
+        self.assertEqual(TagScan.from_json(scan.to_json()), scan)
+
+    def _write_file(self, data):
+        file = os.path.join(self.tempdir.name, "file.xml")
+        with open(file, "wb") as ptr:
+            ptr.write(data)
+        return file
+
+
+class ScanTreeTester(unittest.TestCase):
+    def test_localnames_of_elements_and_attributes_collected(self):
+        root = etree.fromstring(
+            b"<TEI xmlns='http://www.tei-c.org/ns/1.0'>"
+            b"<p xml:id='a' rend='b'><!-- comment --></p></TEI>"
+        )
+        self.assertEqual(scan_tree(root), TagScan({"TEI", "p"}, {"id", "rend"}))
+
+
+class SelectObserversTester(unittest.TestCase):
+    def setUp(self):
+        self.scan = TagScan(frozenset({"TEI", "div", "p"}), frozenset({"id"}))
+
+    def test_observers_without_declared_target_in_file_left_out(self):
+        observers = [
+            DeclaringObserver(target_tags={"p"}),
+            DeclaringObserver(target_tags={"list"}),
+            DeclaringObserver(target_tags={"p"}, required_parents={"list"}),
+            DeclaringObserver(required_attributes={"rend"}),
+        ]
+        self.assertEqual(select_observers(observers, self.scan), observers[:1])
+
+    def test_namespace_of_required_attributes_ignored(self):
+        observer = DeclaringObserver(
+            required_attributes={"{http://www.w3.org/XML/1998/namespace}id"}
+        )
+        self.assertTrue(can_match(observer, self.scan))
+
+    def test_observers_without_declared_target_kept(self):
+        observer = DeclaringObserver()
+        self.assertEqual(select_observers([observer], self.scan), [observer])
+
+    def test_observers_matching_created_elements_kept_in_order(self):
+        observers = [
+            DeclaringObserver(target_tags={"ab"}, created_attributes={"type"}),
+            DeclaringObserver(target_tags={"ab"}, required_attributes={"type"}),
+            DeclaringObserver(target_tags={"p"}, created_tags={"ab"}),
+        ]
+        self.assertEqual(select_observers(observers, self.scan), observers)
+
+    def test_all_observers_kept_if_creations_unknown(self):
+        observers = [
+            DeclaringObserver(target_tags={"list"}),
+            DeclaringObserver(target_tags={"p"}, created_tags=None),
+        ]
+        self.assertEqual(select_observers(observers, self.scan), observers)
+
+    def test_observer_without_match_may_create_unknown_elements(self):
+        observers = [
+            DeclaringObserver(target_tags={"list"}, created_tags=None),
+            DeclaringObserver(target_tags={"p"}),
+        ]
+        self.assertEqual(select_observers(observers, self.scan), observers[1:])
+
+    def test_created_elements_of_plugins_declared(self):
+        constructor = ObserverConstructor()
+        config = parse_config_file(
+            os.path.join("tests", "testdata", "conf_files", "default.cfg")
+        )
+        files = glob.glob(os.path.join("tests", "testdata", "*.xml"))
+        undeclared = []
+        for plugin in constructor.plugins_by_name:
+            observers = constructor.construct_observers([plugin], config)
+            (observer,) = observers[0] + observers[1]
+            transformer = TeiTransformer(XMLTreeIterator())
+            transformer.set_list_of_observers(observers)
+            for file in files:
+                try:
+                    before = scan_tree(etree.parse(file).getroot())
+                except etree.XMLSyntaxError:
+                    continue
+                if "TEI" not in before.tags:
+                    continue
+                root = transformer.perform_transformation(file)
+                if root is None:
+                    continue
+                after = scan_tree(root)
+                tags = after.tags - before.tags - observer.created_tags
+                attributes = (
+                    after.attributes - before.attributes - observer.created_attributes
+                )
+                if tags or attributes:
+                    undeclared.append((plugin, file, tags, attributes))
+        self.assertEqual(undeclared, [])
+
+
+class DeclaringObserver:
+    def __init__(
+        self,
+        target_tags=None,
+        required_parents=None,
+        required_attributes=None,
+        created_tags=(),
+        created_attributes=(),
+    ):
+        self.target_tags = _frozenset_or_none(target_tags)
+        self.required_parents = _frozenset_or_none(required_parents)
+        self.required_attributes = _frozenset_or_none(required_attributes)
+        self.created_tags = _frozenset_or_none(created_tags)
+        self.created_attributes = _frozenset_or_none(created_attributes)
+
+    def observe(self, node):
+        return False
+
+    def transform_node(self, node):
+        pass
+
+
+def _frozenset_or_none(values):
+    return None if values is None else frozenset(values)
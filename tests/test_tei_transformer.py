@@ -1,13 +1,39 @@
+import configparser
+import glob
 import io
 import os
+import tempfile
+import time
 import unittest
 
 from lxml import etree
 
-from tei_transform.observer import TeiNamespaceObserver
-from tei_transform.parse_config import RevisionDescChange
+from tei_transform.cli.controller import DEFAULT_TRANSFORMATION
+from tei_transform.observer import TeiHeaderTypeObserver, TeiNamespaceObserver
+from tei_transform.observer.observer_errors import TransformationError
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.observer_statistics import TransformationProfile
+from tei_transform.parse_config import RevisionDescChange, parse_config_file
+from tei_transform.tag_scan import TagScan, scan_file
 from tei_transform.tei_transformer import TeiTransformer
-from tei_transform.xml_tree_iterator import XMLTreeIterator
+from tei_transform.transformation_budget import BudgetExceeded, TransformationBudget
+from tei_transform.xml_tree_iterator import ParserOptions, XMLTreeIterator
+from tei_transform.xml_writer import XmlWriterImpl
+
+# elements of the header that can also occur in <text>
+HEADER_ELEMENTS_IN_TEXT = b"""<TEI xmlns="http://www.tei-c.org/ns/1.0">
+<teiHeader><fileDesc><titleStmt><title>title</title></titleStmt>
+<publicationStmt><p>publication</p></publicationStmt>
+<sourceDesc><p>source</p></sourceDesc></fileDesc></teiHeader>
+<text><body><p>a<filename>f.xml</filename>b</p>
+<p><textclass><classcode scheme="">1</classcode><keywords/></textclass>
+<language/></p></body>
+<back><listBibl><biblFull><titleStmt><title>title</title></titleStmt>
+<publicationStmt><date>2000</date><p/></publicationStmt><seriesStmt/>
+<sourceDesc><p>source</p></sourceDesc><notesStmt type="x"/></biblFull>
+</listBibl></back></text></TEI>""".replace(
+    b"\n", b""
+)
 
 
 class TeiTransformerTester(unittest.TestCase):
@@ -640,16 +666,802 @@ class TeiTransformerTester(unittest.TestCase):
             transformer.perform_transformation(file)
         self.assertIn("no_tei_file.xml", logger.output[0])
 
+    def test_comments_not_passed_to_observers_with_target_tags(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([TeiHeaderTypeObserver()], []))
+        xml = io.BytesIO(
+            b"""
+        <TEI>
+          <teiHeader type="text">
+            <!-- comment -->
+          </teiHeader>
+          <text/>
+        </TEI>
+        """
+        )
+        tree = transformer.perform_transformation(xml)
+        self.assertEqual(tree[0].attrib, {})
+
+    def test_observer_applied_to_node_renamed_by_previous_observer(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            (
+                [
+                    FakeObserver("match", action=change_tag),
+                    TaggedFakeObserver("newTag", action=remove_id_attrib),
+                ],
+                [],
+            )
+        )
+        xml = io.BytesIO(b"<TEI><text><match id='matching node'/></text></TEI>")
+        tree = transformer.perform_transformation(xml)
+        result = tree.find(".//newTag").attrib
+        self.assertEqual(result, {})
+
+    def test_parsed_tree_transformed_like_file(self):
+        constructor = ObserverConstructor()
+        config = parse_config_file(
+            os.path.join("tests", "testdata", "conf_files", "default.cfg")
+        )
+        plugins = [name for name in constructor.plugins_by_name if name != "tei-ns"]
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            constructor.construct_observers(plugins, config)
+        )
+        for file in glob.glob(os.path.join("tests", "testdata", "*.xml")):
+            try:
+                tree = etree.parse(file)
+            except etree.XMLSyntaxError:
+                continue
+            from_file = transformer.perform_transformation(file)
+            changed_from_file = transformer.xml_tree_changed()
+            from_tree = transformer.perform_transformation(file, tree)
+            with self.subTest(file=file):
+                self.assertEqual(changed_from_file, transformer.xml_tree_changed())
+                if from_file is None:
+                    self.assertIsNone(from_tree)
+                    continue
+                self.assertEqual(etree.tostring(from_file), etree.tostring(from_tree))
+
+    def test_observer_calls_and_matches_recorded_in_profile(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.profile = TransformationProfile()
+        transformer.set_list_of_observers(
+            ([FakeObserver("p")], [TaggedFakeObserver("p")])
+        )
+        xml = io.BytesIO(b"<TEI><text><body><p/><p/></body></text></TEI>")
+        transformer.perform_transformation(xml)
+        statistics = transformer.profile.files[xml]
+        self.assertEqual(
+            (
+                statistics["FakeObserver"].observe_calls,
+                statistics["FakeObserver"].matches,
+                statistics["TaggedFakeObserver"].observe_calls,
+                statistics["TaggedFakeObserver"].matches,
+            ),
+            (5, 2, 2, 2),
+        )
+
+    def test_transformation_errors_recorded_in_profile(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.profile = TransformationProfile()
+        transformer.set_list_of_observers(
+            ([FakeObserver("p", action=raise_transformation_error)], [])
+        )
+        xml = io.BytesIO(b"<TEI><text><body><p/></body></text></TEI>")
+        with self.assertLogs():
+            transformer.perform_transformation(xml)
+        statistics = transformer.profile.files[xml]["FakeObserver"]
+        self.assertEqual(statistics.transformation_errors, 1)
+        self.assertFalse(transformer.xml_tree_changed())
+
+    def test_profiling_doesnt_change_transformation(self):
+        constructor = ObserverConstructor()
+        config = parse_config_file(
+            os.path.join("tests", "testdata", "conf_files", "default.cfg")
+        )
+        plugins = [name for name in constructor.plugins_by_name if name != "tei-ns"]
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            constructor.construct_observers(plugins, config)
+        )
+        profiled_transformer = TeiTransformer(self.iterator)
+        profiled_transformer.profile = TransformationProfile()
+        profiled_transformer.set_list_of_observers(
+            constructor.construct_observers(plugins, config)
+        )
+        for file in glob.glob(os.path.join("tests", "testdata", "*.xml")):
+            result = transformer.perform_transformation(file)
+            profiled_result = profiled_transformer.perform_transformation(file)
+            with self.subTest(file=file):
+                self.assertEqual(
+                    transformer.xml_tree_changed(),
+                    profiled_transformer.xml_tree_changed(),
+                )
+                if result is None:
+                    self.assertIsNone(profiled_result)
+                    continue
+                self.assertEqual(
+                    etree.tostring(result), etree.tostring(profiled_result)
+                )
+
+    def test_sibling_index_doesnt_change_transformation(self):
+        constructor = ObserverConstructor()
+        config = parse_config_file(
+            os.path.join("tests", "testdata", "conf_files", "default.cfg")
+        )
+        plugins = [name for name in constructor.plugins_by_name if name != "tei-ns"]
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            constructor.construct_observers(plugins, config)
+        )
+        unindexed_transformer = TeiTransformer(self.iterator)
+        observers = constructor.construct_observers(plugins, config)
+        unindexed_transformer.set_list_of_observers(observers)
+        unindexed_transformer._sibling_index = None
+        for observer in observers[0] + observers[1]:
+            if hasattr(observer, "sibling_index"):
+                observer.sibling_index = None
+        for file in glob.glob(os.path.join("tests", "testdata", "*.xml")):
+            result = transformer.perform_transformation(file)
+            unindexed_result = unindexed_transformer.perform_transformation(file)
+            with self.subTest(file=file):
+                if result is None:
+                    self.assertIsNone(unindexed_result)
+                    continue
+                self.assertEqual(
+                    etree.tostring(result), etree.tostring(unindexed_result)
+                )
+
+    def test_observers_share_sibling_index(self):
+        constructor = ObserverConstructor()
+        first_pass, second_pass = constructor.construct_observers(
+            ["div-sibling", "byline-sibling", "p-head"]
+        )
+        self.transformer.set_list_of_observers((first_pass, second_pass))
+        indices = {id(observer.sibling_index) for observer in first_pass + second_pass}
+        self.assertEqual(len(indices), 1)
+        self.assertIsNotNone((first_pass + second_pass)[0].sibling_index)
+
+    def test_sibling_index_invalidated_after_node_moved(self):
+        constructor = ObserverConstructor()
+        self.transformer = TeiTransformer(self.iterator)
+        self.transformer.set_list_of_observers(
+            constructor.construct_observers(["div-sibling", "p-head"])
+        )
+        xml = io.BytesIO(
+            b"""<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader/><text><body>
+            <p>a</p><div><p>b</p></div><p>c</p><head>d</head><p>e</p>
+            </body></text></TEI>"""
+        )
+        tree = self.transformer.perform_transformation(xml)
+        body = tree.find(".//{*}body")
+        result = [etree.QName(child).localname for child in body]
+        self.assertEqual(result, ["p", "div", "div"])
+        result = [etree.QName(child).localname for child in body[2]]
+        self.assertEqual(result, ["p", "ab", "p"])
+
+    def test_only_header_parsed_if_observers_apply_to_header_only(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["teiheader-type"])
+        )
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        root = transformer.perform_transformation(file)
+        self.assertEqual([etree.QName(node).localname for node in root], ["teiHeader"])
+        self.assertIsNotNone(transformer.unparsed_text())
+        self.assertTrue(transformer.xml_tree_changed())
+
+    def test_whole_file_parsed_if_observer_applies_to_text(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["teiheader-type", "div-sibling"])
+        )
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        root = transformer.perform_transformation(file)
+        self.assertEqual(
+            [etree.QName(node).localname for node in root], ["teiHeader", "text"]
+        )
+        self.assertIsNone(transformer.unparsed_text())
+
+    def test_whole_file_parsed_if_tei_namespace_added(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["teiheader-type", "tei-ns"])
+        )
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        transformer.perform_transformation(file)
+        self.assertIsNone(transformer.unparsed_text())
+
+    def test_whole_file_parsed_with_default_plugins(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(DEFAULT_TRANSFORMATION)
+        )
+        self.assertFalse(transformer.transforms_header_only())
+        root = transformer.perform_transformation(io.BytesIO(HEADER_ELEMENTS_IN_TEXT))
+        self.assertIsNone(transformer.unparsed_text())
+        self.assertEqual(root.findall(".//{*}filename"), [])
+        self.assertEqual(root.findall(".//{*}notesStmt[@type]"), [])
+
+    def test_header_elements_in_text_transformed_like_every_node_observed(self):
+        config = configparser.ConfigParser()
+        config.read_dict({"empty-scheme": {"scheme": "scheme.path"}})
+        plugins = [
+            "filename-element",
+            "empty-stmt",
+            "notesstmt",
+            "p-pubstmt",
+            "missing-publisher",
+            "misp-notesstmt",
+            "classcode",
+            "textclass",
+            "empty-kw",
+            "empty-scheme",
+            "lang-ident",
+        ]
+        for plugin in plugins:
+            with self.subTest(plugin=plugin):
+                observer_lists = ObserverConstructor().construct_observers(
+                    [plugin], config
+                )
+                transformer = TeiTransformer(self.iterator)
+                transformer.set_list_of_observers(observer_lists)
+                root = transformer.perform_transformation(
+                    io.BytesIO(HEADER_ELEMENTS_IN_TEXT)
+                )
+                self.assertTrue(transformer.xml_tree_changed())
+                expected = etree.fromstring(HEADER_ELEMENTS_IN_TEXT)
+                [observer] = observer_lists[0] + observer_lists[1]
+                _observe_every_node(observer, expected)
+                self.assertEqual(etree.tostring(root), etree.tostring(expected))
+
+    def test_header_only_transformation_equivalent_to_parsing_whole_file(self):
+        constructor = ObserverConstructor()
+        config = parse_config_file(
+            os.path.join("tests", "testdata", "conf_files", "default.cfg")
+        )
+        plugins = ["teiheader-type", "schemalocation"]
+        writer = XmlWriterImpl()
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            constructor.construct_observers(plugins, config)
+        )
+        self.assertTrue(transformer.transforms_header_only())
+        with tempfile.TemporaryDirectory() as output_dir:
+            for file in glob.glob(os.path.join("tests", "testdata", "*.xml")):
+                outputs = []
+                for header_only in (True, False):
+                    transformer._header_only = header_only
+                    output = os.path.join(output_dir, f"{header_only}.xml")
+                    root = transformer.perform_transformation(file)
+                    writer.write_xml(output, root, transformer.unparsed_text())
+                    outputs.append(
+                        etree.tostring(etree.parse(output), method="c14n")
+                        if os.path.exists(output)
+                        else None
+                    )
+                    if os.path.exists(output):
+                        os.remove(output)
+                with self.subTest(file=file):
+                    self.assertEqual(outputs[0], outputs[1])
+
+    def test_streaming_possible_if_observers_need_local_context(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(
+                ["tail-text", "div-text", "teiheader-type", "schemalocation"]
+            )
+        )
+        self.assertTrue(self.transformer.can_stream())
+
+    def test_streaming_not_possible_with_sibling_observer(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["tail-text", "div-sibling"])
+        )
+        self.assertFalse(self.transformer.can_stream())
+
+    def test_streaming_not_possible_if_tei_namespace_added(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["tail-text", "tei-ns"])
+        )
+        self.assertFalse(self.transformer.can_stream())
+
+    def test_streaming_not_used_if_observers_apply_to_header_only(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["teiheader-type"])
+        )
+        self.assertFalse(self.transformer.can_stream())
+
+    def test_stream_transformation_yields_transformed_document(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["tail-text", "ul-elem"])
+        )
+        file = os.path.join("tests", "testdata", "file_with_tail_text.xml")
+        data = b"".join(self.transformer.stream_transformation(file))
+        self.assertTrue(data.startswith(b"<?xml version='1.0' encoding='UTF-8'?>"))
+        root = etree.fromstring(data)
+        self.assertEqual(
+            [etree.QName(node).localname for node in root], ["teiHeader", "text"]
+        )
+        self.assertTrue(self.transformer.xml_tree_changed())
+
+    def test_stream_transformation_yields_nothing_without_tei_root(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["tail-text"])
+        )
+        file = os.path.join("tests", "testdata", "no_tei_file.xml")
+        self.assertEqual(list(self.transformer.stream_transformation(file)), [])
+
+    def test_stream_transformation_raises_error_for_malformed_file(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["tail-text"])
+        )
+        file = os.path.join("tests", "testdata", "malformed_file.xml")
+        with self.assertRaises(etree.XMLSyntaxError):
+            list(self.transformer.stream_transformation(file))
+
+    def test_file_without_tei_root_well_formed(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([FakeObserver()], []))
+        file = os.path.join("tests", "testdata", "no_tei_file.xml")
+        with self.assertLogs():
+            self.assertIsNone(transformer.perform_transformation(file))
+        self.assertTrue(transformer.is_well_formed())
+
+    def test_malformed_file_not_well_formed(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([FakeObserver()], []))
+        file = os.path.join("tests", "testdata", "malformed_file.xml")
+        with self.assertLogs():
+            self.assertIsNone(transformer.perform_transformation(file))
+        self.assertFalse(transformer.is_well_formed())
+
+    def test_divisions_removed_from_memory_after_streaming(self):
+        observer = SiblingCountingObserver()
+        self.transformer.set_list_of_observers(([observer], []))
+        xml = io.BytesIO(
+            b"""<TEI><teiHeader/><text><body>
+            <div><p>a</p></div><div><p>b</p></div><div><p>c</p></div>
+            </body></text></TEI>"""
+        )
+        data = b"".join(self.transformer.stream_transformation(xml))
+        # the older siblings were written and removed before
+        self.assertEqual(observer.preceding_siblings, [0, 0, 0])
+        self.assertEqual(len(etree.fromstring(data).findall(".//div")), 3)
+
+    def test_stream_transformation_equivalent_to_transformation_of_tree(self):
+        constructor = ObserverConstructor()
+        plugins = [
+            plugin.name
+            for plugin in constructor.entry_points
+            if getattr(plugin.load(), "local_context", False)
+            and plugin.name not in {"empty-attrib", "invalid-attr"}
+        ]
+        writer = XmlWriterImpl()
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(constructor.construct_observers(plugins))
+        self.assertTrue(transformer.can_stream())
+        with tempfile.TemporaryDirectory() as output_dir:
+            for file in glob.glob(os.path.join("tests", "testdata", "*.xml")):
+                streamed = os.path.join(output_dir, "streamed.xml")
+                try:
+                    writer.write_stream(
+                        streamed, transformer.stream_transformation(file)
+                    )
+                except etree.XMLSyntaxError:
+                    continue
+                if not os.path.exists(streamed):
+                    continue
+                changed = transformer.xml_tree_changed()
+                output = os.path.join(output_dir, "output.xml")
+                writer.write_xml(output, transformer.perform_transformation(file))
+                with self.subTest(file=file):
+                    with open(streamed, "rb") as ptr:
+                        streamed_data = ptr.read()
+                    with open(output, "rb") as ptr:
+                        self.assertEqual(streamed_data, ptr.read())
+                    self.assertEqual(changed, transformer.xml_tree_changed())
+                os.remove(streamed)
+
+    def test_subtree_observer_applied_after_subtree_in_same_traversal(self):
+        events = []
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            (
+                [RecordingObserver("start", events)],
+                [RecordingObserver("end", events, "list", "subtree")],
+            )
+        )
+        xml = io.BytesIO(
+            b"<TEI><teiHeader/><text><list><item/><list/></list><p/></text></TEI>"
+        )
+        transformer.perform_transformation(xml)
+        text_start = events.index(("start", "text"))
+        text_events = events[text_start:]
+        self.assertEqual(
+            text_events,
+            [
+                ("start", "text"),
+                ("start", "list"),
+                ("start", "item"),
+                ("start", "list"),
+                ("end", "list"),
+                ("end", "list"),
+                ("start", "p"),
+            ],
+        )
+
+    def test_subtree_observer_sees_transformed_children(self):
+        events = []
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            (
+                [TaggedFakeObserver("p", change_tag)],
+                [RecordingObserver("end", events, "list", "subtree", children=True)],
+            )
+        )
+        xml = io.BytesIO(b"<TEI><teiHeader/><text><list><p/></list></text></TEI>")
+        transformer.perform_transformation(xml)
+        self.assertEqual(events, [("end", "list", ["newTag"])])
+
+    def test_subtree_observer_not_applied_to_removed_node(self):
+        events = []
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            (
+                [TaggedFakeObserver("list", remove_node)],
+                [RecordingObserver("end", events, "list", "subtree")],
+            )
+        )
+        xml = io.BytesIO(b"<TEI><teiHeader/><text><p/><list/></text></TEI>")
+        transformer.perform_transformation(xml)
+        self.assertEqual(events, [])
+
+    def test_second_traversal_made_for_document_observer(self):
+        events = []
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            (
+                [RecordingObserver("start", events)],
+                [
+                    RecordingObserver("document", events, "p", "document"),
+                    RecordingObserver("end", events, "list", "subtree"),
+                ],
+            )
+        )
+        xml = io.BytesIO(b"<TEI><teiHeader/><text><list/><p/></text></TEI>")
+        transformer.perform_transformation(xml)
+        text_start = events.index(("start", "text"))
+        text_events = events[text_start:]
+        self.assertEqual(
+            text_events,
+            [
+                ("start", "text"),
+                ("start", "list"),
+                ("start", "p"),
+                ("end", "list"),
+                ("document", "p"),
+            ],
+        )
+
+    def test_fused_traversal_equivalent_to_second_traversal(self):
+        constructor = ObserverConstructor()
+        cfg = parse_config_file(
+            os.path.join("tests", "testdata", "conf_files", "default.cfg")
+        )
+        plugins = [
+            plugin
+            for plugin in constructor.plugins_by_name
+            if plugin not in {"div-sibling", "schemalocation", "tei-ns"}
+        ]
+        fused = TeiTransformer(self.iterator)
+        fused.set_list_of_observers(constructor.construct_observers(plugins, cfg))
+        # an observer that requires the whole document forces a second traversal
+        first_pass, second_pass = constructor.construct_observers(plugins, cfg)
+        second_pass.append(RecordingObserver("document", [], "none", "document"))
+        separate = TeiTransformer(self.iterator)
+        separate.set_list_of_observers((first_pass, second_pass))
+        for file in glob.glob(os.path.join("tests", "testdata", "*.xml")):
+            with self.subTest(file=file):
+                try:
+                    result = fused.perform_transformation(file)
+                    expected = separate.perform_transformation(file)
+                except etree.XMLSyntaxError:
+                    continue
+                if expected is None:
+                    self.assertIsNone(result)
+                    continue
+                self.assertEqual(etree.tostring(result), etree.tostring(expected))
+
+    def test_single_round_by_default(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            ([FakeObserver("b", rename("c")), FakeObserver("a", rename("b"))], [])
+        )
+        xml = io.BytesIO(b"<TEI><teiHeader/><text><a/></text></TEI>")
+        result = transformer.perform_transformation(xml)
+        self.assertEqual(result.find(".//text")[0].tag, "b")
+        self.assertEqual(transformer.rounds(), 1)
+
+    def test_observers_applied_again_to_changed_regions(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            ([FakeObserver("b", rename("c")), FakeObserver("a", rename("b"))], [])
+        )
+        transformer.max_rounds = 10
+        xml = io.BytesIO(b"<TEI><teiHeader/><text><a/></text></TEI>")
+        result = transformer.perform_transformation(xml)
+        self.assertEqual(result.find(".//text")[0].tag, "c")
+        self.assertEqual(transformer.rounds(), 3)
+        self.assertTrue(transformer.is_stable())
+
+    def test_only_changed_regions_observed_again(self):
+        transformer = TeiTransformer(self.iterator)
+        events = []
+        transformer.set_list_of_observers(
+            (
+                [
+                    RecordingObserver("visit", events),
+                    FakeObserver("a", rename("b")),
+                ],
+                [],
+            )
+        )
+        transformer.max_rounds = 10
+        xml = io.BytesIO(
+            b"<TEI><teiHeader><fileDesc/></teiHeader>"
+            b"<text><body><div><ab><a/></ab></div><p/></body></text></TEI>"
+        )
+        transformer.perform_transformation(xml)
+        # the second round starts after the first visit of <p/>
+        second_start = events.index(("visit", "p")) + 1
+        second_round = events[second_start:]
+        self.assertEqual(
+            second_round, [("visit", "div"), ("visit", "ab"), ("visit", "b")]
+        )
+
+    def test_rounds_limited_if_document_not_stable(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([FakeObserver("a", add_child)], []))
+        transformer.max_rounds = 4
+        xml = io.BytesIO(b"<TEI><teiHeader/><text><a/></text></TEI>")
+        transformer.perform_transformation(xml)
+        self.assertEqual(transformer.rounds(), 4)
+        self.assertFalse(transformer.is_stable())
+
+    def test_round_undoing_its_own_changes_considered_stable(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(
+                ["div-parent", "div-sibling", "byline-sibling", "double-plike"]
+            )
+        )
+        transformer.max_rounds = 10
+        file = os.path.join("tests", "testdata", "file_with_unfinished_elements.xml")
+        transformer.perform_transformation(file)
+        self.assertEqual(transformer.rounds(), 2)
+        self.assertTrue(transformer.is_stable())
+
+    def test_output_until_stable_equal_to_repeated_runs(self):
+        transformer = TeiTransformer(self.iterator)
+        plugins = ["hi-parent", "div-parent", "div-sibling", "tail-text"]
+        file = os.path.join("tests", "testdata", "file_with_wrong_div_parent2.xml")
+        data = etree.tostring(etree.parse(file))
+        for _ in range(10):
+            transformer = TeiTransformer(self.iterator)
+            transformer.set_list_of_observers(
+                ObserverConstructor().construct_observers(plugins)
+            )
+            output = etree.tostring(
+                transformer.perform_transformation(io.BytesIO(data))
+            )
+            if output == data:
+                break
+            data = output
+        transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(plugins)
+        )
+        transformer.max_rounds = 10
+        result = transformer.perform_transformation(file)
+        self.assertEqual(etree.tostring(result), data)
+
+    def test_streaming_not_possible_until_stable(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["tail-text", "div-text"])
+        )
+        self.transformer.max_rounds = 2
+        self.assertFalse(self.transformer.can_stream())
+
+    def test_transformation_stopped_when_node_budget_exceeded(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([FakeObserver("p", add_child)], []))
+        transformer.budget = TransformationBudget(max_nodes=10)
+        xml = io.BytesIO(b"<TEI><teiHeader/><text>" + b"<p/>" * 10 + b"</text></TEI>")
+        with self.assertRaises(BudgetExceeded) as context:
+            transformer.perform_transformation(xml)
+        self.assertEqual(context.exception.nodes, 11)
+
+    def test_transformation_stopped_when_time_budget_exceeded(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([FakeObserver("p", sleep)], []))
+        transformer.budget = TransformationBudget(max_seconds=0.01)
+        xml = io.BytesIO(b"<TEI><teiHeader/><text>" + b"<p/>" * 10 + b"</text></TEI>")
+        with self.assertRaises(BudgetExceeded) as context:
+            transformer.perform_transformation(xml)
+        self.assertEqual(context.exception.observer, "FakeObserver")
+        self.assertLess(context.exception.nodes, 10)
+
+    def test_time_budget_checked_while_profiled(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([FakeObserver("p", sleep)], []))
+        transformer.budget = TransformationBudget(max_seconds=0.01)
+        transformer.profile = TransformationProfile()
+        xml = io.BytesIO(b"<TEI><teiHeader/><text>" + b"<p/>" * 10 + b"</text></TEI>")
+        with self.assertRaises(BudgetExceeded) as context:
+            transformer.perform_transformation(xml)
+        self.assertEqual(context.exception.observer, "FakeObserver")
+        statistics = transformer.profile.files[xml]["FakeObserver"]
+        self.assertGreater(statistics.matches, 0)
+        self.assertGreater(statistics.transform_time, 0)
+
+    def test_output_within_budget_same_as_without_budget(self):
+        file = os.path.join("tests", "testdata", "file_with_wrong_div_parent2.xml")
+        plugins = ["hi-parent", "div-parent", "div-sibling", "tail-text"]
+        outputs = []
+        for budget in [None, TransformationBudget(max_seconds=60, max_nodes=10**6)]:
+            transformer = TeiTransformer(self.iterator)
+            transformer.set_list_of_observers(
+                ObserverConstructor().construct_observers(plugins)
+            )
+            transformer.max_rounds = 3
+            transformer.budget = budget
+            outputs.append(etree.tostring(transformer.perform_transformation(file)))
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_budget_applies_to_each_file(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([FakeObserver("p", add_child)], []))
+        transformer.budget = TransformationBudget(max_nodes=10)
+        with self.assertRaises(BudgetExceeded):
+            transformer.perform_transformation(
+                io.BytesIO(b"<TEI><teiHeader/><text>" + b"<p/>" * 10 + b"</text></TEI>")
+            )
+        root = transformer.perform_transformation(
+            io.BytesIO(b"<TEI><teiHeader/><text><p/></text></TEI>")
+        )
+        self.assertEqual(len(root.find("text/p")), 1)
+
+    def test_stream_transformation_stopped_when_budget_exceeded(self):
+        self.transformer = TeiTransformer(self.iterator)
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["tail-text"])
+        )
+        self.transformer.budget = TransformationBudget(max_nodes=10)
+        file = os.path.join("tests", "testdata", "file_with_tail_text.xml")
+        with self.assertRaises(BudgetExceeded):
+            b"".join(self.transformer.stream_transformation(file))
+
+    def test_released_tree_cleared(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(([FakeObserver("a", add_child)], []))
+        transformer.max_rounds = 2
+        xml = io.BytesIO(b"<TEI><teiHeader/><text><a/></text></TEI>")
+        root = transformer.perform_transformation(xml)
+        transformer.release_tree(root)
+        self.assertEqual(len(root), 0)
+        self.assertTrue(transformer.is_stable())
+
+    def test_observers_left_out_not_applied(self):
+        transformer = TeiTransformer(self.iterator)
+        p_observer = TaggedFakeObserver("p", action=remove_node)
+        div_observer = TaggedFakeObserver("div", action=remove_node)
+        for observer in (p_observer, div_observer):
+            observer.created_tags = observer.created_attributes = frozenset()
+        transformer.set_list_of_observers(([p_observer, div_observer], []))
+        xml = b"<TEI><text><body><div/><p/></body></text></TEI>"
+        left_out = transformer.select_observers(
+            TagScan(frozenset({"TEI", "text", "body", "div"}), frozenset())
+        )
+        self.assertEqual(left_out, 1)
+        root = transformer.perform_transformation(io.BytesIO(xml))
+        self.assertEqual(
+            [node.tag for node in root.iter()], ["TEI", "text", "body", "p"]
+        )
+
+    def test_all_observers_applied_again_without_scan(self):
+        transformer = TeiTransformer(self.iterator)
+        observer = TaggedFakeObserver("p", action=remove_node)
+        transformer.set_list_of_observers(([observer], []))
+        transformer.select_observers(TagScan(frozenset({"TEI"}), frozenset()))
+        self.assertEqual(transformer.select_observers(None), 0)
+        root = transformer.perform_transformation(io.BytesIO(b"<TEI><p/></TEI>"))
+        self.assertEqual(len(root), 0)
+
+    def test_only_header_parsed_if_text_observers_left_out(self):
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["teiheader-type", "ul-elem"])
+        )
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        transformer.select_observers(scan_file(file))
+        self.assertTrue(transformer.transforms_header_only())
+        transformer.perform_transformation(file)
+        self.assertIsNotNone(transformer.unparsed_text())
+
+    def test_tei_namespace_observer_never_left_out(self):
+        self.transformer.set_list_of_observers(
+            ObserverConstructor().construct_observers(["tei-ns", "ul-elem"])
+        )
+        left_out = self.transformer.select_observers(
+            TagScan(frozenset({"TEI"}), frozenset())
+        )
+        self.assertEqual(left_out, 1)
+        self.assertFalse(self.transformer.transforms_header_only())
+
+    def test_output_with_selected_observers_equal_to_output_of_all(self):
+        constructor = ObserverConstructor()
+        config = parse_config_file(
+            os.path.join("tests", "testdata", "conf_files", "default.cfg")
+        )
+        observers = constructor.construct_observers(
+            list(constructor.plugins_by_name), config
+        )
+        transformer = TeiTransformer(self.iterator)
+        transformer.set_list_of_observers(observers)
+        for file in glob.glob(os.path.join("tests", "testdata", "*.xml")):
+            try:
+                if etree.QName(etree.parse(file).getroot()).localname != "TEI":
+                    continue
+            except etree.XMLSyntaxError:
+                continue
+            outputs = []
+            for scan in (None, scan_file(file)):
+                transformer.select_observers(scan)
+                root = transformer.perform_transformation(file)
+                outputs.append(etree.tostring(root) if root is not None else None)
+            with self.subTest(file=file):
+                self.assertEqual(outputs[0], outputs[1])
+
 
 # helper functions for node transformation with FakeObserver
+def remove_node(node):
+    node.getparent().remove(node)
+
+
 def change_tag(node):
     node.tag = "newTag"
 
 
+def rename(tag):
+    def change(node):
+        node.tag = tag
+
+    return change
+
+
+def add_child(node):
+    etree.SubElement(node, "x")
+
+
+def sleep(node):
+    time.sleep(0.005)
+
+
 def remove_id_attrib(node):
     node.attrib.pop("id", None)
 
 
+def raise_transformation_error(node):
+    raise TransformationError("manual curation needed")
+
+
+def _observe_every_node(observer, root):
+    # the transformation before nodes were dispatched by tag and scope
+    for node in list(root.iter()):
+        if observer.observe(node):
+            observer.transform_node(node)
+
+
 class FakeObserver:
     def __init__(self, tag=None, action=None):
         self.action = action
@@ -665,7 +1477,58 @@ class FakeObserver:
             self.action(node)
 
 
+class SiblingCountingObserver:
+    target_tags = frozenset({"div"})
+    local_context = True
+
+    def __init__(self):
+        self.preceding_siblings = []
+
+    def observe(self, node):
+        self.preceding_siblings.append(len(list(node.itersiblings(preceding=True))))
+        return False
+
+    def transform_node(self, node):
+        pass
+
+
+class RecordingObserver:
+    """Record the nodes visited with the localname of the target tags."""
+
+    def __init__(
+        self, event, events, tag=None, requires_transformed=None, children=False
+    ):
+        self.event = event
+        self.events = events
+        self.requires_transformed = requires_transformed
+        self.children = children
+        if tag is not None:
+            self.target_tags = frozenset({tag})
+
+    def observe(self, node):
+        if isinstance(node.tag, str):
+            event = (self.event, etree.QName(node).localname)
+            if self.children:
+                event += ([child.tag for child in node],)
+            self.events.append(event)
+        return False
+
+    def transform_node(self, node):
+        pass
+
+
+class TaggedFakeObserver(FakeObserver):
+    def __init__(self, tag=None, action=None):
+        super().__init__(tag, action)
+        self.target_tags = frozenset({tag})
+
+
 class FakeIterator:
+    parser_options = ParserOptions()
+
     def iterate_xml(self, filename):
         for node in etree.parse(filename).iter():
             yield node
+
+    def split_header(self, filename):
+        return None
@@ -0,0 +1,52 @@
+import time
+import unittest
+
+from lxml import etree
+
+from tei_transform.transformation_budget import BudgetExceeded, TransformationBudget
+
+
+class TransformationBudgetTester(unittest.TestCase):
+    def setUp(self):
+        self.root = etree.fromstring("<TEI><p/><p/><p/></TEI>")
+
+    def test_nodes_within_budget_yielded(self):
+        tracker = TransformationBudget(max_nodes=4).start()
+        self.assertEqual(list(tracker.count(self.root.iter())), list(self.root.iter()))
+        self.assertEqual(tracker.nodes, 4)
+
+    def test_nodes_counted_over_several_traversals(self):
+        tracker = TransformationBudget(max_nodes=6).start()
+        list(tracker.count(self.root.iter()))
+        with self.assertRaises(BudgetExceeded) as context:
+            list(tracker.count(self.root.iter()))
+        self.assertEqual(context.exception.nodes, 7)
+        self.assertEqual(context.exception.reason, "Node budget of 6 exceeded")
+        self.assertIsNone(context.exception.observer)
+
+    def test_time_budget_exceeded(self):
+        tracker = TransformationBudget(max_seconds=0.01).start()
+        time.sleep(0.02)
+        with self.assertRaises(BudgetExceeded) as context:
+            tracker.check(FakeObserver())
+        self.assertEqual(context.exception.observer, "FakeObserver")
+        self.assertGreater(context.exception.elapsed, 0.01)
+        self.assertIn("observer: FakeObserver", str(context.exception))
+
+    def test_time_within_budget(self):
+        tracker = TransformationBudget(max_seconds=60).start()
+        tracker.check(FakeObserver())
+
+    def test_no_limits(self):
+        tracker = TransformationBudget().start()
+        list(tracker.count(self.root.iter()))
+        tracker.check()
+        self.assertEqual(tracker.nodes, 4)
+
+
+class FakeObserver:
+    def observe(self, node):
+        return False
+
+    def transform_node(self, node):
+        pass
@@ -0,0 +1,358 @@
+import http.client
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from lxml import etree
+
+from tei_transform.cli.use_case import CliRequest, TeiTransformationUseCaseImpl
+from tei_transform.corpus_survey import CorpusSurveyor
+from tei_transform.observer import TeiHeaderTypeObserver
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.parse_config import RevisionDescChange
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.transformation_service import (
+    TcpTransformationServer,
+    TransformationService,
+    UnixTransformationServer,
+    serve,
+    service_socket_path,
+)
+from tei_transform.xml_tree_iterator import XMLTreeIterator
+from tei_transform.xml_writer import XmlWriterImpl
+
+SCHEME = b"""<element name="TEI" ns="http://www.tei-c.org/ns/1.0"
+  xmlns="http://relaxng.org/ns/structure/1.0">
+  <element name="teiHeader"><empty/></element>
+  <zeroOrMore><element name="p"><text/></element></zeroOrMore>
+</element>
+"""
+
+CHANGED = b"""<TEI xmlns="http://www.tei-c.org/ns/1.0">
+<teiHeader type="text"/><p>text</p></TEI>"""
+
+UNCHANGED = b"""<TEI xmlns="http://www.tei-c.org/ns/1.0">
+<teiHeader/><p>text</p></TEI>"""
+
+
+class TransformationServiceTester(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.tempdir = tempdir.name
+        self.service = _construct_service()
+
+    def test_changed_document_returned_with_validity(self):
+        result = self.service.transform_document(io.BytesIO(CHANGED))
+        self.assertTrue(result.changed)
+        self.assertTrue(result.valid)
+        root = etree.fromstring(result.data)
+        self.assertNotIn("type", root[0].attrib)
+
+    def test_unchanged_document_reported(self):
+        result = self.service.transform_document(io.BytesIO(UNCHANGED))
+        self.assertFalse(result.changed)
+        self.assertTrue(result.valid)
+
+    def test_invalid_result_reported(self):
+        result = self.service.transform_document(
+            io.BytesIO(UNCHANGED.replace(b"<teiHeader/>", b"<teiHeader n='1'/>"))
+        )
+        self.assertFalse(result.valid)
+
+    def test_validity_unknown_without_validator(self):
+        self.service.validator = None
+        result = self.service.transform_document(io.BytesIO(CHANGED))
+        self.assertIsNone(result.valid)
+        self.assertIsNone(self.service.validate(io.BytesIO(CHANGED)))
+
+    def test_no_result_for_document_without_tei_root(self):
+        self.assertIsNone(self.service.transform_document(io.BytesIO(b"<a/>")))
+
+    def test_malformed_document_raises_error(self):
+        with self.assertRaises(etree.XMLSyntaxError):
+            self.service.transform_document(io.BytesIO(b"<TEI>"))
+
+    def test_file_written_to_output_dir(self):
+        file = os.path.join(self.tempdir, "file.xml")
+        with open(file, "wb") as ptr:
+            ptr.write(CHANGED)
+        output_dir = os.path.join(self.tempdir, "output")
+        result = self.service.transform_file(file, output_dir)
+        self.assertEqual(result.output_path, os.path.join(output_dir, "file.xml"))
+        self.assertIsNone(result.data)
+        root = etree.parse(result.output_path).getroot()
+        self.assertNotIn("type", root[0].attrib)
+
+    def test_revision_entry_added_to_changed_document(self):
+        self.service.revision_entry = RevisionDescChange(
+            person=["Name"], date="2022-01-01", reason="reason"
+        )
+        changed = etree.fromstring(
+            self.service.transform_document(io.BytesIO(CHANGED)).data
+        )
+        unchanged = etree.fromstring(
+            self.service.transform_document(io.BytesIO(UNCHANGED)).data
+        )
+        self.assertIsNotNone(changed.find(".//{*}revisionDesc"))
+        self.assertIsNone(unchanged.find(".//{*}revisionDesc"))
+
+    def test_documents_validated(self):
+        self.assertFalse(self.service.validate(io.BytesIO(CHANGED)))
+        self.assertTrue(self.service.validate(io.BytesIO(UNCHANGED)))
+
+    def test_documents_surveyed(self):
+        self.assertEqual(
+            self.service.survey(io.BytesIO(CHANGED)), {"teiheader-type": 1}
+        )
+
+
+class TransformationServerTester(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        # paths are returned resolved
+        self.tempdir = os.path.realpath(tempdir.name)
+        self.input = os.path.join(self.tempdir, "input")
+        os.mkdir(self.input)
+        self.output = os.path.join(self.tempdir, "output")
+        self.socket_path = os.path.join(self.tempdir, "transformation.sock")
+        self.service = _construct_service()
+        self.server = UnixTransformationServer(
+            self.socket_path, self.service, self.output, self.input
+        )
+        self._start_server(self.server)
+
+    def test_document_transformed(self):
+        response, data = self._request("POST", "/transform", CHANGED)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Type"), "application/xml")
+        self.assertEqual(response.getheader("X-TEI-Changed"), "true")
+        self.assertEqual(response.getheader("X-TEI-Valid"), "true")
+        self.assertNotIn("type", etree.fromstring(data)[0].attrib)
+
+    def test_validity_header_left_out_without_validator(self):
+        self.service.validator = None
+        response, _ = self._request("POST", "/transform", UNCHANGED)
+        self.assertEqual(response.getheader("X-TEI-Changed"), "false")
+        self.assertIsNone(response.getheader("X-TEI-Valid"))
+
+    def test_file_transformed_to_default_output_dir(self):
+        file = self._write_input_file(CHANGED)
+        response, data = self._request_json("/transform", {"file": file})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(
+            json.loads(data),
+            {
+                "output_path": os.path.join(self.output, "file.xml"),
+                "changed": True,
+                "valid": True,
+            },
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.output, "file.xml")))
+
+    def test_file_transformed_to_output_dir_of_request(self):
+        file = self._write_input_file(UNCHANGED)
+        output_dir = os.path.join(self.output, "other")
+        _, data = self._request_json("/transform", {"file": file, "output": output_dir})
+        self.assertEqual(
+            json.loads(data)["output_path"], os.path.join(output_dir, "file.xml")
+        )
+
+    def test_paths_outside_of_service_directories_rejected(self):
+        file = self._write_input_file(CHANGED)
+        outside = os.path.join(self.tempdir, "file.xml")
+        with open(outside, "wb") as ptr:
+            ptr.write(CHANGED)
+        os.symlink(outside, os.path.join(self.input, "link.xml"))
+        requests = [
+            ("/transform", {"file": outside}),
+            ("/transform", {"file": os.path.join(self.input, "..", "file.xml")}),
+            ("/transform", {"file": os.path.join(self.input, "link.xml")}),
+            ("/transform", {"file": file, "output": self.tempdir}),
+            ("/transform", {"file": file, "output": self.output + "-other"}),
+            ("/validate", {"file": outside}),
+            ("/survey", {"file": "/etc/passwd"}),
+        ]
+        for path, content in requests:
+            with self.subTest(path=path, content=content):
+                response, data = self._request_json(path, content)
+                self.assertEqual(response.status, 403)
+                self.assertIn("error", json.loads(data))
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_output_that_is_no_string_rejected(self):
+        file = self._write_input_file(CHANGED)
+        response, _ = self._request_json("/transform", {"file": file, "output": 1})
+        self.assertEqual(response.status, 400)
+
+    def test_paths_rejected_without_input_directory(self):
+        self.server.input_root = None
+        file = self._write_input_file(CHANGED)
+        response, data = self._request_json("/survey", {"file": file})
+        self.assertEqual(response.status, 403)
+        self.assertIn("error", json.loads(data))
+
+    def test_socket_only_accessible_by_user(self):
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+
+    def test_document_validated(self):
+        _, data = self._request("POST", "/validate", CHANGED)
+        self.assertEqual(json.loads(data), {"valid": False})
+
+    def test_validation_rejected_without_validator(self):
+        self.service.validator = None
+        response, _ = self._request("POST", "/validate", CHANGED)
+        self.assertEqual(response.status, 501)
+
+    def test_document_surveyed(self):
+        _, data = self._request("POST", "/survey", CHANGED)
+        self.assertEqual(json.loads(data), {"hits": {"teiheader-type": 1}})
+
+    def test_status_contains_plugins(self):
+        response, data = self._request("GET", "/status")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(
+            json.loads(data), {"plugins": ["teiheader-type"], "validation": True}
+        )
+
+    def test_errors_returned_with_status(self):
+        requests = [
+            ("/transform", b"<TEI>", "text/xml", 422),
+            ("/transform", b"<a/>", "text/xml", 422),
+            ("/transform", b"{", "application/json", 400),
+            ("/transform", b"[]", "application/json", 400),
+            ("/transform", b"{}", "application/json", 400),
+            (
+                "/survey",
+                json.dumps({"file": os.path.join(self.input, "missing.xml")}).encode(),
+                "application/json",
+                400,
+            ),
+            ("/unknown", CHANGED, "text/xml", 404),
+        ]
+        for path, body, content_type, status in requests:
+            with self.subTest(path=path, body=body):
+                response, data = self._request(
+                    "POST", path, body, {"Content-Type": content_type}
+                )
+                self.assertEqual(response.status, status)
+                self.assertIn("error", json.loads(data))
+
+    def test_service_served_on_localhost_port(self):
+        server = TcpTransformationServer(0, self.service, self.output)
+        self._start_server(server)
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        self.addCleanup(connection.close)
+        connection.request("POST", "/transform", CHANGED)
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.getheader("X-TEI-Changed"), "true")
+
+    def test_second_service_on_socket_rejected(self):
+        with self.assertRaises(SystemExit):
+            serve(self.service, self.socket_path)
+
+    def test_socket_path_in_cache_dir(self):
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.tempdir}):
+            self.assertTrue(
+                service_socket_path().startswith(
+                    os.path.join(self.tempdir, "tei-transform")
+                )
+            )
+
+    def _write_input_file(self, data):
+        file = os.path.join(self.input, "file.xml")
+        with open(file, "wb") as ptr:
+            ptr.write(data)
+        return file
+
+    def _request_json(self, path, content):
+        return self._request(
+            "POST",
+            path,
+            json.dumps(content).encode("utf-8"),
+            {"Content-Type": "application/json"},
+        )
+
+    def _request(self, method, path, body=None, headers=None):
+        connection = UnixHTTPConnection(self.socket_path)
+        self.addCleanup(connection.close)
+        connection.request(method, path, body, headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+
+    def _start_server(self, server):
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+
+class ServeUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.scheme = os.path.join(tempdir.name, "scheme.rng")
+        with open(self.scheme, "wb") as ptr:
+            ptr.write(SCHEME)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": tempdir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.use_case = TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+            tei_scheme=self.scheme,
+        )
+
+    def test_service_constructed_once_and_served(self):
+        request = CliRequest(
+            "",
+            ["teiheader-type"],
+            validation=True,
+            serve=True,
+            serve_port=8080,
+        )
+        with mock.patch("tei_transform.cli.commands.serve") as serve_mock:
+            self.use_case.process(request)
+        (service, socket_path, port, output, input_root), _ = serve_mock.call_args
+        self.assertEqual(
+            (socket_path, port, output, input_root), (None, 8080, "output", None)
+        )
+        self.assertEqual(service.plugins, ["teiheader-type"])
+        self.assertIsInstance(service.validator, etree.RelaxNG)
+        self.assertEqual(service.survey(io.BytesIO(CHANGED))["teiheader-type"], 1)
+
+    def test_service_without_validation(self):
+        request = CliRequest("", ["teiheader-type"], serve=True)
+        with mock.patch("tei_transform.cli.commands.serve") as serve_mock:
+            self.use_case.process(request)
+        self.assertIsNone(serve_mock.call_args[0][0].validator)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path):
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def _construct_service():
+    transformer = TeiTransformer(XMLTreeIterator())
+    transformer.set_list_of_observers(([TeiHeaderTypeObserver()], []))
+    return TransformationService(
+        tei_transformer=transformer,
+        xml_writer=XmlWriterImpl(),
+        surveyor=CorpusSurveyor({"teiheader-type": TeiHeaderTypeObserver()}),
+        plugins=["teiheader-type"],
+        validator=etree.RelaxNG(etree.fromstring(SCHEME)),
+    )
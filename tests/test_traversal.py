@@ -0,0 +1,72 @@
+import unittest
+
+from lxml import etree
+
+from tei_transform.traversal import Traversal, is_ancestor, schedule_traversals
+
+
+class ScheduleTraversalsTester(unittest.TestCase):
+    def test_single_traversal_without_second_pass(self):
+        observers = [DeclaringObserver(), DeclaringObserver()]
+        result = schedule_traversals(observers, [])
+        self.assertEqual(result, [Traversal(observers)])
+
+    def test_subtree_observers_applied_in_post_order(self):
+        first = DeclaringObserver()
+        second = DeclaringObserver("subtree")
+        result = schedule_traversals([first], [second])
+        self.assertEqual(result, [Traversal([first], [second])])
+
+    def test_second_traversal_for_document_observers(self):
+        first = DeclaringObserver()
+        second = [DeclaringObserver("document"), DeclaringObserver("subtree")]
+        result = schedule_traversals([first], second)
+        self.assertEqual(result, [Traversal([first]), Traversal(second)])
+
+    def test_second_traversal_for_observers_without_dependency(self):
+        first = DeclaringObserver()
+        second = DeclaringObserver()
+        result = schedule_traversals([first], [second])
+        self.assertEqual(result, [Traversal([first]), Traversal([second])])
+
+    def test_subtree_observers_not_moved_without_first_pass(self):
+        second = DeclaringObserver("subtree")
+        result = schedule_traversals([], [second])
+        self.assertEqual(result, [Traversal([second])])
+
+    def test_declared_dependency_in_first_pass_respected(self):
+        first = DeclaringObserver()
+        document = DeclaringObserver("document")
+        result = schedule_traversals([document, first], [])
+        self.assertEqual(result, [Traversal([first]), Traversal([document])])
+
+    def test_no_traversal_without_observers(self):
+        self.assertEqual(schedule_traversals([], []), [])
+
+
+class IsAncestorTester(unittest.TestCase):
+    def setUp(self):
+        self.root = etree.fromstring("<a><b><c/></b><d/></a>")
+
+    def test_ancestors_recognized(self):
+        node = self.root.find(".//c")
+        self.assertTrue(is_ancestor(self.root, node))
+        self.assertTrue(is_ancestor(self.root[0], node))
+
+    def test_node_is_not_its_own_ancestor(self):
+        self.assertFalse(is_ancestor(self.root, self.root))
+
+    def test_siblings_are_not_ancestors(self):
+        self.assertFalse(is_ancestor(self.root[0], self.root[1]))
+        self.assertFalse(is_ancestor(self.root[1], self.root[0]))
+
+
+class DeclaringObserver:
+    def __init__(self, requires_transformed=None):
+        self.requires_transformed = requires_transformed
+
+    def observe(self, node):
+        return False
+
+    def transform_node(self, node):
+        pass
@@ -1,14 +1,23 @@
+import dataclasses
+import io
+import json
 import os
+import tempfile
 import unittest
 from itertools import permutations
-from typing import Dict, Set
+from unittest import mock
+from typing import Dict, Iterable, Optional, Set, Tuple
 
 from lxml import etree
 
 from tei_transform.cli.use_case import CliRequest, TeiTransformationUseCaseImpl
+from tei_transform.memory_limit import resident_set_size
 from tei_transform.observer_constructor import MissingConfiguration, ObserverConstructor
+from tei_transform.result_cache import ResultCache, file_digest
+from tei_transform.tag_scan import scan_file
 from tei_transform.tei_transformer import TeiTransformer
-from tei_transform.xml_tree_iterator import XMLTreeIterator
+from tei_transform.xml_tree_iterator import UnparsedText, XMLTreeIterator
+from tei_transform.xml_writer import XmlWriterImpl
 from tests.mock_observer import add_mock_plugin_entry_point
 
 
@@ -22,10 +31,34 @@ class MockXmlWriter:
         self.written_data: Dict[str, etree._Element] = dict()
         self.created_dirs: Set[str] = set()
         self.copied_files: Dict[str, str] = dict()
+        self.unparsed_text: Dict[str, Optional[UnparsedText]] = dict()
+        self.unchanged_files: Dict[str, Tuple[str, bool]] = dict()
+        self.streamed_files: Set[str] = set()
         self.testcase = testcase
 
-    def write_xml(self, path: str, xml: etree._Element) -> None:
+    def write_xml(
+        self,
+        path: str,
+        xml: etree._Element,
+        unparsed_text: Optional[UnparsedText] = None,
+    ) -> None:
+        if unparsed_text is not None:
+            # combine the header with the unparsed text like XmlWriterImpl
+            data = io.BytesIO()
+            header = etree.tostring(xml.getroottree(), encoding="utf-8")
+            data.write(header[: header.rindex(b"</")])
+            unparsed_text.copy_to(data)
+            xml = etree.fromstring(data.getvalue())
         self.written_data[path] = xml
+        self.unparsed_text[path] = unparsed_text
+
+    def write_stream(self, path: str, chunks: Iterable[bytes]) -> bool:
+        data = b"".join(chunks)
+        if not data:
+            return False
+        self.written_data[path] = etree.fromstring(data)
+        self.streamed_files.add(path)
+        return True
 
     def create_output_directories(self, output_dir: str) -> None:
         self.created_dirs.add(output_dir)
@@ -33,11 +66,34 @@ class MockXmlWriter:
     def copy_valid_files(self, file: str, output_dir: str) -> None:
         self.copied_files[file] = output_dir
 
+    def copy_unchanged_file(self, file: str, path: str, link: bool = False) -> None:
+        self.unchanged_files[path] = (file, link)
+
     def assertSingleDocumentWritten(self):
         self.testcase.assertEqual(len(self.written_data), 1)
         return self.written_data.popitem()
 
 
+class SpyXMLTreeIterator(XMLTreeIterator):
+    def __init__(self):
+        self.parsed_files = []
+        self.iterated_trees = 0
+
+    def iterate_xml(self, file):
+        self.parsed_files.append(file)
+        return super().iterate_xml(file)
+
+    def iterate_tree(self, tree):
+        self.iterated_trees += 1
+        return super().iterate_tree(tree)
+
+    def split_header(self, file):
+        split_document = super().split_header(file)
+        if split_document is not None:
+            self.parsed_files.append(file)
+        return split_document
+
+
 class UseCaseTester(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -1214,7 +1270,7 @@ class UseCaseTester(unittest.TestCase):
         with self.assertLogs() as logged:
             self.use_case.process(request)
         self.assertIn(
-            "ERROR:tei_transform.cli.use_case:"
+            "ERROR:tei_transform.cli.file_processor:"
             "File ignored: tests/testdata/empty_file.xml",
             logged.output[0],
         )
@@ -1347,6 +1403,17 @@ class UseCaseTester(unittest.TestCase):
         expected_error_msg = "Invalid attribute id for element"
         return any(msg.startswith(expected_error_msg) for msg in logs)
 
+    def test_file_parsed_only_once_if_validation_requested(self):
+        iterator = SpyXMLTreeIterator()
+        self.use_case.tei_transformer = TeiTransformer(xml_iterator=iterator)
+        file = os.path.join(self.data, "file_with_type_in_teiheader.xml")
+        request = CliRequest(file, ["teiheader-type"], validation=True)
+        self.use_case.process(request)
+        _, output = self.xml_writer.assertSingleDocumentWritten()
+        self.assertEqual(output[0].attrib, {})
+        self.assertEqual(iterator.parsed_files, [])
+        self.assertEqual(iterator.iterated_trees, 1)
+
     def file_invalid_because_of_filename_element(self, file):
         logs = self._get_validation_error_logs_for_file(file)
         expected_error_msg = "Did not expect element filename there"
@@ -1387,3 +1454,1281 @@ class UseCaseTester(unittest.TestCase):
         _, output = self.xml_writer.assertSingleDocumentWritten()
         result = self.tei_validator.validate(output)
         return result
+
+
+class ParallelUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.data = os.path.join("tests", "testdata")
+        self.tei_scheme = os.path.join("tei_transform", "tei_all.rng")
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def test_output_of_parallel_run_identical_to_sequential_run(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        plugins = ["teiheader-type", "schemalocation", "tail-text"]
+        outputs = []
+        for jobs in [1, 3]:
+            output = os.path.join(self.tempdir.name, str(jobs))
+            self._create_use_case().process(
+                CliRequest(input_dir, plugins, output=output, jobs=jobs)
+            )
+            outputs.append(self._read_output_files(output))
+        self.assertEqual(len(outputs[0]), 6)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_log_messages_of_workers_emitted_in_order_of_input_files(self):
+        input_dir = os.path.join(self.data, "dir_with_empty_file")
+        empty_file = os.path.join(input_dir, "empty_file.xml")
+        logs = []
+        for jobs in [1, 2]:
+            request = CliRequest(
+                input_dir,
+                ["teiheader-type"],
+                output=self.tempdir.name,
+                jobs=jobs,
+                schedule="walk",
+            )
+            with self.assertLogs() as logged:
+                self._create_use_case().process(request)
+            logs.append([line.split("\n")[0] for line in logged.output])
+        self.assertIn(f"File ignored: {empty_file}", logs[1][0])
+        # log of parallel run ends with report of worker utilisation
+        self.assertEqual(logs[0], logs[1][: len(logs[0])])
+
+    def test_largest_files_scheduled_first(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        request = CliRequest(input_dir, [], jobs=2)
+        tasks = self._schedule_input_files(self._create_use_case(), request)
+        sizes = [os.path.getsize(file) for file, _ in tasks]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+
+    def test_files_scheduled_by_cost_model(self):
+        input_dir = os.path.join(self.data, "dir_with_files")
+        request = CliRequest(input_dir, [], jobs=2)
+        use_case = self._create_use_case()
+        use_case.cost_model = lambda file: int(file[-5])
+        tasks = self._schedule_input_files(use_case, request)
+        result = [os.path.basename(file) for file, _ in tasks]
+        self.assertEqual(result, ["file3.xml", "file2.xml", "file1.xml"])
+
+    def test_files_scheduled_in_walk_order(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        request = CliRequest(input_dir, [], jobs=2, schedule="walk")
+        use_case = self._create_use_case()
+        tasks = self._schedule_input_files(use_case, request)
+        self.assertEqual(tasks, list(use_case._input_files(request)))
+
+    def test_makespan_and_utilisation_of_workers_reported(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        request = CliRequest(
+            input_dir, ["teiheader-type"], output=self.tempdir.name, jobs=2
+        )
+        with self.assertLogs(level="INFO") as logged:
+            self._create_use_case().process(request)
+        report = [line for line in logged.output if "makespan" in line]
+        utilisation = [line for line in logged.output if "utilisation" in line]
+        self.assertEqual(len(report), 1)
+        self.assertIn("Processed 6 files", report[0])
+        self.assertTrue(1 <= len(utilisation) <= 2)
+
+    def test_observer_statistics_of_workers_collected(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        plugins = ["teiheader-type", "schemalocation", "tail-text"]
+        results = []
+        for jobs in [1, 2]:
+            stats_file = os.path.join(self.tempdir.name, f"stats{jobs}.json")
+            request = CliRequest(
+                input_dir,
+                plugins,
+                output=os.path.join(self.tempdir.name, str(jobs)),
+                jobs=jobs,
+                observer_stats=stats_file,
+            )
+            self._create_use_case().process(request)
+            with open(stats_file, encoding="utf-8") as ptr:
+                results.append(json.load(ptr))
+        self.assertEqual(len(results[0]["files"]), 6)
+        self.assertEqual(results[0]["files"].keys(), results[1]["files"].keys())
+        for name, statistics in results[0]["total"].items():
+            with self.subTest(observer=name):
+                self.assertEqual(
+                    statistics["observe_calls"],
+                    results[1]["total"][name]["observe_calls"],
+                )
+                self.assertEqual(
+                    statistics["matches"], results[1]["total"][name]["matches"]
+                )
+
+    def _create_use_case(self):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+            tei_scheme=self.tei_scheme,
+        )
+
+    def _schedule_input_files(self, use_case, request):
+        input_files = use_case._input_files(request)
+        return input_files.scheduled(request.schedule, use_case.cost_model)
+
+    def _read_output_files(self, output_dir):
+        output_files = {}
+        for root, _, files in os.walk(output_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, "rb") as ptr:
+                    output_files[os.path.relpath(path, output_dir)] = ptr.read()
+        return output_files
+
+
+class PipelineUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.data = os.path.join("tests", "testdata")
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def test_output_of_pipeline_identical_to_sequential_run(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        for plugins in [
+            ["teiheader-type", "schemalocation", "tail-text", "div-sibling"],
+            ["teiheader-type", "schemalocation"],
+        ]:
+            outputs = []
+            for prefetch in [0, 2]:
+                output = os.path.join(self.tempdir.name, f"{len(plugins)}-{prefetch}")
+                self._create_use_case().process(
+                    CliRequest(input_dir, plugins, output=output, prefetch=prefetch)
+                )
+                outputs.append(self._read_output_files(output))
+            with self.subTest(plugins=plugins):
+                self.assertEqual(len(outputs[0]), 6)
+                self.assertEqual(outputs[0], outputs[1])
+
+    def test_streamed_output_of_pipeline_identical_to_sequential_run(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        outputs = []
+        for prefetch in [0, 2]:
+            output = os.path.join(self.tempdir.name, str(prefetch))
+            request = CliRequest(
+                input_dir, ["tail-text"], output=output, prefetch=prefetch, stream=True
+            )
+            self._create_use_case().process(request)
+            outputs.append(self._read_output_files(output))
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_malformed_file_ignored(self):
+        input_dir = os.path.join(self.data, "dir_with_empty_file")
+        empty_file = os.path.join(input_dir, "empty_file.xml")
+        request = CliRequest(
+            input_dir, ["tail-text"], output=self.tempdir.name, prefetch=1
+        )
+        with self.assertLogs() as logged:
+            self._create_use_case().process(request)
+        self.assertIn(f"File ignored: {empty_file}", logged.output[0])
+        self.assertNotIn("empty_file.xml", self._read_output_files(self.tempdir.name))
+
+    def test_prefetched_tree_validated(self):
+        validator = FakeValidator(valid=True)
+        use_case = self._create_use_case()
+        use_case.tei_validator = validator
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        request = CliRequest(
+            input_dir,
+            ["tail-text"],
+            output=self.tempdir.name,
+            validation=True,
+            copy_valid=True,
+            prefetch=2,
+        )
+        use_case.process(request)
+        self.assertEqual(validator.validated_files, 6)
+        self.assertEqual(len(self._read_output_files(self.tempdir.name)), 6)
+
+    def test_results_of_pipeline_cached(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        cache = os.path.join(self.tempdir.name, "cache.db")
+        request = CliRequest(
+            input_dir,
+            ["tail-text"],
+            output=os.path.join(self.tempdir.name, "output"),
+            cache=cache,
+            prefetch=2,
+        )
+        self._create_use_case().process(request)
+        iterator = SpyXMLTreeIterator()
+        use_case = self._create_use_case()
+        use_case.tei_transformer = TeiTransformer(xml_iterator=iterator)
+        use_case.process(dataclasses.replace(request, prefetch=0))
+        self.assertEqual(iterator.parsed_files, [])
+
+    def _create_use_case(self):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+
+    def _read_output_files(self, output_dir):
+        output_files = {}
+        for root, _, files in os.walk(output_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, "rb") as ptr:
+                    output_files[os.path.relpath(path, output_dir)] = ptr.read()
+        return output_files
+
+
+class UnchangedOutputUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.output = os.path.join(self.tempdir.name, "output")
+        self.unchanged_file = os.path.join(
+            "tests", "testdata", "file_with_double_item.xml"
+        )
+        self.changed_file = os.path.join(
+            "tests", "testdata", "file_with_type_in_teiheader.xml"
+        )
+        self.xml_writer = MockXmlWriter(testcase=self)
+        self.use_case = TeiTransformationUseCaseImpl(
+            xml_writer=self.xml_writer,
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+
+    def test_unchanged_file_written_by_default(self):
+        self.use_case.process(CliRequest(self.unchanged_file, ["teiheader-type"]))
+        self.xml_writer.assertSingleDocumentWritten()
+        self.assertEqual(self.xml_writer.unchanged_files, {})
+
+    def test_unchanged_file_copied(self):
+        request = CliRequest(self.unchanged_file, ["teiheader-type"], unchanged="copy")
+        self.use_case.process(request)
+        self.assertEqual(self.xml_writer.written_data, {})
+        self.assertEqual(
+            self.xml_writer.unchanged_files,
+            {
+                os.path.join("output", os.path.basename(self.unchanged_file)): (
+                    self.unchanged_file,
+                    False,
+                )
+            },
+        )
+
+    def test_unchanged_file_linked(self):
+        request = CliRequest(self.unchanged_file, ["teiheader-type"], unchanged="link")
+        self.use_case.process(request)
+        [(_, link)] = self.xml_writer.unchanged_files.values()
+        self.assertTrue(link)
+
+    def test_changed_file_written(self):
+        request = CliRequest(self.changed_file, ["teiheader-type"], unchanged="copy")
+        self.use_case.process(request)
+        self.xml_writer.assertSingleDocumentWritten()
+        self.assertEqual(self.xml_writer.unchanged_files, {})
+
+    def test_unchanged_file_copied_byte_for_byte(self):
+        use_case = TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+        request = CliRequest(
+            self.unchanged_file, ["div-sibling"], output=self.output, unchanged="copy"
+        )
+        use_case.process(request)
+        output_file = os.path.join(self.output, os.path.basename(self.unchanged_file))
+        with open(output_file, "rb") as output, open(self.unchanged_file, "rb") as ptr:
+            self.assertEqual(output.read(), ptr.read())
+
+    def test_file_changed_if_tei_namespace_added(self):
+        file = os.path.join("tests", "testdata", "file_without_tei_namespace.xml")
+        request = CliRequest(file, ["tei-ns"], unchanged="copy")
+        self.use_case.process(request)
+        self.xml_writer.assertSingleDocumentWritten()
+
+
+class StreamingUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.data = os.path.join("tests", "testdata")
+        self.file = os.path.join(self.data, "file_with_tail_text.xml")
+        self.output_file = os.path.join("output", os.path.basename(self.file))
+        self.xml_writer = MockXmlWriter(testcase=self)
+        self.use_case = TeiTransformationUseCaseImpl(
+            xml_writer=self.xml_writer,
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+
+    def test_file_streamed_if_requested(self):
+        request = CliRequest(self.file, ["tail-text", "teiheader-type"], stream=True)
+        self.use_case.process(request)
+        self.assertEqual(self.xml_writer.streamed_files, {self.output_file})
+        _, output = self.xml_writer.assertSingleDocumentWritten()
+        self.assertIsNotNone(output.find(".//{*}body"))
+
+    def test_file_not_streamed_by_default(self):
+        self.use_case.process(CliRequest(self.file, ["tail-text"]))
+        self.xml_writer.assertSingleDocumentWritten()
+        self.assertEqual(self.xml_writer.streamed_files, set())
+
+    def test_file_not_streamed_if_observers_need_siblings(self):
+        request = CliRequest(self.file, ["tail-text", "div-sibling"], stream=True)
+        self.use_case.process(request)
+        self.xml_writer.assertSingleDocumentWritten()
+        self.assertEqual(self.xml_writer.streamed_files, set())
+
+    def test_file_not_streamed_if_revision_added(self):
+        request = CliRequest(
+            self.file,
+            ["tail-text"],
+            config=os.path.join(self.data, "revision.config"),
+            add_revision=True,
+            stream=True,
+        )
+        self.use_case.process(request)
+        _, output = self.xml_writer.assertSingleDocumentWritten()
+        self.assertEqual(self.xml_writer.streamed_files, set())
+        self.assertIsNotNone(output.find(".//{*}revisionDesc"))
+
+    def test_malformed_file_ignored(self):
+        file = os.path.join(self.data, "malformed_file.xml")
+        self.use_case.process(CliRequest(file, ["tail-text"], stream=True))
+        self.assertEqual(self.xml_writer.written_data, {})
+
+    def test_file_without_tei_root_processed_as_usual(self):
+        file = os.path.join(self.data, "no_tei_file.xml")
+        self.use_case.process(CliRequest(file, ["tail-text"], stream=True))
+        self.assertEqual(
+            self.xml_writer.written_data,
+            {os.path.join("output", "no_tei_file.xml"): None},
+        )
+
+    def test_unchanged_streamed_file_copied(self):
+        file = os.path.join(self.data, "file_with_double_item.xml")
+        request = CliRequest(file, ["tail-text"], stream=True, unchanged="copy")
+        self.use_case.process(request)
+        self.assertEqual(
+            self.xml_writer.unchanged_files,
+            {os.path.join("output", os.path.basename(file)): (file, False)},
+        )
+
+
+class UntilStableUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.data = os.path.join("tests", "testdata")
+        self.xml_writer = MockXmlWriter(testcase=self)
+        self.observer_constructor = ObserverConstructor()
+        self.use_case = TeiTransformationUseCaseImpl(
+            xml_writer=self.xml_writer,
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=self.observer_constructor,
+        )
+
+    def test_stable_file_logged(self):
+        file = os.path.join(self.data, "file_with_wrong_div_parent2.xml")
+        request = CliRequest(file, ["div-parent", "div-sibling"], max_rounds=10)
+        with self.assertLogs() as logged:
+            self.use_case.process(request)
+        self.assertIn(
+            "INFO:tei_transform.cli.file_processor:"
+            "File stable after 2 rounds: tests/testdata/file_with_wrong_div_parent2.xml",
+            logged.output,
+        )
+
+    def test_unstable_file_logged(self):
+        add_mock_plugin_entry_point(
+            self.observer_constructor,
+            "mock",
+            "tests.mock_observer:MockObserverNeverStable",
+        )
+        file = os.path.join(self.data, "file_with_tail_text.xml")
+        request = CliRequest(file, ["mock"], max_rounds=3)
+        with self.assertLogs() as logged:
+            self.use_case.process(request)
+        self.assertIn(
+            "WARNING:tei_transform.cli.file_processor:"
+            "File not stable after 3 rounds: tests/testdata/file_with_tail_text.xml",
+            logged.output,
+        )
+        _, output = self.xml_writer.assertSingleDocumentWritten()
+        self.assertEqual(len(output.find(".//{*}p").findall("milestone")), 3)
+
+    def test_rounds_not_logged_by_default(self):
+        file = os.path.join(self.data, "file_with_wrong_div_parent2.xml")
+        request = CliRequest(file, ["div-parent", "div-sibling"])
+        with self.assertNoLogs("tei_transform.cli.use_case", level="INFO"):
+            self.use_case.process(request)
+
+
+class PrescanUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = os.path.join("tests", "testdata", "dir_with_subdirs")
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.plugins = ["schemalocation", "teiheader-type", "tail-text", "ul-elem"]
+
+    def test_output_with_prescan_identical_to_output_without(self):
+        outputs = []
+        for prescan in [False, True]:
+            output = os.path.join(self.tempdir.name, str(prescan))
+            self._create_use_case().process(
+                CliRequest(self.input_dir, self.plugins, output=output, prescan=prescan)
+            )
+            outputs.append(self._read_output_files(output))
+        self.assertEqual(len(outputs[0]), 6)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_output_of_prefetched_files_identical_to_output_without_prescan(self):
+        outputs = []
+        for prescan in [False, True]:
+            output = os.path.join(self.tempdir.name, str(prescan))
+            self._create_use_case().process(
+                CliRequest(
+                    self.input_dir,
+                    self.plugins,
+                    output=output,
+                    prefetch=2,
+                    prescan=prescan,
+                )
+            )
+            outputs.append(self._read_output_files(output))
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_observers_left_out_logged(self):
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        output = os.path.join(self.tempdir.name, "output")
+        request = CliRequest(file, self.plugins, output=output, prescan=True)
+        with self.assertLogs(level="DEBUG") as logged:
+            self._create_use_case().process(request)
+        self.assertIn(
+            "DEBUG:tei_transform.cli.file_processor:Observers left out after pre-scan: 1, "
+            f"file: {file}",
+            logged.output,
+        )
+
+    def _create_use_case(self):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+
+    def _read_output_files(self, output):
+        output_files = {}
+        for root, _, files in os.walk(output):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, "rb") as ptr:
+                    output_files[os.path.relpath(path, output)] = ptr.read()
+        return output_files
+
+
+class BoundedMemoryUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = os.path.join("tests", "testdata", "dir_with_subdirs")
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.plugins = ["schemalocation", "teiheader-type", "tail-text", "ul-elem"]
+
+    def test_output_with_memory_limit_identical_to_output_without(self):
+        outputs = []
+        for max_memory in [None, 1 << 20]:
+            output = os.path.join(self.tempdir.name, str(max_memory))
+            self._create_use_case().process(
+                CliRequest(
+                    self.input_dir, self.plugins, output=output, max_memory=max_memory
+                )
+            )
+            outputs.append(self._read_output_files(output))
+        self.assertEqual(len(outputs[0]), 6)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_output_of_prefetched_files_identical_with_memory_limit(self):
+        outputs = []
+        for max_memory in [None, 1 << 20]:
+            output = os.path.join(self.tempdir.name, str(max_memory))
+            self._create_use_case().process(
+                CliRequest(
+                    self.input_dir,
+                    self.plugins,
+                    output=output,
+                    prefetch=2,
+                    max_memory=max_memory,
+                )
+            )
+            outputs.append(self._read_output_files(output))
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_file_exceeding_memory_limit_ignored(self):
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        output = os.path.join(self.tempdir.name, "output")
+        request = CliRequest(file, self.plugins, output=output, max_memory=1 << 20)
+        with self.assertLogs() as logged, self._estimate_huge_trees():
+            self._create_use_case().process(request)
+        self.assertTrue(
+            any(
+                record.startswith(
+                    "ERROR:tei_transform.cli.file_processor:File ignored, "
+                )
+                and record.endswith(f"below the limit of {1 << 20} MB: {file}")
+                for record in logged.output
+            )
+        )
+        self.assertEqual(self._read_output_files(output), {})
+
+    def test_file_exceeding_memory_limit_not_validated(self):
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        output = os.path.join(self.tempdir.name, "output")
+        request = CliRequest(
+            file, self.plugins, output=output, max_memory=1 << 20, copy_valid=True
+        )
+        with self.assertLogs(level="ERROR"), self._estimate_huge_trees():
+            self._create_use_case().process(request)
+        self.assertEqual(self._read_output_files(output), {})
+
+    def test_files_within_limit_processed_with_validator(self):
+        # the memory of the compiled scheme doesn't count against the files
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        output = os.path.join(self.tempdir.name, "output")
+        limit = (resident_set_size() >> 20) + 200
+        request = CliRequest(
+            file,
+            self.plugins,
+            output=output,
+            max_memory=limit,
+            validation=True,
+            copy_valid=True,
+        )
+        use_case = self._create_use_case()
+        use_case.tei_scheme = os.path.join("tei_transform", "tei_all.rng")
+        use_case.process(request)
+        self.assertIsInstance(use_case.tei_validator, etree.RelaxNG)
+        # measured after the scheme was compiled
+        self.assertGreaterEqual(
+            use_case.memory_limit.baseline, resident_set_size() >> 1
+        )
+        self.assertEqual(
+            list(self._read_output_files(output)), ["file_with_type_in_teiheader.xml"]
+        )
+
+    def test_run_stopped_if_limit_below_memory_after_setup(self):
+        request = CliRequest(self.input_dir, self.plugins, max_memory=1)
+        with self.assertRaises(SystemExit) as exit, self.assertLogs(level="ERROR"):
+            self._create_use_case().process(request)
+        self.assertIn("Memory limit of 1 MB too low", str(exit.exception))
+
+    def _estimate_huge_trees(self):
+        return mock.patch(
+            "tei_transform.memory_limit.estimate_tree_size", return_value=1 << 50
+        )
+
+    def test_comments_removed(self):
+        file = os.path.join("tests", "testdata", "file_with_type_in_teiheader.xml")
+        document = etree.parse(file)
+        document.getroot()[0].append(etree.Comment("comment"))
+        file = os.path.join(self.tempdir.name, "file.xml")
+        document.write(file)
+        for max_memory in [None, 1 << 20]:
+            output = os.path.join(self.tempdir.name, str(max_memory))
+            self._create_use_case().process(
+                CliRequest(
+                    file,
+                    self.plugins,
+                    output=output,
+                    max_memory=max_memory,
+                    remove_comments=True,
+                )
+            )
+            with self.subTest(max_memory=max_memory):
+                self.assertNotIn(
+                    b"<!--comment-->", self._read_output_files(output)["file.xml"]
+                )
+
+    def _create_use_case(self):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+
+    def _read_output_files(self, output):
+        output_files = {}
+        for root, _, files in os.walk(output):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, "rb") as ptr:
+                    output_files[os.path.relpath(path, output)] = ptr.read()
+        return output_files
+
+
+class BudgetUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.input_dir = os.path.join(self.tempdir.name, "input")
+        os.mkdir(self.input_dir)
+        self.small_file = self._write_file("small.xml", 1)
+        self.large_file = self._write_file("large.xml", 1000)
+        self.output = os.path.join(self.tempdir.name, "output")
+        self.quarantine = os.path.join(self.tempdir.name, "quarantine.jsonl")
+        self.plugins = ["tail-text", "div-sibling"]
+
+    def test_file_exceeding_budget_quarantined(self):
+        request = CliRequest(
+            self.input_dir,
+            self.plugins,
+            output=self.output,
+            node_budget=100,
+            quarantine=self.quarantine,
+        )
+        with self.assertLogs() as logged:
+            self._create_use_case().process(request)
+        self.assertEqual(self._read_output_files(), ["small.xml"])
+        self.assertEqual(
+            self._read_quarantine(),
+            [(self.large_file, "Node budget of 100 exceeded", 101)],
+        )
+        self.assertIn(
+            "ERROR:tei_transform.cli.file_processor:File quarantined, Node budget of 100 "
+            "exceeded after ",
+            "\n".join(logged.output),
+        )
+        self.assertIn(
+            "WARNING:tei_transform.cli.use_case:1 files quarantined", logged.output
+        )
+
+    def test_streamed_file_exceeding_budget_quarantined(self):
+        request = CliRequest(
+            self.input_dir,
+            self.plugins,
+            output=self.output,
+            node_budget=100,
+            quarantine=self.quarantine,
+            stream=True,
+        )
+        with self.assertLogs(level="ERROR"):
+            self._create_use_case().process(request)
+        self.assertEqual(self._read_output_files(), ["small.xml"])
+        self.assertEqual(len(self._read_quarantine()), 1)
+
+    def test_files_quarantined_by_workers_written_by_main_process(self):
+        request = CliRequest(
+            self.input_dir,
+            self.plugins,
+            output=self.output,
+            node_budget=100,
+            quarantine=self.quarantine,
+            jobs=2,
+        )
+        with self.assertLogs(level="ERROR"):
+            self._create_use_case().process(request)
+        self.assertEqual(self._read_output_files(), ["small.xml"])
+        self.assertEqual(
+            self._read_quarantine(),
+            [(self.large_file, "Node budget of 100 exceeded", 101)],
+        )
+
+    def test_files_within_budget_not_quarantined(self):
+        request = CliRequest(
+            self.input_dir,
+            self.plugins,
+            output=self.output,
+            time_budget=60,
+            quarantine=self.quarantine,
+        )
+        self._create_use_case().process(request)
+        self.assertEqual(self._read_output_files(), ["large.xml", "small.xml"])
+        self.assertEqual(self._read_quarantine(), [])
+
+    def _create_use_case(self):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+
+    def _write_file(self, name, paragraphs):
+        path = os.path.join(self.input_dir, name)
+        with open(path, "wb") as ptr:
+            ptr.write(
+                b"<TEI xmlns='http://www.tei-c.org/ns/1.0'><teiHeader/><text><body>"
+                + b"<div><p>text</p></div>tail" * paragraphs
+                + b"</body></text></TEI>"
+            )
+        return path
+
+    def _read_output_files(self):
+        return sorted(file for _, _, files in os.walk(self.output) for file in files)
+
+    def _read_quarantine(self):
+        with open(self.quarantine, encoding="utf-8") as ptr:
+            return [
+                (entry["file"], entry["reason"], entry["nodes"])
+                for entry in map(json.loads, ptr)
+            ]
+
+
+class JournalUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.input_dir = os.path.join(self.tempdir.name, "input")
+        os.mkdir(self.input_dir)
+        self.output = os.path.join(self.tempdir.name, "output")
+        self.journal = os.path.join(self.tempdir.name, "journal.jsonl")
+        self._write_file("changed.xml", b"<TEI><teiHeader type='a'/><text/></TEI>")
+        self._write_file("unchanged.xml", b"<TEI><teiHeader/><text/></TEI>")
+        self._write_file("malformed.xml", b"<TEI><teiHeader><a></teiHeader></TEI>")
+        self._write_file("no_tei.xml", b"<root/>")
+        self.expected_statuses = {
+            "changed.xml": "transformed",
+            "unchanged.xml": "unchanged",
+            "malformed.xml": "syntax-error",
+            "no_tei.xml": "ignored",
+        }
+
+    def test_status_of_each_file_recorded(self):
+        with self.assertLogs():
+            self._create_use_case().process(self._request())
+        self.assertEqual(self._read_statuses(), self.expected_statuses)
+        run, entry = self._read_journal()[:2]
+        self.assertEqual(
+            run["output"], os.path.abspath(os.path.join(self.tempdir.name, "output"))
+        )
+        self.assertEqual(
+            set(entry), {"file", "status", "duration", "output"}, msg=entry
+        )
+
+    def test_output_path_recorded(self):
+        with self.assertLogs():
+            self._create_use_case().process(self._request())
+        outputs = {
+            os.path.basename(entry["file"]): entry["output"]
+            for entry in self._read_journal()[1:]
+        }
+        self.assertEqual(
+            outputs["changed.xml"],
+            os.path.join(self.output, "input", "changed.xml"),
+        )
+        self.assertTrue(os.path.isfile(outputs["changed.xml"]))
+        self.assertIsNone(outputs["malformed.xml"])
+
+    def test_status_recorded_by_workers(self):
+        with self.assertLogs():
+            self._create_use_case().process(self._request(jobs=2))
+        self.assertEqual(self._read_statuses(), self.expected_statuses)
+
+    def test_status_recorded_in_pipeline(self):
+        with self.assertLogs():
+            self._create_use_case().process(self._request(prefetch=2))
+        self.assertEqual(self._read_statuses(), self.expected_statuses)
+
+    def test_status_of_valid_and_cached_files_recorded(self):
+        request = self._request(
+            file_or_dir=os.path.join(self.input_dir, "unchanged.xml"),
+            validation=True,
+            copy_valid=True,
+            cache=os.path.join(self.tempdir.name, "cache.db"),
+        )
+        self._create_use_case(validator=FakeValidator(True)).process(request)
+        self.assertEqual(self._read_statuses(), {"unchanged.xml": "valid-copied"})
+        self._create_use_case(validator=FakeValidator(True)).process(request)
+        self.assertEqual(self._read_statuses(), {"unchanged.xml": "cached"})
+
+    def test_completed_files_skipped_when_resumed(self):
+        with self.assertLogs():
+            self._create_use_case().process(self._request())
+        self._write_file("new.xml", b"<TEI><teiHeader type='a'/><text/></TEI>")
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(self._request(resume=True))
+        self.assertEqual(
+            iterator.parsed_files, [os.path.join(self.input_dir, "new.xml")]
+        )
+        self.assertEqual(
+            self._read_statuses(),
+            dict(self.expected_statuses, **{"new.xml": "transformed"}),
+        )
+
+    def test_files_after_interruption_processed_when_resumed(self):
+        with self.assertLogs():
+            self._create_use_case().process(self._request())
+        lines = self._read_journal()
+        interrupted = lines[-1]["file"]
+        # the run was interrupted while the last entry was written
+        with open(self.journal, "w", encoding="utf-8") as ptr:
+            for line in lines[:-1]:
+                ptr.write(json.dumps(line) + "\n")
+            ptr.write(json.dumps(lines[-1])[:10])
+        iterator = SpyXMLTreeIterator()
+        with self.assertLogs(level="DEBUG"):
+            self._create_use_case(iterator).process(self._request(resume=True))
+        self.assertEqual(iterator.parsed_files, [interrupted])
+        with open(self.journal, encoding="utf-8") as ptr:
+            resumed = ptr.read().split("\n")
+        # the incomplete line is left as it is and skipped when read
+        self.assertEqual(len(resumed), len(lines) + 2)
+        self.assertEqual(json.loads(resumed[-2])["file"], interrupted)
+
+    def test_files_processed_again_without_resume(self):
+        with self.assertLogs():
+            self._create_use_case().process(self._request())
+        iterator = SpyXMLTreeIterator()
+        with self.assertLogs():
+            self._create_use_case(iterator).process(self._request())
+        self.assertEqual(len(iterator.parsed_files), 4)
+        self.assertEqual(len(self._read_journal()), 5)
+
+    def test_run_with_other_settings_not_resumed(self):
+        with self.assertLogs():
+            self._create_use_case().process(self._request())
+        with self.assertRaises(SystemExit):
+            self._create_use_case().process(
+                self._request(observers=["schemalocation"], resume=True)
+            )
+
+    def _request(self, **kwargs):
+        arguments = dict(
+            file_or_dir=self.input_dir,
+            observers=["teiheader-type"],
+            output=self.output,
+            journal=self.journal,
+        )
+        arguments.update(kwargs)
+        return CliRequest(**arguments)
+
+    def _create_use_case(self, iterator=None, validator=None):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=iterator or XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+            tei_validator=validator,
+        )
+
+    def _write_file(self, name, data):
+        with open(os.path.join(self.input_dir, name), "wb") as ptr:
+            ptr.write(data)
+
+    def _read_journal(self):
+        with open(self.journal, encoding="utf-8") as ptr:
+            return [json.loads(line) for line in ptr]
+
+    def _read_statuses(self):
+        return {
+            os.path.basename(entry["file"]): entry["status"]
+            for entry in self._read_journal()[1:]
+        }
+
+
+class ShardUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = os.path.join("tests", "testdata", "dir_with_subdirs")
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.output = os.path.join(self.tempdir.name, "output")
+        self.plugins = ["teiheader-type", "schemalocation"]
+
+    def test_output_of_shards_identical_to_single_run(self):
+        self._create_use_case().process(self._request(output=self.output))
+        expected = self._read_output_files(self.output)
+        outputs = {}
+        for index in range(1, 4):
+            output = os.path.join(self.tempdir.name, str(index))
+            self._create_use_case().process(
+                self._request(output=output, shard=(index, 3))
+            )
+            shard_outputs = self._read_output_files(output)
+            self.assertFalse(set(outputs) & set(shard_outputs))
+            outputs.update(shard_outputs)
+        self.assertEqual(len(expected), 6)
+        self.assertEqual(outputs, expected)
+
+    def test_shard_processed_by_workers(self):
+        for jobs in [1, 2]:
+            output = os.path.join(self.tempdir.name, str(jobs))
+            self._create_use_case().process(
+                self._request(output=output, shard=(2, 3), jobs=jobs)
+            )
+        self.assertEqual(
+            self._read_output_files(os.path.join(self.tempdir.name, "1")),
+            self._read_output_files(os.path.join(self.tempdir.name, "2")),
+        )
+
+    def test_files_of_shard_determined_by_relative_path(self):
+        # the same files are selected for another path to the input directory
+        iterators = [SpyXMLTreeIterator(), SpyXMLTreeIterator()]
+        for iterator, input_dir in zip(
+            iterators, [self.input_dir, os.path.abspath(self.input_dir) + os.sep]
+        ):
+            self._create_use_case(iterator).process(
+                self._request(file_or_dir=input_dir, shard=(1, 2))
+            )
+        relative_paths = [
+            sorted(
+                os.path.relpath(file, self.input_dir) for file in iterator.parsed_files
+            )
+            for iterator in iterators
+        ]
+        self.assertTrue(relative_paths[0])
+        self.assertEqual(relative_paths[0], relative_paths[1])
+
+    def test_output_of_file_list_identical_to_single_run(self):
+        self._create_use_case().process(self._request(output=self.output))
+        expected = self._read_output_files(self.output)
+        output = os.path.join(self.tempdir.name, "list")
+        files = [
+            os.path.join(self.input_dir, "dir1", "file12.xml"),
+            os.path.abspath(
+                os.path.join(self.input_dir, "dir2", "subdir2", "file221.xml")
+            ),
+        ]
+        file_list = self._write_file_list(files)
+        self._create_use_case().process(
+            self._request(output=output, file_list=file_list)
+        )
+        outputs = self._read_output_files(output)
+        self.assertEqual(len(outputs), 2)
+        self.assertEqual(outputs, {path: expected[path] for path in outputs})
+
+    def test_file_list_read_from_stdin(self):
+        iterator = SpyXMLTreeIterator()
+        file = os.path.join(self.input_dir, "dir1", "file11.xml")
+        with mock.patch("sys.stdin", io.StringIO(file + "\n\n")):
+            self._create_use_case(iterator).process(self._request(file_list="-"))
+        self.assertEqual(iterator.parsed_files, [file])
+
+    def test_files_outside_input_directory_ignored(self):
+        iterator = SpyXMLTreeIterator()
+        files = [
+            os.path.join("tests", "testdata", "file_with_empty_body.xml"),
+            os.path.join(self.input_dir, "dir1", "missing.xml"),
+            os.path.join(self.input_dir, "dir1", "file11.xml"),
+        ]
+        file_list = self._write_file_list(files)
+        with self.assertLogs() as logged:
+            self._create_use_case(iterator).process(self._request(file_list=file_list))
+        self.assertEqual(iterator.parsed_files, files[2:])
+        self.assertEqual(len(logged.output), 2)
+        self.assertIn("ignored: %s" % files[0], logged.output[0])
+
+    def test_file_list_requires_directory(self):
+        file_list = self._write_file_list([])
+        with self.assertRaises(SystemExit):
+            self._create_use_case().process(
+                self._request(
+                    file_or_dir=os.path.join(self.input_dir, "dir1", "file11.xml"),
+                    file_list=file_list,
+                )
+            )
+
+    def test_shards_planned_by_size(self):
+        plan = os.path.join(self.tempdir.name, "plan.json")
+        with self.assertLogs():
+            self._create_use_case().process(
+                CliRequest(self.input_dir, [], plan_shards=plan, shards=2)
+            )
+        with open(plan, encoding="utf-8") as ptr:
+            data = json.load(ptr)
+        self.assertEqual(data["shards"], 2)
+        self.assertEqual(len(data["files"]), 6)
+        self.assertIn("dir2/subdir1/file211.xml", data["files"])
+        self.assertLess(abs(data["sizes"][0] - data["sizes"][1]), 1500)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_files_of_shard_assigned_by_plan(self):
+        plan = os.path.join(self.tempdir.name, "plan.json")
+        with open(plan, "w", encoding="utf-8") as ptr:
+            json.dump({"shards": 2, "files": {"dir1/file11.xml": 2}}, ptr)
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(
+            self._request(shard=(2, 2), shard_plan=plan)
+        )
+        self.assertIn(
+            os.path.join(self.input_dir, "dir1", "file11.xml"), iterator.parsed_files
+        )
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(
+            self._request(shard=(1, 2), shard_plan=plan)
+        )
+        self.assertNotIn(
+            os.path.join(self.input_dir, "dir1", "file11.xml"), iterator.parsed_files
+        )
+
+    def test_plan_with_other_number_of_shards_rejected(self):
+        plan = os.path.join(self.tempdir.name, "plan.json")
+        with open(plan, "w", encoding="utf-8") as ptr:
+            json.dump({"shards": 2, "files": {}}, ptr)
+        with self.assertRaises(SystemExit):
+            self._create_use_case().process(
+                self._request(shard=(1, 3), shard_plan=plan)
+            )
+
+    def test_shard_recorded_in_journal(self):
+        journal = os.path.join(self.tempdir.name, "journal.jsonl")
+        self._create_use_case().process(self._request(shard=(1, 2), journal=journal))
+        with self.assertRaises(SystemExit):
+            self._create_use_case().process(
+                self._request(shard=(2, 2), journal=journal, resume=True)
+            )
+
+    def _request(self, **kwargs):
+        arguments = dict(
+            file_or_dir=self.input_dir,
+            observers=self.plugins,
+            output=self.output,
+        )
+        arguments.update(kwargs)
+        return CliRequest(**arguments)
+
+    def _create_use_case(self, iterator=None):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=iterator or XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+
+    def _write_file_list(self, files):
+        path = os.path.join(self.tempdir.name, "files.txt")
+        with open(path, "w", encoding="utf-8") as ptr:
+            ptr.write("".join(file + "\n" for file in files))
+        return path
+
+    def _read_output_files(self, output_dir):
+        output_files = {}
+        for root, _, files in os.walk(output_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, "rb") as ptr:
+                    output_files[os.path.relpath(path, output_dir)] = ptr.read()
+        return output_files
+
+
+class SurveyUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.data = os.path.join("tests", "testdata")
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.survey = os.path.join(self.tempdir.name, "survey.json")
+        self.xml_writer = MockXmlWriter(testcase=self)
+        self.use_case = TeiTransformationUseCaseImpl(
+            xml_writer=self.xml_writer,
+            tei_transformer=TeiTransformer(xml_iterator=XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+        )
+
+    def test_nothing_written_to_output_directory(self):
+        file = os.path.join(self.data, "file_with_tail_text.xml")
+        self.use_case.process(CliRequest(file, ["tail-text"], survey=self.survey))
+        self.assertEqual(self.xml_writer.written_data, {})
+        self.assertEqual(self.xml_writer.created_dirs, set())
+        self.assertEqual(self.xml_writer.unchanged_files, {})
+
+    def test_hits_of_all_installed_plugins_surveyed(self):
+        file = os.path.join(self.data, "file_with_div_siblings.xml")
+        self.use_case.process(CliRequest(file, ["tail-text"], survey=self.survey))
+        survey = self._read_survey()
+        self.assertEqual(survey["files"], {file: {"div-sibling": 3}})
+        self.assertEqual(survey["total"]["div-sibling"]["hits"], 3)
+        self.assertEqual(survey["total"]["tail-text"]["hits"], 0)
+
+    def test_plugin_requiring_configuration_skipped_without_config(self):
+        file = os.path.join(self.data, "file_with_tail_text.xml")
+        with self.assertLogs() as logged:
+            self.use_case.process(CliRequest(file, [], survey=self.survey))
+        self.assertIn(
+            "WARNING:tei_transform.cli.commands:"
+            "Plugin not surveyed, configuration required: empty-scheme",
+            logged.output,
+        )
+        self.assertNotIn("empty-scheme", self._read_survey()["total"])
+
+    def test_plugin_requiring_configuration_surveyed_with_config(self):
+        file = os.path.join(self.data, "file_with_tail_text.xml")
+        config = os.path.join(self.data, "conf_files", "default.cfg")
+        request = CliRequest(file, [], config=config, survey=self.survey)
+        self.use_case.process(request)
+        self.assertIn("empty-scheme", self._read_survey()["total"])
+
+    def test_malformed_file_ignored(self):
+        file = os.path.join(self.data, "malformed_file.xml")
+        with self.assertLogs() as logged:
+            self.use_case.process(CliRequest(file, [], survey=self.survey))
+        self.assertTrue(any(f"File ignored: {file}" in line for line in logged.output))
+        self.assertEqual(self._read_survey()["ignored_files"], [file])
+
+    def test_sample_of_files_surveyed(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        request = CliRequest(input_dir, [], survey=self.survey, sample=0.5)
+        self.use_case.process(request)
+        survey = self._read_survey()
+        self.assertEqual(survey["files_total"], 6)
+        self.assertEqual(survey["files_surveyed"], 3)
+
+    def test_survey_with_prescan_identical_to_survey_without(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        surveys = []
+        for prescan in [False, True]:
+            request = CliRequest(input_dir, [], survey=self.survey, prescan=prescan)
+            self.use_case.process(request)
+            surveys.append(self._read_survey())
+        self.assertEqual(surveys[0], surveys[1])
+
+    def test_survey_in_parallel_identical_to_sequential_survey(self):
+        input_dir = os.path.join(self.data, "dir_with_subdirs")
+        surveys = []
+        for jobs in [1, 2]:
+            request = CliRequest(input_dir, [], survey=self.survey, jobs=jobs)
+            self.use_case.process(request)
+            surveys.append(self._read_survey())
+        self.assertEqual(surveys[0]["files_surveyed"], 6)
+        self.assertEqual(surveys[0], surveys[1])
+
+    def _read_survey(self):
+        with open(self.survey, encoding="utf-8") as ptr:
+            return json.load(ptr)
+
+
+class FakeValidator:
+    def __init__(self, valid):
+        self.valid = valid
+        self.validated_files = 0
+
+    def validate(self, tree):
+        self.validated_files += 1
+        return self.valid
+
+
+class ResultCacheUseCaseTester(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = os.path.join("tests", "testdata", "dir_with_subdirs")
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.output = os.path.join(self.tempdir.name, "output")
+        self.cache = os.path.join(self.tempdir.name, "cache.db")
+
+    def test_unchanged_files_not_processed_again(self):
+        self._create_use_case().process(self._request())
+        output_files = self._read_output_files()
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(self._request())
+        self.assertEqual(iterator.parsed_files, [])
+        self.assertEqual(self._read_output_files(), output_files)
+
+    def test_files_processed_without_cache(self):
+        self._create_use_case().process(self._request(cache=None))
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(self._request(cache=None))
+        self.assertEqual(len(iterator.parsed_files), 6)
+
+    def test_removed_output_file_written_again(self):
+        self._create_use_case().process(self._request())
+        output_files = self._read_output_files()
+        removed_file = os.path.join(self.output, sorted(output_files)[0])
+        os.remove(removed_file)
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(self._request())
+        self.assertEqual(len(iterator.parsed_files), 1)
+        self.assertEqual(self._read_output_files(), output_files)
+
+    def test_files_processed_again_if_plugins_changed(self):
+        self._create_use_case().process(self._request())
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(
+            self._request(observers=["schemalocation", "teiheader-type"])
+        )
+        self.assertEqual(len(iterator.parsed_files), 6)
+
+    def test_files_processed_again_if_output_dir_changed(self):
+        self._create_use_case().process(self._request())
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(
+            self._request(output=os.path.join(self.tempdir.name, "other"))
+        )
+        self.assertEqual(len(iterator.parsed_files), 6)
+
+    def test_cached_files_not_validated(self):
+        validator = FakeValidator(valid=False)
+        self._create_use_case(validator=validator).process(
+            self._request(validation=True)
+        )
+        self.assertEqual(validator.validated_files, 6)
+        validator = FakeValidator(valid=False)
+        self._create_use_case(validator=validator).process(
+            self._request(validation=True)
+        )
+        self.assertEqual(validator.validated_files, 0)
+
+    def test_scheme_not_compiled_if_all_files_cached(self):
+        self._create_use_case(validator=FakeValidator(valid=True)).process(
+            self._request(validation=True)
+        )
+        use_case = self._create_use_case()
+        use_case.tei_scheme = "non_existing"
+        use_case.process(self._request(validation=True))
+        self.assertIsNone(use_case.tei_validator)
+
+    def test_ignored_valid_files_cached(self):
+        self._create_use_case(validator=FakeValidator(valid=True)).process(
+            self._request(validation=True)
+        )
+        validator = FakeValidator(valid=True)
+        self._create_use_case(validator=validator).process(
+            self._request(validation=True)
+        )
+        self.assertEqual(validator.validated_files, 0)
+        self.assertEqual(self._read_output_files(), {})
+
+    def test_scans_of_input_files_stored_with_prescan(self):
+        self._create_use_case().process(self._request(prescan=True))
+        cache = ResultCache(self.cache, "")
+        self.addCleanup(cache.close)
+        for root, _, files in os.walk(self.input_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                with self.subTest(file=path):
+                    self.assertEqual(
+                        cache.lookup_scan(file_digest(path)), scan_file(path)
+                    )
+
+    def test_stored_scans_reused_by_run_with_other_plugins(self):
+        self._create_use_case().process(self._request(prescan=True))
+        with mock.patch(
+            "tei_transform.cli.file_processor.scan_file", side_effect=AssertionError
+        ):
+            self._create_use_case().process(
+                self._request(observers=["schemalocation"], prescan=True)
+            )
+
+    def test_results_of_parallel_run_cached(self):
+        self._create_use_case().process(self._request(jobs=2))
+        iterator = SpyXMLTreeIterator()
+        self._create_use_case(iterator).process(self._request())
+        self.assertEqual(iterator.parsed_files, [])
+
+    def _request(self, **kwargs):
+        arguments = dict(
+            file_or_dir=self.input_dir,
+            observers=["teiheader-type", "schemalocation"],
+            output=self.output,
+            cache=self.cache,
+        )
+        arguments.update(kwargs)
+        return CliRequest(**arguments)
+
+    def _create_use_case(self, iterator=None, validator=None):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=XmlWriterImpl(),
+            tei_transformer=TeiTransformer(xml_iterator=iterator or XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+            tei_scheme=os.path.join("tei_transform", "tei_all.rng"),
+            tei_validator=validator,
+        )
+
+    def _read_output_files(self):
+        output_files = {}
+        for root, _, files in os.walk(self.output):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, "rb") as ptr:
+                    output_files[os.path.relpath(path, self.output)] = ptr.read()
+        return output_files
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from lxml import etree
+
+from tei_transform.cli.use_case import CliRequest, TeiTransformationUseCaseImpl
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.validation_service import (
+    RemoteValidator,
+    ValidationServer,
+    default_socket_path,
+    schema_digest,
+)
+from tei_transform.xml_tree_iterator import ParserOptions, XMLTreeIterator
+
+SCHEME = b"""<element name="TEI" xmlns="http://relaxng.org/ns/structure/1.0">
+  <zeroOrMore><element name="p"><text/></element></zeroOrMore>
+</element>
+"""
+
+
+class ValidationServiceTester(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.tempdir = tempdir.name
+        self.scheme = os.path.join(self.tempdir, "scheme.rng")
+        with open(self.scheme, "wb") as ptr:
+            ptr.write(SCHEME)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.tempdir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_socket_path_depends_on_content_of_scheme(self):
+        other_scheme = os.path.join(self.tempdir, "other.rng")
+        with open(other_scheme, "wb") as ptr:
+            ptr.write(SCHEME.replace(b"p", b"ab"))
+        self.assertNotEqual(
+            default_socket_path(self.scheme), default_socket_path(other_scheme)
+        )
+        self.assertIn(schema_digest(self.scheme)[:16], default_socket_path(self.scheme))
+
+    def test_socket_path_in_cache_dir(self):
+        self.assertTrue(
+            default_socket_path(self.scheme).startswith(
+                os.path.join(self.tempdir, "tei-transform")
+            )
+        )
+
+    def test_no_remote_validator_if_service_not_running(self):
+        self.assertIsNone(RemoteValidator.connect(default_socket_path(self.scheme)))
+
+    def test_no_remote_validator_for_stale_socket_file(self):
+        socket_path = os.path.join(self.tempdir, "stale.sock")
+        open(socket_path, "w").close()
+        self.assertIsNone(RemoteValidator.connect(socket_path))
+
+    def test_remote_validator_validates_documents(self):
+        socket_path = self._start_service()
+        validator = RemoteValidator.connect(socket_path)
+        valid = etree.ElementTree(etree.XML("<TEI><p>text</p></TEI>"))
+        invalid = etree.ElementTree(etree.XML("<TEI><ab>text</ab></TEI>"))
+        self.assertEqual(
+            [validator.validate(valid), validator.validate(invalid)], [True, False]
+        )
+
+    def test_document_parsed_with_options_of_client(self):
+        socket_path = self._start_service()
+        options = ParserOptions.bounded_memory()
+        # a text node larger than libxml2 accepts without huge_tree
+        data = b"<TEI><p>" + b"text " * (3 << 20) + b"</p></TEI>"
+        tree = etree.fromstring(data, options.create_parser()).getroottree()
+        self.assertFalse(RemoteValidator.connect(socket_path).validate(tree))
+        self.assertTrue(RemoteValidator.connect(socket_path, options).validate(tree))
+
+    def test_use_case_uses_running_service_if_requested(self):
+        self._start_service()
+        use_case = self._create_use_case()
+        use_case._prepare_processing(
+            CliRequest(
+                "file", [], validation=True, validation_service=True, max_memory=1024
+            )
+        )
+        self.assertIsInstance(use_case.tei_validator, RemoteValidator)
+        self.assertEqual(
+            use_case.tei_validator.parser_options, ParserOptions.bounded_memory()
+        )
+
+    def test_use_case_compiles_scheme_without_request_for_service(self):
+        self._start_service()
+        use_case = self._create_use_case()
+        use_case._prepare_processing(CliRequest("file", [], validation=True))
+        self.assertIsInstance(use_case.tei_validator, etree.RelaxNG)
+
+    def test_use_case_compiles_scheme_if_service_not_running(self):
+        use_case = self._create_use_case()
+        with self.assertLogs(level="WARNING"):
+            use_case._prepare_processing(
+                CliRequest("file", [], validation=True, validation_service=True)
+            )
+        self.assertIsInstance(use_case.tei_validator, etree.RelaxNG)
+
+    def _create_use_case(self):
+        return TeiTransformationUseCaseImpl(
+            xml_writer=None,
+            tei_transformer=TeiTransformer(XMLTreeIterator()),
+            observer_constructor=ObserverConstructor(),
+            tei_scheme=self.scheme,
+        )
+
+    def _start_service(self):
+        socket_path = default_socket_path(self.scheme)
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+        server = ValidationServer(socket_path, etree.RelaxNG(etree.parse(self.scheme)))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return socket_path
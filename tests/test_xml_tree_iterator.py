@@ -1,7 +1,11 @@
 import io
+import os
+import tempfile
 import unittest
 
-from tei_transform.xml_tree_iterator import XMLTreeIterator
+from lxml import etree
+
+from tei_transform.xml_tree_iterator import ParserOptions, XMLTreeIterator
 
 
 class XMLTreeIteratorTester(unittest.TestCase):
@@ -85,3 +89,200 @@ class XMLTreeIteratorTester(unittest.TestCase):
         self.assertEqual(
             result, [("text", "first"), ("teiHeader", None), ("text", "second")]
         )
+
+    def test_same_nodes_yielded_for_parsed_tree_as_for_file(self):
+        xml = b"""
+        <TEI xmlns="http://www.tei-c.org/ns/1.0">
+          <teiHeader><text>first</text></teiHeader>
+          <text>second</text>
+          <someOtherNode/>
+        </TEI>
+        """
+        from_file = self.tree_iterator.iterate_xml(io.BytesIO(xml))
+        from_tree = self.tree_iterator.iterate_tree(etree.parse(io.BytesIO(xml)))
+        self.assertEqual(
+            [(node.tag, node.text) for node in from_file],
+            [(node.tag, node.text) for node in from_tree],
+        )
+
+    def test_nodes_of_parsed_tree_not_copied(self):
+        tree = etree.parse(
+            io.BytesIO(b"<TEI><teiHeader/><text>Some text here</text></TEI>")
+        )
+        nodes = list(self.tree_iterator.iterate_tree(tree))
+        self.assertIs(nodes[1], tree.getroot()[0])
+        self.assertIs(nodes[2], tree.getroot()[1])
+
+
+class SplitHeaderTester(unittest.TestCase):
+    def setUp(self):
+        self.tree_iterator = XMLTreeIterator()
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def test_only_header_parsed(self):
+        file = self._write_file(
+            b"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><title/></teiHeader>
+  <text><body><p>text</p></body></text>
+</TEI>
+"""
+        )
+        tree, _ = self.tree_iterator.split_header(file)
+        result = [etree.QName(node).localname for node in tree.iter()]
+        self.assertEqual(result, ["TEI", "teiHeader", "title"])
+
+    def test_unparsed_text_starts_after_header(self):
+        xml = b"""<TEI><teiHeader/>\n  <text><p>&#228;</p></text>\n</TEI>\n"""
+        file = self._write_file(xml)
+        _, unparsed_text = self.tree_iterator.split_header(file)
+        data = io.BytesIO()
+        unparsed_text.copy_to(data)
+        self.assertEqual(
+            data.getvalue(), b"""\n  <text><p>&#228;</p></text>\n</TEI>\n"""
+        )
+
+    def test_file_object_not_split(self):
+        xml = io.BytesIO(b"<TEI><teiHeader/><text/></TEI>")
+        self.assertIsNone(self.tree_iterator.split_header(xml))
+
+    def test_file_with_doctype_not_split(self):
+        file = self._write_file(
+            b"""<!DOCTYPE TEI [<!ENTITY e "entity">]>
+            <TEI><teiHeader/><text>&e;</text></TEI>"""
+        )
+        self.assertIsNone(self.tree_iterator.split_header(file))
+
+    def test_file_with_other_encoding_not_split(self):
+        file = self._write_file(
+            b"""<?xml version="1.0" encoding="ISO-8859-1"?>
+            <TEI><teiHeader/><text>\xe4</text></TEI>"""
+        )
+        self.assertIsNone(self.tree_iterator.split_header(file))
+
+    def test_file_with_ascii_encoding_split(self):
+        file = self._write_file(
+            b"""<?xml version="1.0" encoding="ascii"?>
+            <TEI><teiHeader/><text/></TEI>"""
+        )
+        self.assertIsNotNone(self.tree_iterator.split_header(file))
+
+    def test_file_with_other_elements_after_text_not_split(self):
+        file = self._write_file(b"<TEI><teiHeader/><text/><back/></TEI>")
+        self.assertIsNone(self.tree_iterator.split_header(file))
+
+    def test_file_with_other_elements_before_text_not_split(self):
+        file = self._write_file(b"<TEI><teiHeader/><facsimile/><text/></TEI>")
+        self.assertIsNone(self.tree_iterator.split_header(file))
+
+    def test_file_without_header_not_split(self):
+        file = self._write_file(b"<TEI><text/></TEI>")
+        self.assertIsNone(self.tree_iterator.split_header(file))
+
+    def test_file_with_prefixed_tei_element_not_split(self):
+        file = self._write_file(
+            b"""<tei:TEI xmlns:tei="http://www.tei-c.org/ns/1.0">
+            <tei:teiHeader/><tei:text/></tei:TEI>"""
+        )
+        self.assertIsNone(self.tree_iterator.split_header(file))
+
+    def test_file_with_end_tag_of_header_in_comment_not_split(self):
+        file = self._write_file(
+            b"<TEI><teiHeader><!-- </teiHeader> --></teiHeader><text/></TEI>"
+        )
+        self.assertIsNone(self.tree_iterator.split_header(file))
+
+    def test_large_header_split(self):
+        paragraphs = b"<p>note</p>" * 20000
+        file = self._write_file(
+            b"<TEI><teiHeader><notesStmt>"
+            + paragraphs
+            + b"</notesStmt></teiHeader><text/></TEI>"
+        )
+        tree, unparsed_text = self.tree_iterator.split_header(file)
+        self.assertEqual(len(tree.find("teiHeader/notesStmt")), 20000)
+        self.assertEqual(unparsed_text.offset, os.path.getsize(file) - 13)
+
+    def _write_file(self, data):
+        file = os.path.join(self.tempdir.name, "file.xml")
+        with open(file, "wb") as ptr:
+            ptr.write(data)
+        return file
+
+
+class BoundedMemoryIteratorTester(unittest.TestCase):
+    def setUp(self):
+        self.tree_iterator = XMLTreeIterator(ParserOptions.bounded_memory())
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def test_same_nodes_yielded_as_with_default_options(self):
+        file = self._write_file(
+            b"""<TEI xmlns="http://www.tei-c.org/ns/1.0">
+            <teiHeader><fileDesc/></teiHeader>
+            <text><body><p>text</p></body></text>
+            </TEI>"""
+        )
+        expected = [
+            etree.tostring(node) for node in XMLTreeIterator().iterate_xml(file)
+        ]
+        result = [etree.tostring(node) for node in self.tree_iterator.iterate_xml(file)]
+        self.assertEqual(result, expected)
+
+    def test_file_with_duplicate_ids_parsed(self):
+        file = self._write_file(
+            b"<TEI><teiHeader/><text><p xml:id='a'/><p xml:id='a'/></text></TEI>"
+        )
+        with self.assertRaises(etree.XMLSyntaxError):
+            list(XMLTreeIterator().iterate_xml(file))
+        nodes = list(self.tree_iterator.iterate_xml(file))
+        self.assertEqual(len(nodes[2]), 2)
+
+    def test_unwanted_siblings_removed_from_parsed_tree(self):
+        file = self._write_file(
+            b"<TEI><front/><teiHeader/><facsimile/><text/><back/></TEI>"
+        )
+        nodes = list(self.tree_iterator.iterate_xml(file))
+        parent = nodes[1].getparent()
+        self.assertEqual([child.tag for child in parent], ["teiHeader", "text", "back"])
+
+    def test_parser_reused_after_malformed_file(self):
+        malformed = self._write_file(b"<TEI><teiHeader/><text>", "malformed.xml")
+        with self.assertRaises(etree.XMLSyntaxError):
+            list(self.tree_iterator.iterate_xml(malformed))
+        file = self._write_file(b"<TEI><teiHeader/><text/></TEI>")
+        result = [node.tag for node in self.tree_iterator.iterate_xml(file)]
+        self.assertEqual(result, ["TEI", "teiHeader", "text"])
+
+    def test_parser_reused_after_iteration_stopped(self):
+        file = self._write_file(b"<TEI><teiHeader/><text/></TEI>")
+        nodes = self.tree_iterator.iterate_xml(file)
+        next(nodes)
+        nodes.close()
+        result = [node.tag for node in self.tree_iterator.iterate_xml(file)]
+        self.assertEqual(result, ["TEI", "teiHeader", "text"])
+
+    def test_comments_removed(self):
+        self.tree_iterator.set_parser_options(
+            ParserOptions.bounded_memory(remove_comments=True)
+        )
+        file = self._write_file(
+            b"<TEI><teiHeader/><text><!-- comment --><p/></text></TEI>"
+        )
+        nodes = list(self.tree_iterator.iterate_xml(file))
+        self.assertEqual(etree.tostring(nodes[2]), b"<text><p/></text>")
+        self.assertEqual(
+            etree.tostring(self.tree_iterator.parse(file).find("text")),
+            b"<text><p/></text>",
+        )
+
+    def test_comments_kept_by_default(self):
+        file = self._write_file(b"<TEI><teiHeader/><text><!-- c --></text></TEI>")
+        nodes = list(self.tree_iterator.iterate_xml(file))
+        self.assertEqual(len(nodes[2]), 1)
+
+    def _write_file(self, data, name="file.xml"):
+        file = os.path.join(self.tempdir.name, name)
+        with open(file, "wb") as ptr:
+            ptr.write(data)
+        return file
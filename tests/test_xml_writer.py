@@ -3,6 +3,7 @@ import unittest
 
 from lxml import etree
 
+from tei_transform.xml_tree_iterator import UnparsedText
 from tei_transform.xml_writer import XmlWriterImpl
 
 
@@ -38,6 +39,79 @@ class XmlWriterTester(unittest.TestCase):
         expected = f"{xml_declaration}\n{etree.tostring(data, encoding='unicode')}"
         self.assertEqual(expected, file_data)
 
+    def test_unparsed_text_appended_to_header(self):
+        file_path = os.path.join(self.output_dir, "test.xml")
+        os.makedirs(self.output_dir)
+        source = os.path.join(self.output_dir, "source.xml")
+        with open(source, "wb") as ptr:
+            ptr.write(b"<TEI><teiHeader/>\n<text><p>&#228;</p></text>\n</TEI>\n")
+        data = etree.XML("<TEI><teiHeader><title/></teiHeader></TEI>")
+        self.xml_writer.write_xml(file_path, data, UnparsedText(source, 17))
+        with open(file_path, "rb") as ptr:
+            file_data = ptr.read()
+        expected = (
+            b"<?xml version='1.0' encoding='UTF-8'?>\n"
+            b"<TEI><teiHeader><title/></teiHeader>\n"
+            b"<text><p>&#228;</p></text>\n</TEI>\n"
+        )
+        self.assertEqual(expected, file_data)
+
+    def test_chunks_written_to_file(self):
+        file_path = os.path.join(self.output_dir, "test.xml")
+        os.makedirs(self.output_dir)
+        written = self.xml_writer.write_stream(file_path, [b"<TEI>", b"</TEI>"])
+        self.assertTrue(written)
+        with open(file_path, "rb") as ptr:
+            self.assertEqual(ptr.read(), b"<TEI></TEI>")
+
+    def test_no_file_created_without_chunks(self):
+        file_path = os.path.join(self.output_dir, "test.xml")
+        os.makedirs(self.output_dir)
+        written = self.xml_writer.write_stream(file_path, [])
+        self.assertFalse(written)
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_no_incomplete_file_left_after_error(self):
+        def chunks():
+            yield b"<TEI>"
+            raise etree.XMLSyntaxError("error", None, 1, 1)
+
+        file_path = os.path.join(self.output_dir, "test.xml")
+        os.makedirs(self.output_dir)
+        with open(file_path, "wb") as ptr:
+            ptr.write(b"<old/>")
+        with self.assertRaises(etree.XMLSyntaxError):
+            self.xml_writer.write_stream(file_path, chunks())
+        self.assertEqual(os.listdir(self.output_dir), ["test.xml"])
+        with open(file_path, "rb") as ptr:
+            self.assertEqual(ptr.read(), b"<old/>")
+
+    def test_unchanged_file_copied(self):
+        source = os.path.join(self.data, "file_with_double_item.xml")
+        file_path = os.path.join(self.output_dir, "test.xml")
+        os.makedirs(self.output_dir)
+        self.xml_writer.copy_unchanged_file(source, file_path)
+        with open(source, "rb") as expected, open(file_path, "rb") as result:
+            self.assertEqual(expected.read(), result.read())
+
+    def test_unchanged_file_linked(self):
+        source = os.path.join(self.data, "file_with_double_item.xml")
+        file_path = os.path.join(self.output_dir, "test.xml")
+        os.makedirs(self.output_dir)
+        self.xml_writer.copy_unchanged_file(source, file_path, link=True)
+        self.assertTrue(os.path.samefile(source, file_path))
+
+    def test_writing_to_linked_file_doesnt_change_source(self):
+        os.makedirs(self.output_dir)
+        source = os.path.join(self.output_dir, "source.xml")
+        with open(source, "wb") as ptr:
+            ptr.write(b"<TEI/>")
+        file_path = os.path.join(self.output_dir, "test.xml")
+        self.xml_writer.copy_unchanged_file(source, file_path, link=True)
+        self.xml_writer.write_xml(file_path, etree.XML("<element/>"))
+        with open(source, "rb") as ptr:
+            self.assertEqual(ptr.read(), b"<TEI/>")
+
     def test_file_created_in_nested_dir(self):
         file_path = os.path.join(self.output_dir, "subdir", "text.xml")
         os.makedirs(os.path.join(self.output_dir, "subdir"))
@@ -0,0 +1,325 @@
+import configparser
+import glob
+import os
+import random
+import unittest
+
+from lxml import etree
+
+from tei_transform.observer import (
+    ClasscodeObserver,
+    EmptyAttributeObserver,
+    FilenameElementObserver,
+    HLevelObserver,
+    IdAttributeObserver,
+    PtrTargetObserver,
+    TeiHeaderTypeObserver,
+)
+from tei_transform.observer_constructor import ObserverConstructor
+from tei_transform.observer_statistics import TransformationProfile
+from tei_transform.tei_transformer import TeiTransformer
+from tei_transform.xml_tree_iterator import XMLTreeIterator
+from tei_transform.xslt_backend import XsltRule, compile_observers
+
+PLUGIN_SETS = [
+    [
+        "schemalocation",
+        "id-attribute",
+        "teiheader-type",
+        "notesstmt",
+        "filename-element",
+    ],
+    ["classcode"],
+    ["filename-element"],
+    ["h-level"],
+    ["ptr-target"],
+    ["num-value"],
+    ["author-type"],
+    ["empty-attrib"],
+    [
+        "classcode",
+        "h-level",
+        "ptr-target",
+        "num-value",
+        "id-attribute",
+        "teiheader-type",
+        "notesstmt",
+        "schemalocation",
+        "filename-element",
+    ],
+]
+
+DOCUMENTS = [
+    """<TEI xmlns="http://www.tei-c.org/ns/1.0"
+  xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+  xsi:schemaLocation="scheme.xsd" id="tei">
+  <teiHeader type="text">
+    <fileDesc><titleStmt><title>title</title>
+    <author type="person">name</author></titleStmt>
+    <notesStmt type="a"><note>note</note></notesStmt>
+    <filename/>tail</fileDesc>
+    <profileDesc><textClass><classcode scheme="s">1</classcode></textClass>
+    </profileDesc>
+  </teiHeader>
+  <text><body>
+    <h2 class="c" type="t" title="t" n="1">head</h2>after
+    <h٣ id="h">head</h٣><!-- comment -->
+    <div id="d" xml:id="x"><p>text <ptr target="" n="1"/> and
+    <num value="percent" type="t">10</num><num value="10">10</num></p></div>
+    <p rend="" n="">text</p><classcode/>
+  </body></text>
+</TEI>""",
+    """<TEI xmlns:x="urn:x" schemaLocation="scheme.xsd">
+  <teiHeader><fileDesc/></teiHeader>
+  <text><x:h1 rend="r">head</x:h1><?pi data?><x:p id="p"/></text>
+</TEI>""",
+    """<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <teiHeader><fileDesc><filename>name</filename>tail<p/></fileDesc></teiHeader>
+  <text><p>text</p></text>
+</TEI>""",
+    # elements of the header can also occur in <text>
+    """<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <teiHeader><fileDesc><titleStmt><title>title</title></titleStmt></fileDesc>
+  </teiHeader>
+  <text><body><p>a<filename>f.xml</filename>b</p></body>
+  <back><listBibl><biblFull><titleStmt><title>title</title></titleStmt>
+  <publicationStmt><p>publication</p></publicationStmt>
+  <notesStmt type="x"><note>note</note></notesStmt>
+  <sourceDesc><p>source</p></sourceDesc></biblFull>
+  <bibl><classcode scheme="s">1</classcode></bibl></listBibl></back></text>
+</TEI>""",
+]
+
+_TAGS = ["p", "h2", "h10", "classcode", "filename", "ptr", "num", "author", "x:h3"]
+_ATTRIBUTES = [
+    ("id", "a"),
+    ("class", "c"),
+    ("title", "t"),
+    ("type", "t"),
+    ("type", ""),
+    ("target", ""),
+    ("value", "percent"),
+    ("rend", ""),
+    ("n", ""),
+    ("role", "r"),
+]
+
+
+class XsltBackendEquivalenceTester(unittest.TestCase):
+    def setUp(self):
+        self.config = configparser.ConfigParser()
+        self.config.read_dict(
+            {
+                "author-type": {"action": "replace"},
+                "empty-attrib": {"target": "rend, n, type"},
+            }
+        )
+        self.documents = [document.encode("utf-8") for document in DOCUMENTS]
+        for file in sorted(glob.glob("tests/testdata/**/*.xml", recursive=True)):
+            with open(file, "rb") as ptr:
+                self.documents.append(ptr.read())
+        rng = random.Random(0)
+        self.documents += [_random_document(rng) for _ in range(50)]
+
+    def test_stylesheet_transforms_documents_like_observers(self):
+        for plugins in PLUGIN_SETS:
+            observer_lists = ObserverConstructor().construct_observers(
+                plugins, self.config
+            )
+            self.assertIsNotNone(
+                compile_observers(observer_lists[0] + observer_lists[1])
+            )
+            for i, document in enumerate(self.documents):
+                with self.subTest(plugins=plugins, document=i):
+                    try:
+                        expected = _transform(document, plugins, self.config, False)
+                    except (etree.XMLSyntaxError, ValueError, KeyError):
+                        # documents the observers can't transform in Python
+                        continue
+                    result = _transform(document, plugins, self.config, True)
+                    self.assertEqual(result, expected)
+
+    def test_header_elements_in_text_transformed(self):
+        document = DOCUMENTS[3]
+        for plugins in [["filename-element"], ["notesstmt"], ["classcode"]]:
+            with self.subTest(plugins=plugins):
+                expected = _transform(document, plugins, None, False)
+                self.assertTrue(expected[1])
+                self.assertEqual(_transform(document, plugins, None, True), expected)
+        result, _ = _transform(document, PLUGIN_SETS[-1], None, True)
+        for removed in [b"<filename", b'type="x"', b"<classcode"]:
+            self.assertNotIn(removed, result)
+
+    def test_author_type_removed_without_configuration(self):
+        document = DOCUMENTS[0]
+        self.assertEqual(
+            _transform(document, ["author-type"], None, True),
+            _transform(document, ["author-type"], None, False),
+        )
+
+
+class XsltBackendTester(unittest.TestCase):
+    def test_observers_without_rules_not_compiled(self):
+        observers = [TeiHeaderTypeObserver(), FakeObserver()]
+        self.assertIsNone(compile_observers(observers))
+
+    def test_observers_changing_same_attribute_not_compiled(self):
+        observer = EmptyAttributeObserver()
+        observer.configure({"target": "target"})
+        self.assertIsNone(compile_observers([PtrTargetObserver(), observer]))
+
+    def test_observer_renaming_scope_of_other_observer_not_compiled(self):
+        renaming = FakeObserver([XsltRule.create({"teiHeader"}, new_tag="header")])
+        scoped = FakeObserver(
+            [XsltRule.create({"classcode"}, scope="teiHeader", new_tag="classCode")]
+        )
+        self.assertIsNone(compile_observers([renaming, scoped]))
+
+    def test_observers_with_disjoint_rules_compiled(self):
+        observers = [ClasscodeObserver(), HLevelObserver(), IdAttributeObserver()]
+        self.assertIsNotNone(compile_observers(observers))
+
+    def test_nothing_compiled_without_rules(self):
+        self.assertIsNone(compile_observers([EmptyAttributeObserver()]))
+
+    def test_empty_attribute_with_prefixed_target_not_compiled(self):
+        observer = EmptyAttributeObserver()
+        observer.configure({"target": "xml:lang"})
+        self.assertIsNone(observer.xslt_rules())
+
+    def test_removed_element_with_children_not_supported(self):
+        compiled = compile_observers([FilenameElementObserver()])
+        header = etree.fromstring(
+            "<teiHeader><fileDesc><filename/>tail</fileDesc></teiHeader>"
+        )
+        self.assertTrue(compiled.supports([header]))
+        header[0][0].append(etree.Element("p"))
+        self.assertFalse(compiled.supports([header]))
+
+    def test_unchanged_tree_returned_as_is(self):
+        compiled = compile_observers([HLevelObserver()])
+        root = etree.fromstring("<TEI><text><p/></text></TEI>")
+        self.assertEqual(compiled.transform(root), (root, False))
+
+    def test_existing_attributes_replaced_in_place(self):
+        compiled = compile_observers([HLevelObserver(), IdAttributeObserver()])
+        root = etree.fromstring(
+            "<TEI><text><h2 n='1' type='t' class='c'/>"
+            "<p id='new' xml:id='old' n='2'/></text></TEI>"
+        )
+        new_root, changed = compiled.transform(root)
+        self.assertTrue(changed)
+        self.assertEqual(
+            etree.tostring(new_root),
+            b'<TEI><text><ab n="1" type="head" rend="h2"/>'
+            b'<p xml:id="new" n="2"/></text></TEI>',
+        )
+
+    def test_h_level_with_other_numeric_character_compiled(self):
+        compiled = compile_observers([HLevelObserver()])
+        new_root, _ = compiled.transform(etree.fromstring("<TEI><h٣/></TEI>"))
+        self.assertEqual(new_root[0].tag, "ab")
+        self.assertEqual(new_root[0].get("rend"), "h٣")
+
+
+class TeiTransformerXsltTester(unittest.TestCase):
+    def setUp(self):
+        self.transformer = TeiTransformer(XMLTreeIterator())
+        self.transformer.use_xslt = True
+        self.observers = ObserverConstructor().construct_observers(
+            ["teiheader-type", "classcode"]
+        )
+
+    def test_stylesheet_used_for_compilable_observers(self):
+        self.transformer.set_list_of_observers(self.observers)
+        self.assertTrue(self.transformer.uses_stylesheet())
+
+    def test_stylesheet_not_used_by_default(self):
+        self.transformer.use_xslt = False
+        self.transformer.set_list_of_observers(self.observers)
+        self.assertFalse(self.transformer.uses_stylesheet())
+
+    def test_stylesheet_not_used_for_other_observers(self):
+        observers = ObserverConstructor().construct_observers(
+            ["teiheader-type", "missing-body"]
+        )
+        self.transformer.set_list_of_observers(observers)
+        self.assertFalse(self.transformer.uses_stylesheet())
+
+    def test_changed_file_transformed(self):
+        self.transformer.set_list_of_observers(self.observers)
+        root = self.transformer.perform_transformation(
+            os.path.join("tests", "testdata", "file_with_misspelled_classcode.xml")
+        )
+        self.assertTrue(self.transformer.xml_tree_changed())
+        self.assertIsNotNone(root.find(".//{*}classCode"))
+        self.assertIsNone(root.find(".//{*}classcode"))
+
+    def test_observers_profiled_in_python(self):
+        self.transformer.set_list_of_observers(self.observers)
+        self.transformer.profile = TransformationProfile()
+        filename = os.path.join(
+            "tests", "testdata", "file_with_misspelled_classcode.xml"
+        )
+        self.transformer.perform_transformation(filename)
+        self.assertTrue(
+            self.transformer.profile.statistics(
+                filename, self.observers[0][0]
+            ).observe_calls
+        )
+
+
+class FakeObserver:
+    def __init__(self, rules=None):
+        self.rules = rules
+
+    def observe(self, node):
+        return False
+
+    def transform_node(self, node):
+        pass
+
+    def xslt_rules(self):
+        return self.rules
+
+
+def _transform(document, plugins, config, use_xslt):
+    transformer = TeiTransformer(XMLTreeIterator())
+    transformer.use_xslt = use_xslt
+    transformer.set_list_of_observers(
+        ObserverConstructor().construct_observers(plugins, config)
+    )
+    assert transformer.uses_stylesheet() == use_xslt
+    root = transformer.perform_transformation(
+        "document", etree.ElementTree(etree.fromstring(document))
+    )
+    if root is None:
+        return None
+    return (
+        etree.tostring(root.getroottree(), xml_declaration=True, encoding="UTF-8"),
+        transformer.xml_tree_changed(),
+    )
+
+
+def _random_document(rng):
+    namespace = rng.choice(['xmlns="http://www.tei-c.org/ns/1.0"', ""])
+    header_type = rng.choice(["type='a'", ""])
+    return (
+        f"<TEI {namespace} xmlns:x='urn:x'><teiHeader {header_type}>"
+        f"{_random_element(rng)}<fileDesc>{_random_element(rng)}</fileDesc>"
+        f"</teiHeader>\n<text>{_random_element(rng)}{_random_element(rng)}</text>"
+        "</TEI>"
+    ).encode("utf-8")
+
+
+def _random_element(rng, depth=0):
+    tag = rng.choice(_TAGS)
+    attributes = " ".join(
+        f"{name}='{value}'"
+        for name, value in dict(rng.sample(_ATTRIBUTES, rng.randint(0, 3))).items()
+    )
+    children = "".join(
+        _random_element(rng, depth + 1) + rng.choice(["", "tail", "\n"])
+        for _ in range(rng.randint(0, 3 if depth < 3 else 0))
+    )
+    return f"<{tag} {attributes}>{rng.choice(['', 'text'])}{children}</{tag}>"